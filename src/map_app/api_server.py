@@ -0,0 +1,527 @@
+"""Headless JSON API over the location, weather and visibility services.
+
+Endpoints (GET; lat and lon in degrees):
+
+    /health                                           worker pid and memory use per cache
+    /metrics                                          Prometheus metrics of the answering worker
+    /v1/optimal     lat, lon, radius_km=25, top_n=5   best-scored dark pixels on the light pollution maps,
+                    min_separation_km, sectors=0      kept apart (or the best per compass sector)
+    /v1/nearby      lat, lon, radius_km=25, top_n=10  nearest GaN observation sites
+                    rank_by=distance|score            (or best-scored first)
+    /v1/plan        lat, lon, radius_km=25, sites=50  best (site, night, window) this week among the
+                    source=optimal|nearby, nights=7,  finder's (or nearby) sites
+                    window_hours=3, top_n=10
+    /v1/weather     lat, lon                          cloudiness, moon and Bortle class
+    /v1/visibility  lat, lon                          Bortle model prediction
+    /v1/batch       POST {"queries": [{"op": "nearby", "lat": 40.7, "lon": -74.0}, ...]}
+
+Responses are compact JSON (no whitespace, floats rounded to 6 decimals) and
+are gzip-compressed when the client accepts it. With ``encoding=columns``
+lists of records are sent as ``{"columns": [...], "rows": [[...], ...]}``,
+which drops the repeated keys.
+
+The parent process decodes the light pollution rasters, loads the
+observation dataset and the Bortle model, binds the socket and then forks the
+workers. The workers share that memory copy-on-write and accept connections
+on the same socket; the parent restarts any worker that dies.
+
+Run from ``src/map_app``:
+
+    python -m api_server --workers 4 --port 8080 --preload-regions "North America,Europe"
+"""
+import argparse
+import gzip
+import json
+import logging
+import math
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from config import (
+    API_BATCH_THREADS,
+    API_GZIP_MIN_BYTES,
+    API_HOST,
+    API_MAX_BATCH,
+    API_PORT,
+    API_WORKERS,
+    OBSERVING_WINDOW_HOURS,
+    PLANNER_NIGHTS,
+)
+from models.bortle_predictor import BortlePredictor
+from models.optimal_locations import CONTINENTS, OptimalLocationFinder
+from services.memory_budget import get_memory_usage
+from services.nearby_locations_service import find_nearby_observation_locations
+from services.observation_points import load_observation_points
+from services.planner_service import plan_observing_nights
+from services.visibility_service import get_sky_visibility
+from services.weather_service import get_bortle_scale, get_cloudiness, get_moon_brightness
+from utils.instrumentation import PROMETHEUS_CONTENT_TYPE, profile_request, render_prometheus
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class ApiError(Exception):
+    """A request the API rejects, with the HTTP status to answer."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _number(
+    params: Dict[str, Any],
+    name: str,
+    default: Optional[float] = None,
+    low: float = -math.inf,
+    high: float = math.inf,
+    cast: Callable[[Any], float] = float,
+) -> float:
+    """Read a numeric parameter, raising ApiError(400) if it is missing or out of range."""
+    raw = params.get(name, default)
+    if raw is None:
+        raise ApiError(400, f"Missing parameter: {name}")
+    try:
+        value = cast(raw)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"Invalid {name}: {raw!r}") from None
+    if not (math.isfinite(value) and low <= value <= high):
+        raise ApiError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def _coordinates(params: Dict[str, Any]) -> Tuple[float, float]:
+    return _number(params, "lat", low=-90, high=90), _number(params, "lon", low=-180, high=180)
+
+
+def compact(value: Any) -> Any:
+    """Round floats to 6 decimals, turn NaN into null and numpy scalars into Python numbers."""
+    if isinstance(value, dict):
+        return {key: compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, 6) if math.isfinite(value) else None
+    return value
+
+
+def to_columns(value: Any) -> Any:
+    """Turn every non-empty list of dicts into {"columns": [...], "rows": [[...]]}."""
+    if isinstance(value, dict):
+        return {key: to_columns(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            columns = list(dict.fromkeys(key for item in value for key in item))
+            return {
+                "columns": columns,
+                "rows": [[to_columns(item.get(column)) for column in columns] for item in value],
+            }
+        return [to_columns(item) for item in value]
+    return value
+
+
+def encode_body(payload: Any, columns: bool = False, accept_gzip: bool = False) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize a response payload compactly.
+
+    Args:
+        payload: JSON-serializable response
+        columns: Send lists of records column-wise
+        accept_gzip: The client accepts gzip content encoding
+
+    Returns:
+        (body, extra headers)
+    """
+    payload = compact(payload)
+    if columns:
+        payload = to_columns(payload)
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if accept_gzip and len(body) >= API_GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=5), {"Content-Encoding": "gzip"}
+    return body, {}
+
+
+class QueryApi:
+    """The API's operations, independent of the HTTP transport."""
+
+    def __init__(
+        self,
+        finder: Optional[OptimalLocationFinder] = None,
+        max_batch: int = API_MAX_BATCH,
+        batch_threads: int = API_BATCH_THREADS,
+    ):
+        """
+        Args:
+            finder: Light pollution map finder (its decoded rasters are shared)
+            max_batch: Queries accepted in one batch
+            batch_threads: Queries of one batch run at once
+        """
+        self.finder = finder or OptimalLocationFinder()
+        self.max_batch = max_batch
+        self.batch_threads = batch_threads
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.operations: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "optimal": self.optimal,
+            "nearby": self.nearby,
+            "weather": self.weather,
+            "visibility": self.visibility,
+            "plan": self.plan,
+        }
+
+    def preload(self, regions: Optional[Sequence[str]] = None) -> Dict[str, float]:
+        """
+        Load the shared data up front, before worker processes are forked.
+
+        Args:
+            regions: Light pollution map regions to decode (all when None)
+
+        Returns:
+            Seconds spent loading each item
+        """
+        timings = {}
+        for name, load in (
+            ("rasters", lambda: self.finder.preload_regions(regions)),
+            ("observations", load_observation_points),
+            ("bortle_model", lambda: BortlePredictor().load_model()),
+        ):
+            started = time.perf_counter()
+            load()
+            timings[name] = time.perf_counter() - started
+        logger.info(f"Preloaded shared data: {timings}")
+        return timings
+
+    def optimal(self, params: Dict[str, Any]) -> List[Dict]:
+        latitude, longitude = _coordinates(params)
+        radius_km = _number(params, "radius_km", 25, low=1, high=200)
+        top_n = _number(params, "top_n", 5, low=1, high=100, cast=int)
+        # The finder picks a separation for the radius unless one is given
+        min_separation_km = params.get("min_separation_km")
+        if min_separation_km is not None:
+            min_separation_km = _number(params, "min_separation_km", low=0, high=100)
+        sectors = _number(params, "sectors", 0, low=0, high=16, cast=int)
+        return self.finder.find_optimal_locations(
+            latitude, longitude, radius_km, top_n=top_n, min_separation_km=min_separation_km, sectors=sectors
+        )
+
+    def nearby(self, params: Dict[str, Any]) -> List[Dict]:
+        latitude, longitude = _coordinates(params)
+        radius_km = _number(params, "radius_km", 25, low=1, high=500)
+        top_n = _number(params, "top_n", 10, low=1, high=500, cast=int)
+        rank_by = params.get("rank_by", "distance")
+        if rank_by not in ("distance", "score"):
+            raise ApiError(400, "rank_by must be 'distance' or 'score'")
+        return find_nearby_observation_locations(latitude, longitude, radius_km, top_n=top_n, rank_by=rank_by)
+
+    def weather(self, params: Dict[str, Any]) -> Dict[str, Dict]:
+        latitude, longitude = _coordinates(params)
+        # The three share one forecast page fetch
+        return {
+            "cloudiness": get_cloudiness(latitude, longitude),
+            "moon": get_moon_brightness(latitude, longitude),
+            "bortle": get_bortle_scale(latitude, longitude),
+        }
+
+    def visibility(self, params: Dict[str, Any]) -> Dict:
+        latitude, longitude = _coordinates(params)
+        return get_sky_visibility(latitude, longitude)
+
+    def plan(self, params: Dict[str, Any]) -> List[Dict]:
+        latitude, longitude = _coordinates(params)
+        radius_km = _number(params, "radius_km", 25, low=1, high=200)
+        sites = _number(params, "sites", 50, low=1, high=500, cast=int)
+        nights = _number(params, "nights", PLANNER_NIGHTS, low=1, high=7, cast=int)
+        window_hours = _number(params, "window_hours", OBSERVING_WINDOW_HOURS, low=1, high=12, cast=int)
+        top_n = _number(params, "top_n", 10, low=1, high=100, cast=int)
+        source = params.get("source", "optimal")
+        if source == "optimal":
+            locations = self.finder.find_optimal_locations(latitude, longitude, radius_km, top_n=sites)
+        elif source == "nearby":
+            locations = find_nearby_observation_locations(latitude, longitude, radius_km, top_n=sites, rank_by="score")
+        else:
+            raise ApiError(400, "source must be 'optimal' or 'nearby'")
+        return plan_observing_nights(locations, nights=nights, window_hours=window_hours, top_k=top_n)
+
+    def run(self, op: str, params: Dict[str, Any]) -> Any:
+        """Run one operation; raises ApiError for unknown operations or bad parameters."""
+        operation = self.operations.get(op)
+        if operation is None:
+            raise ApiError(404, f"Unknown operation: {op}")
+        return operation(params)
+
+    def _batch_pool(self) -> ThreadPoolExecutor:
+        # Created on first use, so each forked worker gets its own threads
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.batch_threads, thread_name_prefix="api-batch")
+            return self._pool
+
+    def _run_entry(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            params = {key: value for key, value in query.items() if key != "op"}
+            return {"result": self.run(str(query.get("op")), params)}
+        except ApiError as exc:
+            return {"error": str(exc), "status": exc.status}
+        except Exception as exc:  # noqa: BLE001 - one failed query must not fail the batch
+            logger.exception(f"Batch query {query!r} failed")
+            return {"error": f"Internal error: {exc}", "status": 500}
+
+    def batch(self, queries: Any) -> List[Dict[str, Any]]:
+        """
+        Run many queries in one request, concurrently, answering identical ones once.
+
+        Args:
+            queries: List of {"op": ..., **params}
+
+        Returns:
+            One {"result": ...} or {"error": ..., "status": ...} per query, in order
+        """
+        if not isinstance(queries, list) or not all(isinstance(query, dict) for query in queries):
+            raise ApiError(400, "queries must be a list of objects")
+        if len(queries) > self.max_batch:
+            raise ApiError(400, f"At most {self.max_batch} queries per batch")
+
+        keys = [json.dumps(query, sort_keys=True, default=str) for query in queries]
+        unique = dict(zip(keys, queries))
+        answers = dict(zip(unique, self._batch_pool().map(self._run_entry, unique.values())))
+        return [answers[key] for key in keys]
+
+
+def _make_handler(api: QueryApi):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so clients reuse connections
+        server_version = "SkylineAPI/1.0"
+
+        def _send(self, status: int, payload: Any, params: Dict[str, Any]) -> None:
+            body, headers = encode_body(
+                payload,
+                columns=params.get("encoding") == "columns",
+                accept_gzip="gzip" in self.headers.get("Accept-Encoding", ""),
+            )
+            self._write(status, body, {"Content-Type": "application/json", **headers})
+
+        def _write(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+            try:
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                if self.close_connection:
+                    self.send_header("Connection", "close")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass  # Client went away
+
+        def _handle(self, respond: Callable[[Dict[str, Any]], Any]) -> None:
+            url = urlsplit(self.path)
+            params = dict(parse_qsl(url.query))
+            with profile_request(f"{self.command} {url.path}"):
+                try:
+                    self._send(200, respond(params), params)
+                except ApiError as exc:
+                    self._send(exc.status, {"error": str(exc)}, params)
+                except Exception as exc:  # noqa: BLE001 - answer instead of dropping the connection
+                    logger.exception(f"Request {self.path} failed")
+                    self._send(500, {"error": f"Internal error: {exc}"}, params)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path.rstrip("/")
+            if path == "/metrics":
+                self._write(200, render_prometheus().encode("utf-8"), {"Content-Type": PROMETHEUS_CONTENT_TYPE})
+                return
+
+            def respond(params):
+                if path == "/health":
+                    return {"status": "ok", "pid": os.getpid(), "memory": get_memory_usage()}
+                if path.startswith("/v1/") and path != "/v1/batch":
+                    return api.run(path[len("/v1/"):], params)
+                raise ApiError(404, f"Not found: {path}")
+
+            self._handle(respond)
+
+        def do_POST(self):
+            path = urlsplit(self.path).path.rstrip("/")
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            # Consume the body before answering, whatever the answer: on a
+            # keep-alive connection unread bytes would be parsed as the next
+            # request. A body too large (or of unknown length) closes it instead.
+            if 0 <= length <= MAX_BODY_BYTES:
+                raw = self.rfile.read(length)
+            else:
+                raw = None
+                self.close_connection = True
+
+            def respond(params):
+                if path != "/v1/batch":
+                    raise ApiError(404, f"Not found: {path}")
+                if raw is None:
+                    if length < 0:
+                        raise ApiError(400, "Invalid Content-Length")
+                    raise ApiError(413, "Request body too large")
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    raise ApiError(400, "Body must be JSON") from None
+                return {"results": api.batch(body.get("queries") if isinstance(body, dict) else None)}
+
+            self._handle(respond)
+
+        def log_message(self, format, *args):
+            logger.debug("api: " + format, *args)
+
+    return Handler
+
+
+class ApiServer:
+    """Pre-forking HTTP server for QueryApi."""
+
+    def __init__(
+        self,
+        api: Optional[QueryApi] = None,
+        host: str = API_HOST,
+        port: int = API_PORT,
+        workers: int = API_WORKERS,
+    ):
+        """
+        Args:
+            api: Operations to serve (preload it before start to share its data)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            workers: Worker processes to fork; 0 serves from a thread in this process
+        """
+        self.api = api or QueryApi()
+        self.host = host
+        self.port = port
+        self.workers = workers if hasattr(os, "fork") else 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._children: Set[int] = set()
+        self._running = False
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server."""
+        if self._server is None:
+            raise RuntimeError("API server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                self._server.serve_forever()
+            finally:
+                os._exit(0)
+        self._children.add(pid)
+
+    def start(self) -> "ApiServer":
+        """Bind the socket and start the workers (or a serving thread)."""
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self.api))
+        self._server.daemon_threads = True
+        self._running = True
+        if self.workers > 0:
+            for _ in range(self.workers):
+                self._spawn()
+        else:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="api-server", daemon=True)
+            self._thread.start()
+        logger.info(f"API listening on {self.url} with {self.workers or 'in-process'} worker(s)")
+        return self
+
+    def supervise(self) -> None:
+        """Block, restarting workers that exit, until stop() is called."""
+        while self._running and self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid in self._children:
+                self._children.discard(pid)
+                if self._running:
+                    logger.warning(f"API worker {pid} exited with status {status}, restarting")
+                    self._spawn()
+
+    def stop(self) -> None:
+        """Stop the workers and release the port."""
+        self._running = False
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
+        if self._server is not None:
+            if self._thread is not None:
+                self._server.shutdown()
+                self._thread = None
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "ApiServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def parse_regions(value: str) -> Optional[List[str]]:
+    """Parse --preload-regions: "all", "none" or a comma-separated list of region names."""
+    if value.strip().lower() == "all":
+        return None
+    if value.strip().lower() in ("", "none"):
+        return []
+    regions = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in regions if name not in CONTINENTS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown regions {unknown}; choose from {list(CONTINENTS)}")
+    return regions
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the location, weather and visibility queries as JSON.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Worker processes (0 = in-process)")
+    parser.add_argument(
+        "--preload-regions",
+        type=parse_regions,
+        default="all",
+        help='Light pollution maps decoded before forking: "all", "none" or e.g. "North America,Europe"',
+    )
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    logging.basicConfig(level=logging.INFO)
+    api = QueryApi()
+    api.preload(args.preload_regions)
+    server = ApiServer(api, host=args.host, port=args.port, workers=args.workers).start()
+    print(f"Serving the query API at {server.url} (Ctrl+C to stop)")
+    try:
+        if server.workers:
+            server.supervise()
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+"""Score many candidate sites at once from a CSV or columnar file.
+
+Each input row needs a latitude and a longitude column (``latitude``/``lat``
+and ``longitude``/``lon``/``lng``, any case, or named with the column
+options); every other column is carried through. Added columns:
+
+    row                      position of the site in the input
+    region                   light pollution map covering the site ("" if none)
+    light_pollution_index    level of the site's pixel on that map
+    bortle_prediction        Bortle model prediction (1-9)
+    nearest_observation_km   distance to the nearest GaN observation within --observation-radius-km
+    limiting_mag             that observation's limiting magnitude
+    observed_cloud_cover     that observation's cloud cover
+    moon_brightness          moon illumination percent on the night of --date
+    moon_phase, dark_hours, moon_free_dark_hours
+    cloudiness_percent       forecast cloud cover and its source (with --weather)
+
+Sites are grouped by map region and cut into chunks of --chunk-rows. The
+parent process decodes the rasters of the regions present, loads the
+observation index and the Bortle model, then forks the worker pool, so the
+workers share that memory copy-on-write as the API server's workers do.
+
+Each worker writes its chunk to ``<output>.parts/`` as soon as it is scored.
+Running the same command again skips the chunks already there, so an
+interrupted run resumes where it stopped. Once every chunk is written the
+parts are concatenated into the output (CSV or Parquet), grouped by region;
+sort by ``row`` for input order.
+
+Run from ``src/map_app``:
+
+    python -m batch_score sites.csv scores.csv --workers 4
+    python -m batch_score sites.parquet scores.parquet --weather --date 2026-07-04
+"""
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import BATCH_CHUNK_ROWS, BATCH_OBSERVATION_RADIUS_KM, BATCH_WEATHER_THREADS
+from models.bortle_predictor import BortlePredictor
+from models.ephemeris import compute_night_ephemeris
+from models.optimal_locations import CONTINENTS, OptimalLocationFinder
+from services.nearby_locations_service import nearest_observations
+from services.observation_points import load_observation_points
+from utils.instrumentation import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+LATITUDE_COLUMNS = ("latitude", "lat")
+LONGITUDE_COLUMNS = ("longitude", "lon", "lng", "long")
+INPUT_FORMATS = {".csv": "csv", ".tsv": "tsv", ".txt": "csv", ".parquet": "parquet", ".feather": "feather"}
+OUTPUT_FORMATS = {".csv": "csv", ".parquet": "parquet"}
+MANIFEST_NAME = "manifest.json"
+
+# Scorer of the running batch; forked workers inherit it with its loaded data
+_active: Optional["BatchScorer"] = None
+
+
+def _file_format(path: str, formats: Dict[str, str]) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix not in formats:
+        raise ValueError(f"Unsupported file type {suffix!r} for {path}; use one of {sorted(formats)}")
+    return formats[suffix]
+
+
+def read_sites(path: str) -> "pd.DataFrame":
+    """Read the candidate sites from CSV, TSV, Parquet or Feather (by extension)."""
+    import pandas as pd
+
+    kind = _file_format(path, INPUT_FORMATS)
+    if kind == "parquet":
+        return pd.read_parquet(path)
+    if kind == "feather":
+        return pd.read_feather(path)
+    return pd.read_csv(path, sep="\t" if kind == "tsv" else ",")
+
+
+def find_coordinate_columns(
+    columns: Sequence[str],
+    latitude: Optional[str] = None,
+    longitude: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Pick the latitude and longitude columns.
+
+    Args:
+        columns: Column names of the input
+        latitude: Explicit latitude column (detected from common names when None)
+        longitude: Explicit longitude column (detected from common names when None)
+
+    Returns:
+        (latitude column, longitude column)
+
+    Raises:
+        ValueError: If a column is missing or cannot be detected
+    """
+
+    def pick(explicit: Optional[str], aliases: Tuple[str, ...], what: str) -> str:
+        if explicit is not None:
+            if explicit not in columns:
+                raise ValueError(f"Column {explicit!r} not found in the input")
+            return explicit
+        lowered = {str(column).lower(): column for column in columns}
+        for alias in aliases:
+            if alias in lowered:
+                return lowered[alias]
+        raise ValueError(f"No {what} column found; name it with --{what}-column")
+
+    return pick(latitude, LATITUDE_COLUMNS, "latitude"), pick(longitude, LONGITUDE_COLUMNS, "longitude")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """Sites of one region scored and written together."""
+
+    index: int
+    region: str
+    rows: np.ndarray  # Positions in the input
+
+
+def plan_chunks(regions: np.ndarray, chunk_rows: int) -> List[Chunk]:
+    """Group row positions by region (CONTINENTS order, uncovered sites last) and cut them into chunks."""
+    chunks: List[Chunk] = []
+    for name in [*CONTINENTS, ""]:
+        rows = np.flatnonzero(regions == name)
+        for start in range(0, len(rows), chunk_rows):
+            chunks.append(Chunk(len(chunks), name, rows[start : start + chunk_rows]))
+    return chunks
+
+
+class BatchScorer:
+    """Scores the chunks of one input; holds the data its forked workers share."""
+
+    def __init__(
+        self,
+        sites: "pd.DataFrame",
+        latitude_column: str,
+        longitude_column: str,
+        night: date,
+        chunk_rows: int = BATCH_CHUNK_ROWS,
+        observation_radius_km: float = BATCH_OBSERVATION_RADIUS_KM,
+        weather: bool = False,
+        finder: Optional[OptimalLocationFinder] = None,
+        observations_csv: Optional[str] = None,
+    ):
+        """
+        Args:
+            sites: Input rows
+            latitude_column: Column with latitudes in degrees
+            longitude_column: Column with longitudes in degrees
+            night: Evening date of the night the moon figures are for
+            chunk_rows: Sites per chunk
+            observation_radius_km: Search radius for the nearest observation
+            weather: Also fetch forecast cloud cover (one request per forecast cell)
+            finder: Light pollution map finder (its decoded rasters are shared)
+            observations_csv: GaN dataset path (defaults to the bundled one)
+        """
+        import pandas as pd
+
+        self.sites = sites
+        self.night = night
+        self.observation_radius_km = observation_radius_km
+        self.weather = weather
+        self.finder = finder or OptimalLocationFinder()
+        self.observations_csv = observations_csv
+        self.predictor: Optional[BortlePredictor] = None
+
+        latitudes = pd.to_numeric(sites[latitude_column], errors="coerce").to_numpy(dtype=float)
+        longitudes = pd.to_numeric(sites[longitude_column], errors="coerce").to_numpy(dtype=float)
+        valid = (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+        self.invalid_sites = int((~valid).sum())
+        if self.invalid_sites:
+            logger.warning(f"{self.invalid_sites} sites have missing or out-of-range coordinates; they get empty scores")
+        self.latitudes = np.where(valid, latitudes, np.nan)
+        self.longitudes = np.where(valid, longitudes, np.nan)
+        self.regions = self.finder.get_regions(self.latitudes, self.longitudes)
+        self.chunks = plan_chunks(self.regions, chunk_rows)
+
+    def preload(self) -> Dict[str, float]:
+        """
+        Load the shared data up front, before the workers are forked.
+
+        Returns:
+            Seconds spent loading each item
+        """
+        regions = sorted(set(self.regions.tolist()) - {""})
+        timings = {}
+        for name, load in (
+            ("rasters", lambda: self.finder.preload_regions(regions)),
+            ("observations", lambda: load_observation_points(self.observations_csv)),
+            ("bortle_model", lambda: setattr(self, "predictor", BortlePredictor())),
+        ):
+            started = time.perf_counter()
+            load()
+            timings[name] = time.perf_counter() - started
+        logger.info(f"Preloaded shared data for regions {regions}: {timings}")
+        return timings
+
+    def score(self, chunk: Chunk) -> "pd.DataFrame":
+        """Score the sites of one chunk; returns the input rows with the score columns added."""
+        import pandas as pd
+
+        rows = chunk.rows
+        lat = self.latitudes[rows]
+        lon = self.longitudes[rows]
+        valid = ~np.isnan(lat)
+
+        frame = self.sites.iloc[rows].reset_index(drop=True)
+        frame.insert(0, "row", rows)
+        frame["region"] = self.regions[rows]
+        frame["light_pollution_index"] = self.finder.get_light_pollution_levels(lat, lon)
+
+        if self.predictor is None:
+            self.predictor = BortlePredictor()
+        bortle = pd.array([None] * len(rows), dtype="Int64")
+        bortle[valid] = self.predictor.predict_many(lat[valid], lon[valid])
+        frame["bortle_prediction"] = bortle
+
+        observations = nearest_observations(lat, lon, self.observation_radius_km, self.observations_csv)
+        frame["nearest_observation_km"] = np.round(observations["distance_km"], 3)
+        frame["limiting_mag"] = observations["limiting_mag"]
+        frame["observed_cloud_cover"] = observations["cloud_cover"]
+
+        moon = {name: np.full(len(rows), np.nan) for name in ("moon_brightness", "dark_hours", "moon_free_dark_hours")}
+        phases = np.full(len(rows), None, dtype=object)
+        if valid.any():
+            night = compute_night_ephemeris(lat[valid], lon[valid], self.night, nights=1)
+            moon["moon_brightness"][valid] = np.round(night.moon_illumination[:, 0].astype(float), 1)
+            moon["dark_hours"][valid] = np.round(night.dark_hours[:, 0].astype(float), 2)
+            moon["moon_free_dark_hours"][valid] = np.round(night.moon_free_dark_hours[:, 0].astype(float), 2)
+            phases[valid] = night.moon_phase[:, 0]
+        frame["moon_brightness"] = moon["moon_brightness"]
+        frame["moon_phase"] = phases
+        frame["dark_hours"] = moon["dark_hours"]
+        frame["moon_free_dark_hours"] = moon["moon_free_dark_hours"]
+
+        if self.weather:
+            frame["cloudiness_percent"], frame["cloudiness_source"] = self._cloudiness(lat, lon)
+        return frame
+
+    def _cloudiness(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[List[Optional[float]], List[Optional[str]]]:
+        """Forecast cloud cover per site, fetched once per forecast grid cell."""
+        # The weather stack is only needed with --weather
+        from services.forecast_cache import quantize_coordinates
+        from services.weather_service import get_cloudiness
+
+        cells = [None if np.isnan(a) else quantize_coordinates(a, b) for a, b in zip(lat, lon)]
+        unique = list(dict.fromkeys(cell for cell in cells if cell is not None))
+        with ThreadPoolExecutor(max_workers=BATCH_WEATHER_THREADS, thread_name_prefix="batch-weather") as pool:
+            answers = dict(zip(unique, pool.map(lambda cell: get_cloudiness(*cell), unique)))
+        return (
+            [answers[cell]["cloudiness_percent"] if cell else None for cell in cells],
+            [answers[cell].get("source") if cell else None for cell in cells],
+        )
+
+    def write_chunk(self, chunk: Chunk, parts_dir: str, kind: str) -> int:
+        """Score one chunk and write it as a part file; returns the number of sites."""
+        with span("batch.score_chunk"):
+            frame = self.score(chunk)
+        path = part_path(parts_dir, chunk.index, kind)
+        temporary = f"{path}.tmp"
+        if kind == "parquet":
+            frame.to_parquet(temporary, index=False)
+        else:
+            frame.to_csv(temporary, index=False)
+        # A part appears complete or not at all, so an interrupted write is simply redone
+        os.replace(temporary, path)
+        return len(frame)
+
+
+def part_path(parts_dir: str, index: int, kind: str) -> str:
+    return os.path.join(parts_dir, f"part-{index:06d}.{kind}")
+
+
+def _score_in_worker(index: int, parts_dir: str, kind: str) -> Tuple[int, int]:
+    return index, _active.write_chunk(_active.chunks[index], parts_dir, kind)
+
+
+def merge_parts(paths: List[str], output_path: str, kind: str) -> None:
+    """Concatenate part files into the output, one part in memory at a time."""
+    temporary = f"{output_path}.tmp"
+    if kind == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # A text column that is empty in one chunk is typed null there
+        schema = pa.unify_schemas([pq.read_schema(path) for path in paths], promote_options="permissive")
+        with pq.ParquetWriter(temporary, schema) as writer:
+            for path in paths:
+                writer.write_table(pq.read_table(path).cast(schema))
+    else:
+        with open(temporary, "wb") as out:
+            for i, path in enumerate(paths):
+                with open(path, "rb") as part:
+                    if i:
+                        part.readline()  # Header
+                    shutil.copyfileobj(part, out)
+    os.replace(temporary, output_path)
+
+
+def _read_manifest(parts_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(parts_dir, MANIFEST_NAME)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: int = 0,
+    chunk_rows: int = BATCH_CHUNK_ROWS,
+    observation_radius_km: float = BATCH_OBSERVATION_RADIUS_KM,
+    weather: bool = False,
+    night: Optional[date] = None,
+    latitude_column: Optional[str] = None,
+    longitude_column: Optional[str] = None,
+    restart: bool = False,
+    keep_parts: bool = False,
+) -> Dict[str, Any]:
+    """
+    Score every site of an input file into an output file, resuming a previous run.
+
+    Args:
+        input_path: Sites as CSV, TSV, Parquet or Feather
+        output_path: Scores as CSV or Parquet; parts go to ``<output_path>.parts``
+        workers: Worker processes to fork; 0 scores in this process
+        chunk_rows: Sites per chunk
+        observation_radius_km: Search radius for the nearest observation
+        weather: Also fetch forecast cloud cover
+        night: Evening date for the moon figures (today, UTC, for a new run;
+            a resumed run keeps the date it started with)
+        latitude_column: Latitude column (detected when None)
+        longitude_column: Longitude column (detected when None)
+        restart: Discard parts of a previous run with different settings
+        keep_parts: Leave the part files next to the output
+
+    Returns:
+        Summary with sites, invalid_sites, chunks, resumed_chunks, regions and seconds
+
+    Raises:
+        ValueError: If the input is unusable, or parts of a different run exist
+            and restart is False
+    """
+    global _active
+    started = time.perf_counter()
+    kind = _file_format(output_path, OUTPUT_FORMATS)  # Fail before reading the input
+    sites = read_sites(input_path)
+    if sites.empty:
+        raise ValueError(f"{input_path} has no rows")
+    latitude_column, longitude_column = find_coordinate_columns(list(sites.columns), latitude_column, longitude_column)
+
+    parts_dir = f"{output_path}.parts"
+    previous = _read_manifest(parts_dir)
+    if night is None:
+        night = date.fromisoformat(previous["night"]) if previous else datetime.now(timezone.utc).date()
+    stat = os.stat(input_path)
+    manifest = {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "rows": len(sites),
+        "latitude_column": latitude_column,
+        "longitude_column": longitude_column,
+        "chunk_rows": chunk_rows,
+        "observation_radius_km": observation_radius_km,
+        "weather": weather,
+        "night": night.isoformat(),
+    }
+    if previous is not None and previous != manifest:
+        if not restart:
+            raise ValueError(f"{parts_dir} holds parts of a run with other inputs or settings; pass --restart to discard them")
+        shutil.rmtree(parts_dir)
+        previous = None
+    os.makedirs(parts_dir, exist_ok=True)
+    if previous is None:
+        with open(os.path.join(parts_dir, MANIFEST_NAME), "w") as handle:
+            json.dump(manifest, handle, indent=2)
+    for leftover in glob.glob(os.path.join(parts_dir, "*.tmp")):
+        os.remove(leftover)
+
+    scorer = BatchScorer(
+        sites, latitude_column, longitude_column, night,
+        chunk_rows=chunk_rows, observation_radius_km=observation_radius_km, weather=weather,
+    )
+    pending = [chunk.index for chunk in scorer.chunks if not os.path.exists(part_path(parts_dir, chunk.index, kind))]
+    resumed = len(scorer.chunks) - len(pending)
+    if resumed:
+        logger.info(f"Resuming: {resumed} of {len(scorer.chunks)} chunks already scored")
+
+    if pending:
+        scorer.preload()
+        workers = min(workers, len(pending)) if hasattr(os, "fork") else 0
+        done = resumed
+        _active = scorer
+        try:
+            if workers > 0:
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+                try:
+                    futures = [pool.submit(_score_in_worker, index, parts_dir, kind) for index in pending]
+                    for future in as_completed(futures):
+                        index, count = future.result()
+                        done += 1
+                        logger.info(f"Chunk {index} ({count} sites) written, {done}/{len(scorer.chunks)} done")
+                finally:
+                    # On failure drop the queued chunks; the rerun picks them up
+                    pool.shutdown(wait=True, cancel_futures=True)
+            else:
+                for index in pending:
+                    count = scorer.write_chunk(scorer.chunks[index], parts_dir, kind)
+                    done += 1
+                    logger.info(f"Chunk {index} ({count} sites) written, {done}/{len(scorer.chunks)} done")
+        finally:
+            _active = None
+
+    merge_parts([part_path(parts_dir, chunk.index, kind) for chunk in scorer.chunks], output_path, kind)
+    if not keep_parts:
+        shutil.rmtree(parts_dir)
+
+    regions = {name or "uncovered": int((scorer.regions == name).sum()) for name in dict.fromkeys(scorer.regions.tolist())}
+    return {
+        "output": output_path,
+        "sites": len(sites),
+        "invalid_sites": scorer.invalid_sites,
+        "chunks": len(scorer.chunks),
+        "resumed_chunks": resumed,
+        "regions": regions,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score candidate sites from a CSV or columnar file.")
+    parser.add_argument("input", help="Sites as .csv, .tsv, .parquet or .feather")
+    parser.add_argument("output", help="Scores as .csv or .parquet (parts are kept in <output>.parts until done)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 = in-process)")
+    parser.add_argument("--chunk-rows", type=int, default=BATCH_CHUNK_ROWS, help="Sites per chunk")
+    parser.add_argument("--observation-radius-km", type=float, default=BATCH_OBSERVATION_RADIUS_KM)
+    parser.add_argument("--weather", action="store_true", help="Fetch forecast cloud cover for each site")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Evening of the night, YYYY-MM-DD")
+    parser.add_argument("--latitude-column", default=None)
+    parser.add_argument("--longitude-column", default=None)
+    parser.add_argument("--restart", action="store_true", help="Discard parts left by a run with other settings")
+    parser.add_argument("--keep-parts", action="store_true", help="Keep the part files after merging")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        summary = run_batch(
+            args.input,
+            args.output,
+            workers=args.workers,
+            chunk_rows=args.chunk_rows,
+            observation_radius_km=args.observation_radius_km,
+            weather=args.weather,
+            night=args.date,
+            latitude_column=args.latitude_column,
+            longitude_column=args.longitude_column,
+            restart=args.restart,
+            keep_parts=args.keep_parts,
+        )
+    except ValueError as exc:
+        raise SystemExit(f"error: {exc}") from None
+    print(
+        f"Scored {summary['sites']} sites in {summary['chunks']} chunks "
+        f"({summary['resumed_chunks']} resumed) in {summary['seconds']:.1f} s -> {summary['output']}"
+    )
+    for region, sites in summary["regions"].items():
+        print(f"  {region}: {sites}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Performance benchmarks for AI Skyline Visibility Map Application."""
@@ -0,0 +1,136 @@
+"""Throughput benchmark for the headless query API.
+
+Run from ``src/map_app``:
+
+    python -m benchmarks.bench_api_throughput [--workers 4] [--clients 16] [--queries 2000]
+
+Starts the local ClearOutside stand-in and a pre-forked API server (or uses
+``--url``), then has many client threads send a mix of nearby, optimal,
+weather and visibility queries for random coordinates, first one query per
+request and then in batches. Reports queries per second, request latency
+percentiles and the average response size with each encoding.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import numpy as np
+
+from api_server import ApiServer, QueryApi
+from services import weather_service
+from utils.clearoutside_standin import ClearOutsideStandIn, StandInConfig
+
+OPERATIONS = ("nearby", "optimal", "weather", "visibility")
+
+
+def make_queries(count: int, distinct_points: int = 200, seed: int = 0) -> List[Dict]:
+    """Random queries over a fixed set of North American points, so some repeat."""
+    rng = random.Random(seed)
+    points = [(round(rng.uniform(30, 48), 4), round(rng.uniform(-122, -75), 4)) for _ in range(distinct_points)]
+    queries = []
+    for _ in range(count):
+        latitude, longitude = rng.choice(points)
+        op = rng.choice(OPERATIONS)
+        query = {"op": op, "lat": latitude, "lon": longitude}
+        if op in ("nearby", "optimal"):
+            query["radius_km"] = rng.choice([10, 25, 50])
+        queries.append(query)
+    return queries
+
+
+def run(
+    url: str, queries: List[Dict], clients: int = 16, batch_size: int = 1, encoding: str = ""
+) -> Dict[str, float]:
+    """Send the queries with the given request size and return throughput stats."""
+    requests = [queries[i : i + batch_size] for i in range(0, len(queries), batch_size)]
+    params = {"encoding": encoding} if encoding else {}
+    sizes = []
+
+    def one(client: httpx.Client, group: List[Dict]):
+        started = time.perf_counter()
+        if batch_size == 1:
+            query = dict(group[0])
+            response = client.get(f"/v1/{query.pop('op')}", params={**query, **params})
+        else:
+            response = client.post("/v1/batch", params=params, json={"queries": group})
+        response.raise_for_status()
+        sizes.append(int(response.headers.get("Content-Length", len(response.content))))
+        return time.perf_counter() - started
+
+    def worker(groups: List[List[Dict]]):
+        with httpx.Client(base_url=url, timeout=60.0) as client:
+            return [one(client, group) for group in groups]
+
+    shares = [requests[i::clients] for i in range(clients)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [latency for result in pool.map(worker, shares) for latency in result]
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "queries": len(queries),
+        "requests": len(requests),
+        "elapsed_s": elapsed,
+        "queries_per_s": len(queries) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "bytes_per_query": sum(sizes) / len(queries),
+    }
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the query API with single and batched requests.")
+    parser.add_argument("--url", help="Existing API server URL (a local one is started otherwise)")
+    parser.add_argument("--workers", type=int, default=4, help="API worker processes")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client threads")
+    parser.add_argument("--queries", type=int, default=2000, help="Total queries per run")
+    parser.add_argument("--batch-size", type=int, default=25, help="Queries per batched request")
+    parser.add_argument("--latency", type=float, default=0.1, help="Stand-in weather latency in seconds")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    standin = server = None
+    url = args.url
+    if url is None:
+        standin = ClearOutsideStandIn(config=StandInConfig(latency_seconds=args.latency)).start()
+        # Set before forking so every worker fetches from the stand-in
+        weather_service.CLEAROUTSIDE_BASE_URL = standin.url
+        api = QueryApi()
+        preload = api.preload(["North America"])
+        print("preload:    " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in preload.items()))
+        server = ApiServer(api, port=0, workers=args.workers).start()
+        url = server.url
+
+    queries = make_queries(args.queries)
+    try:
+        # Warm every cache first, so the runs compare request handling, not upstream fetches
+        run(url, queries, clients=args.clients, batch_size=args.batch_size)
+        runs = {
+            "single": run(url, queries, clients=args.clients),
+            f"batch x{args.batch_size}": run(url, queries, clients=args.clients, batch_size=args.batch_size),
+            f"batch x{args.batch_size}, columns": run(
+                url, queries, clients=args.clients, batch_size=args.batch_size, encoding="columns"
+            ),
+        }
+    finally:
+        if server is not None:
+            server.stop()
+        if standin is not None:
+            standin.stop()
+
+    print(f"{args.queries} queries, {args.clients} clients, {args.workers} workers against {url}")
+    for name, stats in runs.items():
+        print(
+            f"{name:<20} {stats['queries_per_s']:8.1f} queries/s  "
+            f"p50 {stats['p50_ms']:6.1f} ms  p95 {stats['p95_ms']:6.1f} ms  "
+            f"{stats['bytes_per_query']:7.0f} B/query ({stats['requests']} requests)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark the vectorized ephemeris over many sites and nights.
+
+Run from ``src/map_app``:
+
+    python -m benchmarks.bench_ephemeris [--sites 10000] [--nights 30]
+
+Times one vectorized call over random sites, and compares it with calling the
+same engine one site at a time (measured on a sample and extrapolated).
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Dict, Iterable
+
+import numpy as np
+
+from models.ephemeris import compute_night_ephemeris
+
+START_DATE = "2026-03-01"
+
+
+def run(sites: int = 10000, nights: int = 30, loop_sample: int = 50, seed: int = 0) -> Dict[str, float]:
+    """Return wall times (s) and peak traced memory (MiB) for both call patterns."""
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(-60.0, 60.0, sites)
+    lons = rng.uniform(-180.0, 180.0, sites)
+
+    compute_night_ephemeris(lats[:8], lons[:8], START_DATE, nights)  # warm up
+
+    start = time.perf_counter()
+    compute_night_ephemeris(lats, lons, START_DATE, nights)
+    vectorized = time.perf_counter() - start
+
+    tracemalloc.start()
+    compute_night_ephemeris(lats[: min(sites, 1000)], lons[: min(sites, 1000)], START_DATE, nights)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sample = min(loop_sample, sites)
+    start = time.perf_counter()
+    for i in range(sample):
+        compute_night_ephemeris(lats[i : i + 1], lons[i : i + 1], START_DATE, nights)
+    per_site = (time.perf_counter() - start) / sample
+
+    return {
+        "vectorized_s": vectorized,
+        "per_site_loop_s": per_site * sites,
+        "site_nights_per_s": sites * nights / vectorized,
+        "peak_mib_per_1000_sites": peak / 2**20,
+    }
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the offline ephemeris engine.")
+    parser.add_argument("--sites", type=int, default=10000, help="Number of random sites")
+    parser.add_argument("--nights", type=int, default=30, help="Consecutive nights per site")
+    parser.add_argument("--loop-sample", type=int, default=50, help="Sites timed one at a time")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    results = run(args.sites, args.nights, args.loop_sample)
+
+    print(f"{args.sites} sites x {args.nights} nights")
+    print(f"vectorized:          {results['vectorized_s']:8.2f} s "
+          f"({results['site_nights_per_s']:,.0f} site-nights/s)")
+    print(f"per-site loop (est): {results['per_site_loop_s']:8.2f} s")
+    print(f"peak memory:         {results['peak_mib_per_1000_sites']:8.1f} MiB per 1000 sites")
+    print(f"\nVectorized is {results['per_site_loop_s'] / results['vectorized_s']:.1f}x faster than looping.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark ClearOutside field extraction: streaming scanner vs BeautifulSoup.
+
+Run from ``src/map_app``:
+
+    python -m benchmarks.bench_html_extraction [--repeat 50] [--html page.html]
+
+Reports median parse time and peak traced memory for both extraction paths
+on the recorded forecast fixture (or any saved page passed with ``--html``).
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterable
+
+from services.clearoutside_parser import (
+    extract_forecast_fields,
+    extract_forecast_fields_beautifulsoup,
+)
+
+DEFAULT_FIXTURE = (
+    Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "clearoutside_forecast.html"
+)
+
+
+def _measure(extract: Callable[[str], Dict], html: str, repeat: int) -> Dict[str, float]:
+    """Return median/min wall time (ms) and peak traced memory (KiB) for one extractor."""
+    extract(html)  # warm up regex caches and imports
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract(html)
+        timings.append((time.perf_counter() - start) * 1000.0)
+
+    tracemalloc.start()
+    extract(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "peak_kib": peak / 1024.0,
+    }
+
+
+def run(html: str, repeat: int = 50) -> Dict[str, Dict[str, float]]:
+    """Benchmark both extraction paths on one page and return their stats."""
+    results = {"streaming": _measure(extract_forecast_fields, html, repeat)}
+    try:
+        results["beautifulsoup"] = _measure(extract_forecast_fields_beautifulsoup, html, repeat)
+    except ImportError:
+        pass
+    return results
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ClearOutside HTML extraction.")
+    parser.add_argument("--html", default=str(DEFAULT_FIXTURE), help="Saved forecast page to parse")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed iterations per extractor")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    html = Path(args.html).read_text(encoding="utf-8")
+    results = run(html, repeat=args.repeat)
+
+    print(f"Page: {args.html} ({len(html) / 1024:.1f} KiB)")
+    print(f"{'extractor':<15}{'median ms':>12}{'min ms':>10}{'peak KiB':>12}")
+    for name, stats in results.items():
+        print(f"{name:<15}{stats['median_ms']:>12.2f}{stats['min_ms']:>10.2f}{stats['peak_kib']:>12.1f}")
+
+    if "beautifulsoup" in results:
+        speedup = results["beautifulsoup"]["median_ms"] / results["streaming"]["median_ms"]
+        memory = results["beautifulsoup"]["peak_kib"] / results["streaming"]["peak_kib"]
+        print(f"\nStreaming is {speedup:.1f}x faster and uses {memory:.1f}x less peak memory.")
+    else:
+        print("\nbeautifulsoup4 not installed; only the streaming path was measured.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Offline throughput benchmark for the weather fetch pipeline.
+
+Run from ``src/map_app``:
+
+    python -m benchmarks.bench_weather_throughput [--workers 32] [--requests 400]
+
+Starts the local ClearOutside stand-in (or uses ``--url``), then has many
+threads request forecasts for random coordinates through
+``weather_service.fetch_forecast_fields``, the same path the app uses,
+including request coalescing, the circuit breaker and the latency budget.
+Reports throughput, latency percentiles and how requests were resolved.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from services import weather_service
+from utils.clearoutside_standin import ClearOutsideStandIn, StandInConfig
+
+
+def run(
+    url: str,
+    workers: int = 32,
+    requests: int = 400,
+    distinct_cells: int = 100,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Fire requests at the weather pipeline and return throughput stats."""
+    weather_service.CLEAROUTSIDE_BASE_URL = url
+    weather_service._fetch_flight.reset_stats()
+    rng = random.Random(seed)
+    # Coordinates are drawn from a fixed set of cells so concurrent users overlap
+    cells = [(rng.uniform(25, 50), rng.uniform(-125, -70)) for _ in range(distinct_cells)]
+    queries = [rng.choice(cells) for _ in range(requests)]
+
+    def one(query):
+        started = time.perf_counter()
+        fields = weather_service.fetch_forecast_fields(*query)
+        return time.perf_counter() - started, fields is not None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(one, queries))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([latency for latency, _ in results]) * 1000.0
+    succeeded = sum(ok for _, ok in results)
+    coalescing = weather_service.get_fetch_coalescing_stats()
+    upstream = weather_service.get_upstream_stats()
+    return {
+        "requests": requests,
+        "elapsed_s": elapsed,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "succeeded": succeeded,
+        "fell_back": requests - succeeded,
+        "upstream_fetches": coalescing["misses"],
+        "coalesced": coalescing["coalesced_hits"],
+        "hedges": upstream["hedges"],
+        "retries": upstream["retries"],
+        "short_circuited": upstream["short_circuited"],
+    }
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark weather fetches against a local stand-in.")
+    parser.add_argument("--url", help="Existing stand-in URL (a local one is started otherwise)")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=400, help="Total requests")
+    parser.add_argument("--cells", type=int, default=100, help="Distinct forecast cells queried")
+    parser.add_argument("--latency", type=float, default=0.25, help="Stand-in latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Stand-in latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Stand-in error rate")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    standin = None
+    url = args.url
+    if url is None:
+        config = StandInConfig(latency_seconds=args.latency, jitter_seconds=args.jitter, error_rate=args.error_rate)
+        standin = ClearOutsideStandIn(config=config).start()
+        url = standin.url
+
+    try:
+        stats = run(url, workers=args.workers, requests=args.requests, distinct_cells=args.cells)
+    finally:
+        if standin is not None:
+            standin.stop()
+
+    print(f"{stats['requests']} requests, {args.workers} workers, {args.cells} cells against {url}")
+    print(f"throughput: {stats['throughput_rps']:.1f} req/s ({stats['elapsed_s']:.2f} s)")
+    print(f"latency:    p50 {stats['p50_ms']:.0f} ms  p95 {stats['p95_ms']:.0f} ms  p99 {stats['p99_ms']:.0f} ms")
+    print(f"resolved:   {stats['succeeded']} ok, {stats['fell_back']} fallback")
+    print(
+        f"upstream:   {stats['upstream_fetches']} fetches, {stats['coalesced']} coalesced, "
+        f"{stats['hedges']} hedges, {stats['retries']} retries, {stats['short_circuited']} short-circuited"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Import-time report for the app's entry points, built on ``-X importtime``.
+
+Run from ``src/map_app``:
+
+    python -m benchmarks.import_report [main api_server ...] [--top 15] [--repeat 3]
+
+Imports each target in a fresh interpreter with ``python -X importtime`` and
+reports its total import time (median of the repeats), which heavy
+dependencies it loaded, and the modules with the largest cumulative time.
+
+Importing ``main`` is what a cold Streamlit worker does before it renders
+anything, so its total is the app's time to first render; the benchmark
+suite tracks it as ``startup.import_main``. Heavy dependencies (PIL,
+sklearn, bs4, geopy, pandas, folium) should only appear for targets that use
+them at import, and for ``main`` only streamlit should.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+APP_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_TARGETS = ("main", "api_server", "services.weather_service", "models.optimal_locations")
+HEAVY_MODULES = (
+    "streamlit", "streamlit_folium", "folium", "pandas", "PIL", "sklearn", "joblib", "bs4", "geopy", "httpx",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    """One line of ``-X importtime`` output."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for modules imported directly by the target code
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Parse ``-X importtime`` stderr into records, in output order."""
+    records = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def profile_import(target: str, python: str = sys.executable) -> List[ImportRecord]:
+    """Import a module in a fresh interpreter and return its import records."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {target}"],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    records = parse_importtime(result.stderr)
+    if result.returncode != 0 or not any(record.module == target for record in records):
+        raise RuntimeError(f"Importing {target} failed:\n{result.stderr[-2000:]}")
+    return records
+
+
+def summarize(target: str, records: List[ImportRecord], top: int = 15) -> Dict[str, Any]:
+    """
+    Summarize one import of a target.
+
+    Args:
+        target: Module that was imported
+        records: Its parse_importtime records
+        top: Number of slowest modules to list
+
+    Returns:
+        Dict with total_ms, heavy (heavy top-level packages that were loaded)
+        and top (module, cumulative_ms, self_ms) rows, slowest first
+    """
+    # The target's own line comes last and includes everything it imported;
+    # earlier depth-0 lines are interpreter startup
+    total = next(record for record in reversed(records) if record.module == target and record.depth == 0)
+    start = records.index(total)
+    while start > 0 and records[start - 1].depth > 0:
+        start -= 1
+    loaded = records[start:]
+    packages = {record.module.split(".")[0] for record in loaded}
+    slowest = sorted(loaded, key=lambda record: record.cumulative_us, reverse=True)[: top + 1]
+    return {
+        "total_ms": total.cumulative_us / 1000.0,
+        "modules": len(loaded),
+        "heavy": [name for name in HEAVY_MODULES if name in packages],
+        "top": [
+            (record.module, record.cumulative_us / 1000.0, record.self_us / 1000.0)
+            for record in slowest
+            if record is not total
+        ][:top],
+    }
+
+
+def run(targets: Iterable[str] = DEFAULT_TARGETS, repeat: int = 3, top: int = 15) -> Dict[str, Dict[str, Any]]:
+    """Profile each target repeat times; total_ms is the median, the rest comes from the last run."""
+    report = {}
+    for target in targets:
+        summaries = [summarize(target, profile_import(target), top) for _ in range(repeat)]
+        report[target] = {**summaries[-1], "total_ms": statistics.median(s["total_ms"] for s in summaries)}
+    return report
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Report the import time of the app's entry points.")
+    parser.add_argument("targets", nargs="*", default=list(DEFAULT_TARGETS), help="Modules to import")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules listed per target")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per target (the median is reported)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    for target, summary in run(args.targets, args.repeat, args.top).items():
+        heavy = ", ".join(summary["heavy"]) or "none"
+        print(f"\n{target}: {summary['total_ms']:.0f} ms, {summary['modules']} modules (heavy: {heavy})")
+        print(f"  {'cumulative ms':>13} {'self ms':>8}  module")
+        for module, cumulative_ms, self_ms in summary["top"]:
+            print(f"  {cumulative_ms:>13.1f} {self_ms:>8.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
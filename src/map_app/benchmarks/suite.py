@@ -0,0 +1,492 @@
+"""Benchmark suite over synthetic, continent-scale data with regression tracking.
+
+Run from ``src/map_app``:
+
+    python -m benchmarks.suite run [--scale small|medium|large] [--only finder,map] [--output results.json]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.15]
+
+``run`` times the app's hot paths on data from benchmarks/synthetic.py: the
+optimal location finder at each search radius, nearby-observation queries,
+ranking a million scored candidates, week-long plans for 500 sites,
+Bortle model inference, ClearOutside HTML extraction, ephemeris enrichment of
+result lists, map rendering and cold-start imports (see
+benchmarks/import_report.py). Timings are printed and, with ``--output``,
+written as JSON together with the scale and environment.
+
+``compare`` checks a results file against a saved baseline and exits with
+status 1 when any benchmark's median time grew by more than the threshold,
+so it can gate CI. Save a baseline by keeping the output of a ``run``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import cached_property
+from itertools import cycle
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.import_report import APP_DIR
+
+SCHEMA_VERSION = 1
+DEFAULT_THRESHOLD = 0.15
+# Changes smaller than this are timer noise, whatever the ratio
+DEFAULT_MIN_DELTA_MS = 0.05
+FINDER_RADII_KM = (10, 25, 50, 100, 200)
+HTML_FIXTURE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "clearoutside_forecast.html"
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Size of the synthetic data a run uses."""
+
+    raster_width: int
+    raster_height: int
+    observations: int
+    repeat: int
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(2048, 1080, 10_000, 30),
+    "medium": Scale(7740, 4080, 1_000_000, 20),
+    # The size of the shipped North America map, and a 10M-row GaN set
+    "large": Scale(15480, 8160, 10_000_000, 10),
+}
+
+
+@dataclass(frozen=True)
+class Case:
+    """One benchmark: setup builds the timed zero-argument callable."""
+
+    name: str
+    setup: Callable[["SuiteData"], Callable[[], Any]]
+    items: int = 1  # Work units per call, for throughput
+    repeat: Optional[int] = None  # Overrides the scale's repeat count
+
+
+class SuiteData:
+    """Synthetic inputs of one run, built on first use and shared by the cases."""
+
+    def __init__(self, scale: Scale, workdir: str, seed: int = 0):
+        self.scale = scale
+        self.workdir = workdir
+        self.seed = seed
+
+    @cached_property
+    def raster(self) -> np.ndarray:
+        return synthetic.synthetic_raster(self.scale.raster_width, self.scale.raster_height, seed=self.seed)
+
+    @cached_property
+    def finder(self):
+        from models.optimal_locations import OptimalLocationFinder
+
+        finder = OptimalLocationFinder()
+        synthetic.install_raster(finder, self.raster)
+        return finder
+
+    @cached_property
+    def finder_points(self) -> np.ndarray:
+        """Search centers on lit pixels of the synthetic map."""
+        return synthetic.lit_points(self.raster, 32, seed=self.seed)
+
+    @cached_property
+    def query_points(self) -> np.ndarray:
+        """Query locations near the synthetic towns, so searches find observations."""
+        centers = synthetic.observation_centers(self.scale.observations, seed=self.seed)
+        return centers[:32]
+
+    @cached_property
+    def observations_csv(self) -> str:
+        path = os.path.join(self.workdir, f"observations_{self.scale.observations}.csv")
+        return synthetic.write_observations_csv(path, self.scale.observations, seed=self.seed)
+
+    @cached_property
+    def observation_points(self):
+        from services.observation_points import load_observation_points
+
+        return load_observation_points(self.observations_csv)
+
+    @cached_property
+    def locations(self) -> List[Dict[str, Any]]:
+        """Candidate result dicts, as produced by the finder before enrichment."""
+        points = synthetic.random_points(1000, synthetic.region_bounds(), seed=self.seed)
+        return [{"latitude": float(lat), "longitude": float(lon)} for lat, lon in points]
+
+
+# Case setups
+
+
+def _finder(radius_km: int) -> Callable[[SuiteData], Callable[[], Any]]:
+    def setup(data: SuiteData) -> Callable[[], Any]:
+        finder = data.finder
+        points = cycle(data.finder_points)
+        return lambda: finder.find_optimal_locations(*next(points), radius_km, top_n=10)
+
+    return setup
+
+
+def _nearby(data: SuiteData) -> Callable[[], Any]:
+    from services.nearby_locations_service import find_nearby_observation_locations
+    from services.observation_points import load_observation_points
+
+    load_observation_points(data.observations_csv)
+    points = cycle(data.query_points)
+    return lambda: find_nearby_observation_locations(*next(points), 50, csv_path=data.observations_csv)
+
+
+def _nearby_load(data: SuiteData) -> Callable[[], Any]:
+    from services.observation_points import load_observation_points
+
+    # Bypass the per-process cache to time the CSV parse itself
+    return lambda: load_observation_points.__wrapped__(data.observations_csv)
+
+
+def _ranking(count: int) -> Callable[[SuiteData], Callable[[], Any]]:
+    def setup(data: SuiteData) -> Callable[[], Any]:
+        from models import scoring
+        from models.optimal_locations import LIGHT_POLLUTION_SCALE
+
+        rng = np.random.default_rng(data.seed)
+        levels = rng.choice(list(LIGHT_POLLUTION_SCALE.values()), count)
+        surroundings = rng.uniform(0, 7.5, count)
+        distances = rng.uniform(0, 100, count)
+
+        def rank():
+            criteria = scoring.normalize_criteria(
+                light_pollution=levels,
+                neighborhood_light_pollution=surroundings,
+                distance_km=distances,
+                radius_km=100,
+                cloud_percent=30,
+            )
+            return scoring.top_k(scoring.score(criteria), 50)
+
+        return rank
+
+    return setup
+
+
+def _diversify(count: int) -> Callable[[SuiteData], Callable[[], Any]]:
+    def setup(data: SuiteData) -> Callable[[], Any]:
+        from models import diversity
+
+        rng = np.random.default_rng(data.seed)
+        east, north = rng.uniform(-300, 300, (2, count))
+        # Smooth dark patches, so suppression has whole clusters to skip
+        scores = np.sin(east / 17.0) * np.cos(north / 23.0) + rng.uniform(0, 0.05, count)
+        return lambda: diversity.diversify(east, north, scores, 50, min_separation_km=5.0, sectors=8, per_sector=5)
+
+    return setup
+
+
+def _planner(sites: int) -> Callable[[SuiteData], Callable[[], Any]]:
+    def setup(data: SuiteData) -> Callable[[], Any]:
+        from models.night_planner import build_sky_matrix, plan_windows
+
+        points = synthetic.random_points(sites, synthetic.region_bounds(), seed=data.seed)
+        darkness = {"darkness": np.random.default_rng(data.seed).random(sites)}
+
+        def plan():
+            matrix = build_sky_matrix(points[:, 0], points[:, 1], "2026-01-05T12:00", nights=7)
+            return plan_windows(matrix, darkness, top_k=10)
+
+        return plan
+
+    return setup
+
+
+def _predictor_single(data: SuiteData) -> Callable[[], Any]:
+    from models.bortle_predictor import BortlePredictor
+
+    predictor = BortlePredictor()
+    points = cycle(data.query_points)
+    return lambda: predictor.predict(*next(points))
+
+
+def _predictor_batch(data: SuiteData) -> Callable[[], Any]:
+    from models.bortle_predictor import BortlePredictor
+
+    model = BortlePredictor().load_model()
+    features = synthetic.random_points(1000, synthetic.region_bounds(), seed=data.seed)
+    return lambda: model.predict(features)
+
+
+def _html_extraction(data: SuiteData) -> Callable[[], Any]:
+    from services.clearoutside_parser import extract_forecast_fields
+
+    html = HTML_FIXTURE.read_text(encoding="utf-8")
+    return lambda: extract_forecast_fields(html)
+
+
+def _enrichment(count: int) -> Callable[[SuiteData], Callable[[], Any]]:
+    def setup(data: SuiteData) -> Callable[[], Any]:
+        from models.ephemeris import annotate_locations
+
+        locations = data.locations[:count]
+        return lambda: annotate_locations(locations)
+
+    return setup
+
+
+def _map_render(data: SuiteData) -> Callable[[], Any]:
+    from utils.map_utils import add_center_marker, add_optimal_location_markers, add_radius_circle, create_base_map
+
+    finder = data.finder
+    latitude, longitude = (float(value) for value in data.finder_points[0])
+    locations = finder.find_optimal_locations(latitude, longitude, 50, top_n=10)
+
+    def render():
+        map_obj = create_base_map(latitude, longitude, 10)
+        map_obj = add_center_marker(map_obj, latitude, longitude, "Benchmark")
+        map_obj = add_radius_circle(map_obj, latitude, longitude, 50)
+        return add_optimal_location_markers(map_obj, locations).get_root().render()
+
+    return render
+
+
+def _observation_layer(data: SuiteData) -> Callable[[], Any]:
+    import folium
+
+    from config import OBSERVATION_LAYER_MAX_POINTS
+    from services.observation_points import points_in_bounds
+    from utils.observation_layer import build_observation_feature_group
+
+    boxes = cycle([(lat - 2.0, lon - 3.0, lat + 2.0, lon + 3.0) for lat, lon in data.query_points])
+    points = data.observation_points
+    def render():
+        group = build_observation_feature_group(
+            points_in_bounds(points, *next(boxes), max_points=OBSERVATION_LAYER_MAX_POINTS)
+        )
+        return group.add_to(folium.Map()).get_root().render()
+
+    return render
+
+
+def _startup(target: str) -> Callable[[SuiteData], Callable[[], Any]]:
+    """Fresh interpreter importing target: a cold worker's time before its first render."""
+
+    def setup(data: SuiteData) -> Callable[[], Any]:
+        command = [sys.executable, "-c", f"import {target}"]
+        return lambda: subprocess.run(command, cwd=APP_DIR, capture_output=True, check=True)
+
+    return setup
+
+
+CASES: List[Case] = [
+    *(Case(f"finder.radius_{radius}km", _finder(radius)) for radius in FINDER_RADII_KM),
+    Case("nearby.query_50km", _nearby),
+    Case("nearby.load_csv", _nearby_load, repeat=3),
+    Case("scoring.rank_1000000", _ranking(1_000_000), items=1_000_000),
+    Case("diversity.spread_1000000", _diversify(1_000_000), items=1_000_000),
+    Case("planner.sites_500_nights_7", _planner(500), items=500),
+    Case("predictor.single", _predictor_single),
+    Case("predictor.batch_1000", _predictor_batch, items=1000),
+    Case("html.extract_forecast", _html_extraction),
+    Case("enrichment.annotate_50", _enrichment(50), items=50),
+    Case("enrichment.annotate_1000", _enrichment(1000), items=1000),
+    Case("map.render", _map_render),
+    Case("map.observation_layer", _observation_layer),
+    Case("startup.import_main", _startup("main"), repeat=5),
+    Case("startup.import_api_server", _startup("api_server"), repeat=5),
+]
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Call fn repeatedly and return wall-time statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "mean_ms": statistics.fmean(timings),
+        "repeat": repeat,
+    }
+
+
+def select_cases(only: Optional[Iterable[str]] = None) -> List[Case]:
+    """Cases whose name starts with any of the given prefixes (all when omitted)."""
+    prefixes = [prefix for prefix in (only or []) if prefix]
+    if not prefixes:
+        return list(CASES)
+    return [case for case in CASES if any(case.name.startswith(prefix) for prefix in prefixes)]
+
+
+def environment() -> Dict[str, Any]:
+    """Where the numbers were measured, stored with the results."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(
+    scale: str = "small",
+    only: Optional[Iterable[str]] = None,
+    repeat: Optional[int] = None,
+    seed: int = 0,
+    workdir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run the selected benchmarks on one data scale.
+
+    Args:
+        scale: Key of SCALES
+        only: Name prefixes of the cases to run (all when omitted)
+        repeat: Timed calls per case (the scale's default when omitted)
+        seed: Seed of the synthetic data
+        workdir: Directory for generated files (a temporary one when omitted)
+
+    Returns:
+        Dict with schema, scale, environment and per-benchmark stats
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale: {scale!r} (choose from {', '.join(SCALES)})")
+    cases = select_cases(only)
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="skyline-bench-") as tmp:
+        data = SuiteData(SCALES[scale], workdir or tmp, seed)
+        for case in cases:
+            fn = case.setup(data)
+            stats = measure(fn, repeat or case.repeat or data.scale.repeat)
+            stats["items_per_s"] = case.items / (stats["median_ms"] / 1000.0) if stats["median_ms"] else None
+            results[case.name] = stats
+            print(f"{case.name:<28}{stats['median_ms']:>11.3f} ms{stats['p95_ms']:>11.3f} ms p95", flush=True)
+    return {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "scale": scale,
+        "seed": seed,
+        "environment": environment(),
+        "benchmarks": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> List[Dict[str, Any]]:
+    """
+    Compare the median times of two result sets.
+
+    Args:
+        baseline: Results of the reference run
+        current: Results of the run under test
+        threshold: Relative slowdown (0.15 = 15%) above which a benchmark regressed
+        min_delta_ms: Slowdowns smaller than this never count as regressions
+
+    Returns:
+        One row per benchmark in either run, with baseline_ms, current_ms,
+        change (relative, None when either side is missing) and status:
+        "regressed", "improved", "ok", "new" or "missing"
+    """
+    before = baseline.get("benchmarks", {})
+    after = current.get("benchmarks", {})
+    rows = []
+    for name in list(before) + [name for name in after if name not in before]:
+        old = before.get(name, {}).get("median_ms")
+        new = after.get(name, {}).get("median_ms")
+        if old is None or new is None:
+            status = "new" if old is None else "missing"
+            rows.append({"name": name, "baseline_ms": old, "current_ms": new, "change": None, "status": status})
+            continue
+        change = (new - old) / old if old else 0.0
+        if change > threshold and new - old > min_delta_ms:
+            status = "regressed"
+        elif change < -threshold and old - new > min_delta_ms:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"name": name, "baseline_ms": old, "current_ms": new, "change": change, "status": status})
+    return rows
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Read a results file written by ``run --output``."""
+    with open(path, encoding="utf-8") as handle:
+        results = json.load(handle)
+    if results.get("schema") != SCHEMA_VERSION:
+        raise ValueError(f"{path}: unsupported results schema {results.get('schema')!r}")
+    return results
+
+
+def _print_comparison(rows: List[Dict[str, Any]], baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    if baseline.get("scale") != current.get("scale"):
+        print(f"warning: comparing scale {current.get('scale')!r} against baseline scale {baseline.get('scale')!r}")
+    if baseline.get("environment") != current.get("environment"):
+        print("warning: runs come from different environments; timings may not be comparable")
+    print(f"{'benchmark':<28}{'baseline ms':>13}{'current ms':>13}{'change':>9}  status")
+    for row in rows:
+        old = f"{row['baseline_ms']:.3f}" if row["baseline_ms"] is not None else "-"
+        new = f"{row['current_ms']:.3f}" if row["current_ms"] is not None else "-"
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        print(f"{row['name']:<28}{old:>13}{new:>13}{change:>9}  {row['status']}")
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite or compare results against a baseline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks on synthetic data")
+    run_parser.add_argument("--scale", choices=list(SCALES), default="small", help="Synthetic data size")
+    run_parser.add_argument("--only", default="", help="Comma-separated benchmark name prefixes")
+    run_parser.add_argument("--repeat", type=int, help="Timed calls per benchmark")
+    run_parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    run_parser.add_argument("--output", help="Write results as JSON to this path")
+    run_parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions against a baseline")
+    compare_parser.add_argument("baseline", help="Results JSON of the reference run")
+    compare_parser.add_argument("current", help="Results JSON of the run under test")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS, help="Ignore smaller slowdowns")
+
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    if args.command == "run":
+        only = args.only.split(",")
+        if args.list:
+            for case in select_cases(only):
+                print(case.name)
+            return 0
+        results = run(args.scale, only, args.repeat, args.seed)
+        if args.output:
+            Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+            print(f"\nResults written to {args.output}")
+        return 0
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    rows = compare(baseline, current, args.threshold, args.min_delta_ms)
+    _print_comparison(rows, baseline, current)
+    regressed = [row["name"] for row in rows if row["status"] == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
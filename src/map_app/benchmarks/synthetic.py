@@ -0,0 +1,227 @@
+"""Synthetic datasets for benchmarking at continent scale.
+
+The shipped light pollution maps and GaN observations fix the size of every
+workload. These generators build stand-ins of any size with the same shape:
+
+- ``synthetic_raster``: an RGB light pollution map drawn only from the
+  palette in LIGHT_POLLUTION_SCALE, with dark countryside and bright city
+  glows, up to the full 15480 x 8160 continent maps
+- ``synthetic_observations`` / ``write_observations_csv``: GaN-like
+  observation rows clustered around towns, from 10k to 10M rows
+
+Everything is seeded, so a benchmark run on the same scale always measures
+the same data.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.optimal_locations import CONTINENTS, LIGHT_POLLUTION_SCALE, OptimalLocationFinder
+
+# Palette sorted from darkest to brightest sky, as uint8 RGB
+PALETTE = np.array(
+    sorted(LIGHT_POLLUTION_SCALE, key=LIGHT_POLLUTION_SCALE.get), dtype=np.uint8
+)
+
+# Glow thresholds between consecutive palette levels (arbitrary radiance units)
+_GLOW_LEVELS = np.geomspace(0.01, 20.0, len(PALETTE) - 1).astype(np.float32)
+
+DEFAULT_REGION = "North America"
+
+Bounds = Tuple[float, float, float, float]  # south, west, north, east
+
+
+def region_bounds(name: str = DEFAULT_REGION) -> Bounds:
+    """Return (south, west, north, east) of a map region."""
+    lon_min, lat_min, lon_max, lat_max = CONTINENTS[name][:4]
+    return lat_min, lon_min, lat_max, lon_max
+
+
+def synthetic_raster(
+    width: int,
+    height: int,
+    cities: Optional[int] = None,
+    seed: int = 0,
+    block: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Build a light pollution map made of palette colors only.
+
+    The glow field is computed on a grid ``block`` times coarser than the
+    image and expanded row band by row band, so even continent-sized maps
+    are generated in a few seconds without large float temporaries.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        cities: Number of light sources (scaled with the area when omitted)
+        seed: Random seed
+        block: Side of the square pixel blocks sharing one glow value
+            (about 1/1000 of the width when omitted)
+
+    Returns:
+        uint8 array of shape (height, width, 3)
+    """
+    rng = np.random.default_rng(seed)
+    block = block or max(1, width // 1000)
+    if cities is None:
+        cities = max(8, width * height // 250_000)
+    low_h, low_w = -(-height // block), -(-width // block)
+
+    # Faint, uneven rural background plus one Gaussian glow per city
+    glow = rng.gamma(1.0, 0.01, size=(low_h, low_w)).astype(np.float32)
+    for _ in range(cities):
+        cy, cx = rng.uniform(0, low_h), rng.uniform(0, low_w)
+        sigma = rng.uniform(0.5, 8.0)
+        brightness = np.float32(rng.lognormal(0.0, 1.5))
+        reach = int(4 * sigma) + 1
+        y0, y1 = max(0, int(cy) - reach), min(low_h, int(cy) + reach + 1)
+        x0, x1 = max(0, int(cx) - reach), min(low_w, int(cx) + reach + 1)
+        if y0 >= y1 or x0 >= x1:
+            continue
+        dy = (np.arange(y0, y1, dtype=np.float32) - cy)[:, None]
+        dx = (np.arange(x0, x1, dtype=np.float32) - cx)[None, :]
+        glow[y0:y1, x0:x1] += brightness * np.exp(-(dy * dy + dx * dx) / np.float32(2 * sigma * sigma))
+
+    levels = np.searchsorted(_GLOW_LEVELS, glow).astype(np.uint8)
+    raster = np.empty((height, width, 3), dtype=np.uint8)
+    for row in range(low_h):
+        colors = PALETTE[np.repeat(levels[row], block)[:width]]
+        raster[row * block : (row + 1) * block] = colors[None, :, :]
+    return raster
+
+
+def install_raster(
+    finder: OptimalLocationFinder, raster: np.ndarray, region_name: str = DEFAULT_REGION
+) -> Dict[str, float]:
+    """
+    Make a finder use a synthetic raster for one region instead of its PNG.
+
+    The raster keeps the region's geographic bounds; its own size sets the
+    pixel resolution.
+
+    Args:
+        finder: Finder to update
+        raster: Map from synthetic_raster
+        region_name: Region from CONTINENTS covered by the raster
+
+    Returns:
+        Region metadata the finder will use
+    """
+    south, west, north, east = region_bounds(region_name)
+    region = finder._get_region_info((south + north) / 2, (west + east) / 2)
+    region = {**region, "height": raster.shape[0], "width": raster.shape[1]}
+    finder._map_cache.put(region_name, (raster, region))
+    return region
+
+
+def lit_points(
+    raster: np.ndarray, count: int, bounds: Optional[Bounds] = None, seed: int = 0, min_level: float = 4.0
+) -> np.ndarray:
+    """
+    Pick (latitude, longitude) pairs on pixels at least min_level bright.
+
+    Searches usually start from towns, where the finder has darker pixels
+    to rank; starting on dark countryside returns early and times nothing.
+    """
+    rng = np.random.default_rng(seed)
+    step = max(1, min(raster.shape[:2]) // 512)
+    sample = raster[::step, ::step]
+    bright = PALETTE[[LIGHT_POLLUTION_SCALE[tuple(color)] >= min_level for color in PALETTE.tolist()]]
+    mask = (sample[:, :, None, :] == bright[None, None, :, :]).all(axis=-1).any(axis=-1)
+    ys, xs = np.nonzero(mask)
+    if len(ys) == 0:
+        raise ValueError(f"No pixels at level {min_level} or brighter")
+    picks = rng.integers(0, len(ys), count)
+    south, west, north, east = bounds or region_bounds()
+    height, width = raster.shape[:2]
+    longitude = west + (xs[picks] * step + 0.5) / width * (east - west)
+    latitude = north - (ys[picks] * step + 0.5) / height * (north - south)
+    return np.column_stack([latitude, longitude])
+
+
+def random_points(count: int, bounds: Bounds, seed: int = 0, margin: float = 2.0) -> np.ndarray:
+    """Uniform (latitude, longitude) pairs inside bounds shrunk by margin degrees."""
+    rng = np.random.default_rng(seed)
+    south, west, north, east = bounds
+    return np.column_stack(
+        [rng.uniform(south + margin, north - margin, count), rng.uniform(west + margin, east - margin, count)]
+    )
+
+
+def _cluster_centers(rows: int, bounds: Bounds, seed: int) -> np.ndarray:
+    """Town locations the observations gather around."""
+    return random_points(min(5000, max(10, rows // 1000)), bounds, seed=seed, margin=0.5)
+
+
+def _observation_chunk(rng: np.random.Generator, centers: np.ndarray, rows: int, bounds: Bounds) -> pd.DataFrame:
+    south, west, north, east = bounds
+    # Most observers are near towns, some anywhere
+    clustered = rng.random(rows) < 0.8
+    picks = centers[rng.integers(0, len(centers), rows)]
+    latitude = np.where(clustered, picks[:, 0] + rng.normal(0, 0.3, rows), rng.uniform(south, north, rows))
+    longitude = np.where(clustered, picks[:, 1] + rng.normal(0, 0.4, rows), rng.uniform(west, east, rows))
+    limiting_mag = rng.integers(0, 8, rows).astype(np.float64)
+    limiting_mag[rng.random(rows) < 0.1] = np.nan
+    cloud_cover = rng.integers(0, 5, rows).astype(np.float64)
+    cloud_cover[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame(
+        {
+            "Latitude": np.clip(latitude, south, north),
+            "Longitude": np.clip(longitude, west, east),
+            "LimitingMag": limiting_mag,
+            "CloudCover": cloud_cover,
+            "LightPollutionIndex": rng.integers(0, 30, rows),
+        }
+    )
+
+
+def iter_observation_chunks(
+    rows: int, seed: int = 0, bounds: Optional[Bounds] = None, chunk_rows: int = 1_000_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield GaN-like observation rows in chunks (same rows for the same seed).
+
+    Args:
+        rows: Total number of rows
+        seed: Random seed
+        bounds: (south, west, north, east) covered (defaults to North America)
+        chunk_rows: Rows per yielded DataFrame
+
+    Yields:
+        DataFrame with the columns the services read from GaN2024_Modified.csv
+    """
+    bounds = bounds or region_bounds()
+    centers = _cluster_centers(rows, bounds, seed)
+    for index, start in enumerate(range(0, rows, chunk_rows)):
+        rng = np.random.default_rng([seed, index])
+        yield _observation_chunk(rng, centers, min(chunk_rows, rows - start), bounds)
+
+
+def synthetic_observations(rows: int, seed: int = 0, bounds: Optional[Bounds] = None) -> pd.DataFrame:
+    """Return GaN-like observation rows as one DataFrame."""
+    return pd.concat(list(iter_observation_chunks(rows, seed, bounds)), ignore_index=True)
+
+
+def write_observations_csv(
+    path: str, rows: int, seed: int = 0, bounds: Optional[Bounds] = None, chunk_rows: int = 1_000_000
+) -> str:
+    """
+    Write synthetic observations as a CSV the observation services can load.
+
+    Rows are written chunk by chunk, so 10M-row files need little memory.
+
+    Returns:
+        The path written
+    """
+    for index, chunk in enumerate(iter_observation_chunks(rows, seed, bounds, chunk_rows)):
+        chunk.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+    return path
+
+
+def observation_centers(rows: int, seed: int = 0, bounds: Optional[Bounds] = None) -> np.ndarray:
+    """The town locations behind a synthetic observation set, for realistic query points."""
+    return _cluster_centers(rows, bounds or region_bounds(), seed)
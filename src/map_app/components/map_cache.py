@@ -0,0 +1,157 @@
+"""
+Cache of built folium maps, shared by all sessions of the process.
+
+The built map (markers, radius circle, result popups) and GaN observation
+layer (point encoding) are cached under a canonical hash of their inputs, in
+a bounded LRU, and a copy is handed to st_folium on every run.
+
+Only building is skipped; the rendered output is not reused. st_folium's
+public API takes a folium map, not a prerendered payload, so the map is
+rendered and serialized on every run, and that is most of a run's cost.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import folium
+
+from components.map_display import render_map
+from config import MAP_BUILD_CACHE_MAX_BYTES, MAP_BUILD_CACHE_MAX_ENTRIES, MAP_RETURNED_OBJECTS
+from services.bounded_cache import BoundedLRUCache, approximate_size
+from services.memory_budget import register_cache
+from utils.instrumentation import count_cache, span
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical(value: Any) -> Any:
+    """Make a value JSON-serializable with stable float precision and key order."""
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if hasattr(value, "item"):  # numpy scalars
+        return _canonical(value.item())
+    return value
+
+
+def canonical_map_key(**parts: Any) -> str:
+    """
+    Hash map inputs (center, radius, layers, result set, ...) into a cache key.
+
+    Floats are rounded to 6 decimals and dict keys sorted, so equal inputs
+    always produce the same key regardless of ordering or float noise.
+    """
+    encoded = json.dumps(_canonical(parts), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _element_size(element: folium.Element) -> int:
+    """Approximate memory held by a built map or layer (the attributes of every element in it)."""
+    size, stack = 0, [element]
+    while stack:
+        node = stack.pop()
+        size += approximate_size(vars(node))
+        stack.extend(node._children.values())
+    return size
+
+
+class MapBuildCache:
+    """Bounded LRU of built maps and layers."""
+
+    def __init__(self, max_entries: int = MAP_BUILD_CACHE_MAX_ENTRIES, max_bytes: int = MAP_BUILD_CACHE_MAX_BYTES):
+        """
+        Args:
+            max_entries: Maximum built maps and layers kept
+            max_bytes: Memory budget for them
+        """
+        self._cache = register_cache(
+            "map_builds",
+            BoundedLRUCache(max_entries=max_entries, max_bytes=max_bytes, sizeof=_element_size),
+        )
+
+    def get_or_build(self, key: str, build: Callable[[], Any], kind: str = "map") -> Tuple[Any, bool]:
+        """
+        Return the cached map or layer for key, building and caching it on a miss.
+
+        The returned object is shared: render a copy, never the object itself.
+
+        Args:
+            key: Canonical key of the inputs (see canonical_map_key)
+            build: Builds the map or layer
+            kind: "map" or "layer", naming the instrumentation span and cache
+
+        Returns:
+            (map or layer, hit)
+        """
+        output = self._cache.get(key)
+        hit = output is not None
+        count_cache(f"{kind}_render", hit)
+        if not hit:
+            with span(f"{kind}.build"):
+                output = build()
+            self._cache.put(key, output)
+        return output, hit
+
+    def stats(self) -> Dict[str, Any]:
+        """Return LRU statistics (entries, bytes, hits, misses, ...)."""
+        return self._cache.stats()
+
+    def clear(self) -> int:
+        """Drop every built map; returns how many were removed."""
+        return self._cache.clear()
+
+
+_map_cache = MapBuildCache()
+
+
+def get_map_cache_stats() -> Dict[str, Any]:
+    """Return statistics of the process-wide map cache."""
+    return _map_cache.stats()
+
+
+def render_cached_map(
+    key_parts: Dict[str, Any],
+    build: Callable[[], folium.Map],
+    height: int = 600,
+    returned_objects: Iterable[str] = MAP_RETURNED_OBJECTS,
+    key: str = "observation_map",
+    layer_key_parts: Optional[Dict[str, Any]] = None,
+    build_layer: Optional[Callable[[], folium.FeatureGroup]] = None,
+) -> Dict[str, Any]:
+    """
+    Render a map through the map cache and return its interactions.
+
+    Behaves like render_map, but the map is only built when no map with the
+    same key_parts has been built before (by any session). st_folium still
+    renders and serializes it on every run.
+
+    Args:
+        key_parts: Everything the map depends on (center, radius, layers, results)
+        build: Builds the folium map on a cache miss
+        height: Height of map in pixels
+        returned_objects: Map state keys to return (e.g. "last_clicked", "bounds")
+        key: Widget key, kept stable so the map is not remounted between reruns
+        layer_key_parts: Everything the optional layer depends on
+        build_layer: Builds the feature group swapped in without a remount
+
+    Returns:
+        Dict: User interactions with the map (if any)
+    """
+    map_obj, _ = _map_cache.get_or_build(canonical_map_key(kind="map", **key_parts), build)
+
+    layer = None
+    if build_layer is not None:
+        layer, _ = _map_cache.get_or_build(
+            canonical_map_key(kind="layer", **(layer_key_parts or {})), build_layer, kind="layer"
+        )
+        # st_folium renders the group, which would change the shared copy
+        layer = copy.deepcopy(layer)
+
+    # render_map hands st_folium a copy of the shared map
+    return render_map(map_obj, height, returned_objects, key, feature_group=layer)
@@ -2,27 +2,78 @@
 Map display components for the main application.
 """
 
+import copy
+
 import streamlit as st
 from streamlit_folium import st_folium
 import folium
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from config import MAP_RETURNED_OBJECTS
 
 
-def render_map(map_obj: folium.Map, height: int = 600) -> Dict[str, Any]:
+def render_map(
+    map_obj: folium.Map,
+    height: int = 600,
+    returned_objects: Iterable[str] = MAP_RETURNED_OBJECTS,
+    key: str = "observation_map",
+    feature_group: Optional[folium.FeatureGroup] = None,
+) -> Dict[str, Any]:
     """
     Render a folium map using streamlit-folium.
 
+    Only the events in returned_objects are sent back to Python, and a rerun
+    happens only when one of them changes, so panning and zooming without
+    clicking do not rerun anything by default.
+
+    The map is rendered from a copy: rendering a folium map appends its
+    scripts again on every call, so reusing one object across reruns would
+    change the generated code (and remount the map) each time.
+
     Args:
         map_obj: Folium map object to render
         height: Height of map in pixels
+        returned_objects: Map state keys to return (e.g. "last_clicked", "bounds")
+        key: Widget key, kept stable so the map is not remounted between reruns
+        feature_group: Layer swapped in without remounting the map (e.g. viewport data)
 
     Returns:
         Dict: User interactions with the map (if any)
     """
-    map_data = st_folium(map_obj, width=1400, height=height)
+    map_data = st_folium(
+        copy.deepcopy(map_obj),
+        width=1400,
+        height=height,
+        returned_objects=list(returned_objects),
+        key=key,
+        feature_group_to_add=feature_group,
+    )
     return map_data
 
 
+def get_new_click(
+    map_data: Optional[Dict[str, Any]], last_click: Optional[Tuple[float, float]]
+) -> Optional[Tuple[float, float]]:
+    """
+    Return the clicked coordinate if it differs from the last one handled.
+
+    st_folium keeps returning the last click on every rerun, so a click is
+    only new if its coordinate changed.
+
+    Args:
+        map_data: Value returned by render_map
+        last_click: (latitude, longitude) of the last handled click
+
+    Returns:
+        Tuple[float, float]: (latitude, longitude) of a new click, or None
+    """
+    clicked = (map_data or {}).get("last_clicked")
+    if not clicked:
+        return None
+    click = (round(clicked["lat"], 6), round(clicked["lng"], 6))
+    return None if click == last_click else click
+
+
 def render_optimal_locations_panel(locations: List[Dict[str, Any]], radius_km: int) -> None:
     """
     Render the bottom panel with optimal observation locations.
@@ -67,9 +118,10 @@ def render_optimal_locations_panel(locations: List[Dict[str, Any]], radius_km: i
                     )
 
                 with col3:
+                    cloudiness = loc.get("cloudiness_percent")
                     st.metric(
                         "☁️ Cloudiness",
-                        f"{loc.get('cloudiness_percent', 0)}%",
+                        "n/a" if cloudiness is None else f"{cloudiness}%",
                     )
 
                 with col4:
@@ -6,58 +6,110 @@ import streamlit as st
 from typing import Dict, Any
 
 
-def render_sidebar_metrics(metrics: Dict[str, Any]) -> None:
+def render_location_metrics(metrics: Dict[str, Any]) -> None:
     """
-    Render location metrics in the sidebar.
+    Render location metrics into the current container.
+
+    Used directly inside a sidebar fragment, which cannot open st.sidebar itself.
 
     Args:
         metrics: Dictionary containing Bortle score, cloudiness, moon brightness
     """
-    with st.sidebar:
-        st.markdown("## 📊 Current Location Metrics")
-        st.divider()
+    st.markdown("## 📊 Current Location Metrics")
+    st.divider()
 
-        # Light pollution score derived from map colors
-        light_pollution = metrics.get("light_pollution_index", metrics.get("bortle_score", 5))
-        st.metric(
-            label="💡 Light Pollution",
-            value=f"{light_pollution:.2f}",
-            delta="Lower is darker",
-        )
-        st.caption(
-            "Scale from light pollution map (0 = darkest, higher = brighter skies)"
-        )
+    # Light pollution score derived from map colors
+    light_pollution = metrics.get("light_pollution_index")
+    st.metric(
+        label="💡 Light Pollution",
+        value=_format_value(metrics, "light_pollution", light_pollution, "{:.2f}"),
+        delta="Lower is darker",
+    )
+    st.caption(
+        "Scale from light pollution map (0 = darkest, higher = brighter skies)"
+    )
+    if metrics.get("bortle_score") is not None:
+        st.caption(f"Bortle class {metrics['bortle_score']}")
+    if metrics.get("sky_quality"):
+        st.caption(f"Model prediction: {metrics['sky_quality']}")
+    _source_caption(metrics, "light_pollution", "bortle", "sky_visibility")
 
-        st.divider()
+    st.divider()
 
-        # Cloudiness
-        cloudiness = metrics.get("cloudiness_percent", 0)
-        st.metric(
-            label="☁️ Cloudiness",
-            value=f"{cloudiness}%",
-            delta="Lower is better for observation",
-        )
-        st.caption("Cloud coverage at current location")
+    # Cloudiness
+    cloudiness = metrics.get("cloudiness_percent")
+    st.metric(
+        label="☁️ Cloudiness",
+        value=_format_value(metrics, "cloudiness", cloudiness, "{}%"),
+        delta="Lower is better for observation",
+    )
+    st.caption(metrics.get("forecast_description") or "Cloud coverage at current location")
+    _source_caption(metrics, "cloudiness")
+
+    st.divider()
 
-        st.divider()
+    # Moon Brightness
+    moon_brightness = metrics.get("moon_brightness")
+    st.metric(
+        label="🌕 Moon Brightness",
+        value=_format_value(metrics, "moon", moon_brightness, "{}%"),
+        delta="Lower is better for observation",
+    )
+    moon_phase = metrics.get("moon_phase")
+    if moon_phase:
+        rise = metrics.get("moon_rise_time") or "—"
+        set_time = metrics.get("moon_set_time") or "—"
+        # Scraped times are the site's local time, offline ephemeris times UTC
+        zone = metrics.get("moon_time_zone") or "local"
+        st.caption(f"{moon_phase} · rises {rise} · sets {set_time} ({zone})")
+    else:
+        st.caption("Moon illumination and brightness level")
+    _source_caption(metrics, "moon")
 
-        # Moon Brightness
-        moon_brightness = metrics.get("moon_brightness", 0)
+    # Astronomical darkness tonight
+    if metrics.get("dark_hours") is not None:
+        start = metrics.get("darkness_start_time") or "—"
+        end = metrics.get("darkness_end_time") or "—"
         st.metric(
-            label="🌕 Moon Brightness",
-            value=f"{moon_brightness}%",
-            delta="Lower is better for observation",
+            label="🌌 Astronomical Darkness",
+            value=f"{metrics['dark_hours']:.1f} h",
         )
-        st.caption("Moon illumination and brightness level")
+        st.caption(f"Sun below -18° from {start} to {end} ({metrics.get('darkness_time_zone') or 'UTC'})")
 
-        st.divider()
+    st.divider()
 
-        # Location Info
-        st.markdown("### 📍 Location Info")
-        st.info(
-            f"""
-            **Latitude:** {metrics.get('latitude', 0):.4f}  
-            **Longitude:** {metrics.get('longitude', 0):.4f}  
-            **Location:** {metrics.get('location_name', 'Unknown')}
-            """
-        )
+    # Location Info
+    st.markdown("### 📍 Location Info")
+    st.info(
+        f"""
+        **Latitude:** {metrics.get('latitude', 0):.4f}  
+        **Longitude:** {metrics.get('longitude', 0):.4f}  
+        **Location:** {metrics.get('location_name', 'Unknown')}
+        """
+    )
+
+
+def _format_value(metrics: Dict[str, Any], source: str, value: Any, template: str) -> str:
+    """Format a metric value, or show that its source is still loading or gave nothing."""
+    if value is not None:
+        return template.format(value)
+    if "sources" in metrics and source not in metrics["sources"]:
+        return "…"
+    return "n/a"
+
+
+def _source_caption(metrics: Dict[str, Any], *sources: str) -> None:
+    """Show where the values above came from and how long each source took."""
+    provenance = metrics.get("sources")
+    if provenance is None:
+        return
+    parts = []
+    for name in sources:
+        info = provenance.get(name)
+        if info is None:
+            parts.append(f"{name}: loading…")
+        elif info["status"] == "ok":
+            parts.append(f"{name}: {info['source']} · {info['elapsed_ms']:.0f} ms")
+        else:
+            parts.append(f"{name}: {info['source']} ({info['status']} after {info['elapsed_ms']:.0f} ms)")
+    st.caption(" | ".join(parts))
@@ -0,0 +1,82 @@
+"""
+Timing overlay for measuring how long each part of the page takes to render.
+
+Sections are wrapped in ``timed(name)``. The latest duration of every section
+is kept in session state, so a fragment rerun only updates its own figure and
+the others keep showing their last run. Enable the overlay with ``?timing=1``
+in the URL or ``SKYLINE_TIMING_OVERLAY=1``.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, MutableMapping, Optional
+
+import streamlit as st
+
+from config import SHOW_TIMING_OVERLAY
+
+TIMINGS_KEY = "section_timings"
+
+
+def timing_enabled() -> bool:
+    """Return True if the timing overlay should be shown."""
+    return SHOW_TIMING_OVERLAY or st.query_params.get("timing") == "1"
+
+
+def record_timing(
+    section: str,
+    elapsed_ms: float,
+    store: Optional[MutableMapping[str, Any]] = None,
+) -> Dict[str, float]:
+    """
+    Record one run of a page section.
+
+    Args:
+        section: Section name (e.g. "map")
+        elapsed_ms: Duration of the run in milliseconds
+        store: Mapping holding the timings (defaults to session state)
+
+    Returns:
+        Dict: The section's last_ms, runs and total_ms
+    """
+    store = st.session_state if store is None else store
+    timings = store.setdefault(TIMINGS_KEY, {})
+    entry = timings.setdefault(section, {"last_ms": 0.0, "runs": 0, "total_ms": 0.0})
+    entry["last_ms"] = elapsed_ms
+    entry["runs"] += 1
+    entry["total_ms"] += elapsed_ms
+    return entry
+
+
+@contextmanager
+def timed(section: str) -> Iterator[None]:
+    """Time the enclosed block and record it under the given section name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(section, (time.perf_counter() - started) * 1000.0)
+
+
+def render_timing_caption(section: str) -> None:
+    """Show the latest duration of one section below it."""
+    if not timing_enabled():
+        return
+    entry = st.session_state.get(TIMINGS_KEY, {}).get(section)
+    if entry:
+        st.caption(f"⏱️ {section}: {entry['last_ms']:.0f} ms (run {entry['runs']})")
+
+
+def render_timing_overlay() -> None:
+    """Show the latest duration and run count of every section in the sidebar."""
+    if not timing_enabled():
+        return
+    timings = st.session_state.get(TIMINGS_KEY, {})
+    with st.sidebar:
+        with st.expander("⏱️ Render timings", expanded=True):
+            for section, entry in timings.items():
+                average = entry["total_ms"] / entry["runs"]
+                st.caption(
+                    f"**{section}**: {entry['last_ms']:.0f} ms last · "
+                    f"{average:.0f} ms avg · {entry['runs']} runs"
+                )
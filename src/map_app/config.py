@@ -2,6 +2,9 @@
 Configuration and constants for the Streamlit Map Application.
 """
 
+import os
+import tempfile
+
 # Map Configuration
 DEFAULT_LATITUDE = 40.7128
 DEFAULT_LONGITUDE = -74.0060
@@ -56,3 +59,124 @@ PAGE_TITLE = "AI Skyline Visibility Map"
 PAGE_ICON = "🌟"
 LAYOUT = "wide"
 INITIAL_SIDEBAR_STATE = "expanded"
+
+# Page / map interaction
+PAGE_QUERY_TTL_SECONDS = 600  # Per-input query results reused for this long
+PAGE_QUERY_CACHE_MAX_ENTRIES = 256  # Distinct input states kept per query
+# Map events sent back from the browser; panning/zooming alone sends nothing
+MAP_RETURNED_OBJECTS = ["last_clicked"]
+MAP_CLICK_DEBOUNCE_SECONDS = 0.4  # Rapid clicks within this window start one search
+MAP_BUILD_CACHE_MAX_ENTRIES = 64  # Built maps and layers kept per process
+MAP_BUILD_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Memory budget for them
+OBSERVATION_LAYER_MAX_POINTS = 100_000  # GaN observations streamed per viewport
+OBSERVATION_LAYER_PADDING = 0.5  # Load this fraction of the viewport beyond each edge
+# Show per-section render times (also enabled with ?timing=1 in the URL)
+SHOW_TIMING_OVERLAY = os.environ.get("SKYLINE_TIMING_OVERLAY", "") == "1"
+
+# Weather source
+# Point at a local stand-in (utils/clearoutside_standin.py) to run offline
+CLEAROUTSIDE_BASE_URL = os.environ.get("SKYLINE_CLEAROUTSIDE_URL", "https://clearoutside.com").rstrip("/")
+WEATHER_REQUEST_TIMEOUT_SECONDS = 10.0  # Cap on a single request attempt
+WEATHER_LATENCY_BUDGET_SECONDS = 4.0  # Total time for all attempts of one fetch
+WEATHER_HEDGE_AFTER_SECONDS = 1.5  # Send a hedged request if none answered by then
+WEATHER_MAX_ATTEMPTS = 2  # Hedges plus retries per fetch
+WEATHER_MAX_CONCURRENT_REQUESTS = 32  # Upstream requests in flight per process
+CIRCUIT_FAILURE_THRESHOLD = 3  # Consecutive failed fetches that open the circuit
+CIRCUIT_RESET_SECONDS = 30.0  # Time the circuit stays open before a probe
+WEATHER_FETCHER_CACHE_MAX_ENTRIES = 512  # Parsed forecast pages kept in memory
+WEATHER_FETCHER_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Memory budget for those pages
+
+# Sidebar metrics
+# All sources are queried at once; late ones are shown with their fallback value
+METRICS_DEADLINE_SECONDS = 3.0
+METRICS_MAX_WORKERS = 8  # Source calls running at once per process
+
+# Geocoding
+GEOCODE_CACHE_PATH = os.environ.get(
+    "SKYLINE_GEOCODE_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "skyline_geocode_cache.sqlite3"),
+)
+GEOCODE_CACHE_TTL_SECONDS = 30 * 86400  # Places rarely move
+GEOCODE_NEGATIVE_TTL_SECONDS = 86400  # Retry "not found" queries after a day
+# Optional populated-places file (GeoNames cities*.txt or name,latitude,longitude CSV)
+GAZETTEER_PATH = os.environ.get("SKYLINE_GAZETTEER_PATH", "")
+GEOCODER_TIMEOUT_SECONDS = 5.0
+GEOCODER_USER_AGENT = "star_observation_map"
+
+# Headless query API (api_server.py)
+API_HOST = os.environ.get("SKYLINE_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("SKYLINE_API_PORT", "8080"))
+API_WORKERS = int(os.environ.get("SKYLINE_API_WORKERS", "2"))  # Forked processes; 0 serves in-process
+API_MAX_BATCH = 100  # Queries accepted in one /v1/batch request
+API_BATCH_THREADS = 8  # Queries of one batch run at once
+API_GZIP_MIN_BYTES = 1024  # Smaller responses are sent uncompressed
+
+# Batch site scoring (batch_score.py)
+BATCH_CHUNK_ROWS = 5000  # Sites scored and written per chunk (the unit of resume)
+BATCH_OBSERVATION_RADIUS_KM = 25.0  # Nearest GaN observation searched within this distance
+BATCH_WEATHER_THREADS = 8  # Forecast cells fetched at once per worker (with --weather)
+
+# Instrumentation (see utils/instrumentation.py)
+INSTRUMENTATION_ENABLED = os.environ.get("SKYLINE_INSTRUMENTATION", "") == "1"  # Record spans and counters
+METRICS_PORT = int(os.environ["SKYLINE_METRICS_PORT"]) if os.environ.get("SKYLINE_METRICS_PORT") else None
+# Requests slower than this get a sampled stack profile written (unset disables profiling)
+PROFILE_SLOW_MS = float(os.environ["SKYLINE_PROFILE_SLOW_MS"]) if os.environ.get("SKYLINE_PROFILE_SLOW_MS") else None
+PROFILE_INTERVAL_MS = 5.0  # Time between stack samples of a profiled request
+PROFILE_DIR = os.environ.get("SKYLINE_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "skyline_profiles"))
+
+# Memory budget (see services/memory_budget.py)
+# Combined size of the in-process caches; least recently used entries are
+# evicted across all of them beyond it (unset: each cache only keeps its own limits)
+MEMORY_BUDGET_BYTES = (
+    int(float(os.environ["SKYLINE_MEMORY_BUDGET_MB"]) * 1024 * 1024)
+    if os.environ.get("SKYLINE_MEMORY_BUDGET_MB")
+    else None
+)
+REGION_MAP_CACHE_MAX_BYTES = 2 * 1024**3  # Decoded region maps per finder (all six take ~1.6 GB)
+OBSERVATION_CACHE_MAX_ENTRIES = 2  # Observation datasets (and their indexes) kept in memory
+OBSERVATION_CACHE_MAX_BYTES = 1024**3
+
+# Service result cache (see services/cache_backends.py)
+SERVICE_CACHE_BACKEND = os.environ.get("SKYLINE_SERVICE_CACHE", "memory")  # "memory" or "disk"
+SERVICE_CACHE_PATH = os.environ.get(
+    "SKYLINE_SERVICE_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "skyline_service_cache.sqlite3"),
+)
+SERVICE_CACHE_MAX_ENTRIES = 4096  # Results kept by the in-process backend
+SERVICE_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Memory budget for those results
+
+# Forecast cache configuration
+# Shared SQLite file so every worker process on a node reuses the same forecasts
+FORECAST_CACHE_PATH = os.environ.get(
+    "SKYLINE_FORECAST_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "skyline_forecast_cache.sqlite3"),
+)
+FORECAST_GRID_DEGREES = 0.05  # Coordinates are snapped to this grid (~5 km)
+CLOUDINESS_TTL_SECONDS = 3600  # 1 hour
+BORTLE_TTL_SECONDS = 21600  # 6 hours
+MOON_TTL_SECONDS = 86400  # 24 hours
+FORECAST_STALE_SECONDS = 3600  # Serve expired entries this long while refreshing
+
+# Site scoring (models/scoring.py): weight of each criterion in the score
+SCORING_WEIGHTS = {
+    "darkness": 0.35,  # Light pollution level at the site
+    "surroundings": 0.15,  # Mean level around the site
+    "proximity": 0.10,  # Distance from the search center
+    "clear_sky": 0.20,  # Forecast cloud cover
+    "moon": 0.10,  # Moon illumination while it is up during darkness
+    "limiting_mag": 0.10,  # Limiting magnitude reported by nearby observers
+}
+SCORING_NEIGHBORHOOD_KM = 2.0  # Radius of the surroundings criterion
+SCORING_OBSERVATION_RADIUS_KM = 25.0  # Nearest GaN observation scored with a finder result
+# Default minimum distance between the finder's results (models/diversity.py):
+# the larger of a floor (closer spots share most of their surroundings) and a
+# fraction of the search radius, so wide searches are not one dark patch
+FINDER_MIN_SEPARATION_KM = 2.0
+FINDER_SEPARATION_RADIUS_FRACTION = 0.05
+
+# Observing window planning
+PLANNING_NIGHTS = 3  # Upcoming nights searched for observing windows
+OBSERVING_WINDOW_HOURS = 3  # Length of each suggested observing window
+PLANNER_NIGHTS = 7  # Nights covered by the multi-site planner
+PLANNER_FORECAST_GRID_DEGREES = 0.25  # Planned sites in one such cell share a forecast (~25 km)
+PLANNER_FETCH_THREADS = 8  # Forecasts fetched at once for one plan
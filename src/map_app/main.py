@@ -5,9 +5,11 @@ This application displays an interactive map for viewing star observation locati
 with metrics like Bortle score, cloudiness, and moon brightness.
 """
 
+import time
+from functools import partial
+
 import streamlit as st
-import pandas as pd
-from typing import Tuple
+from typing import TYPE_CHECKING, Iterator, Tuple
 
 # Import configuration and components
 import sys
@@ -27,17 +29,26 @@ from config import (
     PAGE_ICON,
     LAYOUT,
     INITIAL_SIDEBAR_STATE,
+    PAGE_QUERY_TTL_SECONDS,
+    PAGE_QUERY_CACHE_MAX_ENTRIES,
+    MAP_CLICK_DEBOUNCE_SECONDS,
+    MAP_RETURNED_OBJECTS,
+    OBSERVATION_LAYER_MAX_POINTS,
+    OBSERVATION_LAYER_PADDING,
+    METRICS_PORT,
+    CLOUDINESS_TTL_SECONDS,
 )
-from utils.map_utils import (
-    create_base_map,
-    add_center_marker,
-    add_radius_circle,
-    add_optimal_location_markers,
-    geocode_location,
-)
-from components.sidebar import render_sidebar_metrics
-from components.map_display import render_map, render_optimal_locations_panel
-from services.nearby_locations_service import find_nearby_observation_locations
+from components.sidebar import render_location_metrics
+from components.timing_overlay import record_timing, render_timing_caption, render_timing_overlay, timed
+from models.ephemeris import get_moon_summary
+from utils.streamlit_cache import use_streamlit_cache
+from utils.instrumentation import profile_request, serve_metrics
+
+# The map stack (folium, streamlit-folium, pandas), the light pollution finder
+# and the weather services are imported by the functions using them, so a
+# cold worker sends the header and search form before loading any of them.
+if TYPE_CHECKING:
+    import folium
 
 
 # Page configuration
@@ -69,49 +80,257 @@ def initialize_session_state() -> None:
         st.session_state.longitude = DEFAULT_LONGITUDE
     if "location_name" not in st.session_state:
         st.session_state.location_name = DEFAULT_LOCATION_NAME
+    if "location_input" not in st.session_state:
+        st.session_state.location_input = st.session_state.location_name
     if "first_search_done" not in st.session_state:
         st.session_state.first_search_done = False
     if "selected_radius" not in st.session_state:
         st.session_state.selected_radius = DEFAULT_RADIUS
 
 
-def get_location_metrics(latitude: float, longitude: float, location_name: str) -> dict:
-    """Compute light pollution metrics for the current location."""
-    # Use default placeholder value until we have actual location data
-    pollution_level = 7.0
-
-    return {
+def iter_location_metrics(latitude: float, longitude: float, location_name: str) -> Iterator[dict]:
+    """
+    Yield the metrics of the current location, filled in as each source answers.
+
+    All sources are queried concurrently under one deadline (see
+    services/metrics_aggregator.py). Darkness times come from the local
+    ephemeris and are known up front. Once every source has answered, the
+    metrics are kept for reruns at the same location, unless some of them are
+    fallbacks; those are fetched again on the next run. Kept metrics expire
+    after CLOUDINESS_TTL_SECONDS, the shortest-lived forecast they include.
+    """
+    key = (latitude, longitude)
+    cached = st.session_state.get("location_metrics")
+    if cached is not None and cached[0] == key and time.monotonic() - cached[2] < CLOUDINESS_TTL_SECONDS:
+        yield {**cached[1], "location_name": location_name}
+        return
+
+    sky = get_moon_summary(latitude, longitude)
+    metrics = {
         "latitude": latitude,
         "longitude": longitude,
         "location_name": location_name,
-        "light_pollution_index": pollution_level,
-        "bortle_score": pollution_level,
-        "cloudiness_percent": 27,
-        "moon_brightness": 4,
+        "darkness_start_time": sky["darkness_start_time"],
+        "darkness_end_time": sky["darkness_end_time"],
+        "dark_hours": sky["dark_hours"],
+        "darkness_time_zone": sky["time_zone"],
+        "sources": {},
     }
+    yield metrics
+    from services.metrics_aggregator import get_metrics_aggregator, merge_result
+
+    for result in get_metrics_aggregator().iter_results(latitude, longitude):
+        metrics = merge_result(metrics, result)
+        yield metrics
+
+    if all(info["status"] == "ok" and info["source"] != "fallback" for info in metrics["sources"].values()):
+        st.session_state.location_metrics = (key, metrics, time.monotonic())
+
+
+@st.cache_data(ttl=PAGE_QUERY_TTL_SECONDS, max_entries=PAGE_QUERY_CACHE_MAX_ENTRIES, show_spinner=False)
+def query_nearby_locations(latitude: float, longitude: float, radius_km: int, max_locations: int) -> list:
+    """
+    Find nearby observation locations, computed once per input state.
+
+    The map markers and the results panel both read from this, so a search
+    runs once per (location, radius) rather than once per consumer and rerun.
+    Exceptions are not cached, so a failed search is retried on the next run.
+
+    Results are ranked by stargazing score. The area's cloud forecast is not
+    passed: one value for the whole area would not change the order, and the
+    search would have to wait for the forecast.
+    """
+    from services.nearby_locations_service import find_nearby_observation_locations
+
+    return find_nearby_observation_locations(latitude, longitude, radius_km, top_n=max_locations, rank_by="score")
 
 
 def get_optimal_locations_for_radius(radius_km: int, max_locations: int = 5) -> list:
     """Find nearby observation locations from CSV dataset within the given radius."""
     try:
-        return find_nearby_observation_locations(
+        return query_nearby_locations(
             st.session_state.latitude,
             st.session_state.longitude,
             radius_km,
-            top_n=max_locations,
+            max_locations,
         )
     except Exception as exc:  # noqa: BLE001 - surface error to UI
         st.error(f"Failed to find nearby observation locations: {exc}")
         return []
 
 
-def main() -> None:
-    """Main application function."""
-    # Initialize session state
-    initialize_session_state()
+def build_map(
+    latitude: float, longitude: float, location_name: str, radius_km: int, locations: list
+) -> "folium.Map":
+    """Build the folium map with the center marker, search radius and optimal locations."""
+    from utils.map_utils import add_center_marker, add_optimal_location_markers, add_radius_circle, create_base_map
+
+    map_obj = create_base_map(latitude, longitude, DEFAULT_ZOOM_LEVEL)
+
+    # Add markers and circles
+    map_obj = add_center_marker(map_obj, latitude, longitude, location_name)
+    map_obj = add_radius_circle(map_obj, latitude, longitude, radius_km)
+
+    # Add markers for the optimal locations (shared with the results panel)
+    return add_optimal_location_markers(map_obj, locations)
+
+
+def map_key_parts(radius_km: int, locations: list) -> dict:
+    """Everything the built map depends on, for the map cache."""
+    return {
+        "center": (st.session_state.latitude, st.session_state.longitude),
+        "name": st.session_state.location_name,
+        "zoom": DEFAULT_ZOOM_LEVEL,
+        "radius_km": radius_km,
+        "layers": ["center", "radius", "optimal"],
+        "results": [
+            (
+                loc.get("name"),
+                loc.get("latitude"),
+                loc.get("longitude"),
+                loc.get("light_pollution_index", loc.get("bortle_score")),
+                loc.get("distance_km"),
+                loc.get("cloudiness_percent"),
+                loc.get("conditions"),
+            )
+            for loc in locations
+        ],
+    }
+
+
+@st.fragment
+def sidebar_fragment() -> None:
+    """Location metrics, filled in as sources answer; reruns without touching the map or panel."""
+    with timed("sidebar"):
+        placeholder = st.empty()
+        for metrics in iter_location_metrics(
+            st.session_state.latitude,
+            st.session_state.longitude,
+            st.session_state.location_name,
+        ):
+            with placeholder.container():
+                render_location_metrics(metrics)
+    render_timing_caption("sidebar")
+
+
+def search_at(latitude: float, longitude: float) -> None:
+    """Make a coordinate the current location and rerun the whole page."""
+    name = f"{latitude:.4f}, {longitude:.4f}"
+    st.session_state.latitude = latitude
+    st.session_state.longitude = longitude
+    st.session_state.location_name = name
+    # The search box already exists in this run; update it on the next one
+    st.session_state.pending_location_input = name
+    st.session_state.first_search_done = True
+    st.rerun(scope="app")
+
+
+def handle_map_click(map_data: dict) -> None:
+    """
+    Start a search at a newly clicked point, debounced.
+
+    The search waits MAP_CLICK_DEBOUNCE_SECONDS first. A further click in that
+    time requests a rerun, which interrupts this one at the next Streamlit
+    call, so a burst of clicks only searches at the last point.
+    """
+    from components.map_display import get_new_click
+
+    click = get_new_click(map_data, st.session_state.get("handled_click"))
+    if click is None:
+        return
+    st.session_state.handled_click = click
+
+    status = st.empty()
+    status.caption(f"📍 Searching near {click[0]:.4f}, {click[1]:.4f}…")
+    time.sleep(MAP_CLICK_DEBOUNCE_SECONDS)
+    status.empty()  # Interrupt point for a newer click
+    search_at(*click)
+
 
+def observation_points_in_view() -> tuple:
+    """
+    Return (region, points) of GaN observations for the current map viewport.
+
+    Observations are loaded for the viewport plus OBSERVATION_LAYER_PADDING on
+    each side and reused until the view leaves that region, so small pans do
+    not reselect or resend any points.
+    """
+    from services.observation_points import load_observation_points, points_in_bounds
+    from utils.observation_layer import bounds_to_box, box_contains, pad_box
+
+    map_state = st.session_state.get("observation_map") or {}
+    view = bounds_to_box(map_state.get("bounds"))
+    if view is None:
+        # Before the first move: roughly the area shown at the default zoom
+        lat, lon = st.session_state.latitude, st.session_state.longitude
+        view = (lat - 0.5, lon - 0.75, lat + 0.5, lon + 0.75)
+
+    loaded = st.session_state.get("observation_points")
+    if loaded is None or not box_contains(loaded[0], view):
+        region = pad_box(view, OBSERVATION_LAYER_PADDING)
+        points = points_in_bounds(load_observation_points(), *region, max_points=OBSERVATION_LAYER_MAX_POINTS)
+        loaded = (region, points)
+        st.session_state.observation_points = loaded
+    return loaded
+
+
+@st.fragment
+def map_fragment() -> None:
+    """Interactive map; only clicks (and moves, with observations on) rerun this fragment."""
+    from components.map_cache import render_cached_map
+    from utils.observation_layer import build_observation_feature_group
+
+    show_observations = st.toggle(
+        "Show all GaN observations",
+        key="show_observations",
+        help="Clustered layer of every GaN observation in view",
+    )
+    with timed("map"):
+        selected_radius = st.session_state.get("selected_radius", DEFAULT_RADIUS)
+        locations = get_optimal_locations_for_radius(selected_radius)
+        returned_objects, layer_key_parts, build_layer = MAP_RETURNED_OBJECTS, None, None
+        if show_observations:
+            region, points = observation_points_in_view()
+            returned_objects = [*MAP_RETURNED_OBJECTS, "bounds"]
+            layer_key_parts = {"layer": "gan_observations", "region": region, "points": len(points)}
+            build_layer = partial(build_observation_feature_group, points)
+        map_data = render_cached_map(
+            map_key_parts(selected_radius, locations),
+            lambda: build_map(
+                st.session_state.latitude,
+                st.session_state.longitude,
+                st.session_state.location_name,
+                selected_radius,
+                locations,
+            ),
+            height=600,
+            returned_objects=returned_objects,
+            layer_key_parts=layer_key_parts,
+            build_layer=build_layer,
+        )
+    render_timing_caption("map")
+    handle_map_click(map_data)
+
+
+@st.fragment
+def results_panel_fragment() -> None:
+    """Optimal locations panel; its buttons rerun only this fragment."""
+    from components.map_display import render_optimal_locations_panel
+
+    with timed("results panel"):
+        selected_radius = st.session_state.get("selected_radius", DEFAULT_RADIUS)
+        optimal_locs = get_optimal_locations_for_radius(selected_radius)
+        render_optimal_locations_panel(optimal_locs, selected_radius)
+    render_timing_caption("results panel")
+
+
+def render_page() -> None:
+    """Render the search bar and the page sections."""
+    started = time.perf_counter()
     # Header with location input
     st.markdown("# 🌟 AI Skyline Visibility Map")
+    if "pending_location_input" in st.session_state:
+        st.session_state.location_input = st.session_state.pop("pending_location_input")
 
     # Location search form
     col1, col2 = st.columns([4, 1])
@@ -121,7 +340,6 @@ def main() -> None:
             location_input = st.text_input(
                 label="📍 Enter Location",
                 placeholder="Enter address or coordinates (e.g., 'New York' or '40.7128,-74.0060')",
-                value=st.session_state.location_name,
                 key="location_input",
                 label_visibility="collapsed",
             )
@@ -129,6 +347,8 @@ def main() -> None:
             
             if submitted and location_input:
                 # Geocode the location
+                from utils.map_utils import geocode_location
+
                 lat, lon, name = geocode_location(location_input)
                 st.session_state.latitude = lat
                 st.session_state.longitude = lon
@@ -149,16 +369,20 @@ def main() -> None:
 
     st.markdown("---")
 
-    # Main layout: Left sidebar + Main content (map + bottom panel)
-    # Only show sidebar after first search
+    # Main content area
+    st.markdown("### 🗺️ Interactive Map")
+    map_fragment()
+    record_timing("time to map", (time.perf_counter() - started) * 1000.0)
+
+    # Display optimal locations panel
+    results_panel_fragment()
+
+    # Left sidebar, filled in last: its metrics wait for the slowest source
+    # (up to METRICS_DEADLINE_SECONDS), which must not hold back the map and
+    # panel. Only show it after the first search.
     if st.session_state.first_search_done:
-        render_sidebar_metrics(
-            get_location_metrics(
-                st.session_state.latitude,
-                st.session_state.longitude,
-                st.session_state.location_name,
-            )
-        )
+        with st.sidebar:
+            sidebar_fragment()
     else:
         # Show a welcome message in the sidebar
         with st.sidebar:
@@ -171,40 +395,20 @@ def main() -> None:
                 "The map and metrics will appear after your first search!"
             )
 
-    # Main content area
-    st.markdown("### 🗺️ Interactive Map")
 
-    # Create map
-    map_obj = create_base_map(
-        st.session_state.latitude,
-        st.session_state.longitude,
-        DEFAULT_ZOOM_LEVEL,
-    )
-
-    # Add markers and circles
-    map_obj = add_center_marker(
-        map_obj,
-        st.session_state.latitude,
-        st.session_state.longitude,
-        st.session_state.location_name,
-    )
-
-    # Get selected radius from session state
-    selected_radius = st.session_state.get("selected_radius", DEFAULT_RADIUS)
-    map_obj = add_radius_circle(
-        map_obj, st.session_state.latitude, st.session_state.longitude, selected_radius
-    )
-
-    # Get optimal locations and add markers
-    optimal_locs = get_optimal_locations_for_radius(selected_radius)
-    map_obj = add_optimal_location_markers(map_obj, optimal_locs)
+def main() -> None:
+    """Main application function."""
+    use_streamlit_cache()
+    if METRICS_PORT is not None:
+        serve_metrics(METRICS_PORT)
 
-    # Render map
-    render_map(map_obj, height=600)
+    # Initialize session state
+    initialize_session_state()
 
-    # Display optimal locations panel
-    optimal_locs = get_optimal_locations_for_radius(st.session_state.selected_radius)
-    render_optimal_locations_panel(optimal_locs, st.session_state.selected_radius)
+    # Full reruns (new search, radius change) are timed as a whole; fragment
+    # reruns only update their own section's timing
+    with timed("full page"), profile_request("streamlit full page"):
+        render_page()
 
     # Footer
     st.markdown("---")
@@ -216,6 +420,7 @@ def main() -> None:
         """,
         unsafe_allow_html=True,
     )
+    render_timing_overlay()
 
 
 if __name__ == "__main__":
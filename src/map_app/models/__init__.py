@@ -1,9 +1,21 @@
-"""Models package for ML models and prediction algorithms."""
-from .bortle_predictor import BortlePredictor, get_sky_quality_description
-from .optimal_locations import OptimalLocationFinder
-
-__all__ = [
-    "BortlePredictor",
-    "get_sky_quality_description",
-    "OptimalLocationFinder",
-]
+"""Models package for ML models and prediction algorithms.
+
+Exports are resolved on first access, so importing one model module (e.g.
+``models.ephemeris``) does not load the others' dependencies (PIL, sklearn).
+"""
+from utils.lazy_exports import lazy_exports
+
+_EXPORTS = {
+    "BortlePredictor": "bortle_predictor",
+    "get_sky_quality_description": "bortle_predictor",
+    "OptimalLocationFinder": "optimal_locations",
+    "HourlyForecast": "observing_windows",
+    "find_best_windows": "observing_windows",
+    "NightEphemeris": "ephemeris",
+    "compute_night_ephemeris": "ephemeris",
+    "get_moon_summary": "ephemeris",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__ = lazy_exports(_EXPORTS, __name__)
@@ -1,14 +1,32 @@
 """Bortle scale prediction model using RandomForestRegressor."""
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-import joblib
 import os
 import logging
-import streamlit as st
+import pickle
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from services.memory_budget import get_memory_governor
+
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestRegressor
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _load_model_file(model_path: str) -> "RandomForestRegressor":
+    """Unpickle a model once per process (joblib and sklearn load on first use)."""
+    import joblib
+
+    model = joblib.load(model_path)
+    logger.info(f"Loaded pre-trained Bortle scale model from {model_path}")
+    # The model is never evicted, but it counts toward the memory budget
+    nbytes = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    get_memory_governor().register_usage("bortle_model", lambda: nbytes)
+    return model
+
+
 class BortlePredictor:
     """Predict Bortle scale from geographic coordinates using trained ML model."""
     
@@ -17,8 +35,24 @@ class BortlePredictor:
         self.model = None
         self._load_model()
     
-    @st.cache_resource
-    def _load_model(_self) -> RandomForestRegressor:
+    def load_model(self) -> "RandomForestRegressor":
+        """
+        Load the model now rather than on the first prediction.
+
+        Servers call this before forking workers, so the workers share the
+        loaded model instead of each unpickling it.
+
+        Returns:
+            The trained model, shared by every predictor in the process
+
+        Raises:
+            FileNotFoundError: If the model file does not exist
+        """
+        if self.model is None:
+            self.model = self._load_model()
+        return self.model
+
+    def _load_model(self) -> "RandomForestRegressor":
         """
         Load a pre-trained RandomForestRegressor for Bortle scale prediction.
         
@@ -44,10 +78,8 @@ class BortlePredictor:
                 "  python src/models/train_bortle_model.py"
             )
         
-        # Load the model
-        model = joblib.load(model_path)
-        logger.info(f"Loaded pre-trained Bortle scale model from {model_path}")
-        return model
+        # Load the model (shared by every predictor in the process)
+        return _load_model_file(model_path)
     
     def predict(self, latitude: float, longitude: float) -> int:
         """
@@ -80,6 +112,24 @@ class BortlePredictor:
             logger.warning(f"Error in ML prediction: {e}")
             raise
     
+    def predict_many(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Vectorized predict: one model call for all coordinates.
+
+        Args:
+            latitudes: Latitude coordinates, shape (N,)
+            longitudes: Longitude coordinates, shape (N,)
+
+        Returns:
+            Predicted Bortle scales (1-9) as an int array
+        """
+        if self.model is None:
+            self.model = self._load_model()
+        features = np.column_stack([np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)])
+        if not len(features):
+            return np.zeros(0, dtype=int)
+        return np.clip(np.round(self.model.predict(features)), 1, 9).astype(int)
+
     def predict_heuristic(self, latitude: float, longitude: float) -> int:
         """
         Fallback heuristic-based Bortle scale prediction.
@@ -0,0 +1,172 @@
+"""Spatially diverse selection of candidate sites.
+
+The best-scoring pixels of a search are usually neighbours in the same dark
+patch, so a plain top-N returns the same spot several times. diversify picks
+the best candidates subject to a minimum separation (non-maximum
+suppression) and, optionally, at most a few per compass sector around the
+search center.
+
+Both constraints work on grid buckets, so the cost stays linear in the
+number of candidates however large the search radius:
+
+- Candidates are bucketed into cells of half the separation; two candidates
+  in one cell are always closer than the separation, so each cell is
+  represented by its best candidate (a max per cell, no sort).
+- The cell leaders are visited best first; keeping one suppresses the
+  leaders within the separation, which can only sit in the 5 × 5 cells
+  around it.
+
+Greedy suppression over cell leaders can differ from exact pixel-level NMS
+when a cell's leader is suppressed but another of its pixels was far enough
+away; the result still honours the separation.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from models import scoring
+
+# Compass point names, clockwise from north, for 4, 8 or 16 sectors
+COMPASS_POINTS = (
+    "N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW",
+)
+# Dense cell arrays are used while they stay this many times the candidate count
+_DENSE_CELLS_FACTOR = 4
+
+
+def local_offsets_km(
+    latitudes: np.ndarray, longitudes: np.ndarray, center_lat: float, center_lon: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    East and north offsets from the center in km (equirectangular projection).
+
+    Args:
+        latitudes: Candidate latitudes
+        longitudes: Candidate longitudes
+        center_lat: Center latitude
+        center_lon: Center longitude
+
+    Returns:
+        (east_km, north_km) arrays
+    """
+    east = (np.asarray(longitudes, dtype=float) - center_lon) * 111.0 * np.cos(np.radians(center_lat))
+    north = (np.asarray(latitudes, dtype=float) - center_lat) * 111.0
+    return east, north
+
+
+def bearings(east_km: np.ndarray, north_km: np.ndarray) -> np.ndarray:
+    """Bearing from the center in degrees, clockwise from north, in [0, 360)."""
+    return np.degrees(np.arctan2(east_km, north_km)) % 360.0
+
+
+def compass_sectors(bearing_deg: np.ndarray, sectors: int) -> np.ndarray:
+    """Sector index of each bearing; sector 0 is centered on north."""
+    width = 360.0 / sectors
+    return (np.floor((np.asarray(bearing_deg) + width / 2) / width) % sectors).astype(np.intp)
+
+
+def compass_direction(bearing_deg: float, points: int = 8) -> str:
+    """Compass point name (4, 8 or 16 points) of a bearing."""
+    sector = int(compass_sectors(bearing_deg, points))
+    return COMPASS_POINTS[sector * (len(COMPASS_POINTS) // points)]
+
+
+def _cell_leaders(east: np.ndarray, north: np.ndarray, values: np.ndarray, size: float):
+    """Best candidate of each grid cell: (candidate indices, cell x, cell y)."""
+    gx = np.floor(east / size).astype(np.int64)
+    gy = np.floor(north / size).astype(np.int64)
+    gx -= gx.min()
+    gy -= gy.min()
+    nx = int(gx.max()) + 1
+    cells = gy * nx + gx
+    if nx * (int(gy.max()) + 1) > _DENSE_CELLS_FACTOR * len(cells) + 1024:
+        # Separation far below the candidate spacing: compact the cell ids
+        _, cells = np.unique(cells, return_inverse=True)
+    best = np.full(int(cells.max()) + 1, -np.inf)
+    np.maximum.at(best, cells, values)
+    leaders = np.flatnonzero(values == best[cells])
+    # Ties within a cell: keep the lowest index
+    _, first = np.unique(cells[leaders], return_index=True)
+    leaders = leaders[first]
+    return leaders, gx[leaders], gy[leaders]
+
+
+def diversify(
+    east_km: np.ndarray,
+    north_km: np.ndarray,
+    scores: np.ndarray,
+    limit: int,
+    min_separation_km: float = 0.0,
+    sectors: int = 0,
+    per_sector: int = 1,
+) -> np.ndarray:
+    """
+    Indices of the best candidates, best first, spread out in space.
+
+    Args:
+        east_km: East offset of each candidate from the search center
+        north_km: North offset of each candidate from the search center
+        scores: Candidate scores (NaN ranks last, as in scoring.top_k)
+        limit: Maximum number of indices to return
+        min_separation_km: Minimum distance between returned candidates (0 disables)
+        sectors: Number of compass sectors around the center (0 disables)
+        per_sector: Maximum candidates returned per sector
+
+    Returns:
+        Up to limit indices into scores
+
+    Raises:
+        ValueError: If min_separation_km is negative or sectors is negative
+    """
+    if min_separation_km < 0 or sectors < 0:
+        raise ValueError("min_separation_km and sectors must not be negative")
+    values = np.asarray(scores, dtype=float)
+    if not len(values) or limit <= 0:
+        return np.zeros(0, dtype=np.intp)
+    values = np.where(np.isnan(values), -np.inf, values)
+    east = np.asarray(east_km, dtype=float)
+    north = np.asarray(north_km, dtype=float)
+
+    if not min_separation_km:
+        if not sectors:
+            return scoring.top_k(values, limit)
+        sector = compass_sectors(bearings(east, north), sectors)
+        picks = []
+        for index in range(sectors):
+            members = np.flatnonzero(sector == index)
+            picks.append(members[scoring.top_k(values[members], per_sector)])
+        picks = np.concatenate(picks)
+        return picks[np.lexsort((picks, -values[picks]))][:limit]
+
+    leaders, gx, gy = _cell_leaders(east, north, values, min_separation_km / 2.0)
+    order = np.lexsort((leaders, -values[leaders]))
+    sector = compass_sectors(bearings(east[leaders], north[leaders]), sectors).tolist() if sectors else None
+    slot = {key: position for position, key in enumerate(zip(gx.tolist(), gy.tolist()))}
+    suppressed = np.zeros(len(leaders), dtype=bool)
+    sector_counts = np.zeros(max(sectors, 1), dtype=np.intp)
+    full_sectors = 0
+    limit_sq = min_separation_km ** 2
+    kept = []
+    for position in order.tolist():
+        if suppressed[position]:
+            continue
+        candidate = int(leaders[position])
+        if sector is not None:
+            if sector_counts[sector[position]] >= per_sector:
+                continue
+            sector_counts[sector[position]] += 1
+            full_sectors += sector_counts[sector[position]] == per_sector
+        kept.append(candidate)
+        if len(kept) >= limit or (sector is not None and full_sectors == sectors):
+            break
+        # Leaders within the separation lie in the surrounding 5 × 5 cells
+        x, y = int(gx[position]), int(gy[position])
+        for dx in range(-2, 3):
+            for dy in range(-2, 3):
+                other = slot.get((x + dx, y + dy))
+                if other is None or suppressed[other]:
+                    continue
+                neighbour = leaders[other]
+                if (east[neighbour] - east[candidate]) ** 2 + (north[neighbour] - north[candidate]) ** 2 < limit_sq:
+                    suppressed[other] = True
+    return np.asarray(kept, dtype=np.intp)
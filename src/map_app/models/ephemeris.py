@@ -0,0 +1,509 @@
+"""Offline, vectorized moon and twilight ephemeris.
+
+Computes moon illumination and phase, moon rise/set and astronomical twilight
+(sun 18° below the horizon) for arrays of sites × nights without any network
+access. Positions use the low-precision solar and lunar series from the
+Astronomical Almanac (about 0.01° for the sun and 0.3° for the moon), which
+keeps rise/set and twilight times within a few minutes.
+
+Each night runs from local solar noon to the next local solar noon. Altitudes
+are sampled on a regular grid inside that window and crossings are located by
+linear interpolation between samples.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+J2000 = 2451545.0
+UNIX_EPOCH_JD = 2440587.5
+
+ASTRONOMICAL_TWILIGHT_DEG = -18.0
+# Refraction plus apparent radius of the moon's upper limb
+MOON_HORIZON_OFFSET_DEG = -0.5667
+# Fraction of the horizontal parallax that lowers the geocentric rise altitude
+MOON_PARALLAX_FACTOR = 0.7275
+
+DEFAULT_STEP_MINUTES = 15
+# Sites processed per block, bounding memory to block × nights × samples
+SITE_BLOCK_SIZE = 64
+# Spacing of the shared geocentric position grid that sites interpolate from
+_POSITION_GRID_MINUTES = 30
+
+PHASE_NAMES = (
+    "New Moon",
+    "Waxing Crescent",
+    "First Quarter",
+    "Waxing Gibbous",
+    "Full Moon",
+    "Waning Gibbous",
+    "Last Quarter",
+    "Waning Crescent",
+)
+
+DateLike = Union[date, datetime, np.datetime64, str]
+
+
+def _julian_day(times: np.ndarray) -> np.ndarray:
+    """Convert datetime64 values (UTC) to Julian days."""
+    seconds = times.astype("datetime64[s]").astype(np.int64)
+    return seconds / 86400.0 + UNIX_EPOCH_JD
+
+
+def _from_julian_day(jd: np.ndarray) -> np.ndarray:
+    """Convert Julian days to datetime64[s]; NaN becomes NaT."""
+    out = np.full(jd.shape, np.datetime64("NaT"), dtype="datetime64[s]")
+    valid = np.isfinite(jd)
+    seconds = np.round((jd[valid] - UNIX_EPOCH_JD) * 86400.0).astype(np.int64)
+    out[valid] = seconds.astype("datetime64[s]")
+    return out
+
+
+def sun_position(jd: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Geocentric solar coordinates.
+
+    Args:
+        jd: Julian days (any shape)
+
+    Returns:
+        Dictionary of radians arrays: ra, dec, longitude (ecliptic)
+    """
+    n = np.asarray(jd, dtype=np.float64) - J2000
+    mean_longitude = np.radians(280.460 + 0.9856474 * n)
+    mean_anomaly = np.radians(357.528 + 0.9856003 * n)
+    longitude = (
+        mean_longitude
+        + np.radians(1.915) * np.sin(mean_anomaly)
+        + np.radians(0.020) * np.sin(2 * mean_anomaly)
+    )
+    obliquity = np.radians(23.439 - 0.0000004 * n)
+    ra = np.arctan2(np.cos(obliquity) * np.sin(longitude), np.cos(longitude))
+    dec = np.arcsin(np.sin(obliquity) * np.sin(longitude))
+    return {"ra": ra, "dec": dec, "longitude": longitude}
+
+
+def moon_position(jd: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Geocentric lunar coordinates.
+
+    Args:
+        jd: Julian days (any shape)
+
+    Returns:
+        Dictionary of radians arrays: ra, dec, longitude, latitude (ecliptic)
+        and parallax (horizontal parallax)
+    """
+    jd = np.asarray(jd, dtype=np.float64)
+    t = (jd - J2000) / 36525.0
+    d = np.radians
+
+    longitude = d(
+        218.32 + 481267.881 * t
+        + 6.29 * np.sin(d(135.0 + 477198.87 * t))
+        - 1.27 * np.sin(d(259.3 - 413335.36 * t))
+        + 0.66 * np.sin(d(235.7 + 890534.22 * t))
+        + 0.21 * np.sin(d(269.9 + 954397.74 * t))
+        - 0.19 * np.sin(d(357.5 + 35999.05 * t))
+        - 0.11 * np.sin(d(186.5 + 966404.03 * t))
+    )
+    latitude = d(
+        5.13 * np.sin(d(93.3 + 483202.02 * t))
+        + 0.28 * np.sin(d(228.2 + 960400.89 * t))
+        - 0.28 * np.sin(d(318.3 + 6003.15 * t))
+        - 0.17 * np.sin(d(217.6 - 407332.21 * t))
+    )
+    parallax = d(
+        0.9508
+        + 0.0518 * np.cos(d(135.0 + 477198.87 * t))
+        + 0.0095 * np.cos(d(259.3 - 413335.36 * t))
+        + 0.0078 * np.cos(d(235.7 + 890534.22 * t))
+        + 0.0028 * np.cos(d(269.9 + 954397.74 * t))
+    )
+
+    obliquity = d(23.439 - 0.0000004 * (jd - J2000))
+    x = np.cos(latitude) * np.cos(longitude)
+    y = np.cos(obliquity) * np.cos(latitude) * np.sin(longitude) - np.sin(obliquity) * np.sin(latitude)
+    z = np.sin(obliquity) * np.cos(latitude) * np.sin(longitude) + np.cos(obliquity) * np.sin(latitude)
+    return {
+        "ra": np.arctan2(y, x),
+        "dec": np.arcsin(np.clip(z, -1.0, 1.0)),
+        "longitude": longitude,
+        "latitude": latitude,
+        "parallax": parallax,
+    }
+
+
+def _sidereal_angle(jd: np.ndarray) -> np.ndarray:
+    """Greenwich mean sidereal time in radians."""
+    return np.radians((280.46061837 + 360.98564736629 * (jd - J2000)) % 360.0)
+
+
+def moon_elongation(jd: np.ndarray) -> np.ndarray:
+    """Moon-minus-sun ecliptic longitude in degrees [0, 360); 0 = new, 180 = full."""
+    moon = moon_position(jd)
+    sun = sun_position(jd)
+    return np.degrees(moon["longitude"] - sun["longitude"]) % 360.0
+
+
+def moon_illumination(jd: np.ndarray) -> np.ndarray:
+    """
+    Illuminated fraction of the lunar disk.
+
+    Args:
+        jd: Julian days (any shape)
+
+    Returns:
+        Fractions in [0, 1]
+    """
+    moon = moon_position(jd)
+    sun = sun_position(jd)
+    cos_elongation = (
+        np.sin(sun["dec"]) * np.sin(moon["dec"])
+        + np.cos(sun["dec"]) * np.cos(moon["dec"]) * np.cos(sun["ra"] - moon["ra"])
+    )
+    # Phase angle ≈ 180° − elongation for a distant sun
+    return (1.0 - np.clip(cos_elongation, -1.0, 1.0)) / 2.0
+
+
+def moon_phase_name(jd: np.ndarray) -> np.ndarray:
+    """Name the lunar phase from its elongation (distinguishing waxing from waning)."""
+    index = ((moon_elongation(jd) + 22.5) // 45.0).astype(int) % 8
+    return np.asarray(PHASE_NAMES, dtype=object)[index]
+
+
+def _as_datetime64_days(value: DateLike) -> np.datetime64:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return np.datetime64(value.date(), "D")
+    return np.datetime64(value, "D")
+
+
+@dataclass(frozen=True)
+class NightEphemeris:
+    """Per-site, per-night moon and twilight events (times in UTC)."""
+
+    night_dates: np.ndarray  # (nights,) datetime64[D], date of each night's evening
+    moon_illumination: np.ndarray  # (sites, nights) percent at local solar midnight
+    moon_elongation: np.ndarray  # (sites, nights) degrees at local solar midnight
+    moon_rise: np.ndarray  # (sites, nights) datetime64[s], NaT if none in the night window
+    moon_set: np.ndarray
+    dusk: np.ndarray  # end of evening astronomical twilight
+    dawn: np.ndarray  # start of morning astronomical twilight
+    dark_hours: np.ndarray  # (sites, nights) hours with the sun below -18°
+    moon_free_dark_hours: np.ndarray  # dark hours with the moon below the horizon
+
+    @property
+    def moon_phase(self) -> np.ndarray:
+        """Phase names at local solar midnight, shape (sites, nights)."""
+        index = ((self.moon_elongation + 22.5) // 45.0).astype(int) % 8
+        return np.asarray(PHASE_NAMES, dtype=object)[index]
+
+
+@dataclass(frozen=True)
+class HourlySky:
+    """Per-site, per-hour darkness and moon on a shared UTC hour axis."""
+
+    hours: np.ndarray  # (hours,) datetime64[h], start of each hour
+    darkness: np.ndarray  # (sites, hours) fraction of the hour with the sun below -18°
+    moon_up: np.ndarray  # (sites, hours) fraction of the hour with the moon above the horizon
+    moon_illumination: np.ndarray  # (hours,) percent at mid-hour
+
+
+def _as_datetime64_hours(value: DateLike) -> np.datetime64:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "h")
+
+
+def _first_crossing(values: np.ndarray, threshold, rising: bool, jd: np.ndarray) -> np.ndarray:
+    """Interpolated JD of the first threshold crossing along the last axis (NaN if none)."""
+    offset = values - threshold
+    above = offset >= 0
+    if rising:
+        crossing = ~above[..., :-1] & above[..., 1:]
+    else:
+        crossing = above[..., :-1] & ~above[..., 1:]
+    has_crossing = crossing.any(axis=-1)
+    k = np.argmax(crossing, axis=-1)[..., None]
+
+    v0 = np.take_along_axis(offset, k, axis=-1)[..., 0]
+    v1 = np.take_along_axis(offset, k + 1, axis=-1)[..., 0]
+    t0 = np.take_along_axis(jd, k, axis=-1)[..., 0]
+    t1 = np.take_along_axis(jd, k + 1, axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip(v0 / (v0 - v1), 0.0, 1.0)
+    return np.where(has_crossing, t0 + fraction * (t1 - t0), np.nan)
+
+
+def compute_night_ephemeris(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    start_date: DateLike,
+    nights: int = 1,
+    step_minutes: int = DEFAULT_STEP_MINUTES,
+) -> NightEphemeris:
+    """
+    Compute moon and twilight events for every site on every night.
+
+    Args:
+        latitudes: Site latitudes in degrees, shape (sites,)
+        longitudes: Site longitudes in degrees (east positive), shape (sites,)
+        start_date: Date of the first night's evening
+        nights: Number of consecutive nights
+        step_minutes: Altitude sampling interval; crossings are interpolated
+
+    Returns:
+        NightEphemeris with (sites, nights) arrays
+    """
+    lat = np.radians(np.atleast_1d(np.asarray(latitudes, dtype=np.float64)))
+    lon_deg = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+    lon = np.radians(lon_deg)
+    sites = lat.size
+
+    first = _as_datetime64_days(start_date)
+    night_dates = first + np.arange(nights).astype("timedelta64[D]")
+    # Local solar noon of each night's evening, as JD per (site, night)
+    noon_jd = _julian_day(night_dates)[None, :] + 0.5 - lon_deg[:, None] / 360.0
+    samples_per_night = int(round(1440 / step_minutes)) + 1
+    offsets = np.arange(samples_per_night) * (step_minutes / 1440.0)
+
+    # Geocentric positions on a shared coarse grid; every site interpolates
+    # Greenwich hour angle and declination from it instead of re-evaluating
+    # the series per sample
+    grid_step = _POSITION_GRID_MINUTES / 1440.0
+    grid = np.arange(noon_jd.min() - grid_step, noon_jd.max() + 1.0 + 2 * grid_step, grid_step)
+    sidereal = _sidereal_angle(grid)
+    bodies = {}
+    for name, position in (("moon", moon_position(grid)), ("sun", sun_position(grid))):
+        bodies[name] = (
+            np.unwrap(sidereal - position["ra"]),
+            np.sin(position["dec"]),
+            np.cos(position["dec"]),
+        )
+    moon_horizon = np.sin(np.radians(
+        MOON_PARALLAX_FACTOR * np.degrees(moon_position(grid)["parallax"]) + MOON_HORIZON_OFFSET_DEG
+    ))
+    twilight = np.sin(np.radians(ASTRONOMICAL_TWILIGHT_DEG))
+
+    shape = (sites, nights)
+    rise = np.full(shape, np.nan)
+    set_ = np.full(shape, np.nan)
+    dusk = np.full(shape, np.nan)
+    dawn = np.full(shape, np.nan)
+    dark_hours = np.zeros(shape, dtype=np.float32)
+    moon_free = np.zeros(shape, dtype=np.float32)
+    interval_hours = step_minutes / 60.0
+
+    for block in range(0, sites, SITE_BLOCK_SIZE):
+        rows = slice(block, min(block + SITE_BLOCK_SIZE, sites))
+        jd = noon_jd[rows, :, None] + offsets  # (block, nights, samples)
+        position = (jd - grid[0]) / grid_step
+        index = position.astype(np.intp)
+        weight = position - index
+
+        def sample(values: np.ndarray) -> np.ndarray:
+            lower = values[index]
+            return lower + weight * (values[index + 1] - lower)
+
+        sin_lat = np.sin(lat[rows])[:, None, None]
+        cos_lat = np.cos(lat[rows])[:, None, None]
+        site_lon = lon[rows, None, None]
+
+        def sin_altitude(body: str) -> np.ndarray:
+            hour_angle, sin_dec, cos_dec = bodies[body]
+            return sin_lat * sample(sin_dec) + cos_lat * sample(cos_dec) * np.cos(sample(hour_angle) + site_lon)
+
+        # Crossings are found on sin(altitude), which is monotonic in altitude
+        moon_alt = sin_altitude("moon")
+        sun_alt = sin_altitude("sun")
+        moon_h0 = sample(moon_horizon)
+
+        rise[rows] = _first_crossing(moon_alt, moon_h0, rising=True, jd=jd)
+        set_[rows] = _first_crossing(moon_alt, moon_h0, rising=False, jd=jd)
+        dusk[rows] = _first_crossing(sun_alt, twilight, rising=False, jd=jd)
+        dawn[rows] = _first_crossing(sun_alt, twilight, rising=True, jd=jd)
+
+        # Trapezoid rule: an interval straddling a crossing counts for half
+        dark = (sun_alt < twilight).astype(np.float32)
+        moon_free_dark = dark * (moon_alt < moon_h0)
+        dark_hours[rows] = (dark[..., 1:] + dark[..., :-1]).sum(axis=-1) * (interval_hours / 2)
+        moon_free[rows] = (moon_free_dark[..., 1:] + moon_free_dark[..., :-1]).sum(axis=-1) * (interval_hours / 2)
+
+    midnight = noon_jd + 0.5
+    return NightEphemeris(
+        night_dates=night_dates,
+        moon_illumination=(moon_illumination(midnight) * 100.0).astype(np.float32),
+        moon_elongation=moon_elongation(midnight).astype(np.float32),
+        moon_rise=_from_julian_day(rise),
+        moon_set=_from_julian_day(set_),
+        dusk=_from_julian_day(dusk),
+        dawn=_from_julian_day(dawn),
+        dark_hours=dark_hours,
+        moon_free_dark_hours=moon_free,
+    )
+
+
+def compute_hourly_sky(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    start: DateLike,
+    hours: int,
+    samples_per_hour: int = 4,
+) -> HourlySky:
+    """
+    Compute darkness and moon for every site in every hour.
+
+    Altitudes are sampled samples_per_hour times per hour (at the middle of
+    each sub-interval) and averaged into fractions of the hour.
+
+    Args:
+        latitudes: Site latitudes in degrees, shape (sites,)
+        longitudes: Site longitudes in degrees (east positive), shape (sites,)
+        start: First hour (UTC; truncated to the hour)
+        hours: Number of consecutive hours
+        samples_per_hour: Altitude samples per hour
+
+    Returns:
+        HourlySky with (sites, hours) arrays
+    """
+    lat = np.radians(np.atleast_1d(np.asarray(latitudes, dtype=np.float64)))
+    lon = np.radians(np.atleast_1d(np.asarray(longitudes, dtype=np.float64)))
+    sites = lat.size
+
+    hour_starts = _as_datetime64_hours(start) + np.arange(hours).astype("timedelta64[h]")
+    jd = (_julian_day(hour_starts)[:, None] + (np.arange(samples_per_hour) + 0.5) / (24.0 * samples_per_hour)).ravel()
+    sidereal = _sidereal_angle(jd)
+    moon = moon_position(jd)
+    sun = sun_position(jd)
+    moon_horizon = np.sin(np.radians(MOON_PARALLAX_FACTOR * np.degrees(moon["parallax"]) + MOON_HORIZON_OFFSET_DEG))
+    twilight = np.sin(np.radians(ASTRONOMICAL_TWILIGHT_DEG))
+
+    darkness = np.zeros((sites, hours), dtype=np.float32)
+    moon_up = np.zeros((sites, hours), dtype=np.float32)
+    for block in range(0, sites, SITE_BLOCK_SIZE):
+        rows = slice(block, min(block + SITE_BLOCK_SIZE, sites))
+        sin_lat = np.sin(lat[rows])[:, None]
+        cos_lat = np.cos(lat[rows])[:, None]
+
+        def sin_altitude(position: Dict[str, np.ndarray]) -> np.ndarray:
+            hour_angle = sidereal - position["ra"]
+            return sin_lat * np.sin(position["dec"]) + cos_lat * np.cos(position["dec"]) * np.cos(
+                hour_angle + lon[rows, None]
+            )
+
+        shape = (-1, hours, samples_per_hour)
+        darkness[rows] = (sin_altitude(sun) < twilight).reshape(shape).mean(axis=-1)
+        moon_up[rows] = (sin_altitude(moon) >= moon_horizon).reshape(shape).mean(axis=-1)
+
+    return HourlySky(
+        hours=hour_starts,
+        darkness=darkness,
+        moon_up=moon_up,
+        moon_illumination=(moon_illumination(_julian_day(hour_starts) + 1.0 / 48.0) * 100.0).astype(np.float32),
+    )
+
+
+def _format_utc_time(value: np.datetime64) -> Optional[str]:
+    if np.isnat(value):
+        return None
+    return str(value.astype("datetime64[s]")).split("T")[1]
+
+
+def evening_date(longitude: float, now: Optional[datetime] = None) -> date:
+    """
+    Evening date of the night in progress (or next) at a site.
+
+    Nights run from local solar noon to noon, as in
+    night_planner.build_sky_matrix, so in the evening and early morning the
+    night in progress is named by the evening it started, whatever the UTC
+    date is.
+
+    Args:
+        longitude: Site longitude in degrees (east positive)
+        now: Instant to look from (naive values are UTC; defaults to now)
+
+    Returns:
+        Date of that night's evening
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    elif now.tzinfo is not None:
+        now = now.astimezone(timezone.utc)
+    return (now + timedelta(hours=longitude / 15.0 - 12.0)).date()
+
+
+def _night_of(longitude: float, when: Optional[DateLike]) -> DateLike:
+    """Evening date for a when argument: instants are resolved at the site, dates kept."""
+    if when is None or isinstance(when, datetime):
+        return evening_date(longitude, when)
+    return when
+
+
+def get_moon_summary(latitude: float, longitude: float, when: Optional[DateLike] = None) -> Dict:
+    """
+    Moon and darkness summary for one site, shaped like the weather moon data.
+
+    Args:
+        latitude: Latitude coordinate (-90 to 90)
+        longitude: Longitude coordinate (-180 to 180)
+        when: Evening date of the night, or an instant whose night in
+            progress (or next) is wanted (defaults to now)
+
+    Returns:
+        Dictionary with moon_phase, illumination_percent, moon_rise_time,
+        moon_set_time, darkness_start_time, darkness_end_time (times are
+        "HH:MM:SS" UTC) and dark_hours
+    """
+    night = compute_night_ephemeris([latitude], [longitude], _night_of(longitude, when), nights=1)
+    return {
+        "moon_phase": str(night.moon_phase[0, 0]),
+        "illumination_percent": round(float(night.moon_illumination[0, 0]), 1),
+        "moon_rise_time": _format_utc_time(night.moon_rise[0, 0]),
+        "moon_set_time": _format_utc_time(night.moon_set[0, 0]),
+        "darkness_start_time": _format_utc_time(night.dusk[0, 0]),
+        "darkness_end_time": _format_utc_time(night.dawn[0, 0]),
+        "dark_hours": round(float(night.dark_hours[0, 0]), 2),
+        "time_zone": "UTC",
+    }
+
+
+def annotate_locations(locations: List[Dict], when: Optional[DateLike] = None) -> List[Dict]:
+    """
+    Add tonight's moon and darkness figures to candidate location dictionaries.
+
+    Locations sharing a night are computed in one vectorized call. Sets
+    moon_brightness (illumination percent), moon_phase, dark_hours and
+    moon_free_dark_hours.
+
+    Args:
+        locations: Dictionaries with latitude and longitude keys (updated in place)
+        when: Evening date of the night, or an instant whose night in
+            progress (or next) is wanted at each location (defaults to now)
+
+    Returns:
+        The same list, for chaining
+    """
+    if not locations:
+        return locations
+    if when is None:
+        when = datetime.now(timezone.utc)
+    by_night: Dict[DateLike, List[Dict]] = {}
+    for loc in locations:
+        by_night.setdefault(_night_of(loc["longitude"], when), []).append(loc)
+    for night_date, group in by_night.items():
+        night = compute_night_ephemeris(
+            [loc["latitude"] for loc in group],
+            [loc["longitude"] for loc in group],
+            night_date,
+            nights=1,
+        )
+        phases = night.moon_phase[:, 0]
+        for i, loc in enumerate(group):
+            loc["moon_brightness"] = round(float(night.moon_illumination[i, 0]), 1)
+            loc["moon_phase"] = str(phases[i])
+            loc["dark_hours"] = round(float(night.dark_hours[i, 0]), 2)
+            loc["moon_free_dark_hours"] = round(float(night.moon_free_dark_hours[i, 0]), 2)
+    return locations
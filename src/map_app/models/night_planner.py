@@ -0,0 +1,297 @@
+"""Multi-night planning across many candidate sites.
+
+Answers "which of these spots is best, and on which night this week": every
+site × hour cell of the coming nights is scored at once, and the best
+contiguous window of each (site, night) pair is ranked.
+
+Darkness and the moon come from the local ephemeris on a shared UTC hour
+axis (models/ephemeris.py). Cloud cover comes from ClearOutside's hourly
+forecasts, which are listed in the site's local time. Each forecast is
+placed on the UTC axis by the timezone its page gives, or, for pages without
+one, by matching the darkness hours on the page with the ephemeris, so the
+cloud rows line up with the rest of the matrix. A site
+without a forecast is planned on darkness and moon alone (its clear-sky
+criterion is NaN and drops out of the score).
+
+Cell scores are the models.scoring weighted mean of the site's own criteria
+(darkness, limiting magnitude, proximity) and the hour's clear sky and moon,
+scaled by the fraction of the hour that is astronomically dark.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from models import scoring
+from models.ephemeris import DateLike, compute_hourly_sky
+from models.observing_windows import MIN_DARKNESS_FRACTION, HourlyForecast
+
+# Whole-hour UTC offsets tried around the site's solar offset when aligning a forecast
+OFFSET_SEARCH_HOURS = 3
+
+
+@dataclass(frozen=True)
+class SkyMatrix:
+    """Sites × hours conditions on a shared UTC hour axis."""
+
+    hours: np.ndarray  # (hours,) datetime64[h], start of each hour
+    clouds: np.ndarray  # (sites, hours) total cloud percent, NaN without a forecast
+    darkness: np.ndarray  # (sites, hours) fraction of the hour in astronomical darkness
+    moon_up: np.ndarray  # (sites, hours) fraction of the hour with the moon above the horizon
+    moon_illumination: np.ndarray  # (hours,) percent
+    nights: np.ndarray  # (sites, hours) datetime64[D], local evening date of each hour's night
+
+
+def _first_forecast_day(dates: Sequence[str], near: np.datetime64) -> Optional[np.datetime64]:
+    """Date of a forecast's first day from its "dd/mm" label, in the year closest to near."""
+    try:
+        day, month = (int(part) for part in dates[0].split("/")[:2])
+    except (IndexError, ValueError):
+        return None
+    year = int(str(near)[:4])
+    candidates = []
+    for candidate_year in (year - 1, year, year + 1):
+        try:
+            candidates.append(np.datetime64(datetime(candidate_year, month, day).date(), "D"))
+        except ValueError:
+            continue
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: abs(int((candidate - near).astype(int))))
+
+
+def align_forecast_clouds(
+    forecasts: Sequence[HourlyForecast],
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    hours: np.ndarray,
+) -> np.ndarray:
+    """
+    Put forecasts' local-time cloud rows on a UTC hour axis.
+
+    A forecast whose page gave its timezone is placed by its start_utc.
+    Otherwise its UTC offset is the whole number of hours (within
+    OFFSET_SEARCH_HOURS of the solar offset) that best lines up the darkness
+    fractions on the page with the ephemeris at the forecast's coordinates;
+    pages without darkness (polar summer) use the solar offset.
+
+    Args:
+        forecasts: Hourly forecasts
+        latitudes: Latitude of each forecast
+        longitudes: Longitude of each forecast
+        hours: UTC hour axis, datetime64[h]
+
+    Returns:
+        Array (forecasts, hours) of cloud percent, NaN where not covered
+    """
+    clouds = np.full((len(forecasts), len(hours)), np.nan)
+    if not len(hours):
+        return clouds
+    # UTC hour of each forecast's offset hour 0 (its first local midnight)
+    origins: Dict[int, np.datetime64] = {
+        i: np.datetime64(int(round(forecast.start_utc / 3600.0)), "h")
+        for i, forecast in enumerate(forecasts)
+        if len(forecast) and forecast.start_utc is not None
+    }
+    first_days = {
+        i: _first_forecast_day(forecast.dates, hours[0].astype("datetime64[D]"))
+        for i, forecast in enumerate(forecasts)
+        if len(forecast) and i not in origins
+    }
+    guessed = [i for i, day in first_days.items() if day is not None]
+    if guessed:
+        origins.update(
+            zip(
+                guessed,
+                _match_darkness_origins(
+                    [forecasts[i] for i in guessed],
+                    np.asarray(latitudes, dtype=float)[guessed],
+                    np.asarray(longitudes, dtype=float)[guessed],
+                    np.array([first_days[i] for i in guessed]).astype("datetime64[h]"),
+                ),
+            )
+        )
+
+    for i, origin in origins.items():
+        # Page hour listed for each axis hour
+        axis = (hours.astype("datetime64[h]") - origin).astype(int)
+        listed = forecasts[i].offset_hours.astype(np.int64)
+        position = np.clip(np.searchsorted(listed, axis), 0, max(len(listed) - 1, 0))
+        found = listed[position] == axis
+        clouds[i, found] = forecasts[i].total_clouds[position[found]]
+    return clouds
+
+
+def _match_darkness_origins(
+    forecasts: Sequence[HourlyForecast],
+    lat: np.ndarray,
+    lon: np.ndarray,
+    day0: np.ndarray,
+) -> List[np.datetime64]:
+    """UTC hour of each forecast's offset hour 0, from the offset best matching page and ephemeris darkness."""
+    solar = np.round(lon / 15.0).astype(int)
+    # Closest to the solar offset first, so ties (no darkness) resolve to it
+    steps = np.array([0] + [sign * step for step in range(1, OFFSET_SEARCH_HOURS + 1) for sign in (-1, 1)])
+    candidates = solar[:, None] + steps[None, :]  # (forecasts, candidates)
+
+    length = max(len(forecast) for forecast in forecasts)
+    local = np.full((len(forecasts), length), -1, dtype=np.int64)  # hours since the first local midnight
+    page_darkness = np.full((len(forecasts), length), np.nan, dtype=np.float32)
+    for row, forecast in enumerate(forecasts):
+        local[row, : len(forecast)] = forecast.offset_hours
+        page_darkness[row, : len(forecast)] = forecast.darkness
+
+    # Ephemeris darkness over every UTC hour any candidate offset can map to
+    span_start = day0.min() - np.timedelta64(int(candidates.max()), "h")
+    span_hours = int((day0.max() - span_start).astype(int)) + length - int(candidates.min()) + 1
+    sky = compute_hourly_sky(lat, lon, span_start, span_hours, samples_per_hour=4)
+    # UTC index of each page hour under each candidate offset
+    base = (day0 - span_start).astype(int)
+    index = base[:, None, None] + local[:, None, :] - candidates[:, :, None]
+    index = np.clip(index, 0, span_hours - 1)
+    ephemeris = np.take_along_axis(sky.darkness[:, None, :], index, axis=2)
+    mismatch = np.nansum(np.abs(ephemeris - page_darkness[:, None, :]), axis=2)
+    offsets = np.take_along_axis(candidates, mismatch.argmin(axis=1)[:, None], axis=1)[:, 0]
+    return [day - np.timedelta64(int(offset), "h") for day, offset in zip(day0, offsets)]
+
+
+def build_sky_matrix(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    start: DateLike,
+    nights: int,
+    forecasts: Sequence[HourlyForecast] = (),
+    forecast_index: Optional[Sequence[int]] = None,
+) -> SkyMatrix:
+    """
+    Build the sites × hours condition matrix for the coming nights.
+
+    Args:
+        latitudes: Site latitudes, shape (sites,)
+        longitudes: Site longitudes, shape (sites,)
+        start: First hour (UTC)
+        nights: Number of days covered (24 hours each)
+        forecasts: Hourly forecasts shared by the sites (e.g. one per forecast cell)
+        forecast_index: Forecast used by each site, -1 for none (all -1 when omitted)
+
+    Returns:
+        SkyMatrix
+    """
+    lat = np.atleast_1d(np.asarray(latitudes, dtype=float))
+    lon = np.atleast_1d(np.asarray(longitudes, dtype=float))
+    sky = compute_hourly_sky(lat, lon, start, nights * 24)
+
+    clouds = np.full(sky.darkness.shape, np.nan)
+    if forecasts and forecast_index is not None:
+        index = np.asarray(forecast_index, dtype=np.intp)
+        # Each forecast is aligned at the mean position of the sites using it
+        used = np.unique(index[index >= 0])
+        centers = np.array([[lat[index == i].mean(), lon[index == i].mean()] for i in used]).reshape(-1, 2)
+        rows = align_forecast_clouds([forecasts[i] for i in used], centers[:, 0], centers[:, 1], sky.hours)
+        lookup = np.full(len(forecasts), -1, dtype=np.intp)
+        lookup[used] = np.arange(len(used))
+        has_forecast = index >= 0
+        clouds[has_forecast] = rows[lookup[index[has_forecast]]]
+
+    # Nights run from local solar noon to noon and are named by their evening
+    solar_minutes = np.round(lon * 4.0).astype("timedelta64[m]")
+    local_noon_shifted = sky.hours.astype("datetime64[m]")[None, :] + solar_minutes[:, None] - np.timedelta64(12, "h")
+    return SkyMatrix(
+        hours=sky.hours,
+        clouds=clouds,
+        darkness=sky.darkness,
+        moon_up=sky.moon_up,
+        moon_illumination=sky.moon_illumination,
+        nights=local_noon_shifted.astype("datetime64[D]"),
+    )
+
+
+def plan_windows(
+    matrix: SkyMatrix,
+    site_criteria: Optional[Mapping[str, np.ndarray]] = None,
+    window_hours: int = 3,
+    top_k: int = 10,
+    weights: Optional[Mapping[str, float]] = None,
+    min_darkness: float = MIN_DARKNESS_FRACTION,
+) -> List[Dict]:
+    """
+    Rank the best (site, night, window) combinations.
+
+    Every cell is scored at once, window means come from cumulative sums
+    along the hour axis, and each (site, night) keeps its best window; the
+    best of those are returned.
+
+    Args:
+        matrix: Conditions from build_sky_matrix
+        site_criteria: Per-site criteria in [0, 1], shape (sites,) each (see
+            scoring.normalize_criteria)
+        window_hours: Window length in hours
+        top_k: Maximum number of combinations to return
+        weights: Criterion weights (defaults to config SCORING_WEIGHTS)
+        min_darkness: Minimum darkness fraction required for every hour
+
+    Returns:
+        List of plan dictionaries, best first: site (index), night (evening
+        date), start_time and end_time (UTC), duration_hours, score (0-100),
+        mean_cloudiness_percent (None without a forecast), moon_up_fraction,
+        moon_illumination_percent, time_zone
+    """
+    sites, hours = matrix.darkness.shape
+    if window_hours < 1 or hours < window_hours or sites == 0:
+        return []
+
+    criteria = {name: np.asarray(values, dtype=float)[:, None] for name, values in (site_criteria or {}).items()}
+    criteria.update(scoring.normalize_criteria(
+        cloud_percent=matrix.clouds,
+        moon_illumination_percent=matrix.moon_illumination[None, :],
+        moon_up=matrix.moon_up,
+    ))
+    cells = np.nan_to_num(scoring.score(criteria, weights)) * matrix.darkness
+
+    cumulative = np.concatenate([np.zeros((sites, 1)), np.cumsum(cells, axis=1)], axis=1)
+    window_scores = (cumulative[:, window_hours:] - cumulative[:, :-window_hours]) / window_hours
+    dark = matrix.darkness >= min_darkness
+    night_ids = (matrix.nights - matrix.nights.min()).astype(int)
+    valid = (
+        np.lib.stride_tricks.sliding_window_view(dark, window_hours, axis=1).all(axis=2)
+        & (night_ids[:, : 1 - window_hours or None] == night_ids[:, window_hours - 1:])
+    )
+
+    # Best window of every (site, night)
+    window_nights = night_ids[:, : window_scores.shape[1]]
+    night_count = int(night_ids.max()) + 1
+    best_start = np.zeros((sites, night_count), dtype=np.intp)
+    best_score = np.full((sites, night_count), np.nan)
+    for night in range(night_count):
+        masked = np.where(valid & (window_nights == night), window_scores, -np.inf)
+        best_start[:, night] = masked.argmax(axis=1)
+        best = masked[np.arange(sites), best_start[:, night]]
+        best_score[:, night] = np.where(np.isfinite(best), best, np.nan)
+
+    flat = best_score.ravel()
+    plans: List[Dict] = []
+    for cell in scoring.top_k(flat, top_k):
+        if np.isnan(flat[cell]):
+            break
+        site, night = divmod(int(cell), night_count)
+        start = int(best_start[site, night])
+        stop = start + window_hours
+        window_clouds = matrix.clouds[site, start:stop]
+        plans.append(
+            {
+                "site": site,
+                "night": str(matrix.nights[site, start]),
+                "start_time": str(matrix.hours[start].astype("datetime64[s]")),
+                "end_time": str((matrix.hours[start] + np.timedelta64(window_hours, "h")).astype("datetime64[s]")),
+                "duration_hours": window_hours,
+                "score": round(float(flat[cell]) * 100, 1),
+                "mean_cloudiness_percent": (
+                    None if np.isnan(window_clouds).all() else round(float(np.nanmean(window_clouds)), 1)
+                ),
+                "moon_up_fraction": round(float(matrix.moon_up[site, start:stop].mean()), 2),
+                "moon_illumination_percent": round(float(matrix.moon_illumination[start:stop].mean()), 1),
+                "time_zone": "UTC",
+            }
+        )
+    return plans
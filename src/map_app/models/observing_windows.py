@@ -0,0 +1,258 @@
+"""Hourly forecast arrays and best observing window search.
+
+The ClearOutside page carries a 7-day hourly table of cloud layers plus daily
+darkness and moon rise/set times. This module turns that table into compact
+per-hour numpy arrays once, and ranks contiguous observing windows over the
+next few nights with array operations only.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MINUTES_PER_DAY = 1440
+
+# How strongly a fully lit, risen moon degrades an otherwise perfect hour
+MOON_PENALTY = 0.5
+# Minimum fraction of an hour that must be astronomically dark
+MIN_DARKNESS_FRACTION = 0.5
+
+_CLOUD_ROWS = ("total_clouds", "low_clouds", "medium_clouds", "high_clouds")
+
+
+def _interval_overlap(starts: np.ndarray, ends: np.ndarray, hour_starts: np.ndarray) -> np.ndarray:
+    """Fraction of each hour covered by the union of [start, end) minute intervals."""
+    if starts.size == 0:
+        return np.zeros(hour_starts.shape, dtype=np.float32)
+    hour_ends = hour_starts + 60
+    overlap = (
+        np.minimum(hour_ends[:, None], ends[None, :])
+        - np.maximum(hour_starts[:, None], starts[None, :])
+    )
+    covered = np.clip(overlap, 0, 60).sum(axis=1) / 60.0
+    return np.minimum(covered, 1.0).astype(np.float32)
+
+
+def _day_intervals(day_index: int, start: int, end: int) -> List[Tuple[int, int]]:
+    """Absolute minute intervals for a daily start/end pair that may cross midnight."""
+    base = day_index * MINUTES_PER_DAY
+    if end > start:
+        return [(base + start, base + end)]
+    intervals = [(base + start, base + end + MINUTES_PER_DAY)]
+    if day_index == 0:
+        # Morning part of the previous night, which the page does not list
+        intervals.append((0, end))
+    return intervals
+
+
+@dataclass(frozen=True)
+class HourlyForecast:
+    """Per-hour forecast arrays for one location."""
+
+    dates: Tuple[str, ...]
+    offset_hours: np.ndarray  # hours since 00:00 local on the first forecast day
+    total_clouds: np.ndarray  # percent, uint8
+    low_clouds: np.ndarray
+    medium_clouds: np.ndarray
+    high_clouds: np.ndarray
+    darkness: np.ndarray  # fraction of the hour in astronomical darkness
+    moon_up: np.ndarray  # fraction of the hour with the moon above the horizon
+    moon_illumination: np.ndarray  # percent
+    start_utc: Optional[float] = None  # epoch seconds at offset hour 0, when the page gives its timezone
+
+    def __len__(self) -> int:
+        return int(self.offset_hours.size)
+
+    @classmethod
+    def from_table(cls, table: Dict) -> "HourlyForecast":
+        """
+        Build hourly arrays from the parsed ClearOutside forecast table.
+
+        Args:
+            table: "hourly" table from clearoutside_parser.extract_forecast_fields
+
+        Returns:
+            HourlyForecast with one entry per listed hour
+        """
+        days = table.get("days", [])
+        offsets: List[int] = []
+        illumination: List[float] = []
+        clouds: Dict[str, List[int]] = {name: [] for name in _CLOUD_ROWS}
+        dark_intervals: List[Tuple[int, int]] = []
+        moon_intervals: List[Tuple[int, int]] = []
+
+        for day_index, day in enumerate(days):
+            hours = day.get("hours", [])
+            offsets.extend(day_index * 24 + h for h in hours)
+            illumination.extend([day.get("moon_illumination") or 0.0] * len(hours))
+            for name in _CLOUD_ROWS:
+                values = day.get(name) or []
+                clouds[name].extend(values + [0] * (len(hours) - len(values)))
+            if day.get("darkness"):
+                dark_intervals.extend(_day_intervals(day_index, *day["darkness"]))
+            if day.get("moon_rise") is not None and day.get("moon_set") is not None:
+                moon_intervals.extend(_day_intervals(day_index, day["moon_rise"], day["moon_set"]))
+
+        start_utc = None
+        if table.get("start_date") and table.get("utc_offset_hours") is not None:
+            zone = timezone(timedelta(hours=table["utc_offset_hours"]))
+            start_utc = datetime.fromisoformat(table["start_date"]).replace(tzinfo=zone).timestamp()
+
+        offset_hours = np.asarray(offsets, dtype=np.int16)
+        hour_starts = offset_hours.astype(np.int32) * 60
+        dark = np.asarray(dark_intervals, dtype=np.int32).reshape(-1, 2)
+        moon = np.asarray(moon_intervals, dtype=np.int32).reshape(-1, 2)
+
+        return cls(
+            dates=tuple(day.get("date") or f"Day {i + 1}" for i, day in enumerate(days)),
+            offset_hours=offset_hours,
+            **{name: np.clip(np.asarray(clouds[name], dtype=np.int16), 0, 100).astype(np.uint8)
+               for name in _CLOUD_ROWS},
+            darkness=_interval_overlap(dark[:, 0], dark[:, 1], hour_starts),
+            moon_up=_interval_overlap(moon[:, 0], moon[:, 1], hour_starts),
+            moon_illumination=np.asarray(illumination, dtype=np.float32),
+            start_utc=start_utc,
+        )
+
+    def to_dict(self) -> Dict:
+        """Serialize to JSON-ready lists for the forecast cache."""
+        return {
+            "dates": list(self.dates),
+            "offset_hours": self.offset_hours.tolist(),
+            **{name: getattr(self, name).tolist() for name in _CLOUD_ROWS},
+            "darkness": np.round(self.darkness, 3).tolist(),
+            "moon_up": np.round(self.moon_up, 3).tolist(),
+            "moon_illumination": self.moon_illumination.tolist(),
+            "start_utc": self.start_utc,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HourlyForecast":
+        """Rebuild arrays from to_dict output without re-parsing any HTML."""
+        return cls(
+            dates=tuple(data.get("dates", [])),
+            offset_hours=np.asarray(data.get("offset_hours", []), dtype=np.int16),
+            **{name: np.asarray(data.get(name, []), dtype=np.uint8) for name in _CLOUD_ROWS},
+            darkness=np.asarray(data.get("darkness", []), dtype=np.float32),
+            moon_up=np.asarray(data.get("moon_up", []), dtype=np.float32),
+            moon_illumination=np.asarray(data.get("moon_illumination", []), dtype=np.float32),
+            start_utc=data.get("start_utc"),
+        )
+
+    def hour_quality(self) -> np.ndarray:
+        """Observing quality per hour in [0, 1]: dark, clear and moon-free is best."""
+        clear = 1.0 - self.total_clouds.astype(np.float32) / 100.0
+        moon_factor = 1.0 - MOON_PENALTY * self.moon_up * (self.moon_illumination / 100.0)
+        return self.darkness * clear * moon_factor
+
+    def current_offset_hours(self, now: Optional[float] = None) -> int:
+        """
+        Offset (see offset_hours) of the hour containing now.
+
+        Args:
+            now: Epoch seconds, defaults to the current time
+
+        Returns:
+            The current hour's offset, or 0 when the page gave no timezone
+        """
+        if self.start_utc is None:
+            return 0
+        return int(((time.time() if now is None else now) - self.start_utc) // 3600)
+
+
+def _format_hour(offset: int) -> str:
+    return f"{offset % 24:02d}:00"
+
+
+def find_best_windows(
+    forecast: HourlyForecast,
+    nights: int = 3,
+    window_hours: int = 3,
+    top_k: int = 3,
+    min_darkness: float = MIN_DARKNESS_FRACTION,
+    now: Optional[float] = None,
+) -> List[Dict]:
+    """
+    Rank the best contiguous observing windows over the next nights.
+
+    Every candidate window is scored at once from cumulative sums of the
+    per-hour quality; the best non-overlapping windows are returned.
+
+    Args:
+        forecast: Hourly forecast arrays for one location
+        nights: Number of upcoming nights to consider
+        window_hours: Window length in hours
+        top_k: Maximum number of windows to return
+        min_darkness: Minimum darkness fraction required for every hour
+        now: Epoch seconds of the current time (defaults to now); earlier
+            hours of the forecast are skipped
+
+    Returns:
+        List of window dictionaries, best first
+    """
+    n = len(forecast)
+    if n < window_hours or window_hours < 1:
+        return []
+
+    offsets = forecast.offset_hours.astype(np.int32)
+    quality = forecast.hour_quality().astype(np.float64)
+
+    # A night runs from noon to noon, so evening and early morning share an index
+    night_ids = (offsets - 12) // 24
+    dark_hours = (forecast.darkness >= min_darkness) & (offsets >= forecast.current_offset_hours(now))
+    # Nights are counted from the first evening on the page; the early hours
+    # of the first day end a night whose evening is not listed
+    dark_nights = np.unique(night_ids[dark_hours & (night_ids >= 0)])
+    if dark_nights.size == 0:
+        return []
+    allowed_nights = dark_nights[:nights]
+
+    cumulative = np.concatenate(([0.0], np.cumsum(quality)))
+    window_scores = (cumulative[window_hours:] - cumulative[:-window_hours]) / window_hours
+
+    starts = np.arange(n - window_hours + 1)
+    ends = starts + window_hours - 1
+    valid = (
+        (offsets[ends] - offsets[starts] == window_hours - 1)
+        & (night_ids[starts] == night_ids[ends])
+        & np.isin(night_ids[starts], allowed_nights)
+        & np.lib.stride_tricks.sliding_window_view(dark_hours, window_hours).all(axis=1)
+    )
+    candidates = starts[valid]
+    if candidates.size == 0:
+        return []
+
+    order = candidates[np.argsort(-window_scores[candidates], kind="stable")]
+    occupied = np.zeros(n, dtype=bool)
+    clouds = forecast.total_clouds.astype(np.float32)
+    results: List[Dict] = []
+    for start in order:
+        stop = start + window_hours
+        if occupied[start:stop].any():
+            continue
+        occupied[start:stop] = True
+        # Nights are labelled by the date of their evening
+        night_day = int(night_ids[start])
+        results.append(
+            {
+                "night": forecast.dates[night_day] if night_day < len(forecast.dates) else None,
+                "start_time": _format_hour(int(offsets[start])),
+                "end_time": _format_hour(int(offsets[start]) + window_hours),
+                "start_offset_hours": int(offsets[start]),
+                "duration_hours": window_hours,
+                "score": round(float(window_scores[start]) * 100, 1),
+                "mean_cloudiness_percent": round(float(clouds[start:stop].mean()), 1),
+                "moon_up_fraction": round(float(forecast.moon_up[start:stop].mean()), 2),
+                "moon_illumination_percent": round(float(forecast.moon_illumination[start:stop].mean()), 1),
+            }
+        )
+        if len(results) >= top_k:
+            break
+    return results
+
+
+def empty_hourly_forecast() -> HourlyForecast:
+    """Return a forecast with no hours, used when no page could be fetched."""
+    return HourlyForecast.from_table({"days": []})
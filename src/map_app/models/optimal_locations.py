@@ -3,13 +3,25 @@
 This module will analyze light pollution maps to find the best stargazing
 locations within a given radius from a center point.
 """
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Mapping, Tuple, Optional
 import math
 import os
 import logging
-from PIL import Image
 import numpy as np
 
+from config import (
+    FINDER_MIN_SEPARATION_KM,
+    FINDER_SEPARATION_RADIUS_FRACTION,
+    REGION_MAP_CACHE_MAX_BYTES,
+    SCORING_NEIGHBORHOOD_KM,
+    SCORING_OBSERVATION_RADIUS_KM,
+)
+from models import diversity, scoring
+from models.ephemeris import annotate_locations
+from services.bounded_cache import BoundedLRUCache
+from services.memory_budget import register_cache
+from utils.instrumentation import count, count_cache, span, traced
+
 logger = logging.getLogger(__name__)
 
 # [lon_min, lat_min, lon_max, lat_max, width, height, filename]
@@ -22,6 +34,9 @@ CONTINENTS = {
     "Australia":     [94, -48, 180, 8, 10320, 6720, 'Australia2024.png']
 }
 
+# Candidates kept per requested result before re-ranking by tonight's moon
+SHORTLIST_FACTOR = 5
+
 LIGHT_POLLUTION_SCALE = {
     (0, 0, 0): 0,
     (34, 34, 34): 1,
@@ -41,6 +56,34 @@ LIGHT_POLLUTION_SCALE = {
 }
 
 
+def _nearby_limiting_magnitudes(results: List[Dict]) -> np.ndarray:
+    """
+    Limiting magnitude of the nearest GaN observation to each result.
+
+    Args:
+        results: Dictionaries with latitude and longitude keys
+
+    Returns:
+        (N,) array, NaN where no observation lies within
+        SCORING_OBSERVATION_RADIUS_KM or the observations file cannot be read
+    """
+    # Imported here: the nearby service imports this module
+    from services.nearby_locations_service import nearest_observations
+
+    if not results:
+        return np.zeros(0)
+    try:
+        nearest = nearest_observations(
+            [loc["latitude"] for loc in results],
+            [loc["longitude"] for loc in results],
+            SCORING_OBSERVATION_RADIUS_KM,
+        )
+    except OSError as e:
+        logger.warning(f"Observations unavailable, scoring without limiting magnitude: {e}")
+        return np.full(len(results), np.nan)
+    return nearest["limiting_mag"]
+
+
 class OptimalLocationFinder:
     """Find optimal stargazing locations using PNG light pollution maps."""
     
@@ -56,32 +99,69 @@ class OptimalLocationFinder:
         # Use shared color scale for all methods
         self.light_pollution_scale = LIGHT_POLLUTION_SCALE
         
-        # Cache loaded maps by region name to avoid repeated disk reads
-        self._map_cache: Dict[str, Tuple[np.ndarray, Dict[str, float]]] = {}
+        # Decoded maps by region name; under the process memory budget the
+        # least recently searched region is dropped first
+        self._map_cache = register_cache(
+            "region_maps",
+            BoundedLRUCache(
+                max_entries=len(CONTINENTS),
+                max_bytes=REGION_MAP_CACHE_MAX_BYTES,
+                sizeof=lambda entry: entry[0].nbytes,
+            ),
+        )
     
+    @traced("finder.find_optimal_locations")
     def find_optimal_locations(
         self,
         center_lat: float,
         center_lon: float,
         radius_km: int,
-        top_n: int = 10
+        top_n: int = 10,
+        cloud_percent: Optional[float] = None,
+        weights: Optional[Mapping[str, float]] = None,
+        min_separation_km: Optional[float] = None,
+        sectors: int = 0,
     ) -> List[Dict]:
         """
         Find optimal stargazing locations within radius using PNG maps.
         
+        Candidates are ranked by models.scoring: every pixel in the radius is
+        scored on its darkness, its surroundings and its distance, the best
+        are shortlisted, and the shortlist is re-scored with tonight's moon.
+        Results are kept apart (models.diversity) so they are not neighbouring
+        pixels of one dark patch; with sectors, at most one result is
+        returned per compass sector around the center.
+        
         Args:
             center_lat: Center latitude
             center_lon: Center longitude
             radius_km: Search radius in kilometers
             top_n: Number of top locations to return
+            cloud_percent: Forecast cloud cover for the area (0-100), if known
+            weights: Criterion weights (defaults to config SCORING_WEIGHTS)
+            min_separation_km: Minimum distance between results, 0 disables
+                (defaults to FINDER_SEPARATION_RADIUS_FRACTION of the radius,
+                at least FINDER_MIN_SEPARATION_KM; see config)
+            sectors: Return the best location of each of this many compass
+                sectors (e.g. 8 for N, NE, ...; 0 disables)
         
         Returns:
-            List of dictionaries with location info (lat, lon, score, distance)
+            List of dictionaries with location info (lat, lon, score, distance,
+            bearing)
         
         Returns up to `top_n` locations that have lower light pollution than the
-        center point. Returns an empty list if no better pixels are found (for
-        example, if the entire search area is the same color).
+        center point, best score first. Returns an empty list if no better
+        pixels are found (for example, if the entire search area is the same
+        color).
+
+        Raises:
+            ValueError: If the weights, separation or sector count are invalid
         """
+        scoring.validate_weights(weights)
+        if min_separation_km is None:
+            min_separation_km = max(FINDER_MIN_SEPARATION_KM, radius_km * FINDER_SEPARATION_RADIUS_FRACTION)
+        if min_separation_km < 0 or sectors < 0:
+            raise ValueError("min_separation_km and sectors must not be negative")
         region = self._get_region_info(center_lat, center_lon)
         if region is None:
             logger.warning("Coordinates (lat=%.4f, lon=%.4f) fall outside supported maps", center_lat, center_lon)
@@ -127,49 +207,88 @@ class OptimalLocationFinder:
         window = map_array[y_min : y_max + 1, x_min : x_max + 1]
 
         # Compute distances and mask points within radius
-        distances = self._haversine_grid(center_lat, center_lon, lat_grid, lon_grid)
-        within_radius_mask = distances <= radius_km
+        with span("finder.distances"):
+            distances = self._haversine_grid(center_lat, center_lon, lat_grid, lon_grid)
+            within_radius_mask = distances <= radius_km
 
         if not within_radius_mask.any():
             return []
 
-        valid_y, valid_x = np.where(within_radius_mask)
-        valid_colors = window[valid_y, valid_x]
-
-        # Map colors to pollution levels
-        valid_levels = np.array([
-            self._get_light_pollution_level(tuple(int(v) for v in rgb)) for rgb in valid_colors
-        ])
-        valid_distances = distances[valid_y, valid_x]
-        valid_lats = lat_grid[valid_y, valid_x]
-        valid_lons = lon_grid[valid_y, valid_x]
+        # Map colors to pollution levels; the whole window is classified so
+        # the surroundings of pixels near the edge of the radius are known
+        with span("finder.classify"):
+            levels = self._get_light_pollution_levels(window.reshape(-1, 3)).reshape(window.shape[:2])
+            km_per_pixel = 111.0 * (region["lat_max"] - region["lat_min"]) / region["height"]
+            surroundings = scoring.neighborhood_mean(levels, int(round(SCORING_NEIGHBORHOOD_KM / km_per_pixel)))
 
         # Keep only pixels that are better than center
-        better_mask = valid_levels < center_level
-        if not better_mask.any():
+        valid_y, valid_x = np.where(within_radius_mask & (levels < center_level))
+        if not len(valid_y):
             return []
+        valid_levels = levels[valid_y, valid_x]
+        valid_distances = distances[valid_y, valid_x]
 
-        # Sort by pollution level first, then by proximity
-        order = np.lexsort((valid_distances[better_mask], valid_levels[better_mask]))
-        selected_indices = np.nonzero(better_mask)[0][order][:top_n]
+        # Score every candidate on what the map tells, then shortlist spots
+        # that are spread out (several per sector, so the moon can reorder them)
+        with span("finder.rank"):
+            criteria = scoring.normalize_criteria(
+                light_pollution=valid_levels,
+                neighborhood_light_pollution=surroundings[valid_y, valid_x],
+                distance_km=valid_distances,
+                radius_km=radius_km,
+                cloud_percent=cloud_percent,
+            )
+            east, north = diversity.local_offsets_km(
+                lat_grid[valid_y, valid_x], lon_grid[valid_y, valid_x], center_lat, center_lon
+            )
+            shortlist = diversity.diversify(
+                east,
+                north,
+                scoring.score(criteria, weights),
+                (sectors or top_n) * SHORTLIST_FACTOR,
+                min_separation_km=min_separation_km,
+                sectors=sectors,
+                per_sector=SHORTLIST_FACTOR,
+            )
+        bearings = diversity.bearings(east[shortlist], north[shortlist])
+        # Name directions after the sectors asked for when they are compass points
+        points = sectors if sectors in (4, 8, 16) else 8
 
         results: List[Dict[str, float]] = []
-        for rank, idx in enumerate(selected_indices, start=1):
+        for idx, bearing in zip(shortlist, bearings):
             results.append(
                 {
-                    "name": f"Low-light spot #{rank}",
-                    "latitude": float(valid_lats[idx]),
-                    "longitude": float(valid_lons[idx]),
+                    "name": "",
+                    "latitude": float(lat_grid[valid_y[idx], valid_x[idx]]),
+                    "longitude": float(lon_grid[valid_y[idx], valid_x[idx]]),
                     "distance_km": float(valid_distances[idx]),
+                    "bearing_deg": round(float(bearing), 1),
+                    "direction": diversity.compass_direction(bearing, points),
                     "light_pollution_index": float(round(valid_levels[idx], 2)),
                     # Backward-compatible field used by UI components
                     "bortle_score": float(round(valid_levels[idx], 2)),
-                    "cloudiness_percent": 0,
-                    "moon_brightness": 0,
+                    "cloudiness_percent": None if cloud_percent is None else int(round(cloud_percent)),
                     "conditions": "Lower light pollution compared to center",
                 }
             )
 
+        # Re-score the shortlist with tonight's moon and what observers saw nearby
+        with span("finder.enrich"):
+            annotate_locations(results)
+            limiting_mags = _nearby_limiting_magnitudes(results)
+        for loc, mag in zip(results, limiting_mags):
+            loc["limiting_mag"] = round(float(mag), 2) if np.isfinite(mag) else None
+        criteria = {name: values[shortlist] if np.ndim(values) else values for name, values in criteria.items()}
+        criteria.update(scoring.moon_criteria(results))
+        criteria.update(scoring.normalize_criteria(limiting_mag=limiting_mags))
+        scores = scoring.score(criteria, weights)
+        # The shortlist is already spread out; only the sector cap is left
+        order = diversity.diversify(east[shortlist], north[shortlist], scores, top_n, sectors=sectors)
+        results = [results[idx] for idx in order]
+        for rank, (loc, idx) in enumerate(zip(results, order), start=1):
+            loc["name"] = f"Low-light spot #{rank}"
+            loc["score"] = round(float(scores[idx]), 4) if np.isfinite(scores[idx]) else None
+
         return results
     
     def _load_map_for_region(self, latitude: float, longitude: float) -> np.ndarray:
@@ -189,15 +308,22 @@ class OptimalLocationFinder:
             raise ValueError("Coordinates fall outside supported map regions")
 
         cache_key = region["name"]
-        if cache_key in self._map_cache:
-            return self._map_cache[cache_key]
+        cached = self._map_cache.get(cache_key)
+        count_cache("region_map", cached is not None)
+        if cached is not None:
+            return cached
 
         map_path = os.path.join(self.maps_dir, region["filename"])
         if not os.path.exists(map_path):
             raise FileNotFoundError(f"Map file not found: {map_path}")
 
-        image = Image.open(map_path).convert("RGB")
-        map_array = np.array(image)
+        # PIL loads with the first map, not with the module
+        from PIL import Image
+
+        with span("finder.decode_png"):
+            image = Image.open(map_path).convert("RGB")
+            map_array = np.array(image)
+        count("bytes_loaded_total", os.path.getsize(map_path), source="region_png")
 
         # Sanity check for expected dimensions
         expected_height, expected_width = int(region["height"]), int(region["width"])
@@ -210,15 +336,15 @@ class OptimalLocationFinder:
                 map_array.shape,
             )
 
-        self._map_cache[cache_key] = (map_array, region)
+        if not self._map_cache.put(cache_key, (map_array, region)):
+            logger.warning(f"Map for {cache_key} exceeds the region map cache budget and is not cached")
         return map_array, region
     
     def _latlon_to_pixel(
         self,
         latitude: float,
         longitude: float,
-        map_bounds: Tuple[float, float, float, float],
-        image_shape: Tuple[int, int]
+        region: Dict[str, float],
     ) -> Tuple[int, int]:
         """
         Convert lat/lon coordinates to pixel coordinates on the map.
@@ -226,8 +352,7 @@ class OptimalLocationFinder:
         Args:
             latitude: Latitude coordinate
             longitude: Longitude coordinate
-            map_bounds: (min_lat, max_lat, min_lon, max_lon) of the map
-            image_shape: (height, width) of the image
+            region: Region metadata from _get_region_info (bounds and image size)
         
         Returns:
             (x, y) pixel coordinates
@@ -269,6 +394,40 @@ class OptimalLocationFinder:
         
         return closest_level
 
+    def _get_light_pollution_levels(self, colors: np.ndarray) -> np.ndarray:
+        """
+        Vectorized _get_light_pollution_level for many pixels at once.
+        
+        Args:
+            colors: Array of RGB colors, shape (N, 3)
+        
+        Returns:
+            Array of light pollution levels; ties resolve to the first scale
+            color, as in the scalar version
+        """
+        palette = np.array(list(self.light_pollution_scale), dtype=np.int32)
+        levels = np.array(list(self.light_pollution_scale.values()), dtype=float)
+        diff = colors.reshape(-1, 1, 3).astype(np.int32) - palette[None, :, :]
+        return levels[np.einsum("npc,npc->np", diff, diff).argmin(axis=1)]
+
+    def preload_regions(self, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Decode region maps ahead of time (e.g. before forking worker processes).
+        
+        Args:
+            names: Region names from CONTINENTS (all regions when omitted)
+        
+        Returns:
+            Names of the regions now loaded
+        """
+        names = list(CONTINENTS) if names is None else names
+        for name in names:
+            if name not in CONTINENTS:
+                raise ValueError(f"Unknown region: {name!r}")
+            lon_min, lat_min, lon_max, lat_max = CONTINENTS[name][:4]
+            self._load_map_for_region((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+        return names
+
     def get_light_pollution_at(self, latitude: float, longitude: float) -> float:
         """Return light pollution level at a specific coordinate."""
         map_array, region = self._load_map_for_region(latitude, longitude)
@@ -276,6 +435,53 @@ class OptimalLocationFinder:
         rgb = tuple(int(v) for v in map_array[y, x])
         return float(self._get_light_pollution_level(rgb))
 
+    def get_regions(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Vectorized _get_region_info: the region name of each coordinate.
+
+        Args:
+            latitudes: Latitude coordinates, shape (N,)
+            longitudes: Longitude coordinates, shape (N,)
+
+        Returns:
+            Array of region names (object dtype); "" where no map covers the
+            coordinate. Overlapping regions resolve in CONTINENTS order.
+        """
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        names = np.full(lat.shape, "", dtype=object)
+        for name, values in reversed(CONTINENTS.items()):
+            lon_min, lat_min, lon_max, lat_max = values[:4]
+            names[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)] = name
+        return names
+
+    def get_light_pollution_levels(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Vectorized get_light_pollution_at for many coordinates.
+
+        Args:
+            latitudes: Latitude coordinates, shape (N,)
+            longitudes: Longitude coordinates, shape (N,)
+
+        Returns:
+            Array of light pollution levels; NaN where no map covers the coordinate
+        """
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        names = self.get_regions(lat, lon)
+        levels = np.full(lat.shape, np.nan)
+        for name in set(names.tolist()) - {""}:
+            selected = names == name
+            lon_min, lat_min, lon_max, lat_max = CONTINENTS[name][:4]
+            map_array, region = self._load_map_for_region((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+            # Same rounding and clamping as _latlon_to_pixel
+            x = (lon[selected] - lon_min) / (lon_max - lon_min) * (region["width"] - 1)
+            y = (lat_max - lat[selected]) / (lat_max - lat_min) * (region["height"] - 1)
+            x = np.clip(np.round(x).astype(np.intp), 0, int(region["width"]) - 1)
+            y = np.clip(np.round(y).astype(np.intp), 0, int(region["height"]) - 1)
+            levels[selected] = self._get_light_pollution_levels(map_array[y, x])
+        return levels
+
     def _get_region_info(self, latitude: float, longitude: float) -> Optional[Dict[str, float]]:
         """Return region metadata for given coordinates, or None if not covered."""
         for name, values in CONTINENTS.items():
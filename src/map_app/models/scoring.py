@@ -0,0 +1,253 @@
+"""Multi-criteria stargazing score for ranking candidate sites.
+
+Every criterion is normalized to [0, 1], 1 being best:
+
+- darkness: the site's own light pollution level
+- surroundings: the mean level of the pixels around the site (a dark pixel
+  next to a town is worse than one in the middle of a dark area)
+- proximity: distance from the search center, relative to the radius
+- clear_sky: forecast cloud cover
+- moon: moon illumination, weighted by the share of the dark hours the moon
+  is above the horizon
+- limiting_mag: naked-eye limiting magnitude reported by nearby observers
+
+The score is the weighted mean of the criteria that are known; a NaN
+criterion (no forecast, no observation nearby) drops out of the mean rather
+than counting as zero. Everything is computed as array operations over all
+candidates, and top_k picks the best with a partial selection, so ranking a
+million candidates takes milliseconds.
+"""
+from typing import Dict, List, Mapping, Optional, Union
+
+import numpy as np
+
+from config import SCORING_WEIGHTS
+
+ArrayLike = Union[float, np.ndarray]
+
+CRITERIA = ("darkness", "surroundings", "proximity", "clear_sky", "moon", "limiting_mag")
+
+# Brightest level in LIGHT_POLLUTION_SCALE (models/optimal_locations.py)
+MAX_LIGHT_POLLUTION_LEVEL = 7.5
+# Naked-eye limiting magnitude at a pristine site, as reported in GaN
+MAX_LIMITING_MAG = 7.0
+
+
+def _unit(values: ArrayLike, scale: float, offset: float = 0.0) -> np.ndarray:
+    """values * scale + offset clipped to [0, 1], in one new array."""
+    result = np.array(values, dtype=float)
+    result *= scale
+    result += offset
+    return np.clip(result, 0.0, 1.0, out=result)
+
+
+def moon_up_fraction(dark_hours: ArrayLike, moon_free_dark_hours: ArrayLike) -> np.ndarray:
+    """
+    Share of the dark hours with the moon above the horizon.
+
+    Args:
+        dark_hours: Hours of astronomical darkness
+        moon_free_dark_hours: Dark hours with the moon below the horizon
+
+    Returns:
+        Fractions in [0, 1]; NaN where the night has no darkness
+    """
+    dark = np.asarray(dark_hours, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = 1.0 - np.asarray(moon_free_dark_hours, dtype=float) / dark
+    return np.where(dark > 0, np.clip(fraction, 0.0, 1.0), np.nan)
+
+
+def normalize_criteria(
+    light_pollution: Optional[ArrayLike] = None,
+    neighborhood_light_pollution: Optional[ArrayLike] = None,
+    distance_km: Optional[ArrayLike] = None,
+    radius_km: Optional[float] = None,
+    cloud_percent: Optional[ArrayLike] = None,
+    moon_illumination_percent: Optional[ArrayLike] = None,
+    moon_up: Optional[ArrayLike] = None,
+    limiting_mag: Optional[ArrayLike] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Convert raw site figures to criteria in [0, 1].
+
+    Omitted figures are left out of the result (and so out of the score);
+    NaN values drop out per candidate.
+
+    Args:
+        light_pollution: Light pollution level (0-7.5)
+        neighborhood_light_pollution: Mean level around the site (0-7.5)
+        distance_km: Distance from the search center
+        radius_km: Search radius (required with distance_km)
+        cloud_percent: Forecast cloud cover (0-100)
+        moon_illumination_percent: Moon illumination (0-100)
+        moon_up: Share of the dark hours with the moon up (see
+            moon_up_fraction); without it the moon counts as up all night
+        limiting_mag: Naked-eye limiting magnitude
+
+    Returns:
+        Dictionary of criterion name to array (or 0-d array)
+    """
+    criteria: Dict[str, np.ndarray] = {}
+    if light_pollution is not None:
+        criteria["darkness"] = _unit(light_pollution, -1.0 / MAX_LIGHT_POLLUTION_LEVEL, 1.0)
+    if neighborhood_light_pollution is not None:
+        criteria["surroundings"] = _unit(neighborhood_light_pollution, -1.0 / MAX_LIGHT_POLLUTION_LEVEL, 1.0)
+    if distance_km is not None:
+        if not radius_km:
+            raise ValueError("radius_km is required to score distance")
+        criteria["proximity"] = _unit(distance_km, -1.0 / radius_km, 1.0)
+    if cloud_percent is not None:
+        criteria["clear_sky"] = _unit(cloud_percent, -1.0 / 100.0, 1.0)
+    if moon_illumination_percent is not None:
+        up = 1.0 if moon_up is None else np.asarray(moon_up, dtype=float)
+        criteria["moon"] = _unit(np.asarray(moon_illumination_percent, dtype=float) * up, -1.0 / 100.0, 1.0)
+    if limiting_mag is not None:
+        criteria["limiting_mag"] = _unit(limiting_mag, 1.0 / MAX_LIMITING_MAG)
+    return criteria
+
+
+def moon_criteria(locations: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    The moon criterion of location dictionaries annotated by
+    models.ephemeris.annotate_locations.
+
+    Args:
+        locations: Dictionaries with moon_brightness, dark_hours and
+            moon_free_dark_hours
+
+    Returns:
+        Dictionary with the moon criterion, shape (len(locations),)
+    """
+    return normalize_criteria(
+        moon_illumination_percent=[loc["moon_brightness"] for loc in locations],
+        moon_up=moon_up_fraction(
+            [loc["dark_hours"] for loc in locations],
+            [loc["moon_free_dark_hours"] for loc in locations],
+        ),
+    )
+
+
+def validate_weights(weights: Optional[Mapping[str, float]]) -> Mapping[str, float]:
+    """
+    Check criterion weights.
+
+    Args:
+        weights: Criterion name to weight, or None for config SCORING_WEIGHTS
+
+    Returns:
+        The weights to use
+
+    Raises:
+        ValueError: If a weight names an unknown criterion or is negative
+    """
+    weights = SCORING_WEIGHTS if weights is None else weights
+    unknown = set(weights) - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"Unknown scoring criteria: {sorted(unknown)}")
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError("Scoring weights must not be negative")
+    return weights
+
+
+def score(criteria: Mapping[str, ArrayLike], weights: Optional[Mapping[str, float]] = None) -> np.ndarray:
+    """
+    Weighted mean of the known criteria of each candidate.
+
+    Criteria broadcast against each other, so a scalar (e.g. one forecast for
+    the whole search area) applies to every candidate.
+
+    Args:
+        criteria: Criterion name to values in [0, 1] (see normalize_criteria)
+        weights: Criterion name to weight (defaults to config SCORING_WEIGHTS);
+            criteria without a weight are ignored
+
+    Returns:
+        Scores in [0, 1]; NaN where no weighted criterion is known
+
+    Raises:
+        ValueError: If a weight names an unknown criterion or is negative
+    """
+    weights = validate_weights(weights)
+    used = [name for name in CRITERIA if weights.get(name) and name in criteria]
+    values = [np.asarray(criteria[name], dtype=float) for name in used]
+    total = np.zeros(np.broadcast_shapes(*(array.shape for array in values)))
+    # A plain number while every criterion is known (the common case)
+    weight_sum: ArrayLike = 0.0
+    for name, array in zip(used, values):
+        missing = np.isnan(array)
+        if missing.any():
+            array = np.where(missing, 0.0, array)
+            weight_sum = weight_sum + np.where(missing, 0.0, weights[name])
+        else:
+            weight_sum = weight_sum + weights[name]
+        total += array * weights[name]
+    if np.ndim(weight_sum) == 0 and weight_sum > 0:
+        total /= weight_sum
+        return total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(weight_sum > 0, total / weight_sum, np.nan)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k best scores, best first.
+
+    Uses a partial selection (np.argpartition), so only the selected k are
+    sorted. NaN scores rank last; ties keep the lower index first.
+
+    Args:
+        scores: Candidate scores, shape (N,)
+        k: Number of indices to return
+
+    Returns:
+        Up to k indices into scores
+    """
+    values = np.asarray(scores, dtype=float)
+    if np.isnan(values).any():
+        values = np.where(np.isnan(values), -np.inf, values)
+    k = min(int(k), len(values))
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if k < len(values):
+        selected = np.argpartition(values, len(values) - k)[len(values) - k:]
+        # Candidates tied with the k-th score may have been cut arbitrarily;
+        # keep the lowest indices among them so the result is deterministic
+        threshold = values[selected].min()
+        above = np.flatnonzero(values > threshold)
+        tied = np.flatnonzero(values == threshold)[: k - len(above)]
+        selected = np.concatenate([above, tied])
+    else:
+        selected = np.arange(len(values))
+    return selected[np.lexsort((selected, -values[selected]))]
+
+
+def neighborhood_mean(grid: np.ndarray, radius_px: int) -> np.ndarray:
+    """
+    Mean of each cell's (2r+1) x (2r+1) neighborhood, via an integral image.
+
+    Cells near the edge average over the part of the neighborhood inside
+    the grid.
+
+    Args:
+        grid: 2-D array (e.g. light pollution levels of a search window)
+        radius_px: Neighborhood radius in cells (0 returns the grid as floats)
+
+    Returns:
+        Array of the same shape
+    """
+    grid = np.asarray(grid, dtype=float)
+    if radius_px <= 0:
+        return grid.copy()
+    height, width = grid.shape
+    integral = np.zeros((height + 1, width + 1))
+    np.cumsum(np.cumsum(grid, axis=0), axis=1, out=integral[1:, 1:])
+
+    rows = np.arange(height)
+    cols = np.arange(width)
+    top = np.clip(rows - radius_px, 0, height)[:, None]
+    bottom = np.clip(rows + radius_px + 1, 0, height)[:, None]
+    left = np.clip(cols - radius_px, 0, width)[None, :]
+    right = np.clip(cols + radius_px + 1, 0, width)[None, :]
+    sums = integral[bottom, right] - integral[top, right] - integral[bottom, left] + integral[top, left]
+    return sums / ((bottom - top) * (right - left))
@@ -1,9 +1,17 @@
-"""Services package for backend data services."""
-from .weather_service import get_cloudiness, get_moon_brightness
-from .visibility_service import get_sky_visibility
-
-__all__ = [
-    "get_cloudiness",
-    "get_moon_brightness",
-    "get_sky_visibility",
-]
+"""Services package for backend data services.
+
+Exports are resolved on first access, so importing one service module (e.g.
+``services.cache_backends``) does not load the others' dependencies (httpx).
+"""
+from utils.lazy_exports import lazy_exports
+
+_EXPORTS = {
+    "get_cloudiness": "weather_service",
+    "get_moon_brightness": "weather_service",
+    "get_best_observing_windows": "weather_service",
+    "get_sky_visibility": "visibility_service",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__ = lazy_exports(_EXPORTS, __name__)
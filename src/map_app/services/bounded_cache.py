@@ -0,0 +1,234 @@
+"""Size-bounded, thread-safe LRU cache with a memory budget.
+
+Entries are evicted least-recently-used first whenever either the entry limit
+or the approximate byte budget is exceeded. Values report their size through
+an ``nbytes`` attribute when they have one (numpy arrays, forecast records);
+other values are measured recursively.
+
+A cache registered with the process-wide MemoryGovernor
+(services/memory_budget.py) also counts toward the shared memory budget,
+and the governor may evict its least recently used entry to make room for
+another cache.
+"""
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import fields, is_dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional
+
+if TYPE_CHECKING:
+    from services.memory_budget import MemoryGovernor
+
+_MISSING = object()
+
+
+def approximate_size(value: Any) -> int:
+    """
+    Estimate the memory held by a value in bytes.
+
+    Args:
+        value: Object to measure; containers and dataclasses are walked
+
+    Returns:
+        Approximate size in bytes
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item) for item in value)
+    elif is_dataclass(value) and not isinstance(value, type):
+        size += sum(approximate_size(getattr(value, f.name)) for f in fields(value))
+    return size
+
+
+class BoundedLRUCache:
+    """LRU cache bounded by entry count and approximate memory use."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        sizeof: Callable[[Any], int] = approximate_size,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries kept
+            max_bytes: Memory budget across all entries
+            sizeof: Function estimating an entry's size in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._touched: Dict[Hashable, float] = {}  # Last access, monotonic seconds
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._evicted_bytes = 0
+        self._rejected = 0
+        self._invalidations = 0
+        self.governor: Optional["MemoryGovernor"] = None  # Set by MemoryGovernor.register
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value and mark it most recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._touched[key] = time.monotonic()
+            self._hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Store a value, evicting least-recently-used entries to stay within budget.
+
+        Args:
+            key: Cache key
+            value: Value to store
+
+        Returns:
+            False if the value alone exceeds the memory budget and was not stored
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            if size > self.max_bytes:
+                self._rejected += 1
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._touched[key] = time.monotonic()
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict_first()
+        # Outside the lock: the governor may evict from this cache too
+        if self.governor is not None:
+            self.governor.enforce()
+        return True
+
+    def _remove(self, key: Hashable) -> None:
+        del self._entries[key]
+        del self._touched[key]
+        self._bytes -= self._sizes.pop(key)
+
+    def _evict_first(self) -> int:
+        oldest = next(iter(self._entries))
+        size = self._sizes[oldest]
+        self._evictions += 1
+        self._evicted_bytes += size
+        self._remove(oldest)
+        return size
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the entries."""
+        with self._lock:
+            return self._bytes
+
+    def oldest_access(self) -> Optional[float]:
+        """Last access time (time.monotonic) of the least recently used entry; None when empty."""
+        with self._lock:
+            if not self._entries:
+                return None
+            return self._touched[next(iter(self._entries))]
+
+    def evict_oldest(self) -> int:
+        """Evict the least recently used entry; returns the bytes freed (0 when empty)."""
+        with self._lock:
+            return self._evict_first() if self._entries else 0
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop one entry; returns True if it was present."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self._invalidations += 1
+            return True
+
+    def clear(self) -> int:
+        """Drop every entry and return how many were removed."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._sizes.clear()
+            self._touched.clear()
+            self._bytes = 0
+            self._invalidations += count
+            return count
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        Return cache metrics.
+
+        Returns:
+            Dictionary with entries, bytes, limits, hits, misses, hit_rate,
+            evictions, evicted_bytes, rejected (oversized values) and invalidations
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+                "evictions": self._evictions,
+                "evicted_bytes": self._evicted_bytes,
+                "rejected": self._rejected,
+                "invalidations": self._invalidations,
+            }
+
+
+def memoize(cache: BoundedLRUCache) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Memoize a function in a BoundedLRUCache, like functools.lru_cache.
+
+    Unlike lru_cache, results are bounded by memory and, once the cache is
+    registered with the memory governor, count toward the process budget.
+
+    Args:
+        cache: Store for the results, keyed by the call's arguments
+
+    Returns:
+        Decorator; the wrapped function gains cache and cache_clear attributes
+    """
+
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = (args, tuple(sorted(kwargs.items())))
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = function(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
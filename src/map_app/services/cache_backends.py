@@ -0,0 +1,253 @@
+"""Pluggable result caches for the service functions.
+
+Service functions are memoized with ``@cached`` instead of ``st.cache_data``,
+so they cache the same way in the Streamlit app, batch jobs, the API server
+and plain worker processes, without importing Streamlit. The decorator stores
+results in the process-wide backend, which is chosen once at startup:
+
+- ``MemoryCacheBackend``: in-process LRU bounded by entries and bytes (default)
+- ``DiskCacheBackend``: SQLite file shared by every process on the node
+- ``StreamlitCacheBackend`` (utils/streamlit_cache.py): the app's adapter
+
+Values are pickled on the way in, so every hit returns a fresh copy (as
+st.cache_data does) and entry sizes are exact.
+"""
+import abc
+import functools
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import (
+    SERVICE_CACHE_BACKEND,
+    SERVICE_CACHE_MAX_BYTES,
+    SERVICE_CACHE_MAX_ENTRIES,
+    SERVICE_CACHE_PATH,
+)
+from services.bounded_cache import BoundedLRUCache
+from services.memory_budget import register_cache
+from utils.instrumentation import count_cache
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS service_cache (
+    key TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    expires_at REAL
+)
+"""
+
+
+class CacheBackend(abc.ABC):
+    """Interface of the stores behind @cached functions."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value); expired entries are misses."""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, optionally expiring after ttl_seconds."""
+
+    @abc.abstractmethod
+    def clear(self) -> int:
+        """Drop every entry; returns how many were removed."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Return backend metrics (hits, misses, size, ...)."""
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU bounded by entry count and pickled size."""
+
+    def __init__(
+        self,
+        max_entries: int = SERVICE_CACHE_MAX_ENTRIES,
+        max_bytes: int = SERVICE_CACHE_MAX_BYTES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of results kept
+            max_bytes: Memory budget for the pickled results
+            clock: Time source, injectable for tests
+        """
+        self._entries = register_cache(
+            "service_results", BoundedLRUCache(max_entries, max_bytes, sizeof=lambda entry: len(entry[1]))
+        )
+        self._clock = clock
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, payload = entry
+        if expires_at is not None and self._clock() >= expires_at:
+            self._entries.invalidate(key)
+            return False, None
+        return True, pickle.loads(payload)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = None if ttl_seconds is None else self._clock() + ttl_seconds
+        self._entries.put(key, (expires_at, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def clear(self) -> int:
+        return self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self._entries.stats()}
+
+
+class DiskCacheBackend(CacheBackend):
+    """SQLite-backed cache shared by every process on the node and across restarts."""
+
+    def __init__(self, path: str = SERVICE_CACHE_PATH, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: SQLite file path
+            clock: Wall-clock time source, injectable for tests
+        """
+        self.path = path
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._connect().execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        row = self._connect().execute(
+            "SELECT payload FROM service_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, self._clock()),
+        ).fetchone()
+        self._count(row is not None)
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = None if ttl_seconds is None else self._clock() + ttl_seconds
+        self._connect().execute(
+            "INSERT OR REPLACE INTO service_cache (key, payload, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at),
+        )
+
+    def clear(self) -> int:
+        return self._connect().execute("DELETE FROM service_cache").rowcount
+
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many were removed."""
+        return self._connect().execute(
+            "DELETE FROM service_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (self._clock(),)
+        ).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        (entries,) = self._connect().execute("SELECT COUNT(*) FROM service_cache").fetchone()
+        with self._lock:
+            return {"backend": "disk", "path": self.path, "entries": entries, "hits": self._hits, "misses": self._misses}
+
+
+def create_cache_backend(kind: str = SERVICE_CACHE_BACKEND) -> CacheBackend:
+    """
+    Build a backend by name.
+
+    Args:
+        kind: "memory" or "disk" (the Streamlit adapter is installed by the app)
+
+    Returns:
+        CacheBackend
+    """
+    if kind == "memory":
+        return MemoryCacheBackend()
+    if kind == "disk":
+        return DiskCacheBackend()
+    raise ValueError(f"Unknown service cache backend: {kind!r}")
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend() -> CacheBackend:
+    """Return the process-wide backend, creating the configured one on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_cache_backend()
+        return _backend
+
+
+def set_cache_backend(backend: CacheBackend) -> Optional[CacheBackend]:
+    """Install the process-wide backend; returns the previous one."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+        return previous
+
+
+def cached(
+    namespace: str,
+    ttl_seconds: Optional[float] = None,
+    cache_if: Optional[Callable[[Any], bool]] = None,
+) -> Callable[[Callable], Callable]:
+    """
+    Memoize a service function in the process-wide cache backend.
+
+    Args:
+        namespace: Prefix of the function's keys, unique per function
+        ttl_seconds: Time-to-live of each result (None keeps it until evicted)
+        cache_if: Predicate deciding whether a result is stored (e.g. to skip
+            fallbacks, so a recovered upstream is picked up right away)
+
+    Returns:
+        Decorator; the wrapped function gains a clear() method that
+        invalidates its results in whichever backend is installed
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        generation = [0]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            backend = get_cache_backend()
+            key = f"{namespace}:{generation[0]}:{args!r}:{sorted(kwargs.items())!r}"
+            hit, value = backend.get(key)
+            count_cache(namespace, hit)
+            if hit:
+                return value
+            value = fn(*args, **kwargs)
+            if cache_if is None or cache_if(value):
+                backend.set(key, value, ttl_seconds)
+            return value
+
+        def clear() -> None:
+            # Orphaned entries age out of the LRU (or expire on disk)
+            generation[0] += 1
+
+        wrapper.clear = clear
+        return wrapper
+
+    return decorator
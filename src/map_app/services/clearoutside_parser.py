@@ -0,0 +1,509 @@
+"""Single-pass extraction of forecast fields from ClearOutside pages.
+
+Building a full BeautifulSoup tree and searching it for every field costs tens
+of milliseconds and several MB per page. This module streams the HTML once
+with a compiled-regex tokenizer, tracking only the handful of elements
+the weather service needs, and returns the same dictionaries as the original
+BeautifulSoup-based extraction (kept below as a reference implementation for
+parity tests and benchmarks).
+"""
+import html as html_lib
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_CLOUDINESS_PERCENT = 50
+
+_PERCENT_RE = re.compile(r'(\d+)\s*%')
+_CLOUD_RE = re.compile(r'cloud', re.IGNORECASE)
+_CLOUD_CLASS_RE = re.compile(r'cloud|forecast', re.IGNORECASE)
+_BORTLE_CLASS_RE = re.compile(r'btn-bortle-(\d)')
+_TIME_RE = re.compile(r'(\d{1,2}):(\d{2})')
+_MAGNITUDE_RE = re.compile(r'(\d+\.?\d*)\s+Magnitude')
+_BRIGHTNESS_RE = re.compile(r'(\d+\.?\d*)\s*mcd/m')
+_ARTIFICIAL_RE = re.compile(r'(\d+\.?\d*)\s*μcd/m')
+
+# Tags, comments, doctypes and processing instructions; quoted attribute
+# values may contain ">"
+_MARKUP_RE = re.compile(
+    r'<(/?)([a-zA-Z][^\s/>]*)((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>'
+    r'|<!--.*?-->|<![^>]*>|<\?[^>]*>',
+    re.DOTALL,
+)
+_CLASS_ATTR_RE = re.compile(
+    r'(?:^|\s)class\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))',
+    re.IGNORECASE,
+)
+
+# Elements that never have an end tag
+_VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+# Raw-text elements whose content is not page text
+_RAW_TEXT_ELEMENTS = frozenset({"script", "style"})
+
+_MOON_SPANS = ("fc_moon_phase", "fc_moon_percentage", "fc_moon_riseset")
+
+_DARKNESS_RE = re.compile(r'Darkness:?\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+_INT_RE = re.compile(r'-?\d+')
+# Page header, e.g. "Timezone: UTC-4.00. Generated: ... Forecast: 18/10/26 to 24/10/26."
+_TIMEZONE_RE = re.compile(r'Timezone:\s*UTC\s*([+-]?\d+(?:\.\d+)?)')
+_FORECAST_START_RE = re.compile(r'Forecast:\s*(\d{1,2})/(\d{1,2})/(\d{2,4})')
+
+# Hourly detail rows kept from the forecast table, keyed by label prefix
+HOURLY_ROWS = {
+    "total clouds": "total_clouds",
+    "low clouds": "low_clouds",
+    "medium clouds": "medium_clouds",
+    "high clouds": "high_clouds",
+}
+
+
+@dataclass
+class _OpenElement:
+    """Bookkeeping for an element on the open-element stack."""
+
+    tag: str
+    classes: List[str]
+    text_start: int
+    # Moon/Bortle field captured from the element's text when it closes
+    role: Optional[str] = None
+    # Position of the first direct child text node containing "cloud"
+    cloud_hit: Optional[int] = None
+    # Set for td/div elements whose class mentions cloud or forecast
+    cloud_class: bool = False
+    # Index of the fc_moon block the element belongs to
+    moon_index: int = -1
+    order: int = 0
+
+
+class _ForecastPageScanner:
+    """Tokenizer callbacks that collect only the fields the service reads."""
+
+    def __init__(self):
+        self._stack: List[_OpenElement] = []
+        self._chunks: List[str] = []
+        self._order = 0
+
+        # Cloudiness candidates resolved in document order once text is known;
+        # text hits are keyed by text-node order, class hits by start-tag order
+        self._cloud_text_hits: Dict[int, Optional[int]] = {}
+        self._cloud_class_hits: Dict[int, Optional[int]] = {}
+
+        self.moon_found = False
+        self._moon_open = False
+        self._moon_count = 0
+        self.moon_text: Dict[str, Optional[str]] = {name: None for name in _MOON_SPANS}
+
+        # Hourly forecast table, one record per fc_day block
+        self.days: List[Dict] = []
+        self._hour_target: Optional[List[Optional[int]]] = None
+        self._row_values: Optional[List[Optional[int]]] = None
+        self._row_label = ""
+
+        self.bortle_found = False
+        self.bortle_level: Optional[int] = None
+        self.bortle_text: Optional[str] = None
+
+        # Header text giving the page's timezone and first forecast day
+        self.header_text: Optional[str] = None
+
+    def feed(self, html: str) -> None:
+        """Tokenize a whole page, dispatching tags and text to the handlers."""
+        position = 0
+        length = len(html)
+        while position < length:
+            match = _MARKUP_RE.search(html, position)
+            if match is None:
+                self.handle_data(_unescape(html[position:]))
+                break
+            if match.start() > position:
+                self.handle_data(_unescape(html[position:match.start()]))
+            position = match.end()
+
+            tag = match.group(2)
+            if tag is None:
+                continue  # comment, doctype or processing instruction
+            tag = tag.lower()
+            if match.group(1):
+                self.handle_endtag(tag)
+                continue
+
+            attrs = match.group(3)
+            classes: List[str] = []
+            if attrs:
+                class_match = _CLASS_ATTR_RE.search(attrs)
+                if class_match:
+                    value = next(group for group in class_match.groups() if group is not None)
+                    classes = html_lib.unescape(value).split()
+
+            if tag in _RAW_TEXT_ELEMENTS:
+                # Skip script/style bodies without tokenizing them
+                end = html.find(f"</{tag}", position)
+                if end < 0:
+                    break
+                close = html.find(">", end)
+                position = length if close < 0 else close + 1
+                continue
+
+            self.handle_starttag(tag, classes)
+            if attrs.endswith("/") and tag not in _VOID_ELEMENTS:
+                self.handle_endtag(tag)
+
+    def handle_starttag(self, tag: str, classes: List[str]) -> None:
+        """Open an element and mark it if it holds a field we extract."""
+        self._order += 1
+        element = _OpenElement(tag, classes, len(self._chunks), order=self._order)
+
+        if tag in ("td", "div") and any(_CLOUD_CLASS_RE.search(c) for c in classes):
+            element.cloud_class = True
+            self._cloud_class_hits[element.order] = None
+
+        if tag == "div" and "fc_moon" in classes:
+            self.moon_found = True
+            self._moon_open = True
+            element.role = "moon"
+        elif tag == "div" and "fc_day" in classes:
+            self.days.append({"date": None, "hours": [], "rows": {}, "darkness": None, "moon": {}})
+            element.role = "day"
+        elif tag == "div" and "fc_daylight" in classes and self.days:
+            element.role = "daylight"
+        elif tag == "div" and "fc_hours" in classes and self.days:
+            self._hour_target = self.days[-1]["hours"]
+            element.role = "hour_list"
+        elif tag == "div" and "fc_detail_row" in classes and self.days:
+            self._row_values = []
+            self._hour_target = self._row_values
+            element.role = "detail_row"
+        elif tag == "div" and "fc_detail_label" in classes and self._row_values is not None:
+            element.role = "detail_label"
+        elif tag == "li" and self._hour_target is not None:
+            element.role = "hour_cell"
+        elif tag == "span":
+            if "fc_day_date_num" in classes and self.days:
+                element.role = "day_date"
+            elif self._moon_open:
+                for name in _MOON_SPANS:
+                    if name in classes:
+                        element.role = name
+                        element.moon_index = self._moon_count
+                        break
+            if element.role is None and not self.bortle_found:
+                for cls in classes:
+                    match = _BORTLE_CLASS_RE.search(cls)
+                    if match:
+                        self.bortle_found = True
+                        self.bortle_level = int(match.group(1))
+                        element.role = "bortle"
+                        break
+
+        if tag in _VOID_ELEMENTS:
+            return
+        self._stack.append(element)
+
+    def handle_endtag(self, tag: str) -> None:
+        """Close an element, resolving any field that needed its text."""
+        # Close implicitly-closed children the same way a tree builder would
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth].tag == tag:
+                while len(self._stack) > depth:
+                    self._close(self._stack.pop())
+                return
+
+    def handle_data(self, data: str) -> None:
+        """Record a text node and note parents of text mentioning clouds."""
+        if not self._stack:
+            return
+        self._chunks.append(data)
+        if self.header_text is None and "Timezone:" in data:
+            self.header_text = data
+        parent = self._stack[-1]
+        if parent.cloud_hit is None and _CLOUD_RE.search(data):
+            parent.cloud_hit = len(self._cloud_text_hits)
+            self._cloud_text_hits[parent.cloud_hit] = None
+
+    def close(self) -> None:
+        """Close any elements left open at the end of the page."""
+        while self._stack:
+            self._close(self._stack.pop())
+
+    def _text(self, element: _OpenElement, strip: bool = False) -> str:
+        chunks = self._chunks[element.text_start:]
+        if strip:
+            return "".join(chunk.strip() for chunk in chunks)
+        return "".join(chunks)
+
+    def _close(self, element: _OpenElement) -> None:
+        if element.cloud_hit is not None or element.cloud_class:
+            percent = _first_valid_percent(self._text(element))
+            if element.cloud_hit is not None:
+                self._cloud_text_hits[element.cloud_hit] = percent
+            if element.cloud_class:
+                self._cloud_class_hits[element.order] = percent
+
+        role = element.role
+        if role is None:
+            pass
+        elif role == "moon":
+            self._moon_open = False
+            self._moon_count += 1
+        elif role in _MOON_SPANS:
+            strip = role != "fc_moon_riseset"
+            text = self._text(element, strip=strip)
+            # Only the first moon block feeds the current-conditions result
+            if element.moon_index == 0 and self.moon_text[role] is None:
+                self.moon_text[role] = text
+            if self.days:
+                self.days[-1]["moon"].setdefault(role, text)
+        elif role == "bortle":
+            self.bortle_text = self._text(element)
+        elif role == "hour_cell":
+            match = _INT_RE.search(self._text(element))
+            self._hour_target.append(int(match.group(0)) if match else None)
+        elif role == "hour_list":
+            self._hour_target = None
+        elif role == "detail_label":
+            self._row_label = self._text(element).strip().lower()
+        elif role == "detail_row":
+            label = self._row_label
+            for prefix, name in HOURLY_ROWS.items():
+                if label.startswith(prefix):
+                    self.days[-1]["rows"][name] = self._row_values
+                    break
+            self._row_values = None
+            self._hour_target = None
+            self._row_label = ""
+        elif role == "day_date":
+            self.days[-1]["date"] = self._text(element, strip=True)
+        elif role == "daylight":
+            match = _DARKNESS_RE.search(self._text(element))
+            if match:
+                h1, m1, h2, m2 = (int(v) for v in match.groups())
+                self.days[-1]["darkness"] = [h1 * 60 + m1, h2 * 60 + m2]
+
+        if not self._stack:
+            # Nothing left open can reference earlier text
+            self._chunks.clear()
+
+    def cloudiness_percent(self) -> int:
+        """Resolve cloudiness with the same precedence as the tree search."""
+        for hits in (self._cloud_text_hits, self._cloud_class_hits):
+            for order in sorted(hits):
+                if hits[order] is not None:
+                    return hits[order]
+        return DEFAULT_CLOUDINESS_PERCENT
+
+
+def _unescape(text: str) -> str:
+    """Decode character references only when the text contains any."""
+    return html_lib.unescape(text) if "&" in text else text
+
+
+def _first_valid_percent(text: str) -> Optional[int]:
+    """Return the first percentage in text if it lies within 0-100."""
+    percent_match = _PERCENT_RE.search(text)
+    if percent_match:
+        value = int(percent_match.group(1))
+        if 0 <= value <= 100:
+            return value
+    return None
+
+
+def _moon_data(phase_text: Optional[str], percent_text: Optional[str], riseset_text: Optional[str]) -> Dict:
+    """Build the moon dictionary from the raw span texts."""
+    illumination = 50.0
+    phase = "Unknown"
+    rise_time = None
+    set_time = None
+
+    if phase_text is not None:
+        phase = phase_text
+    if percent_text is not None:
+        percent_match = _PERCENT_RE.search(percent_text)
+        if percent_match:
+            illumination = float(percent_match.group(1))
+    if riseset_text is not None:
+        # Format: "08:01  16:44" or similar
+        time_matches = _TIME_RE.findall(riseset_text)
+        if len(time_matches) >= 2:
+            h1, m1 = time_matches[0]
+            h2, m2 = time_matches[1]
+            rise_time = f"{h1}:{m1}:00"
+            set_time = f"{h2}:{m2}:00"
+
+    return {
+        "moon_phase": phase,
+        "illumination_percent": round(illumination, 1),
+        "moon_rise_time": rise_time,
+        "moon_set_time": set_time,
+    }
+
+
+def _bortle_data(level: Optional[int], span_text: Optional[str]) -> Dict:
+    """Build the Bortle dictionary from the class level and span text."""
+    bortle_scale = 5  # Default
+    magnitude = 0.0
+    brightness_mcd = 0.0
+    artificial_brightness = 0.0
+
+    if level is not None:
+        bortle_scale = level
+    if span_text:
+        magnitude_match = _MAGNITUDE_RE.search(span_text)
+        if magnitude_match:
+            magnitude = float(magnitude_match.group(1))
+        brightness_match = _BRIGHTNESS_RE.search(span_text)
+        if brightness_match:
+            brightness_mcd = float(brightness_match.group(1))
+        artificial_match = _ARTIFICIAL_RE.search(span_text)
+        if artificial_match:
+            artificial_brightness = float(artificial_match.group(1))
+
+    return {
+        "bortle_scale": bortle_scale,
+        "magnitude": round(magnitude, 2),
+        "brightness_mcd_m2": round(brightness_mcd, 2),
+        "artificial_brightness_ucd_m2": round(artificial_brightness, 2),
+    }
+
+
+def _minutes(hour: str, minute: str) -> int:
+    return int(hour) * 60 + int(minute)
+
+
+def _page_clock(header_text: Optional[str]) -> Dict:
+    """UTC offset (hours) and ISO date of the first forecast day from the page header."""
+    offset = start = None
+    if header_text:
+        zone_match = _TIMEZONE_RE.search(header_text)
+        if zone_match:
+            offset = float(zone_match.group(1))
+        date_match = _FORECAST_START_RE.search(header_text)
+        if date_match:
+            day, month, year = (int(v) for v in date_match.groups())
+            start = f"{year + 2000 if year < 100 else year:04d}-{month:02d}-{day:02d}"
+    return {"utc_offset_hours": offset, "start_date": start}
+
+
+def _hourly_table(days: List[Dict], header_text: Optional[str] = None) -> Dict:
+    """Flatten the per-day forecast blocks into JSON-ready hourly columns."""
+    table_days = []
+    for day in days:
+        hours = [h for h in day["hours"] if h is not None]
+        moon = day["moon"]
+        illumination = None
+        if moon.get("fc_moon_percentage"):
+            percent_match = _PERCENT_RE.search(moon["fc_moon_percentage"])
+            if percent_match:
+                illumination = float(percent_match.group(1))
+        rise = set_ = None
+        time_matches = _TIME_RE.findall(moon.get("fc_moon_riseset") or "")
+        if len(time_matches) >= 2:
+            rise = _minutes(*time_matches[0])
+            set_ = _minutes(*time_matches[1])
+
+        record = {
+            "date": day["date"],
+            "hours": hours,
+            "darkness": day["darkness"],
+            "moon_illumination": illumination,
+            "moon_rise": rise,
+            "moon_set": set_,
+        }
+        for name, values in day["rows"].items():
+            # Rows are aligned with the hour labels; blanks become 0
+            record[name] = [v if v is not None else 0 for v in values[:len(hours)]]
+        table_days.append(record)
+    return {"days": table_days, **_page_clock(header_text)}
+
+
+def extract_forecast_fields(html: str) -> Dict:
+    """
+    Extract cloudiness, moon and Bortle fields from a forecast page in one pass.
+
+    Args:
+        html: Raw ClearOutside forecast page
+
+    Returns:
+        Dictionary with "cloudiness_percent" (int), "moon" and "bortle"
+        dictionaries shaped like the weather service results (without source),
+        and "hourly", the per-day hourly forecast table with the page's UTC
+        offset and first forecast date (None when the page omits them)
+    """
+    scanner = _ForecastPageScanner()
+    scanner.feed(html)
+    scanner.close()
+    return {
+        "cloudiness_percent": scanner.cloudiness_percent(),
+        "moon": _moon_data(
+            scanner.moon_text["fc_moon_phase"],
+            scanner.moon_text["fc_moon_percentage"],
+            scanner.moon_text["fc_moon_riseset"],
+        ),
+        "bortle": _bortle_data(scanner.bortle_level, scanner.bortle_text),
+        "hourly": _hourly_table(scanner.days, scanner.header_text),
+    }
+
+
+def extract_forecast_fields_beautifulsoup(html: str) -> Dict:
+    """
+    Reference extraction using a full BeautifulSoup tree.
+
+    This is the original tree-search implementation, kept to check parity
+    and to benchmark the streaming extractor against.
+
+    Args:
+        html: Raw ClearOutside forecast page
+
+    Returns:
+        Same structure as extract_forecast_fields, without the hourly table
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    cloudiness = None
+    for element in soup.find_all(string=_CLOUD_RE):
+        parent = element.parent
+        if parent:
+            cloudiness = _first_valid_percent(parent.get_text())
+            if cloudiness is not None:
+                break
+    if cloudiness is None:
+        for cell in soup.find_all(['td', 'div'], class_=_CLOUD_CLASS_RE):
+            cloudiness = _first_valid_percent(cell.get_text())
+            if cloudiness is not None:
+                break
+    if cloudiness is None:
+        cloudiness = DEFAULT_CLOUDINESS_PERCENT
+
+    phase_text = percent_text = riseset_text = None
+    moon_div = soup.find('div', class_='fc_moon')
+    if moon_div:
+        phase_span = moon_div.find('span', class_='fc_moon_phase')
+        if phase_span:
+            phase_text = phase_span.get_text(strip=True)
+        percent_span = moon_div.find('span', class_='fc_moon_percentage')
+        if percent_span:
+            percent_text = percent_span.get_text(strip=True)
+        riseset_span = moon_div.find('span', class_='fc_moon_riseset')
+        if riseset_span:
+            riseset_text = riseset_span.get_text()
+
+    level = None
+    span_text = None
+    bortle_span = soup.find('span', class_=re.compile(r'btn-bortle-\d'))
+    if bortle_span:
+        for cls in bortle_span.get('class', []):
+            match = _BORTLE_CLASS_RE.search(cls)
+            if match:
+                level = int(match.group(1))
+                break
+        span_text = bortle_span.get_text()
+
+    return {
+        "cloudiness_percent": cloudiness,
+        "moon": _moon_data(phase_text, percent_text, riseset_text),
+        "bortle": _bortle_data(level, span_text),
+    }
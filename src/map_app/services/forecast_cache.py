@@ -0,0 +1,290 @@
+"""Persistent forecast cache shared across processes and restarts.
+
+Parsed weather results are stored in a SQLite file keyed by a coordinate
+grid cell instead of exact floats, so nearby searches share one scrape and
+every worker process on the node (and every restart) starts warm.
+"""
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from config import (
+    FORECAST_CACHE_PATH,
+    FORECAST_GRID_DEGREES,
+    CLOUDINESS_TTL_SECONDS,
+    BORTLE_TTL_SECONDS,
+    MOON_TTL_SECONDS,
+    FORECAST_STALE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Time-to-live per cached field, matching the previous st.cache_data TTLs
+DEFAULT_FIELD_TTLS = {
+    "cloudiness": CLOUDINESS_TTL_SECONDS,
+    "bortle": BORTLE_TTL_SECONDS,
+    "moon": MOON_TTL_SECONDS,
+    "hourly": CLOUDINESS_TTL_SECONDS,
+}
+
+# How long a process may hold the refresh lease for a stale entry
+REFRESH_LEASE_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast (
+    field TEXT NOT NULL,
+    grid REAL NOT NULL,
+    cell_lat INTEGER NOT NULL,
+    cell_lon INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (field, grid, cell_lat, cell_lon)
+)
+"""
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """A cached forecast value and its freshness."""
+
+    value: Dict
+    fetched_at: float
+    age_seconds: float
+    is_stale: bool
+
+
+def is_cacheable(value: Dict) -> bool:
+    """Only keep real, current results; fallbacks and stale values would hide upstream recovery."""
+    return value.get("source") != "fallback" and not value.get("stale")
+
+
+def quantize_coordinates(
+    latitude: float, longitude: float, grid_degrees: float = FORECAST_GRID_DEGREES
+) -> Tuple[float, float]:
+    """
+    Snap a coordinate to the center of its forecast grid cell.
+
+    Args:
+        latitude: Latitude coordinate (-90 to 90)
+        longitude: Longitude coordinate (-180 to 180)
+        grid_degrees: Grid cell size in degrees
+
+    Returns:
+        (latitude, longitude) of the grid point shared by the whole cell
+    """
+    return (
+        round(math.floor(latitude / grid_degrees + 0.5) * grid_degrees, 6),
+        round(math.floor(longitude / grid_degrees + 0.5) * grid_degrees, 6),
+    )
+
+
+class ForecastCache:
+    """SQLite-backed forecast cache with grid snapping and stale-while-revalidate."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        grid_degrees: Optional[float] = None,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite file path (defaults to FORECAST_CACHE_PATH)
+            grid_degrees: Grid cell size in degrees used to snap coordinates
+            ttls: Per-field time-to-live in seconds
+            stale_seconds: Grace period during which expired entries are still
+                served while a background refresh runs
+            clock: Time source, injectable for tests
+        """
+        self.path = path or FORECAST_CACHE_PATH
+        self.grid_degrees = float(grid_degrees or FORECAST_GRID_DEGREES)
+        self.ttls = {**DEFAULT_FIELD_TTLS, **(ttls or {})}
+        self.stale_seconds = FORECAST_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self._clock = clock
+        self._local = threading.local()
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh_thread: Optional[threading.Thread] = None
+        self._connect().execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            # WAL lets readers in other processes proceed while one process writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Return integer grid cell indices for a coordinate."""
+        return (
+            int(math.floor(latitude / self.grid_degrees + 0.5)),
+            int(math.floor(longitude / self.grid_degrees + 0.5)),
+        )
+
+    def quantize(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        """Snap a coordinate to the center of its grid cell (see quantize_coordinates)."""
+        return quantize_coordinates(latitude, longitude, self.grid_degrees)
+
+    def get(
+        self, field: str, latitude: float, longitude: float, allow_expired: bool = False
+    ) -> Optional[CacheEntry]:
+        """
+        Look up a cached field for the grid cell containing a coordinate.
+
+        Args:
+            field: Field name
+            latitude: Latitude coordinate (-90 to 90)
+            longitude: Longitude coordinate (-180 to 180)
+            allow_expired: Also return entries older than TTL plus grace period
+
+        Returns:
+            CacheEntry, or None when missing or older than TTL plus grace period
+        """
+        cell_lat, cell_lon = self._cell(latitude, longitude)
+        row = self._connect().execute(
+            "SELECT payload, fetched_at FROM forecast "
+            "WHERE field = ? AND grid = ? AND cell_lat = ? AND cell_lon = ?",
+            (field, self.grid_degrees, cell_lat, cell_lon),
+        ).fetchone()
+        if row is None:
+            return None
+
+        payload, fetched_at = row
+        age = self._clock() - fetched_at
+        ttl = self.ttls.get(field, CLOUDINESS_TTL_SECONDS)
+        if age > ttl + self.stale_seconds and not allow_expired:
+            return None
+        return CacheEntry(
+            value=json.loads(payload),
+            fetched_at=fetched_at,
+            age_seconds=age,
+            is_stale=age > ttl,
+        )
+
+    def set(self, field: str, latitude: float, longitude: float, value: Dict) -> None:
+        """Store a field for the grid cell containing a coordinate."""
+        cell_lat, cell_lon = self._cell(latitude, longitude)
+        self._connect().execute(
+            "INSERT OR REPLACE INTO forecast "
+            "(field, grid, cell_lat, cell_lon, payload, fetched_at, lease_until) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0)",
+            (field, self.grid_degrees, cell_lat, cell_lon, json.dumps(value), self._clock()),
+        )
+
+    def get_or_fetch(
+        self,
+        field: str,
+        latitude: float,
+        longitude: float,
+        fetch: Callable[[float, float], Dict],
+    ) -> Dict:
+        """
+        Return a cached field, fetching it at the snapped grid point on a miss.
+
+        Fresh entries are returned directly. Stale entries (past TTL but within
+        the grace period) are returned immediately while a single background
+        refresh runs. Fallback results are never persisted; when the fetch
+        falls back (upstream down or circuit open) an expired entry, if any,
+        is returned instead, marked with "stale": True.
+
+        Args:
+            field: Field name ("cloudiness", "bortle", "moon" or "hourly")
+            latitude: Latitude coordinate (-90 to 90)
+            longitude: Longitude coordinate (-180 to 180)
+            fetch: Callable taking snapped (latitude, longitude) and returning the field
+
+        Returns:
+            Field dictionary
+        """
+        entry = self.get(field, latitude, longitude)
+        if entry is not None:
+            if entry.is_stale:
+                self._refresh_in_background(field, latitude, longitude, fetch)
+            return entry.value
+
+        grid_lat, grid_lon = self.quantize(latitude, longitude)
+        value = fetch(grid_lat, grid_lon)
+        if is_cacheable(value):
+            self.set(field, latitude, longitude, value)
+            return value
+
+        expired = self.get(field, latitude, longitude, allow_expired=True)
+        if expired is not None:
+            return {**expired.value, "stale": True}
+        return value
+
+    def _acquire_lease(self, field: str, latitude: float, longitude: float) -> bool:
+        """Claim the refresh of a stale entry so only one process revalidates it."""
+        cell_lat, cell_lon = self._cell(latitude, longitude)
+        now = self._clock()
+        cursor = self._connect().execute(
+            "UPDATE forecast SET lease_until = ? "
+            "WHERE field = ? AND grid = ? AND cell_lat = ? AND cell_lon = ? AND lease_until < ?",
+            (now + REFRESH_LEASE_SECONDS, field, self.grid_degrees, cell_lat, cell_lon, now),
+        )
+        return cursor.rowcount == 1
+
+    def _refresh_in_background(
+        self,
+        field: str,
+        latitude: float,
+        longitude: float,
+        fetch: Callable[[float, float], Dict],
+    ) -> None:
+        """Start a daemon thread that revalidates a stale entry."""
+        key = (field, self._cell(latitude, longitude))
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            if not self._acquire_lease(field, latitude, longitude):
+                return
+            self._refreshing.add(key)
+
+        def _refresh() -> None:
+            try:
+                grid_lat, grid_lon = self.quantize(latitude, longitude)
+                value = fetch(grid_lat, grid_lon)
+                if is_cacheable(value):
+                    self.set(field, latitude, longitude, value)
+            except Exception as e:
+                logger.warning(f"Background refresh of {field} failed: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        thread = threading.Thread(target=_refresh, name=f"forecast-refresh-{field}", daemon=True)
+        thread.start()
+        self._last_refresh_thread = thread
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        self._connect().execute("DELETE FROM forecast")
+
+
+_forecast_cache: Optional[ForecastCache] = None
+_forecast_cache_lock = threading.Lock()
+
+
+def get_forecast_cache() -> ForecastCache:
+    """Return the process-wide forecast cache, opening it on first use."""
+    global _forecast_cache
+    if _forecast_cache is None:
+        with _forecast_cache_lock:
+            if _forecast_cache is None:
+                _forecast_cache = ForecastCache()
+    return _forecast_cache
@@ -0,0 +1,149 @@
+"""Process-wide memory budget shared by the in-process caches.
+
+Each cache enforces its own entry and byte limits, but a process holds many
+of them: decoded region maps (hundreds of MB each), parsed forecast pages,
+service results, rendered maps and the observation dataset. The governor
+keeps their combined size within ``MEMORY_BUDGET_BYTES``. After every insert
+into a registered cache it evicts the least recently used entry across all
+registered caches until the total fits, so a region map nobody has searched
+in a while goes before this minute's forecast page.
+
+Memory that cannot be evicted (the Bortle model) is registered as a usage
+probe: it counts toward the budget and shows in the report.
+
+Without a budget (the default) nothing is evicted beyond the caches' own
+limits, but usage is still reported per cache.
+"""
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import MEMORY_BUDGET_BYTES
+from services.bounded_cache import BoundedLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryGovernor:
+    """Keeps the registered caches' combined size within one budget."""
+
+    def __init__(self, budget_bytes: Optional[int] = MEMORY_BUDGET_BYTES):
+        """
+        Args:
+            budget_bytes: Memory allowed across the registered caches and
+                probes (None only accounts, never evicts)
+        """
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        # Caches are held weakly: registering must not keep a finder alive
+        self._caches: List[Tuple[str, "weakref.ref[BoundedLRUCache]"]] = []
+        self._probes: Dict[str, Callable[[], int]] = {}
+        self._evictions: Dict[str, int] = {}
+        self._evicted_bytes: Dict[str, int] = {}
+        self._over_budget_warned = False
+
+    def register(self, name: str, cache: BoundedLRUCache) -> BoundedLRUCache:
+        """
+        Count a cache toward the budget and let the governor evict from it.
+
+        Args:
+            name: Label in the usage report; caches may share one (e.g. every
+                finder's region maps)
+            cache: The cache
+
+        Returns:
+            The same cache, for chaining
+        """
+        with self._lock:
+            self._caches = [(label, ref) for label, ref in self._caches if ref() is not None]
+            self._caches.append((name, weakref.ref(cache)))
+        cache.governor = self
+        self.enforce()
+        return cache
+
+    def register_usage(self, name: str, probe: Callable[[], int]) -> None:
+        """Count memory that cannot be evicted (returned in bytes by probe) toward the budget."""
+        with self._lock:
+            self._probes[name] = probe
+
+    def _live_caches(self) -> List[Tuple[str, BoundedLRUCache]]:
+        caches = [(name, ref()) for name, ref in self._caches]
+        return [(name, cache) for name, cache in caches if cache is not None]
+
+    def enforce(self) -> int:
+        """
+        Evict least recently used entries across caches until within budget.
+
+        Returns:
+            Bytes freed
+        """
+        if self.budget_bytes is None:
+            return 0
+        with self._lock:
+            caches = self._live_caches()
+            total = sum(cache.nbytes for _, cache in caches) + sum(probe() for probe in self._probes.values())
+            freed = 0
+            while total > self.budget_bytes:
+                candidates = [(cache.oldest_access(), name, cache) for name, cache in caches]
+                candidates = [candidate for candidate in candidates if candidate[0] is not None]
+                if not candidates:
+                    if not self._over_budget_warned:
+                        logger.warning(
+                            f"Resident memory ({total} bytes) exceeds the {self.budget_bytes} byte budget "
+                            "with every cache empty"
+                        )
+                        self._over_budget_warned = True
+                    break
+                _, name, cache = min(candidates, key=lambda candidate: candidate[0])
+                size = cache.evict_oldest()
+                self._evictions[name] = self._evictions.get(name, 0) + 1
+                self._evicted_bytes[name] = self._evicted_bytes.get(name, 0) + size
+                logger.debug(f"Memory budget: evicted {size} bytes from {name}")
+                total -= size
+                freed += size
+            return freed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the budget report.
+
+        Returns:
+            Dictionary with budget_bytes, used_bytes and caches: per name
+            bytes, entries (None for probes), and the evictions and
+            evicted_bytes the governor caused
+        """
+        with self._lock:
+            caches: Dict[str, Dict[str, Any]] = {}
+            for name, cache in self._live_caches():
+                report = caches.setdefault(name, {"bytes": 0, "entries": 0})
+                report["bytes"] += cache.nbytes
+                report["entries"] += len(cache)
+            for name, probe in self._probes.items():
+                caches.setdefault(name, {"bytes": 0, "entries": None})["bytes"] += probe()
+            for name, report in caches.items():
+                report["evictions"] = self._evictions.get(name, 0)
+                report["evicted_bytes"] = self._evicted_bytes.get(name, 0)
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": sum(report["bytes"] for report in caches.values()),
+                "caches": caches,
+            }
+
+
+_governor = MemoryGovernor()
+
+
+def get_memory_governor() -> MemoryGovernor:
+    """Return the process-wide governor."""
+    return _governor
+
+
+def register_cache(name: str, cache: BoundedLRUCache) -> BoundedLRUCache:
+    """Register a cache with the process-wide governor; returns the cache."""
+    return _governor.register(name, cache)
+
+
+def get_memory_usage() -> Dict[str, Any]:
+    """Return the process-wide budget report (see MemoryGovernor.stats)."""
+    return _governor.stats()
@@ -0,0 +1,282 @@
+"""Concurrent collection of the location metrics shown in the sidebar.
+
+Each metric comes from a different source: the light pollution maps, the
+ClearOutside forecast (cloudiness, moon, Bortle class) and the Bortle model.
+``MetricsAggregator`` starts them all at once on a shared thread pool and
+yields each result as it arrives, so a search waits for the slowest source
+rather than the sum of all of them, and the page can show every value as soon
+as its source answers.
+
+Sources still running when the shared deadline passes are reported with their
+fallback value. They are not cancelled: their result still lands in the
+service caches, so the next search at that location gets the real value.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from config import METRICS_DEADLINE_SECONDS, METRICS_MAX_WORKERS
+from models.ephemeris import get_moon_summary
+from models.optimal_locations import OptimalLocationFinder
+from services.single_flight import SingleFlight
+from services.visibility_service import get_sky_visibility
+from services.weather_service import get_bortle_scale, get_cloudiness, get_moon_brightness
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+@dataclass(frozen=True)
+class MetricSource:
+    """A named metric fetcher and the values used when it fails or is late."""
+
+    name: str
+    fetch: Callable[[float, float], Dict[str, Any]]
+    fallback: Callable[[float, float], Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class SourceResult:
+    """What one source produced for a location, where it came from and how long it took."""
+
+    name: str
+    values: Dict[str, Any]
+    source: str  # Provenance reported by the service, or "fallback"
+    status: str  # OK, TIMEOUT or ERROR
+    elapsed_ms: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Provenance summary (without the values) for display."""
+        return {"source": self.source, "status": self.status, "elapsed_ms": round(self.elapsed_ms, 1)}
+
+
+class MetricsAggregator:
+    """Run metric sources concurrently under one shared deadline."""
+
+    def __init__(
+        self,
+        sources: Iterable[MetricSource],
+        deadline_seconds: float = METRICS_DEADLINE_SECONDS,
+        max_workers: int = METRICS_MAX_WORKERS,
+    ):
+        """
+        Args:
+            sources: Metric sources queried for every location
+            deadline_seconds: Time allowed for all sources together
+            max_workers: Source calls running at once
+        """
+        self.sources: List[MetricSource] = list(sources)
+        self.deadline_seconds = deadline_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metrics")
+        # Sessions searching the same place share one call per source
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, float]] = {
+            source.name: {OK: 0, TIMEOUT: 0, ERROR: 0, "total_ms": 0.0} for source in self.sources
+        }
+
+    def _fetch(self, source: MetricSource, latitude: float, longitude: float) -> Dict[str, Any]:
+        """Run one source (on a worker thread), returning its values and timing."""
+        started = time.perf_counter()
+        values = self._flight.do(
+            (source.name, round(latitude, 6), round(longitude, 6)),
+            lambda: source.fetch(latitude, longitude),
+        )
+        return {"values": values, "elapsed_ms": (time.perf_counter() - started) * 1000.0}
+
+    def _fallback(
+        self, source: MetricSource, latitude: float, longitude: float, status: str, elapsed_ms: float
+    ) -> SourceResult:
+        try:
+            values = source.fallback(latitude, longitude)
+        except Exception as exc:  # noqa: BLE001 - a broken fallback must not break the page
+            logger.error(f"Fallback for metric source {source.name} failed: {exc}")
+            values = {}
+        return SourceResult(source.name, dict(values), values.get("source", "fallback"), status, elapsed_ms)
+
+    def _result(
+        self, source: MetricSource, future: Future, latitude: float, longitude: float, started: float
+    ) -> SourceResult:
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"Metric source {source.name} failed: {error}")
+            return self._fallback(source, latitude, longitude, ERROR, (time.perf_counter() - started) * 1000.0)
+        outcome = future.result()
+        values = dict(outcome["values"])
+        return SourceResult(source.name, values, values.get("source", source.name), OK, outcome["elapsed_ms"])
+
+    def _record(self, result: SourceResult) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(result.name, {OK: 0, TIMEOUT: 0, ERROR: 0, "total_ms": 0.0})
+            counts[result.status] += 1
+            counts["total_ms"] += result.elapsed_ms
+
+    def iter_results(
+        self, latitude: float, longitude: float, deadline_seconds: Optional[float] = None
+    ) -> Iterator[SourceResult]:
+        """
+        Query every source at once and yield each result as soon as it is ready.
+
+        Args:
+            latitude: Latitude coordinate (-90 to 90)
+            longitude: Longitude coordinate (-180 to 180)
+            deadline_seconds: Override of the shared deadline for this call
+
+        Yields:
+            SourceResult for every source, in completion order; sources that
+            missed the deadline come last with their fallback values
+        """
+        budget = self.deadline_seconds if deadline_seconds is None else deadline_seconds
+        started = time.perf_counter()
+        deadline = started + budget
+        futures = {
+            self._executor.submit(self._fetch, source, latitude, longitude): source for source in self.sources
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                result = self._result(futures[future], future, latitude, longitude, started)
+                self._record(result)
+                yield result
+
+        for future in pending:
+            source = futures[future]
+            logger.warning(f"Metric source {source.name} missed the {budget:.1f}s deadline, using fallback")
+            result = self._fallback(source, latitude, longitude, TIMEOUT, (time.perf_counter() - started) * 1000.0)
+            self._record(result)
+            yield result
+
+    def collect(self, latitude: float, longitude: float) -> Dict[str, SourceResult]:
+        """Query every source and return all results by source name."""
+        return {result.name: result for result in self.iter_results(latitude, longitude)}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-source counts of ok/timeout/error results and the average time."""
+        with self._lock:
+            stats = {}
+            for name, counts in self._counts.items():
+                calls = counts[OK] + counts[TIMEOUT] + counts[ERROR]
+                stats[name] = {
+                    OK: counts[OK],
+                    TIMEOUT: counts[TIMEOUT],
+                    ERROR: counts[ERROR],
+                    "avg_ms": counts["total_ms"] / calls if calls else None,
+                }
+            return stats
+
+
+def merge_result(metrics: Dict[str, Any], result: SourceResult) -> Dict[str, Any]:
+    """
+    Return metrics with one source's values and provenance filled in.
+
+    Args:
+        metrics: Metrics collected so far (not modified)
+        result: Result of one source
+
+    Returns:
+        Dict: New metrics dict; provenance is kept under "sources"
+    """
+    values = {key: value for key, value in result.values.items() if key != "source"}
+    return {
+        **metrics,
+        **values,
+        "sources": {**metrics.get("sources", {}), result.name: result.to_dict()},
+    }
+
+
+# Sources of the sidebar metrics
+
+# One finder per process, so each region's PNG is decoded only once
+_finder = OptimalLocationFinder()
+
+
+def _light_pollution(latitude: float, longitude: float) -> Dict[str, Any]:
+    level = _finder.get_light_pollution_at(latitude, longitude)
+    return {"light_pollution_index": level, "source": "light_pollution_map"}
+
+
+def _cloudiness(latitude: float, longitude: float) -> Dict[str, Any]:
+    data = get_cloudiness(latitude, longitude)
+    return {
+        "cloudiness_percent": data.get("cloudiness_percent"),
+        "forecast_description": data.get("forecast_description"),
+        "source": data.get("source", "clearoutside"),
+    }
+
+
+def _moon_values(data: Dict[str, Any], source: str) -> Dict[str, Any]:
+    return {
+        "moon_brightness": data.get("illumination_percent"),
+        "moon_phase": data.get("moon_phase"),
+        "moon_rise_time": data.get("moon_rise_time"),
+        "moon_set_time": data.get("moon_set_time"),
+        "moon_time_zone": data.get("time_zone"),
+        "source": data.get("source", source),
+    }
+
+
+def _moon(latitude: float, longitude: float) -> Dict[str, Any]:
+    return _moon_values(get_moon_brightness(latitude, longitude), "clearoutside")
+
+
+def _moon_ephemeris(latitude: float, longitude: float) -> Dict[str, Any]:
+    return _moon_values(get_moon_summary(latitude, longitude), "ephemeris")
+
+
+def _bortle(latitude: float, longitude: float) -> Dict[str, Any]:
+    data = get_bortle_scale(latitude, longitude)
+    return {
+        "bortle_score": data.get("bortle_scale"),
+        "sky_brightness_mag": data.get("magnitude"),
+        "source": data.get("source", "clearoutside"),
+    }
+
+
+def _sky_visibility(latitude: float, longitude: float) -> Dict[str, Any]:
+    data = get_sky_visibility(latitude, longitude)
+    return {
+        "sky_quality": data.get("sky_quality"),
+        "visibility_score": data.get("visibility_score"),
+        "predicted_bortle": data.get("bortle_scale"),
+        "source": data.get("source", "bortle_model"),
+    }
+
+
+def _unavailable(*fields: str) -> Callable[[float, float], Dict[str, Any]]:
+    """Fallback that reports the fields as unavailable."""
+    return lambda latitude, longitude: {**{field: None for field in fields}, "source": "fallback"}
+
+
+def location_metric_sources() -> List[MetricSource]:
+    """The sources behind the sidebar metrics, in display order."""
+    return [
+        MetricSource("light_pollution", _light_pollution, _unavailable("light_pollution_index")),
+        MetricSource("bortle", _bortle, _unavailable("bortle_score", "sky_brightness_mag")),
+        MetricSource("sky_visibility", _sky_visibility, _unavailable("sky_quality", "visibility_score", "predicted_bortle")),
+        MetricSource("cloudiness", _cloudiness, _unavailable("cloudiness_percent", "forecast_description")),
+        # The moon is computable offline, so a late forecast costs nothing
+        MetricSource("moon", _moon, _moon_ephemeris),
+    ]
+
+
+_aggregator: Optional[MetricsAggregator] = None
+_aggregator_lock = threading.Lock()
+
+
+def get_metrics_aggregator() -> MetricsAggregator:
+    """Return the process-wide aggregator of the sidebar's location metrics."""
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = MetricsAggregator(location_metric_sources())
+        return _aggregator
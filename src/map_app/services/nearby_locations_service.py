@@ -4,11 +4,16 @@ This module provides functionality to search for actual observation locations
 within a radius of a target point, using the GaN2024_Modified.csv dataset.
 """
 
-import pandas as pd
+import numpy as np
 import math
 import logging
-from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Mapping, Optional
+
+from models import scoring
+from models.ephemeris import annotate_locations
+from models.optimal_locations import SHORTLIST_FACTOR
+from services.observation_points import load_observation_points, points_in_bounds
+from utils.instrumentation import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -41,26 +46,109 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return R * c
 
 
+def haversine_distances(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Vectorized haversine_distance from one point to arrays of points.
+    
+    Args:
+        lat1, lon1: Reference point coordinates
+        lat2, lon2: Arrays of point coordinates
+    
+    Returns:
+        Array of distances in kilometers
+    """
+    lat1_rad = math.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    delta_lat = lat2_rad - lat1_rad
+    delta_lon = np.radians(lon2 - lon1)
+    a = np.sin(delta_lat / 2) ** 2 + math.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon / 2) ** 2
+    return 6371 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _search_box(latitude: float, longitude: float, max_km: float) -> tuple:
+    """(south, west, north, east) box holding every point within max_km of a coordinate."""
+    # A degree of latitude is at least 111 km, and a degree of longitude
+    # 111 km times the cosine of the latitude
+    lat_band = max_km / 111.0
+    cos_lat = math.cos(math.radians(min(abs(latitude) + lat_band, 90.0)))
+    lon_band = max_km / (111.0 * cos_lat) if cos_lat > 1e-6 else 360.0
+    west, east = longitude - lon_band, longitude + lon_band
+    if east - west >= 360.0:
+        west, east = -180.0, 180.0
+    return latitude - lat_band, west, latitude + lat_band, east
+
+
+def nearest_observations(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    max_km: float,
+    csv_path: Optional[str] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Nearest observation to each of many points, within max_km.
+
+    Uses the shared latitude-sorted columns of load_observation_points: each
+    point only measures the observations in its bounding box (points_in_bounds),
+    then keeps the closest by haversine distance.
+
+    Args:
+        latitudes: Point latitudes, shape (N,)
+        longitudes: Point longitudes, shape (N,)
+        max_km: Observations farther than this are ignored
+        csv_path: Path to CSV file (optional, defaults to GaN2024_Modified.csv in assets)
+
+    Returns:
+        Dictionary of (N,) arrays: distance_km, limiting_mag and cloud_cover
+        of the nearest observation (NaN where none is within max_km)
+    """
+    points = load_observation_points(csv_path)
+    lat = np.asarray(latitudes, dtype=float)
+    lon = np.asarray(longitudes, dtype=float)
+
+    results = {column: np.full(lat.shape, np.nan) for column in ('distance_km', 'limiting_mag', 'cloud_cover')}
+    for i in range(len(lat)):
+        box = points_in_bounds(points, *_search_box(lat[i], lon[i], max_km))
+        if not len(box):
+            continue
+        distances = haversine_distances(lat[i], lon[i], box.latitude, box.longitude)
+        closest = int(distances.argmin())
+        if distances[closest] <= max_km:
+            results['distance_km'][i] = distances[closest]
+            results['limiting_mag'][i] = box.limiting_mag[closest]
+            results['cloud_cover'][i] = box.cloud_cover[closest]
+    return results
+
+
+@traced("nearby.find_nearby_observation_locations")
 def find_nearby_observation_locations(
     latitude: float,
     longitude: float,
     radius_km: float,
     csv_path: Optional[str] = None,
-    top_n: int = 10
+    top_n: int = 10,
+    rank_by: str = "distance",
+    cloud_percent: Optional[float] = None,
+    weights: Optional[Mapping[str, float]] = None,
 ) -> List[Dict]:
     """
     Find actual observation locations near target coordinates from CSV dataset.
     
+    Every location is scored by models.scoring on its distance, its observed
+    limiting magnitude and tonight's moon (plus cloud cover when given).
+    
     Args:
         latitude: Target latitude
         longitude: Target longitude
         radius_km: Search radius in kilometers
         csv_path: Path to CSV file (optional, defaults to GaN2024_Modified.csv in assets)
         top_n: Maximum number of locations to return (default: 10)
+        rank_by: "distance" (closest first) or "score" (best first)
+        cloud_percent: Forecast cloud cover for the area (0-100), if known
+        weights: Criterion weights (defaults to config SCORING_WEIGHTS)
     
     Returns:
-        List of dictionaries with location info, sorted by distance (closest first).
-        Each dictionary contains:
+        List of dictionaries with location info, sorted by distance (closest
+        first) or by score. Each dictionary contains:
         - name: Location description (based on distance)
         - latitude: Location latitude
         - longitude: Location longitude
@@ -71,71 +159,83 @@ def find_nearby_observation_locations(
         - conditions: Brief description
         - bortle_score: (backward-compatible, same as light_pollution_index)
         - cloudiness_percent: (backward-compatible, same as cloud_cover)
-        - moon_brightness: (backward-compatible, always 0)
+        - moon_brightness: Moon illumination percent tonight (local ephemeris)
+        - moon_phase, dark_hours, moon_free_dark_hours: Tonight's sky at the site
+        - score: Stargazing score (0-1, higher is better)
+    
+    Raises:
+        ValueError: If rank_by is not "distance" or "score", the weights are
+            invalid, or the dataset is malformed
+        OSError: If the dataset cannot be read
     """
-    try:
-        # Default path to CSV in assets folder
-        if csv_path is None:
-            script_dir = Path(__file__).resolve().parent
-            csv_path = str(script_dir.parent / "models" / "assets" / "GaN2024_Modified.csv")
-        
-        # Load the CSV
-        logger.info(f"Loading observation data from: {csv_path}")
-        df = pd.read_csv(csv_path)
-        
-        # Calculate distances
-        logger.info(f"Calculating distances from ({latitude}, {longitude})...")
-        df['distance_km'] = df.apply(
-            lambda row: haversine_distance(
-                latitude, longitude, row['Latitude'], row['Longitude']
-            ),
-            axis=1
-        )
+    if rank_by not in ("distance", "score"):
+        raise ValueError(f"rank_by must be 'distance' or 'score', got {rank_by!r}")
+    scoring.validate_weights(weights)
+
+    # Shared columns (loaded once per process); only the radius' bounding box is measured
+    points = load_observation_points(csv_path)
+    
+    # Calculate distances
+    logger.info(f"Calculating distances from ({latitude}, {longitude})...")
+    with span("nearby.distances"):
+        box = points_in_bounds(points, *_search_box(latitude, longitude, radius_km))
+        distances = haversine_distances(latitude, longitude, box.latitude, box.longitude)
         
         # Filter by distance
-        nearby = df[df['distance_km'] <= radius_km].copy()
-        
-        logger.info(f"Found {len(nearby)} observation locations within {radius_km} km")
-        
-        if nearby.empty:
-            return []
-        
-        # Select relevant columns
-        columns_to_keep = [
-            'Latitude', 'Longitude', 'distance_km',
-            'LimitingMag', 'CloudCover', 'LightPollutionIndex'
-        ]
-        
-        nearby = nearby[columns_to_keep].sort_values('distance_km')
-        
-        # Limit to top_n results
-        nearby = nearby.head(top_n)
-        
-        # Convert to list of dictionaries matching optimal_locations format
-        results: List[Dict] = []
-        for idx, row in nearby.iterrows():
-            distance = round(float(row['distance_km']), 2)
-            location_dict = {
-                'name': f"{distance} km away",
-                'latitude': float(row['Latitude']),
-                'longitude': float(row['Longitude']),
-                'distance_km': distance,
-                'light_pollution_index': float(row['LimitingMag']) if pd.notna(row['LimitingMag']) else None,
-                'limiting_mag': float(row['LimitingMag']) if pd.notna(row['LimitingMag']) else None,
-                'cloud_cover': int(row['CloudCover']) if pd.notna(row['CloudCover']) else None,
-                # Backward-compatible fields used by UI components
-                'bortle_score': float(row['LimitingMag']) if pd.notna(row['LimitingMag']) else None,
-                'cloudiness_percent': int(row['CloudCover']) if pd.notna(row['CloudCover']) else 0,
-                'moon_brightness': 0,
-                'conditions': f"Observation location {distance} km from center",
-            }
-            results.append(location_dict)
-        
-        return results
-        
-    except Exception as e:
-        logger.error(f"Error finding nearby observation locations: {e}")
+        within = np.flatnonzero(distances <= radius_km)
+        nearby = box.select(within)
+        distances = distances[within]
+    
+    logger.info(f"Found {len(nearby)} observation locations within {radius_km} km")
+    
+    if not len(nearby):
         return []
+    
+    criteria = scoring.normalize_criteria(
+        distance_km=distances,
+        radius_km=radius_km,
+        cloud_percent=cloud_percent,
+        limiting_mag=nearby.limiting_mag.astype(float),
+    )
+    
+    # Limit to top_n results (a shortlist when the moon may reorder them)
+    if rank_by == "score":
+        with span("nearby.rank"):
+            selected = scoring.top_k(scoring.score(criteria, weights), top_n * SHORTLIST_FACTOR)
+    else:
+        selected = np.argsort(distances, kind='stable')[:top_n]
+    
+    # Convert to list of dictionaries matching optimal_locations format
+    results: List[Dict] = []
+    for idx in selected:
+        distance = round(float(distances[idx]), 2)
+        # Readings are stored as float32; round off the widening noise
+        limiting_mag = None if np.isnan(nearby.limiting_mag[idx]) else round(float(nearby.limiting_mag[idx]), 4)
+        cloud_cover = None if np.isnan(nearby.cloud_cover[idx]) else int(nearby.cloud_cover[idx])
+        location_dict = {
+            'name': f"{distance} km away",
+            'latitude': float(nearby.latitude[idx]),
+            'longitude': float(nearby.longitude[idx]),
+            'distance_km': distance,
+            'light_pollution_index': limiting_mag,
+            'limiting_mag': limiting_mag,
+            'cloud_cover': cloud_cover,
+            # Backward-compatible fields used by UI components
+            'bortle_score': limiting_mag,
+            'cloudiness_percent': cloud_cover if cloud_cover is not None else 0,
+            'conditions': f"Observation location {distance} km from center",
+        }
+        results.append(location_dict)
+    
+    with span("nearby.enrich"):
+        annotate_locations(results)
+    criteria = {name: values[selected] if np.ndim(values) else values for name, values in criteria.items()}
+    criteria.update(scoring.moon_criteria(results))
+    scores = scoring.score(criteria, weights)
+    order = scoring.top_k(scores, top_n) if rank_by == "score" else np.arange(len(results))
+    for idx in order:
+        results[idx]['score'] = round(float(scores[idx]), 4) if np.isfinite(scores[idx]) else None
+    return [results[idx] for idx in order]
 
 
 def _print_results(results: List[Dict]) -> None:
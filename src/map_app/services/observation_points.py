@@ -0,0 +1,158 @@
+"""Columnar access to the GaN observation dataset.
+
+The CSV is loaded once into numpy arrays sorted by latitude, so the
+observations inside a map viewport or search radius are found with a binary
+search plus one longitude mask instead of a scan over DataFrame rows. The
+map layer, the nearby search and the batch scorer all read these columns,
+so each process (and its forked workers) holds one copy, in a cache
+registered with the process memory budget.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from config import OBSERVATION_CACHE_MAX_BYTES, OBSERVATION_CACHE_MAX_ENTRIES
+from services.bounded_cache import BoundedLRUCache, memoize
+from services.memory_budget import register_cache
+from utils.instrumentation import count, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CSV_PATH = Path(__file__).resolve().parent.parent / "models" / "assets" / "GaN2024_Modified.csv"
+
+
+@dataclass(frozen=True)
+class ObservationPoints:
+    """Observation columns, sorted by latitude."""
+
+    latitude: np.ndarray  # float64 degrees
+    longitude: np.ndarray  # float64 degrees
+    limiting_mag: np.ndarray  # float32, NaN when not reported
+    cloud_cover: np.ndarray  # float32 fraction of sky, NaN when not reported
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the columns."""
+        return sum(column.nbytes for column in (self.latitude, self.longitude, self.limiting_mag, self.cloud_cover))
+
+    @classmethod
+    def from_arrays(
+        cls,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        limiting_mag: Optional[np.ndarray] = None,
+        cloud_cover: Optional[np.ndarray] = None,
+    ) -> "ObservationPoints":
+        """Build a sorted, read-only instance from unsorted columns."""
+        latitude = np.asarray(latitude, dtype=np.float64)
+        n = len(latitude)
+        columns = [
+            latitude,
+            np.asarray(longitude, dtype=np.float64),
+            np.full(n, np.nan, dtype=np.float32) if limiting_mag is None else np.asarray(limiting_mag, np.float32),
+            np.full(n, np.nan, dtype=np.float32) if cloud_cover is None else np.asarray(cloud_cover, np.float32),
+        ]
+        order = np.argsort(latitude, kind="stable")
+        sorted_columns = []
+        for column in columns:
+            column = column[order]
+            column.setflags(write=False)
+            sorted_columns.append(column)
+        return cls(*sorted_columns)
+
+    def select(self, mask_or_index: np.ndarray) -> "ObservationPoints":
+        """Return the subset at the given index array or boolean mask."""
+        return ObservationPoints(
+            self.latitude[mask_or_index],
+            self.longitude[mask_or_index],
+            self.limiting_mag[mask_or_index],
+            self.cloud_cover[mask_or_index],
+        )
+
+
+@memoize(register_cache(
+    "observation_points",
+    BoundedLRUCache(OBSERVATION_CACHE_MAX_ENTRIES, OBSERVATION_CACHE_MAX_BYTES, sizeof=lambda points: points.nbytes),
+))
+def load_observation_points(csv_path: Optional[str] = None) -> ObservationPoints:
+    """
+    Load the observation coordinates and sky readings from the GaN dataset.
+
+    Loaded once per process; under the process memory budget the columns may
+    be dropped and reloaded on the next call.
+
+    Args:
+        csv_path: Path to CSV file (optional, defaults to GaN2024_Modified.csv in assets)
+
+    Returns:
+        ObservationPoints: Columns sorted by latitude
+    """
+    csv_path = csv_path or str(DEFAULT_CSV_PATH)
+    logger.info(f"Loading observation points from: {csv_path}")
+    import pandas as pd  # Loaded with the dataset, not with the module
+
+    with span("observations.load_csv"):
+        df = pd.read_csv(
+            csv_path,
+            usecols=["Latitude", "Longitude", "LimitingMag", "CloudCover"],
+            dtype={"Latitude": np.float64, "Longitude": np.float64, "LimitingMag": np.float32, "CloudCover": np.float32},
+        )
+    count("bytes_loaded_total", os.path.getsize(csv_path), source="observation_csv")
+    df = df.dropna(subset=["Latitude", "Longitude"])
+    return ObservationPoints.from_arrays(
+        df["Latitude"].to_numpy(),
+        df["Longitude"].to_numpy(),
+        df["LimitingMag"].to_numpy(),
+        df["CloudCover"].to_numpy(),
+    )
+
+
+def points_in_bounds(
+    points: ObservationPoints,
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    max_points: Optional[int] = None,
+) -> ObservationPoints:
+    """
+    Return the observations inside a bounding box.
+
+    Boxes crossing the antimeridian (west > east) are supported. If more than
+    max_points fall inside, an evenly strided subset is returned so the
+    spatial distribution is kept.
+
+    Args:
+        points: Observations sorted by latitude
+        south, west, north, east: Box edges in degrees
+        max_points: Upper bound on the number of points returned
+
+    Returns:
+        ObservationPoints: Observations inside the box, still sorted by latitude
+    """
+    start = int(np.searchsorted(points.latitude, south, side="left"))
+    stop = int(np.searchsorted(points.latitude, north, side="right"))
+    longitude = points.longitude[start:stop]
+    if east - west >= 360.0:
+        inside = np.ones(len(longitude), dtype=bool)
+    else:
+        # Leaflet reports longitudes beyond +/-180 once the map wraps around
+        west = (west + 180.0) % 360.0 - 180.0
+        east = (east + 180.0) % 360.0 - 180.0
+        if west <= east:
+            inside = (longitude >= west) & (longitude <= east)
+        else:
+            inside = (longitude >= west) | (longitude <= east)
+
+    index = start + np.flatnonzero(inside)
+    if max_points is not None and len(index) > max_points:
+        index = index[np.linspace(0, len(index) - 1, max_points).astype(np.int64)]
+    return points.select(index)
@@ -0,0 +1,123 @@
+"""Plan which candidate site to visit on which night of the coming week.
+
+Takes the result lists of the finder or the nearby service, fetches one
+cached hourly forecast per forecast cell the sites fall in, and ranks the
+best (site, night, window) combinations with models.night_planner.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+from config import OBSERVING_WINDOW_HOURS, PLANNER_FETCH_THREADS, PLANNER_FORECAST_GRID_DEGREES, PLANNER_NIGHTS
+from models import scoring
+from models.ephemeris import DateLike
+from models.night_planner import build_sky_matrix, plan_windows
+from models.observing_windows import HourlyForecast
+from services.forecast_cache import quantize_coordinates
+from services.weather_service import get_hourly_forecast
+from utils.instrumentation import span, traced
+
+logger = logging.getLogger(__name__)
+
+# Site fields copied into each plan
+_SITE_FIELDS = ("name", "latitude", "longitude", "distance_km", "light_pollution_index", "limiting_mag")
+
+
+def site_criteria(locations: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Per-site scoring criteria from finder or nearby result dictionaries.
+
+    Nearby results repeat their limiting magnitude in light_pollution_index,
+    so that field is read as a pollution level only for finder results
+    (those without limiting_mag).
+
+    Args:
+        locations: Result dictionaries with latitude and longitude
+
+    Returns:
+        Criteria arrays, shape (len(locations),), NaN where a site lacks the figure
+    """
+    def column(key: str, skip_nearby: bool = False) -> np.ndarray:
+        values = [
+            np.nan if loc.get(key) is None or (skip_nearby and "limiting_mag" in loc) else loc[key]
+            for loc in locations
+        ]
+        return np.asarray(values, dtype=float)
+
+    distances = column("distance_km")
+    farthest = np.nanmax(distances) if np.isfinite(distances).any() else 0.0
+    return scoring.normalize_criteria(
+        light_pollution=column("light_pollution_index", skip_nearby=True),
+        distance_km=distances if farthest > 0 else None,
+        radius_km=farthest or None,
+        limiting_mag=column("limiting_mag"),
+    )
+
+
+def _fetch_forecasts(cells: List[tuple]) -> List[HourlyForecast]:
+    """Hourly forecasts for grid cells, fetched concurrently (each is cached for an hour)."""
+    with ThreadPoolExecutor(max_workers=PLANNER_FETCH_THREADS, thread_name_prefix="planner-forecast") as pool:
+        pages = list(pool.map(lambda cell: get_hourly_forecast(*cell), cells))
+    return [HourlyForecast.from_dict(page) for page in pages]
+
+
+@traced("planner.plan_observing_nights")
+def plan_observing_nights(
+    locations: List[Dict],
+    nights: int = PLANNER_NIGHTS,
+    window_hours: int = OBSERVING_WINDOW_HOURS,
+    top_k: int = 10,
+    weights: Optional[Mapping[str, float]] = None,
+    start: Optional[DateLike] = None,
+) -> List[Dict]:
+    """
+    Rank the best (site, night, window) combinations over the coming nights.
+
+    Sites within one PLANNER_FORECAST_GRID_DEGREES cell share a forecast, so
+    hundreds of nearby sites need only a handful of (cached) page fetches.
+
+    Args:
+        locations: Candidate sites (finder or nearby results)
+        nights: Number of nights to plan, starting tonight
+        window_hours: Observing window length in hours
+        top_k: Maximum number of combinations to return
+        weights: Criterion weights (defaults to config SCORING_WEIGHTS)
+        start: First hour considered (UTC, defaults to now)
+
+    Returns:
+        Plans, best first (see models.night_planner.plan_windows), each with
+        the site's name, coordinates and sky figures added
+
+    Raises:
+        ValueError: If the weights are invalid
+    """
+    scoring.validate_weights(weights)
+    if not locations:
+        return []
+    latitudes = np.array([loc["latitude"] for loc in locations], dtype=float)
+    longitudes = np.array([loc["longitude"] for loc in locations], dtype=float)
+
+    cells = [quantize_coordinates(lat, lon, PLANNER_FORECAST_GRID_DEGREES) for lat, lon in zip(latitudes, longitudes)]
+    unique = list(dict.fromkeys(cells))
+    with span("planner.forecasts"):
+        forecasts = _fetch_forecasts(unique)
+    position = {cell: i for i, cell in enumerate(unique)}
+    logger.info(f"Planning {len(locations)} sites over {nights} nights with {len(unique)} forecasts")
+
+    with span("planner.matrix"):
+        matrix = build_sky_matrix(
+            latitudes,
+            longitudes,
+            np.datetime64("now", "h") if start is None else start,
+            nights,
+            forecasts=forecasts,
+            forecast_index=[position[cell] for cell in cells],
+        )
+    with span("planner.rank"):
+        plans = plan_windows(matrix, site_criteria(locations), window_hours=window_hours, top_k=top_k, weights=weights)
+    for plan in plans:
+        site = locations[plan["site"]]
+        plan.update({field: site[field] for field in _SITE_FIELDS if field in site})
+    return plans
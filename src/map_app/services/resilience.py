@@ -0,0 +1,331 @@
+"""Resilience helpers for calls to slow or failing upstream services.
+
+``CircuitBreaker`` stops calling an upstream after consecutive failures and
+lets a single probe through once a cool-down has passed. ``ResilientCaller``
+wraps each call in the breaker and runs hedged/retried attempts that all share
+one total latency budget, so a slow upstream can never block a page for
+longer than the budget.
+
+Client errors (4xx responses other than 408 and 429) mean the upstream is up
+and rejected this particular request: they are raised to the caller without
+a retry and do not count against the breaker, so a run of bad inputs cannot
+open the circuit for everyone.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 4xx statuses that still signal an overloaded or slow upstream
+_UPSTREAM_CLIENT_STATUSES = (408, 429)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is short-circuited because the breaker is open."""
+
+
+class LatencyBudgetExceeded(TimeoutError):
+    """Raised when no attempt succeeded within the total latency budget."""
+
+
+def is_client_error(error: BaseException) -> bool:
+    """True for HTTP errors whose response is a 4xx caused by the request itself."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in _UPSTREAM_CLIENT_STATUSES
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            failure_threshold: Consecutive failures that trip the breaker
+            reset_timeout_seconds: Time the breaker stays open before a probe
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._trips = 0
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open."""
+        with self._lock:
+            return self._current_state()
+
+    def try_acquire(self) -> Optional[str]:
+        """
+        Admit a call if the breaker allows it (only one probe while half-open).
+
+        Returns:
+            The state the call was admitted in (closed, or half_open for the
+            probe), or None if it is rejected
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return state
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return state
+            return None
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed (only one probe while half-open)."""
+        return self.try_acquire() is not None
+
+    def release_probe(self) -> None:
+        """Let another probe through after one ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            if self._current_state() == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        """Close the breaker and reset the failure count."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, tripping the breaker at the threshold or on a failed probe."""
+        with self._lock:
+            self._failures += 1
+            if self._current_state() == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._trips += 1
+                    logger.warning(f"Circuit opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return state, consecutive failures and number of trips."""
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+            }
+
+
+class ResilientCaller:
+    """Run upstream calls behind a circuit breaker within a latency budget."""
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        budget_seconds: float,
+        hedge_after_seconds: float,
+        max_attempts: int = 2,
+        attempt_timeout_seconds: Optional[float] = None,
+        max_workers: int = 8,
+    ):
+        """
+        Args:
+            breaker: Circuit breaker guarding the upstream
+            budget_seconds: Total wall time allowed for all attempts of one call
+            hedge_after_seconds: Start another attempt if none has answered by then
+            max_attempts: Maximum attempts (hedges plus retries) per call
+            attempt_timeout_seconds: Upper bound on a single attempt's timeout
+            max_workers: Threads available for concurrent sync attempts
+        """
+        self.breaker = breaker
+        self.budget_seconds = budget_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.max_attempts = max_attempts
+        self.attempt_timeout_seconds = attempt_timeout_seconds or budget_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream")
+        self._lock = threading.Lock()
+        self._counts = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "short_circuited": 0,
+            "hedges": 0,
+            "retries": 0,
+            "budget_exceeded": 0,
+            "client_errors": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _admit(self) -> bool:
+        """Pass the breaker; returns True if this call is the half-open probe."""
+        self._count("calls")
+        admitted = self.breaker.try_acquire()
+        if admitted is None:
+            self._count("short_circuited")
+            raise CircuitOpenError("Upstream circuit is open")
+        return admitted == CircuitBreaker.HALF_OPEN
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        return max(0.0, min(self.attempt_timeout_seconds, deadline - time.monotonic()))
+
+    def _next_wait(self, deadline: float, attempts: int) -> float:
+        remaining = deadline - time.monotonic()
+        if attempts < self.max_attempts:
+            return min(remaining, self.hedge_after_seconds)
+        return remaining
+
+    def _client_error(self, error: BaseException) -> None:
+        # The upstream answered, so it is healthy; the request was at fault
+        self.breaker.record_success()
+        self._count("client_errors")
+        raise error
+
+    def _fail(self, error: Optional[BaseException]) -> None:
+        self.breaker.record_failure()
+        self._count("failures")
+        if error is None:
+            self._count("budget_exceeded")
+            raise LatencyBudgetExceeded(f"No response within {self.budget_seconds:.2f}s")
+        raise error
+
+    def call(self, attempt: Callable[[float], T]) -> T:
+        """
+        Run attempt(timeout) with hedging and retries inside the latency budget.
+
+        A further attempt starts when the previous one fails, or when none has
+        answered within hedge_after_seconds (unless it is still queued for a
+        worker thread). The first success wins.
+
+        Args:
+            attempt: Performs one upstream request given its timeout in seconds
+
+        Returns:
+            The first successful attempt's result
+
+        Raises:
+            CircuitOpenError: The breaker is open; nothing was attempted
+            LatencyBudgetExceeded: No attempt finished within the budget
+        """
+        probe = self._admit()
+        try:
+            return self._call(attempt)
+        except BaseException:
+            # Failures and successes already settled the probe; anything else
+            # (e.g. KeyboardInterrupt) must not leave it claimed forever
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+    def _call(self, attempt: Callable[[float], T]) -> T:
+        deadline = time.monotonic() + self.budget_seconds
+        pending = {self._executor.submit(attempt, self._attempt_timeout(deadline))}
+        attempts = 1
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            timeout = self._next_wait(deadline, attempts)
+            if timeout <= 0:
+                break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    self.breaker.record_success()
+                    self._count("successes")
+                    return future.result()
+                last_error = future.exception()
+                if is_client_error(last_error):
+                    for other in pending:
+                        other.cancel()
+                    self._client_error(last_error)
+            # A hedge only helps if the slow attempt is actually in flight; one
+            # still queued for a worker would just queue a duplicate behind it
+            in_flight = all(future.running() for future in pending)
+            if attempts < self.max_attempts and deadline - time.monotonic() > 0 and (done or in_flight):
+                self._count("retries" if done else "hedges")
+                pending.add(self._executor.submit(attempt, self._attempt_timeout(deadline)))
+                attempts += 1
+
+        for other in pending:
+            other.cancel()
+        self._fail(None if pending or last_error is None else last_error)
+
+    async def call_async(self, attempt: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Async variant of call(); losing attempts are cancelled.
+
+        Args:
+            attempt: Coroutine function performing one request given its timeout
+
+        Returns:
+            The first successful attempt's result
+        """
+        probe = self._admit()
+        try:
+            return await self._call_async(attempt)
+        except BaseException:
+            # A cancelled probe records neither success nor failure
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+    async def _call_async(self, attempt: Callable[[float], Awaitable[T]]) -> T:
+        deadline = time.monotonic() + self.budget_seconds
+        pending = {asyncio.ensure_future(attempt(self._attempt_timeout(deadline)))}
+        attempts = 1
+        last_error: Optional[BaseException] = None
+
+        try:
+            while pending:
+                timeout = self._next_wait(deadline, attempts)
+                if timeout <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.breaker.record_success()
+                        self._count("successes")
+                        return task.result()
+                    last_error = task.exception()
+                    if is_client_error(last_error):
+                        self._client_error(last_error)
+                if attempts < self.max_attempts and deadline - time.monotonic() > 0:
+                    self._count("retries" if done else "hedges")
+                    pending.add(asyncio.ensure_future(attempt(self._attempt_timeout(deadline))))
+                    attempts += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self._fail(None if pending or last_error is None else last_error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters plus the breaker's state."""
+        with self._lock:
+            counts = dict(self._counts)
+        return {**counts, "breaker": self.breaker.stats()}
@@ -0,0 +1,127 @@
+"""Single-flight request coalescing.
+
+When several sessions ask for the same key at the same moment, only the first
+caller (the leader) runs the work; everyone else waits for and shares its
+result. Calls are tracked with ``concurrent.futures.Future`` so threaded and
+asyncio callers coalesce onto the same in-flight call.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._misses = 0
+        self._coalesced = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _join(self, key: Hashable):
+        """Return (future, is_leader), registering a new call when none is running."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self._misses += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _record_wait(self, started: float) -> None:
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once per key among concurrent callers and share its result.
+
+        Args:
+            key: Identity of the work (e.g. a quantized coordinate)
+            fn: Zero-argument callable executed by the leader
+
+        Returns:
+            The leader's result; the leader's exception is re-raised for all callers
+        """
+        future, is_leader = self._join(key)
+        if not is_leader:
+            started = time.perf_counter()
+            try:
+                return future.result()
+            finally:
+                self._record_wait(started)
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._finish(key, future)
+        return future.result()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of do(); also coalesces with threaded callers of the same key.
+
+        Args:
+            key: Identity of the work (e.g. a quantized coordinate)
+            fn: Zero-argument coroutine function awaited by the leader
+
+        Returns:
+            The leader's result
+        """
+        future, is_leader = self._join(key)
+        if not is_leader:
+            started = time.perf_counter()
+            try:
+                return await asyncio.wrap_future(future)
+            finally:
+                self._record_wait(started)
+
+        try:
+            future.set_result(await fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._finish(key, future)
+        return future.result()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return coalescing metrics.
+
+        Returns:
+            Dictionary with misses (leader executions), coalesced_hits (callers
+            that joined an in-flight call), in_flight, and wait times in seconds
+        """
+        with self._lock:
+            return {
+                "misses": self._misses,
+                "coalesced_hits": self._coalesced,
+                "in_flight": len(self._in_flight),
+                "total_wait_seconds": round(self._wait_seconds, 6),
+                "max_wait_seconds": round(self._max_wait_seconds, 6),
+                "mean_wait_seconds": round(self._wait_seconds / self._coalesced, 6) if self._coalesced else 0.0,
+            }
+
+    def reset_stats(self) -> None:
+        """Zero the counters (in-flight calls are unaffected)."""
+        with self._lock:
+            self._misses = 0
+            self._coalesced = 0
+            self._wait_seconds = 0.0
+            self._max_wait_seconds = 0.0
@@ -1,13 +1,13 @@
 """Sky visibility service for predicting Bortle scale and sky quality."""
-import streamlit as st
 import logging
 from typing import Dict
 from models.bortle_predictor import BortlePredictor, get_sky_quality_description
+from services.cache_backends import cached
 
 logger = logging.getLogger(__name__)
 
 
-@st.cache_data(ttl=21600)
+@cached("sky_visibility", ttl_seconds=21600)
 def get_sky_visibility(latitude: float, longitude: float) -> Dict:
     """
     Predict sky visibility and Bortle scale.
@@ -1,42 +1,300 @@
 """Weather service for fetching cloudiness and moon brightness data."""
-import streamlit as st
+from dataclasses import dataclass, field
 from datetime import datetime
-import re
-from bs4 import BeautifulSoup
+from types import MappingProxyType
 import httpx
 import logging
-from typing import Dict, Optional, Tuple
+import ssl
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from config import (
+    CLEAROUTSIDE_BASE_URL,
+    WEATHER_REQUEST_TIMEOUT_SECONDS,
+    CLOUDINESS_TTL_SECONDS,
+    PLANNING_NIGHTS,
+    OBSERVING_WINDOW_HOURS,
+    WEATHER_FETCHER_CACHE_MAX_ENTRIES,
+    WEATHER_FETCHER_CACHE_MAX_BYTES,
+    WEATHER_LATENCY_BUDGET_SECONDS,
+    WEATHER_HEDGE_AFTER_SECONDS,
+    WEATHER_MAX_ATTEMPTS,
+    WEATHER_MAX_CONCURRENT_REQUESTS,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+)
+from models.ephemeris import get_moon_summary
+from models.observing_windows import HourlyForecast, empty_hourly_forecast, find_best_windows
+from services.bounded_cache import BoundedLRUCache, approximate_size
+from services.cache_backends import cached
+from services.clearoutside_parser import extract_forecast_fields
+from services.forecast_cache import get_forecast_cache, is_cacheable, quantize_coordinates
+from services.memory_budget import register_cache
+from services.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+from services.single_flight import SingleFlight
+from utils.instrumentation import count, count_cache, span, traced
 
 logger = logging.getLogger(__name__)
 
+# Concurrent requests for the same forecast grid cell share one HTTP fetch
+_fetch_flight = SingleFlight()
+
+# Every ClearOutside request shares one breaker and latency budget
+_upstream = ResilientCaller(
+    CircuitBreaker(
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout_seconds=CIRCUIT_RESET_SECONDS,
+    ),
+    budget_seconds=WEATHER_LATENCY_BUDGET_SECONDS,
+    hedge_after_seconds=WEATHER_HEDGE_AFTER_SECONDS,
+    max_attempts=WEATHER_MAX_ATTEMPTS,
+    attempt_timeout_seconds=WEATHER_REQUEST_TIMEOUT_SECONDS,
+    max_workers=WEATHER_MAX_CONCURRENT_REQUESTS,
+)
+
+# Pooled HTTP client shared by all threads; building a client (and its SSL
+# context) per request costs far more CPU than the request itself. Both are
+# built on the first fetch: loading the CA bundle is most of this module's
+# import time, and forked workers should not share the parent's sockets.
+_ssl_context: Optional[ssl.SSLContext] = None
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+# Sentinel telling ClearOutsideWeatherFetcher to fetch its own page
+_FETCH = object()
+
+# Parsed forecasts per grid cell, bounded by entry count and memory
+_fetcher_cache = register_cache(
+    "weather_fetchers",
+    BoundedLRUCache(max_entries=WEATHER_FETCHER_CACHE_MAX_ENTRIES, max_bytes=WEATHER_FETCHER_CACHE_MAX_BYTES),
+)
+
+
+def _get_ssl_context() -> ssl.SSLContext:
+    global _ssl_context
+    with _http_client_lock:
+        if _ssl_context is None:
+            _ssl_context = httpx.create_ssl_context()
+        return _ssl_context
+
+
+def _get_http_client() -> httpx.Client:
+    """Return the process-wide pooled client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        context = _get_ssl_context()
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    verify=context,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=WEATHER_MAX_CONCURRENT_REQUESTS),
+                )
+    return _http_client
+
+
+def _forecast_url(latitude: float, longitude: float) -> str:
+    return f"{CLEAROUTSIDE_BASE_URL}/forecast/{latitude:.6f}/{longitude:.6f}"
+
+
+def _get_forecast_page(url: str, timeout: float) -> str:
+    """One upstream request attempt."""
+    with span("weather.http_get"):
+        response = _get_http_client().get(url, timeout=timeout)
+        response.raise_for_status()
+    count("bytes_loaded_total", len(response.content), source="clearoutside")
+    return response.text
+
+
+def _parse_page(html: str, latitude: float, longitude: float) -> Optional[Dict]:
+    try:
+        with span("weather.parse"):
+            fields = extract_forecast_fields(html)
+    except Exception as e:
+        logger.warning(f"Error parsing ClearOutside page: {e}")
+        return None
+    logger.info(f"Successfully fetched ClearOutside forecast for ({latitude}, {longitude})")
+    return fields
+
+
+@traced("weather.fetch")
+def _download_forecast_fields(latitude: float, longitude: float) -> Optional[Dict]:
+    """
+    Fetch and parse one forecast page, returning None on any failure.
+    
+    Requests go through the upstream circuit breaker and are hedged/retried
+    within the weather latency budget; an open circuit returns None at once.
+    """
+    url = _forecast_url(latitude, longitude)
+    try:
+        html = _upstream.call(lambda timeout: _get_forecast_page(url, timeout))
+    except CircuitOpenError:
+        logger.info(f"ClearOutside circuit open; skipping fetch for ({latitude}, {longitude})")
+        return None
+    except Exception as e:
+        logger.warning(f"Error fetching ClearOutside page: {e!r}")
+        return None
+    return _parse_page(html, latitude, longitude)
+
+
+async def _download_forecast_fields_async(latitude: float, longitude: float) -> Optional[Dict]:
+    """Async variant of _download_forecast_fields."""
+    url = _forecast_url(latitude, longitude)
+    try:
+        async with httpx.AsyncClient(verify=_get_ssl_context(), follow_redirects=True) as client:
+            async def attempt(timeout: float) -> str:
+                with span("weather.http_get"):
+                    response = await client.get(url, timeout=timeout)
+                    response.raise_for_status()
+                count("bytes_loaded_total", len(response.content), source="clearoutside")
+                return response.text
+            
+            html = await _upstream.call_async(attempt)
+    except CircuitOpenError:
+        logger.info(f"ClearOutside circuit open; skipping fetch for ({latitude}, {longitude})")
+        return None
+    except Exception as e:
+        logger.warning(f"Error fetching ClearOutside page: {e!r}")
+        return None
+    return _parse_page(html, latitude, longitude)
+
+
+def fetch_forecast_fields(latitude: float, longitude: float) -> Optional[Dict]:
+    """
+    Fetch parsed forecast fields, coalescing concurrent calls per grid cell.
+    
+    The page is fetched for the cell's grid point (the key the forecast cache
+    stores it under), so every caller in the cell gets the same page whichever
+    of them arrived first.
+    
+    Args:
+        latitude: Latitude coordinate (-90 to 90)
+        longitude: Longitude coordinate (-180 to 180)
+    
+    Returns:
+        Parsed page fields (see extract_forecast_fields), or None if the fetch failed
+    """
+    key = quantize_coordinates(latitude, longitude)
+    return _fetch_flight.do(key, lambda: _download_forecast_fields(*key))
+
+
+async def fetch_forecast_fields_async(latitude: float, longitude: float) -> Optional[Dict]:
+    """
+    Async variant of fetch_forecast_fields; coalesces with sync callers too.
+    
+    Args:
+        latitude: Latitude coordinate (-90 to 90)
+        longitude: Longitude coordinate (-180 to 180)
+    
+    Returns:
+        Parsed page fields, or None if the fetch failed
+    """
+    key = quantize_coordinates(latitude, longitude)
+    return await _fetch_flight.do_async(key, lambda: _download_forecast_fields_async(*key))
+
+
+def get_fetch_coalescing_stats() -> Dict[str, float]:
+    """Return single-flight metrics: misses, coalesced hits and wait times."""
+    return _fetch_flight.stats()
+
+
+def get_upstream_stats() -> Dict:
+    """Return upstream call metrics (hedges, retries, short circuits) and breaker state."""
+    return _upstream.stats()
+
+
+def _time_zone_label(utc_offset_hours: Optional[float]) -> str:
+    """Label for a page's clock times, e.g. "UTC-4" or "UTC+5:30" ("local" when the page omits it)."""
+    if utc_offset_hours is None:
+        return "local"
+    hours, minutes = divmod(round(abs(utc_offset_hours) * 60), 60)
+    sign = "-" if utc_offset_hours < 0 else "+"
+    return f"UTC{sign}{hours}" + (f":{minutes:02d}" if minutes else "")
+
+
+@dataclass(frozen=True)
+class ForecastRecord:
+    """Immutable fields extracted eagerly from one forecast page."""
+    
+    cloudiness_percent: int
+    moon: Mapping[str, Any]
+    bortle: Mapping[str, Any]
+    hourly: HourlyForecast
+    fetched_at: float
+    nbytes: int = field(init=False, compare=False)
+    
+    def __post_init__(self):
+        size = sys.getsizeof(self) + sum(
+            approximate_size(part) for part in (self.moon, self.bortle, self.hourly)
+        )
+        object.__setattr__(self, "nbytes", size)
+    
+    @classmethod
+    def from_fields(cls, fields: Dict, fetched_at: Optional[float] = None) -> "ForecastRecord":
+        """
+        Build a read-only record from extract_forecast_fields output.
+        
+        Args:
+            fields: Parsed page fields
+            fetched_at: Fetch time (epoch seconds), defaults to now
+        
+        Returns:
+            ForecastRecord with read-only mappings and hourly arrays
+        """
+        table = fields.get("hourly") or {"days": []}
+        hourly = HourlyForecast.from_table(table)
+        for value in vars(hourly).values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        return cls(
+            cloudiness_percent=int(fields["cloudiness_percent"]),
+            # The page gives rise and set times in the site's local time
+            moon=MappingProxyType({**fields["moon"], "time_zone": _time_zone_label(table.get("utc_offset_hours"))}),
+            bortle=MappingProxyType(dict(fields["bortle"])),
+            hourly=hourly,
+            fetched_at=time.time() if fetched_at is None else fetched_at,
+        )
+
 
 class ClearOutsideWeatherFetcher:
-    """Fetch and cache weather data from ClearOutside.com with single HTTP call."""
+    """Fetch weather data from ClearOutside.com with a single HTTP call."""
     
-    def __init__(self, latitude: float, longitude: float):
+    def __init__(self, latitude: float, longitude: float, fields=_FETCH):
         """
         Initialize fetcher and fetch data from ClearOutside.com.
         
         Args:
             latitude: Latitude coordinate (-90 to 90)
             longitude: Longitude coordinate (-180 to 180)
+            fields: Already-fetched page fields (None for a failed fetch);
+                the page is fetched when omitted
         """
         self.latitude = latitude
         self.longitude = longitude
-        self.soup: Optional[BeautifulSoup] = None
-        self._fetch_page()
+        self.record: Optional[ForecastRecord] = None
+        if fields is _FETCH:
+            self._fetch_page()
+        elif fields is not None:
+            self.record = ForecastRecord.from_fields(fields)
+    
+    @classmethod
+    async def create_async(cls, latitude: float, longitude: float) -> "ClearOutsideWeatherFetcher":
+        """Create a fetcher using the async HTTP path."""
+        return cls(latitude, longitude, fields=await fetch_forecast_fields_async(latitude, longitude))
     
     def _fetch_page(self) -> None:
-        """Fetch the forecast page from ClearOutside.com."""
-        try:
-            url = f"https://clearoutside.com/forecast/{self.latitude:.6f}/{self.longitude:.6f}"
-            response = httpx.get(url, timeout=10.0, follow_redirects=True)
-            response.raise_for_status()
-            self.soup = BeautifulSoup(response.text, 'html.parser')
-            logger.info(f"Successfully fetched ClearOutside forecast for ({self.latitude}, {self.longitude})")
-        except Exception as e:
-            logger.warning(f"Error fetching ClearOutside page: {e}")
-            self.soup = None
+        """Fetch the forecast page from ClearOutside.com and keep only its parsed record."""
+        fields = fetch_forecast_fields(self.latitude, self.longitude)
+        if fields is not None:
+            self.record = ForecastRecord.from_fields(fields)
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by this fetcher."""
+        return sys.getsizeof(self) + (self.record.nbytes if self.record is not None else 0)
     
     def get_cloudiness(self) -> Dict:
         """
@@ -45,21 +303,15 @@ class ClearOutsideWeatherFetcher:
         Returns:
             Dictionary with cloudiness_percent, description, and source
         """
-        if self.soup is None:
+        if self.record is None:
             return self._fallback_cloudiness()
         
-        try:
-            cloudiness = self._extract_cloudiness_percent()
-            description = self._get_cloud_description(cloudiness)
-            
-            return {
-                "cloudiness_percent": cloudiness,
-                "forecast_description": description,
-                "source": "scraped"
-            }
-        except Exception as e:
-            logger.error(f"Error extracting cloudiness: {e}")
-            return self._fallback_cloudiness()
+        cloudiness = self.record.cloudiness_percent
+        return {
+            "cloudiness_percent": cloudiness,
+            "forecast_description": self._get_cloud_description(cloudiness),
+            "source": "scraped"
+        }
     
     def get_moon_brightness(self) -> Dict:
         """
@@ -67,16 +319,12 @@ class ClearOutsideWeatherFetcher:
         
         Returns:
             Dictionary with moon_phase, illumination_percent, rise/set times
+            and the time_zone they are given in
         """
-        if self.soup is None:
-            return self._fallback_moon_data(datetime.utcnow())
-        
-        try:
-            moon_data = self._extract_moon_data()
-            return {**moon_data, "source": "scraped"}
-        except Exception as e:
-            logger.error(f"Error extracting moon data: {e}")
+        if self.record is None:
             return {**self._fallback_moon_data(datetime.utcnow()), "source": "fallback"}
+        
+        return {**self.record.moon, "source": "scraped"}
     
     def get_bortle_scale(self) -> Dict:
         """
@@ -85,128 +333,22 @@ class ClearOutsideWeatherFetcher:
         Returns:
             Dictionary with bortle_scale, magnitude, brightness, and artificial_brightness
         """
-        if self.soup is None:
+        if self.record is None:
             return self._fallback_bortle()
         
-        try:
-            bortle_data = self._extract_bortle_data()
-            return {**bortle_data, "source": "scraped"}
-        except Exception as e:
-            logger.error(f"Error extracting Bortle data: {e}")
-            return self._fallback_bortle()
+        return {**self.record.bortle, "source": "scraped"}
     
-    def _extract_cloudiness_percent(self) -> int:
-        """Extract cloudiness percentage from HTML."""
-        # Look for "Total Clouds" rows in forecast detail
-        cloud_elements = self.soup.find_all(string=re.compile(r'cloud', re.IGNORECASE))
-        
-        for element in cloud_elements:
-            parent = element.parent
-            if parent:
-                text = parent.get_text()
-                percent_match = re.search(r'(\d+)\s*%', text)
-                if percent_match:
-                    value = int(percent_match.group(1))
-                    if 0 <= value <= 100:
-                        return value
-        
-        # Alternative: Look for forecast table cells
-        forecast_cells = self.soup.find_all(['td', 'div'], class_=re.compile(r'cloud|forecast', re.IGNORECASE))
-        for cell in forecast_cells:
-            text = cell.get_text()
-            percent_match = re.search(r'(\d+)\s*%', text)
-            if percent_match:
-                value = int(percent_match.group(1))
-                if 0 <= value <= 100:
-                    return value
-        
-        return 50  # Default if extraction fails
-    
-    def _extract_moon_data(self) -> Dict:
-        """Extract moon phase and illumination from HTML."""
-        illumination = 50.0
-        phase = "Unknown"
-        rise_time = None
-        set_time = None
-        
-        # Find moon div with class "fc_moon"
-        moon_div = self.soup.find('div', class_='fc_moon')
-        if moon_div:
-            # Extract moon phase
-            phase_span = moon_div.find('span', class_='fc_moon_phase')
-            if phase_span:
-                phase = phase_span.get_text(strip=True)
-            
-            # Extract illumination percentage
-            percent_span = moon_div.find('span', class_='fc_moon_percentage')
-            if percent_span:
-                percent_text = percent_span.get_text(strip=True)
-                percent_match = re.search(r'(\d+)\s*%', percent_text)
-                if percent_match:
-                    illumination = float(percent_match.group(1))
-            
-            # Extract rise/set times
-            riseset_span = moon_div.find('span', class_='fc_moon_riseset')
-            if riseset_span:
-                riseset_text = riseset_span.get_text()
-                # Format: "08:01  16:44" or similar
-                time_matches = re.findall(r'(\d{1,2}):(\d{2})', riseset_text)
-                if len(time_matches) >= 2:
-                    h1, m1 = time_matches[0]
-                    h2, m2 = time_matches[1]
-                    rise_time = f"{h1}:{m1}:00"
-                    set_time = f"{h2}:{m2}:00"
-        
-        return {
-            "moon_phase": phase,
-            "illumination_percent": round(illumination, 1),
-            "moon_rise_time": rise_time,
-            "moon_set_time": set_time,
-        }
-    
-    def _extract_bortle_data(self) -> Dict:
-        """Extract Bortle scale and light pollution metrics from HTML."""
-        # Look for span with class "btn btn-primary btn-bortle-X"
-        bortle_span = self.soup.find('span', class_=re.compile(r'btn-bortle-\d'))
-        
-        bortle_scale = 5  # Default
-        magnitude = 0.0
-        brightness_mcd = 0.0
-        artificial_brightness = 0.0
+    def get_hourly_forecast(self) -> Dict:
+        """
+        Convert the page's hourly forecast table into compact hourly arrays.
         
-        if bortle_span:
-            # Extract Bortle class number
-            classes = bortle_span.get('class', [])
-            for cls in classes:
-                match = re.search(r'btn-bortle-(\d)', cls)
-                if match:
-                    bortle_scale = int(match.group(1))
-                    break
-            
-            # Extract all strong tags which contain the metrics
-            span_text = bortle_span.get_text()
-            
-            # Extract magnitude: "17.53 Magnitude"
-            magnitude_match = re.search(r'(\d+\.?\d*)\s+Magnitude', span_text)
-            if magnitude_match:
-                magnitude = float(magnitude_match.group(1))
-            
-            # Extract brightness in mcd/m²: "10.52 mcd/m²"
-            brightness_match = re.search(r'(\d+\.?\d*)\s*mcd/m', span_text)
-            if brightness_match:
-                brightness_mcd = float(brightness_match.group(1))
-            
-            # Extract artificial brightness: "10349.17 μcd/m²"
-            artificial_match = re.search(r'(\d+\.?\d*)\s*μcd/m', span_text)
-            if artificial_match:
-                artificial_brightness = float(artificial_match.group(1))
+        Returns:
+            HourlyForecast.to_dict() output plus source
+        """
+        if self.record is None:
+            return {**empty_hourly_forecast().to_dict(), "source": "fallback"}
         
-        return {
-            "bortle_scale": bortle_scale,
-            "magnitude": round(magnitude, 2),
-            "brightness_mcd_m2": round(brightness_mcd, 2),
-            "artificial_brightness_ucd_m2": round(artificial_brightness, 2),
-        }
+        return {**self.record.hourly.to_dict(), "source": "scraped"}
     
     @staticmethod
     def _get_cloud_description(cloudiness: int) -> str:
@@ -233,42 +375,15 @@ class ClearOutsideWeatherFetcher:
             "source": "fallback"
         }
     
-    @staticmethod
-    def _fallback_moon_data(time: datetime) -> Dict:
-        """Calculate moon data using simple lunar cycle approximation."""
-        known_new_moon = datetime(2024, 1, 11)
-        lunar_cycle = 29.53
-        
-        days_since = (time - known_new_moon).days % lunar_cycle
-        phase_fraction = days_since / lunar_cycle
-        
-        illumination = abs(2 * phase_fraction - 1) * 100
-        if phase_fraction > 0.5:
-            illumination = 100 - illumination
-        
-        # Determine moon phase
-        if illumination < 1:
-            phase = "New Moon"
-        elif illumination < 25:
-            phase = "Waxing Crescent"
-        elif illumination < 45:
-            phase = "First Quarter"
-        elif illumination < 55:
-            phase = "Waxing Gibbous"
-        elif illumination < 75:
-            phase = "Full Moon"
-        elif illumination < 95:
-            phase = "Waning Gibbous"
-        elif illumination < 99:
-            phase = "Last Quarter"
-        else:
-            phase = "Waning Crescent"
-        
+    def _fallback_moon_data(self, time: datetime) -> Dict:
+        """Compute moon data offline from the local ephemeris (times in UTC)."""
+        summary = get_moon_summary(self.latitude, self.longitude, time)
         return {
-            "moon_phase": phase,
-            "illumination_percent": round(illumination, 1),
-            "moon_rise_time": None,
-            "moon_set_time": None,
+            "moon_phase": summary["moon_phase"],
+            "illumination_percent": summary["illumination_percent"],
+            "moon_rise_time": summary["moon_rise_time"],
+            "moon_set_time": summary["moon_set_time"],
+            "time_zone": summary["time_zone"],
         }
     
     @staticmethod
@@ -279,33 +394,71 @@ class ClearOutsideWeatherFetcher:
             "magnitude": 0.0,
             "brightness_mcd_m2": 0.0,
             "artificial_brightness_ucd_m2": 0.0,
+            "source": "fallback",
         }
 
 
-@st.cache_resource
 def get_weather_fetcher(latitude: float, longitude: float) -> ClearOutsideWeatherFetcher:
     """
-    Get or create cached weather fetcher instance.
+    Get or create a cached weather fetcher for the coordinate's forecast cell.
     
-    Uses @st.cache_resource to ensure only one HTTP call per coordinate pair,
-    even when multiple public functions request different metrics.
+    Fetchers are kept in a bounded LRU (entry count and memory budget) keyed by
+    the quantized coordinate, so nearby searches share one HTTP call. Failed
+    fetches are not cached, and entries older than the cloudiness TTL are
+    refetched; if that refetch fails the previous record keeps being served.
     
     Args:
         latitude: Latitude coordinate (-90 to 90)
         longitude: Longitude coordinate (-180 to 180)
     
     Returns:
-        ClearOutsideWeatherFetcher instance (cached by coordinates)
+        ClearOutsideWeatherFetcher instance
     """
-    return ClearOutsideWeatherFetcher(latitude, longitude)
+    key = quantize_coordinates(latitude, longitude)
+    fetcher = _fetcher_cache.get(key)
+    if fetcher is not None and time.time() - fetcher.record.fetched_at <= CLOUDINESS_TTL_SECONDS:
+        count_cache("weather_fetcher", True)
+        return fetcher
+    count_cache("weather_fetcher", False)
+    
+    fresh = ClearOutsideWeatherFetcher(latitude, longitude)
+    if fresh.record is not None:
+        _fetcher_cache.put(key, fresh)
+        return fresh
+    # Upstream failing or circuit open: stale data beats a fallback guess
+    return fetcher if fetcher is not None else fresh
 
 
-@st.cache_data(ttl=3600)
+def invalidate_weather_fetchers(latitude: Optional[float] = None, longitude: Optional[float] = None) -> int:
+    """
+    Drop cached fetchers so the next request refetches the page.
+    
+    Args:
+        latitude: Latitude of the cell to drop (drops every cell when omitted)
+        longitude: Longitude of the cell to drop
+    
+    Returns:
+        Number of fetchers removed
+    """
+    if latitude is None or longitude is None:
+        return _fetcher_cache.clear()
+    return int(_fetcher_cache.invalidate(quantize_coordinates(latitude, longitude)))
+
+
+def get_weather_fetcher_cache_stats() -> Dict:
+    """Return fetcher cache metrics: size, hits, misses and evictions."""
+    return _fetcher_cache.stats()
+
+
+# The forecast-backed getters below are not memoized with @cached: the forecast
+# cache already serves them, and a result cache on top would keep stale and
+# recovered-from-outage values for another full TTL.
 def get_cloudiness(latitude: float, longitude: float) -> Dict:
     """
     Get cloudiness percentage for a location (single web call).
     
-    Reuses cached ClearOutsideWeatherFetcher instance.
+    Served from the persistent forecast cache (snapped to the forecast grid),
+    falling back to a cached ClearOutsideWeatherFetcher instance on a miss.
     Cache expires after 1 hour (3600 seconds).
     
     Args:
@@ -315,16 +468,20 @@ def get_cloudiness(latitude: float, longitude: float) -> Dict:
     Returns:
         Dictionary with cloudiness_percent and forecast_description
     """
-    fetcher = get_weather_fetcher(latitude, longitude)
-    return fetcher.get_cloudiness()
+    return get_forecast_cache().get_or_fetch(
+        "cloudiness",
+        latitude,
+        longitude,
+        lambda lat, lon: get_weather_fetcher(lat, lon).get_cloudiness(),
+    )
 
 
-@st.cache_data(ttl=86400)
 def get_moon_brightness(latitude: float, longitude: float) -> Dict:
     """
     Get moon brightness and phase information (single web call).
     
-    Reuses cached ClearOutsideWeatherFetcher instance.
+    Served from the persistent forecast cache (snapped to the forecast grid),
+    falling back to a cached ClearOutsideWeatherFetcher instance on a miss.
     Cache expires after 24 hours (86400 seconds).
     
     Args:
@@ -334,16 +491,20 @@ def get_moon_brightness(latitude: float, longitude: float) -> Dict:
     Returns:
         Dictionary with moon_phase, illumination_percent, and rise/set times
     """
-    fetcher = get_weather_fetcher(latitude, longitude)
-    return fetcher.get_moon_brightness()
+    return get_forecast_cache().get_or_fetch(
+        "moon",
+        latitude,
+        longitude,
+        lambda lat, lon: get_weather_fetcher(lat, lon).get_moon_brightness(),
+    )
 
 
-@st.cache_data(ttl=21600)
 def get_bortle_scale(latitude: float, longitude: float) -> Dict:
     """
     Get Bortle scale and light pollution metrics (single web call).
     
-    Reuses cached ClearOutsideWeatherFetcher instance.
+    Served from the persistent forecast cache (snapped to the forecast grid),
+    falling back to a cached ClearOutsideWeatherFetcher instance on a miss.
     Cache expires after 6 hours (21600 seconds).
     
     Args:
@@ -353,8 +514,73 @@ def get_bortle_scale(latitude: float, longitude: float) -> Dict:
     Returns:
         Dictionary with bortle_scale, magnitude, brightness measurements
     """
-    fetcher = get_weather_fetcher(latitude, longitude)
-    return fetcher.get_bortle_scale()
+    return get_forecast_cache().get_or_fetch(
+        "bortle",
+        latitude,
+        longitude,
+        lambda lat, lon: get_weather_fetcher(lat, lon).get_bortle_scale(),
+    )
+
+
+def get_hourly_forecast(latitude: float, longitude: float) -> Dict:
+    """
+    Get the 7-day hourly forecast arrays for a location (single web call).
+    
+    The parsed arrays are stored in the persistent forecast cache, so later
+    planning queries never re-parse the page.
+    Cache expires after 1 hour (3600 seconds).
+    
+    Args:
+        latitude: Latitude coordinate (-90 to 90)
+        longitude: Longitude coordinate (-180 to 180)
+    
+    Returns:
+        Dictionary of hourly arrays (see HourlyForecast.to_dict) plus source
+    """
+    return get_forecast_cache().get_or_fetch(
+        "hourly",
+        latitude,
+        longitude,
+        lambda lat, lon: get_weather_fetcher(lat, lon).get_hourly_forecast(),
+    )
+
+
+@cached("observing_windows", ttl_seconds=CLOUDINESS_TTL_SECONDS, cache_if=lambda value: value[1])
+def _observing_windows(
+    latitude: float, longitude: float, nights: int, window_hours: int, top_k: int
+) -> Tuple[List[Dict], bool]:
+    """Best windows, and whether they came from a real (cacheable) forecast."""
+    hourly = get_hourly_forecast(latitude, longitude)
+    forecast = HourlyForecast.from_dict(hourly)
+    windows = find_best_windows(forecast, nights=nights, window_hours=window_hours, top_k=top_k)
+    return windows, is_cacheable(hourly)
+
+
+def get_best_observing_windows(
+    latitude: float,
+    longitude: float,
+    nights: int = PLANNING_NIGHTS,
+    window_hours: int = OBSERVING_WINDOW_HOURS,
+    top_k: int = 3,
+) -> List[Dict]:
+    """
+    Get the best observing windows over the next nights.
+    
+    Uses the cached hourly arrays; results are cached per query for 1 hour,
+    unless the forecast was a fallback or stale (upstream down), so the
+    windows appear as soon as upstream recovers.
+    
+    Args:
+        latitude: Latitude coordinate (-90 to 90)
+        longitude: Longitude coordinate (-180 to 180)
+        nights: Number of upcoming nights to search
+        window_hours: Length of each window in hours
+        top_k: Maximum number of windows to return
+    
+    Returns:
+        List of window dictionaries (night, start/end time, score, conditions)
+    """
+    return _observing_windows(latitude, longitude, nights, window_hours, top_k)[0]
 
 
 if __name__ == "__main__":
@@ -388,6 +614,11 @@ if __name__ == "__main__":
     bortle_result = fetcher.get_bortle_scale()
     print(json.dumps(bortle_result, indent=2))
     
+    # Test hourly forecast and observing windows
+    print("\n🔭 Best Observing Windows:")
+    hourly = HourlyForecast.from_dict(fetcher.get_hourly_forecast())
+    print(json.dumps(find_best_windows(hourly), indent=2))
+    
     print("\n" + "=" * 60)
     print("✅ Weather service debugging complete!")
     print("=" * 60)
@@ -0,0 +1,67 @@
+"""Shared fixtures: weather tests run against a local ClearOutside stand-in.
+
+Pass ``--live-clearoutside`` to run them against the real site instead.
+Caches and breakers under test take the ``clock`` fixture, a manually
+advanced time source.
+"""
+import pytest
+from services import cache_backends, forecast_cache, weather_service
+from services.bounded_cache import BoundedLRUCache
+from services.resilience import CircuitBreaker, ResilientCaller
+from services.single_flight import SingleFlight
+from utils.clearoutside_standin import ClearOutsideStandIn, StandInConfig
+
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--live-clearoutside",
+        action="store_true",
+        help="Send weather requests to clearoutside.com instead of the local stand-in",
+    )
+
+
+@pytest.fixture(scope="session")
+def clearoutside_server():
+    """One stand-in server for the whole test session."""
+    with ClearOutsideStandIn() as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def clearoutside(request, monkeypatch, tmp_path):
+    """Give every test a fresh weather pipeline pointed at the stand-in."""
+    monkeypatch.setattr(weather_service, "_fetch_flight", SingleFlight())
+    monkeypatch.setattr(weather_service, "_fetcher_cache", BoundedLRUCache(max_entries=64, max_bytes=10**7))
+    monkeypatch.setattr(
+        weather_service,
+        "_upstream",
+        ResilientCaller(CircuitBreaker(), budget_seconds=5.0, hedge_after_seconds=5.0),
+    )
+    monkeypatch.setattr(cache_backends, "_backend", cache_backends.MemoryCacheBackend())
+    monkeypatch.setattr(forecast_cache, "_forecast_cache", forecast_cache.ForecastCache(str(tmp_path / "forecast.sqlite3")))
+
+    if request.config.getoption("--live-clearoutside"):
+        yield None
+        return
+
+    server = request.getfixturevalue("clearoutside_server")
+    server.config = StandInConfig()
+    server.reset_stats()
+    monkeypatch.setattr(weather_service, "CLEAROUTSIDE_BASE_URL", server.url)
+    yield server
+
+
+@pytest.fixture
+def clock():
+    """Time source that only moves when a test advances clock.now."""
+    return FakeClock()
@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+
+import httpx
+import pytest
+
+from api_server import ApiServer, QueryApi, encode_body
+
+
+@pytest.fixture
+def api_url():
+    """An in-process API server."""
+    with ApiServer(QueryApi(), port=0, workers=0) as server:
+        yield server.url
+
+
+def test_query_endpoints_return_json(api_url):
+    """Test the single-query endpoints and parameter validation."""
+    with httpx.Client(base_url=api_url) as client:
+        nearby = client.get("/v1/nearby", params={"lat": 40.7128, "lon": -74.006, "radius_km": 50, "top_n": 3})
+        visibility = client.get("/v1/visibility", params={"lat": 40.7128, "lon": -74.006})
+        weather = client.get("/v1/weather", params={"lat": 40.7128, "lon": -74.006})
+        bad = client.get("/v1/nearby", params={"lat": 140, "lon": -74.006})
+        unknown = client.get("/v1/nowhere", params={"lat": 40, "lon": -74})
+
+    assert nearby.status_code == 200 and len(nearby.json()) == 3
+    assert nearby.json()[0]["distance_km"] <= nearby.json()[-1]["distance_km"]
+    assert 1 <= visibility.json()["bortle_scale"] <= 9
+    assert set(weather.json()) == {"cloudiness", "moon", "bortle"}
+    assert bad.status_code == 400 and "lat" in bad.json()["error"]
+    assert unknown.status_code == 404
+
+
+def test_batch_runs_queries_and_reports_errors_per_query(api_url):
+    """Test that a batch answers every query in order, isolating failures."""
+    query = {"op": "nearby", "lat": 40.7128, "lon": -74.006, "radius_km": 50, "top_n": 2}
+    queries = [query, {"op": "visibility", "lat": 40.7, "lon": -74.0}, {"op": "nearby", "lat": "x", "lon": 0}, query]
+
+    response = httpx.post(f"{api_url}/v1/batch", json={"queries": queries})
+    results = response.json()["results"]
+
+    assert response.status_code == 200
+    assert len(results) == 4
+    assert results[0] == results[3] and len(results[0]["result"]) == 2
+    assert "bortle_scale" in results[1]["result"]
+    assert results[2]["status"] == 400
+    too_many = httpx.post(f"{api_url}/v1/batch", json={"queries": [query] * 1000})
+    assert too_many.status_code == 400
+
+
+def test_rejected_posts_keep_the_connection_usable(api_url):
+    """Test that an error reply to a POST consumes its body before the next keep-alive request."""
+    with httpx.Client(base_url=api_url) as client:
+        wrong_path = client.post("/v1/nowhere", json={"queries": [{"op": "visibility", "lat": 40, "lon": -74}]})
+        health = client.get("/health")
+        too_large = client.post("/v1/batch", content=b" " * (1024 * 1024 + 1))
+        after = client.get("/health")
+
+    assert wrong_path.status_code == 404
+    assert health.status_code == 200 and "pid" in health.json()
+    assert too_large.status_code == 413 and too_large.headers["connection"] == "close"
+    assert after.status_code == 200
+
+
+def test_compact_encoding_shrinks_record_lists():
+    """Test column-wise encoding, float rounding and gzip of large bodies."""
+    rows = [{"latitude": 40.123456789, "longitude": -74.0, "name": f"site {i}"} for i in range(200)]
+
+    plain, _ = encode_body(rows)
+    columns, _ = encode_body(rows, columns=True)
+    zipped, headers = encode_body(rows, columns=True, accept_gzip=True)
+
+    decoded = json.loads(columns)
+    assert decoded["columns"] == ["latitude", "longitude", "name"]
+    assert decoded["rows"][0] == [40.123457, -74.0, "site 0"]
+    assert len(columns) < 0.6 * len(plain)
+    assert headers == {"Content-Encoding": "gzip"} and gzip.decompress(zipped) == columns
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-forking needs os.fork")
+def test_forked_workers_share_the_socket():
+    """Test that forked workers all serve requests and are stopped cleanly."""
+    api = QueryApi()
+    api.preload([])
+    with ApiServer(api, port=0, workers=2) as server:
+        with httpx.Client(base_url=server.url) as client:
+            pids = {client.get("/health", headers={"Connection": "close"}).json()["pid"] for _ in range(40)}
+        children = set(server._children)
+
+    assert pids <= children and os.getpid() not in pids
+    for pid in children:
+        with pytest.raises(ChildProcessError):
+            os.waitpid(pid, os.WNOHANG)
@@ -0,0 +1,75 @@
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_score import main, run_batch
+from models.optimal_locations import OptimalLocationFinder
+from services.nearby_locations_service import find_nearby_observation_locations
+
+NIGHT = date(2026, 7, 4)
+
+
+@pytest.fixture
+def sites_csv(tmp_path):
+    """Sites around New York, one outside every map and one with a bad coordinate."""
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame({
+        "name": [f"site {i}" for i in range(40)],
+        "Lat": np.r_[40.7 + rng.uniform(-1, 1, 38), -60.0, 95.0],
+        "Lng": np.r_[-74.0 + rng.uniform(-1, 1, 38), 0.0, 10.0],
+    })
+    path = tmp_path / "sites.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_batch_scores_match_the_single_site_services(sites_csv, tmp_path):
+    """Test that batch columns agree with the per-site finder, nearby search and weather."""
+    output = str(tmp_path / "scores.csv")
+    summary = run_batch(sites_csv, output, chunk_rows=16, night=NIGHT, weather=True)
+
+    assert summary["sites"] == 40 and summary["invalid_sites"] == 1
+    assert summary["regions"] == {"North America": 38, "uncovered": 2}
+    scores = pd.read_csv(output).sort_values("row").set_index("row")
+    assert list(scores["name"]) == [f"site {i}" for i in range(40)]
+
+    finder = OptimalLocationFinder()
+    for _, site in scores.iloc[:38].iterrows():
+        assert site["light_pollution_index"] == finder.get_light_pollution_at(site["Lat"], site["Lng"])
+        assert 1 <= site["bortle_prediction"] <= 9
+        assert site["moon_phase"] and site["cloudiness_source"] == "scraped"
+        nearest = find_nearby_observation_locations(site["Lat"], site["Lng"], 25, top_n=1)
+        if nearest:
+            assert site["nearest_observation_km"] == pytest.approx(nearest[0]["distance_km"], abs=0.01)
+            assert site["limiting_mag"] == nearest[0]["limiting_mag"]
+        else:
+            assert np.isnan(site["nearest_observation_km"])
+    assert np.isnan(scores["light_pollution_index"][38]) and not np.isnan(scores["dark_hours"][38])
+    assert scores.iloc[39].drop(["name", "Lat", "Lng", "region"]).isna().all()
+
+
+def test_interrupted_batch_resumes_missing_chunks(sites_csv, tmp_path, capsys):
+    """Test that a rerun only scores the chunks missing on disk, in forked workers."""
+    output = str(tmp_path / "scores.csv")
+    first = run_batch(sites_csv, output, workers=2, chunk_rows=8, night=NIGHT, keep_parts=True)
+    expected = pd.read_csv(output)
+    assert first["chunks"] == 6 and first["resumed_chunks"] == 0
+
+    # An interrupted run leaves some parts, possibly a half-written one, and no output
+    os.remove(output)
+    os.remove(f"{output}.parts/part-000003.csv")
+    open(f"{output}.parts/part-000003.csv.tmp", "w").close()
+    second = run_batch(sites_csv, output, workers=2, chunk_rows=8, night=None)
+
+    assert second["resumed_chunks"] == 5
+    pd.testing.assert_frame_equal(pd.read_csv(output), expected)
+    assert not os.path.exists(f"{output}.parts")
+
+    run_batch(sites_csv, output, chunk_rows=8, night=NIGHT, keep_parts=True)
+    with pytest.raises(SystemExit, match="--restart"):
+        main([sites_csv, output, "--chunk-rows", "10"])
+    main([sites_csv, output, "--chunk-rows", "10", "--restart", "--workers", "0"])
+    assert "in 5 chunks (0 resumed)" in capsys.readouterr().out
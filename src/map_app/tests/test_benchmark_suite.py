@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+
+from benchmarks import suite, synthetic
+from models.optimal_locations import LIGHT_POLLUTION_SCALE, OptimalLocationFinder
+from services.nearby_locations_service import find_nearby_observation_locations
+from services.observation_points import load_observation_points
+
+
+def test_synthetic_data_feeds_the_finder_and_nearby_search(tmp_path):
+    """Test that synthetic rasters and observation files work with the real services."""
+    raster = synthetic.synthetic_raster(512, 270, seed=1)
+    colors = {tuple(color) for color in np.unique(raster.reshape(-1, 3), axis=0).tolist()}
+    assert colors <= set(LIGHT_POLLUTION_SCALE) and len(colors) > 3
+    assert np.array_equal(raster, synthetic.synthetic_raster(512, 270, seed=1))
+
+    finder = OptimalLocationFinder()
+    synthetic.install_raster(finder, raster)
+    center = synthetic.lit_points(raster, 1, seed=1, min_level=6)[0]
+    assert finder.get_light_pollution_at(*center) >= 6
+    results = finder.find_optimal_locations(*center, 200, top_n=5)
+    assert results and all(loc["light_pollution_index"] < 6 for loc in results)
+
+    path = synthetic.write_observations_csv(str(tmp_path / "obs.csv"), 25_000, seed=1, chunk_rows=10_000)
+    assert len(load_observation_points(path)) == 25_000
+    town = synthetic.observation_centers(25_000, seed=1)[0]
+    assert find_nearby_observation_locations(*town, 50, csv_path=path, top_n=3)
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Test regression, improvement, noise floor and added/removed benchmarks."""
+    baseline = {"benchmarks": {
+        "slower": {"median_ms": 10.0}, "faster": {"median_ms": 10.0},
+        "steady": {"median_ms": 10.0}, "tiny": {"median_ms": 0.01}, "dropped": {"median_ms": 1.0},
+    }}
+    current = {"benchmarks": {
+        "slower": {"median_ms": 12.0}, "faster": {"median_ms": 5.0},
+        "steady": {"median_ms": 10.5}, "tiny": {"median_ms": 0.03}, "added": {"median_ms": 1.0},
+    }}
+
+    rows = {row["name"]: row for row in suite.compare(baseline, current, threshold=0.15)}
+
+    assert {name: row["status"] for name, row in rows.items()} == {
+        "slower": "regressed", "faster": "improved", "steady": "ok",
+        "tiny": "ok", "dropped": "missing", "added": "new",
+    }
+    assert abs(rows["slower"]["change"] - 0.2) < 1e-9
+
+
+def test_run_writes_results_and_compare_exits_nonzero_on_regression(tmp_path):
+    """Test the run and compare commands end to end."""
+    baseline_path = tmp_path / "baseline.json"
+    current_path = tmp_path / "current.json"
+
+    assert suite.main(["run", "--only", "html", "--repeat", "3", "--output", str(baseline_path)]) == 0
+    baseline = json.loads(baseline_path.read_text())
+    assert baseline["schema"] == suite.SCHEMA_VERSION and baseline["scale"] == "small"
+    assert list(baseline["benchmarks"]) == ["html.extract_forecast"]
+    assert baseline["benchmarks"]["html.extract_forecast"]["repeat"] == 3
+
+    slower = json.loads(baseline_path.read_text())
+    slower["benchmarks"]["html.extract_forecast"]["median_ms"] *= 2
+    current_path.write_text(json.dumps(slower))
+    assert suite.main(["compare", str(baseline_path), str(baseline_path)]) == 0
+    assert suite.main(["compare", str(baseline_path), str(current_path)]) == 1
@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from services import weather_service
+from services.bounded_cache import BoundedLRUCache, approximate_size
+from services.clearoutside_parser import extract_forecast_fields
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "clearoutside_forecast.html"
+
+
+def test_lru_evicts_least_recently_used_entry():
+    """Test that reading an entry protects it from the next eviction."""
+    cache = BoundedLRUCache(max_entries=2, max_bytes=10_000, sizeof=lambda value: 1)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+
+
+def test_memory_budget_evicts_until_within_bytes():
+    """Test that the byte budget is enforced independently of the entry limit."""
+    cache = BoundedLRUCache(max_entries=100, max_bytes=100, sizeof=len)
+    cache.put("a", "x" * 40)
+    cache.put("b", "x" * 40)
+
+    cache.put("c", "x" * 70)
+
+    assert len(cache) == 1
+    stats = cache.stats()
+    assert stats["bytes"] == 70
+    assert stats["evictions"] == 2
+    assert stats["evicted_bytes"] == 80
+
+
+def test_oversized_value_is_rejected():
+    """Test that a value larger than the whole budget is not stored."""
+    cache = BoundedLRUCache(max_entries=10, max_bytes=10, sizeof=len)
+
+    assert cache.put("big", "x" * 11) is False
+    assert len(cache) == 0
+    assert cache.stats()["rejected"] == 1
+
+
+def test_invalidate_and_clear():
+    """Test the explicit invalidation API and its metrics."""
+    cache = BoundedLRUCache(max_entries=10, max_bytes=10_000)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    assert cache.clear() == 1
+    assert cache.stats()["invalidations"] == 2
+    assert cache.stats()["bytes"] == 0
+
+
+def test_approximate_size_uses_nbytes():
+    """Test that numpy arrays are measured by their buffer size."""
+    assert approximate_size(np.zeros(1000, dtype=np.float64)) == 8000
+    assert approximate_size({"a": [1, 2, 3]}) > approximate_size({})
+
+
+def test_forecast_record_is_read_only():
+    """Test that fetchers keep an immutable record of the parsed page."""
+    fields = extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))
+    fetcher = weather_service.ClearOutsideWeatherFetcher(40.7128, -74.0060, fields=fields)
+    record = fetcher.record
+
+    with pytest.raises(TypeError):
+        record.moon["illumination_percent"] = 0
+    with pytest.raises(ValueError):
+        record.hourly.total_clouds[0] = 0
+    assert not hasattr(fetcher, "fields")
+    assert 0 < fetcher.nbytes < 64 * 1024
+    assert fetcher.get_moon_brightness()["illumination_percent"] == 52.0
+
+
+def test_weather_fetcher_cache_is_bounded_and_skips_failures(monkeypatch):
+    """Test fetcher caching per grid cell, LRU bounds and invalidation."""
+    fields = extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))
+    calls = []
+
+    def fake_fetch(lat, lon):
+        calls.append((lat, lon))
+        return None if lat < 0 else fields
+
+    monkeypatch.setattr(weather_service, "fetch_forecast_fields", fake_fetch)
+    monkeypatch.setattr(
+        weather_service, "_fetcher_cache", weather_service.BoundedLRUCache(max_entries=2, max_bytes=10**7)
+    )
+
+    first = weather_service.get_weather_fetcher(40.7128, -74.0060)
+    # A point a few meters away shares the forecast cell
+    assert weather_service.get_weather_fetcher(40.7129, -74.0061) is first
+    assert len(calls) == 1
+
+    # Failed fetches fall back without being cached
+    weather_service.get_weather_fetcher(-33.87, 151.21)
+    weather_service.get_weather_fetcher(-33.87, 151.21)
+    assert len(calls) == 3
+
+    weather_service.get_weather_fetcher(34.05, -118.24)
+    weather_service.get_weather_fetcher(51.5, -0.12)
+    stats = weather_service.get_weather_fetcher_cache_stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+
+    assert weather_service.invalidate_weather_fetchers(51.5, -0.12) == 1
+    assert weather_service.invalidate_weather_fetchers() == 1
@@ -0,0 +1,94 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from services import cache_backends
+from services.cache_backends import CacheBackend, DiskCacheBackend, MemoryCacheBackend, cached
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_memory_backend_expires_entries_and_returns_copies(clock):
+    """Test TTL expiry and that callers cannot mutate cached values."""
+    backend = MemoryCacheBackend(max_entries=8, max_bytes=10_000, clock=clock)
+    backend.set("a", {"cloudiness_percent": 20}, ttl_seconds=60)
+
+    hit, value = backend.get("a")
+    value["cloudiness_percent"] = 99
+    assert hit and backend.get("a") == (True, {"cloudiness_percent": 20})
+
+    clock.now += 61
+    assert backend.get("a") == (False, None)
+
+
+def test_disk_backend_is_shared_between_instances(tmp_path, clock):
+    """Test that a second process (instance) sees entries and expiry applies."""
+    path = str(tmp_path / "service.sqlite3")
+    DiskCacheBackend(path, clock=clock).set("moon", {"illumination_percent": 42}, ttl_seconds=10)
+    other = DiskCacheBackend(path, clock=clock)
+
+    assert other.get("moon") == (True, {"illumination_percent": 42})
+    clock.now += 11
+    assert other.get("moon") == (False, None)
+    assert other.purge_expired() == 1
+
+
+def test_backends_must_implement_the_whole_interface():
+    """Test that a backend missing part of the interface cannot be created."""
+
+    class GetOnly(CacheBackend):
+        def get(self, key):
+            return False, None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+    assert MemoryCacheBackend().stats()["entries"] == 0
+
+
+def test_cached_decorator_skips_rejected_results_and_clears(monkeypatch):
+    """Test memoization, the cache_if predicate and clear()."""
+    monkeypatch.setattr(cache_backends, "_backend", MemoryCacheBackend())
+    calls = []
+
+    @cached("test_lookup", ttl_seconds=60, cache_if=lambda value: value["source"] != "fallback")
+    def lookup(latitude, longitude, source="scraped"):
+        calls.append((latitude, longitude, source))
+        return {"latitude": latitude, "source": source}
+
+    lookup(40.0, -74.0)
+    lookup(40.0, -74.0)
+    assert len(calls) == 1
+
+    lookup(40.0, -74.0, source="fallback")
+    lookup(40.0, -74.0, source="fallback")
+    assert len(calls) == 3
+
+    lookup.clear()
+    lookup(40.0, -74.0)
+    assert len(calls) == 4
+
+
+def test_services_import_without_streamlit_or_sklearn():
+    """Test that a plain worker can import the services without the app's heavy deps."""
+    code = (
+        "import sys; import services.weather_service, services.visibility_service, models.bortle_predictor; "
+        "print('streamlit' in sys.modules, 'sklearn' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_package_exports_load_their_module_on_first_access():
+    """Test the lazy package exports of models and services."""
+    code = (
+        "import sys, models, services; loaded = 'models.observing_windows' in sys.modules; "
+        "forecast = models.HourlyForecast; "
+        "print(loaded, forecast is sys.modules['models.observing_windows'].HourlyForecast, "
+        "'HourlyForecast' in vars(models), callable(services.get_cloudiness), hasattr(services, 'nothing'))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+
+    assert result.stdout.split() == ["False", "True", "True", "True", "False"]
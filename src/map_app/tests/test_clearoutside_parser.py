@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+from services.clearoutside_parser import (
+    extract_forecast_fields,
+    extract_forecast_fields_beautifulsoup,
+)
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def _load_fixture(name: str) -> str:
+    return (FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("fixture", ["clearoutside_forecast.html", "clearoutside_minimal.html"])
+def test_streaming_extractor_matches_beautifulsoup(fixture):
+    """Test that the single-pass extractor returns the same fields as the tree search."""
+    pytest.importorskip("bs4")
+    html = _load_fixture(fixture)
+
+    streaming = extract_forecast_fields(html)
+    reference = extract_forecast_fields_beautifulsoup(html)
+
+    for key in ("cloudiness_percent", "moon", "bortle"):
+        assert streaming[key] == reference[key]
+
+
+def test_extracts_forecast_page_fields():
+    """Test extracted values from the recorded forecast page."""
+    fields = extract_forecast_fields(_load_fixture("clearoutside_forecast.html"))
+
+    assert fields["cloudiness_percent"] == 23
+    assert fields["moon"] == {
+        "moon_phase": "Waxing Gibbous",
+        "illumination_percent": 52.0,
+        "moon_rise_time": "14:31:00",
+        "moon_set_time": "23:58:00",
+    }
+    assert fields["bortle"] == {
+        "bortle_scale": 7,
+        "magnitude": 18.21,
+        "brightness_mcd_m2": 3.95,
+        "artificial_brightness_ucd_m2": 3775.23,
+    }
+
+
+def test_cloudiness_uses_first_text_hit_in_document_order():
+    """Test that a nested "cloud" text beats a later hit in an enclosing element."""
+    html = "<div>outer 90% <p>Cloud cover <b>15%</b></p> cloud tail</div>"
+
+    assert extract_forecast_fields(html)["cloudiness_percent"] == 15
+
+
+def test_missing_fields_use_defaults():
+    """Test defaults when the page has no moon, Bortle or cloud data."""
+    fields = extract_forecast_fields("<html><body><p>Nothing here</p></body></html>")
+
+    assert fields["cloudiness_percent"] == 50
+    assert fields["moon"]["moon_phase"] == "Unknown"
+    assert fields["moon"]["illumination_percent"] == 50.0
+    assert fields["bortle"]["bortle_scale"] == 5
+
+
+def test_extracts_hourly_table():
+    """Test that the 7-day hourly table is parsed in the same pass."""
+    table = extract_forecast_fields(_load_fixture("clearoutside_forecast.html"))["hourly"]
+    days = table["days"]
+
+    assert (table["utc_offset_hours"], table["start_date"]) == (-4.0, "2026-10-18")
+    assert extract_forecast_fields(_load_fixture("clearoutside_minimal.html"))["hourly"]["utc_offset_hours"] is None
+    assert len(days) == 7
+    assert days[0]["date"] == "18/10"
+    assert days[0]["hours"] == list(range(24))
+    assert days[0]["darkness"] == [19 * 60 + 41, 5 * 60 + 43]
+    assert days[0]["moon_illumination"] == 52.0
+    assert (days[0]["moon_rise"], days[0]["moon_set"]) == (14 * 60 + 31, 23 * 60 + 58)
+    for name in ("total_clouds", "low_clouds", "medium_clouds", "high_clouds"):
+        assert len(days[0][name]) == 24
+        assert all(0 <= value <= 100 for value in days[0][name])
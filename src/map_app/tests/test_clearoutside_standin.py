@@ -0,0 +1,36 @@
+import httpx
+from services import weather_service
+from services.clearoutside_parser import extract_forecast_fields
+
+
+def test_pages_vary_by_coordinate_but_are_deterministic(clearoutside):
+    """Test per-coordinate variation of the recorded page."""
+    new_york = extract_forecast_fields(clearoutside.render(40.71, -74.00).decode())
+    again = extract_forecast_fields(clearoutside.render(40.71, -74.00).decode())
+    elsewhere = [extract_forecast_fields(clearoutside.render(lat, 10.0).decode()) for lat in (1.0, 2.0, 3.0, 4.0)]
+
+    assert new_york == again
+    assert any(fields["bortle"] != new_york["bortle"] for fields in elsewhere)
+    assert any(fields["hourly"] != new_york["hourly"] for fields in elsewhere)
+    # The moon is the same everywhere
+    assert all(fields["moon"] == new_york["moon"] for fields in elsewhere)
+    assert "40.71N 74.00W" in clearoutside.render(40.71, -74.00).decode()
+
+
+def test_injected_errors_and_unknown_paths(clearoutside):
+    """Test configured error rate and 404 for non-forecast paths."""
+    clearoutside.config.error_rate = 1.0
+
+    assert httpx.get(f"{clearoutside.url}/forecast/40.71/-74.00").status_code == 503
+    clearoutside.config.error_rate = 0.0
+    assert httpx.get(f"{clearoutside.url}/about").status_code == 404
+    assert clearoutside.stats() == {"requests": 2, "errors": 1, "not_found": 1}
+
+
+def test_weather_service_scrapes_stand_in_offline(clearoutside):
+    """Test that the weather service runs end to end against the stand-in."""
+    result = weather_service.get_bortle_scale(12.34, 56.78)
+
+    assert result["source"] == "scraped"
+    assert 1 <= result["bortle_scale"] <= 9
+    assert clearoutside.stats()["requests"] == 1
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from api_server import ApiError, QueryApi
+from benchmarks import synthetic
+from models import diversity
+from models.optimal_locations import OptimalLocationFinder
+
+
+def _pairwise_km(east, north):
+    distances = np.hypot(east[:, None] - east[None, :], north[:, None] - north[None, :])
+    np.fill_diagonal(distances, np.inf)
+    return distances
+
+
+def test_diversify_keeps_candidates_apart_and_caps_each_sector():
+    """Test the separation, best-first order and sector caps against a brute-force check."""
+    rng = np.random.default_rng(3)
+    east, north = rng.uniform(-40, 40, (2, 20_000))
+    # One broad dark patch: a plain top-N would all come from its middle
+    scores = -np.hypot(east - 10, north - 5) + rng.uniform(0, 0.1, len(east))
+    scores[::97] = np.nan
+
+    picked = diversity.diversify(east, north, scores, 30, min_separation_km=4.0)
+    assert len(picked) == 30 and picked[0] == np.nanargmax(scores)
+    assert np.all(np.diff(scores[picked]) <= 0)
+    assert _pairwise_km(east[picked], north[picked]).min() >= 4.0
+    assert _pairwise_km(*(axis[diversity.diversify(east, north, scores, 30)] for axis in (east, north))).min() < 1.0
+
+    sectors = diversity.compass_sectors(diversity.bearings(east, north), 8)
+    best_per_sector = diversity.diversify(east, north, scores, 100, sectors=8)
+    assert sorted(sectors[best_per_sector].tolist()) == list(range(8))
+    for index in best_per_sector:
+        assert scores[index] == np.nanmax(scores[sectors == sectors[index]])
+
+    both = diversity.diversify(east, north, scores, 100, min_separation_km=4.0, sectors=8, per_sector=3)
+    assert np.bincount(sectors[both], minlength=8).tolist() == [3] * 8
+    assert _pairwise_km(east[both], north[both]).min() >= 4.0
+    assert [diversity.compass_direction(b) for b in (0, 44, 91, 200, 337.6)] == ["N", "NE", "E", "S", "N"]
+    with pytest.raises(ValueError):
+        diversity.diversify(east, north, scores, 5, min_separation_km=-1)
+
+
+def test_finder_spreads_results_and_returns_one_per_sector():
+    """Test the finder's separation, its sector mode and the API parameters."""
+    raster = synthetic.synthetic_raster(512, 270, seed=1)
+    finder = OptimalLocationFinder()
+    synthetic.install_raster(finder, raster)
+    center = synthetic.lit_points(raster, 1, seed=1, min_level=6)[0]
+
+    def east_north(results):
+        return diversity.local_offsets_km(
+            [loc["latitude"] for loc in results], [loc["longitude"] for loc in results], *center
+        )
+
+    # Synthetic pixels are about 28 km apart
+    packed = finder.find_optimal_locations(*center, 150, top_n=6, min_separation_km=0)
+    spread = finder.find_optimal_locations(*center, 150, top_n=6, min_separation_km=60)
+    assert len(spread) == 6 and _pairwise_km(*east_north(spread)).min() >= 60
+    assert _pairwise_km(*east_north(packed)).min() < 60
+    assert packed[0]["score"] >= spread[0]["score"]
+
+    per_sector = finder.find_optimal_locations(*center, 150, top_n=8, sectors=8)
+    directions = [loc["direction"] for loc in per_sector]
+    assert len(set(directions)) == len(directions) > 1
+    quadrants = [loc["direction"] for loc in finder.find_optimal_locations(*center, 150, top_n=8, sectors=4)]
+    assert len(set(quadrants)) == len(quadrants) > 1 and set(quadrants) <= {"N", "E", "S", "W"}
+    assert all(0 <= loc["bearing_deg"] < 360 for loc in per_sector)
+    with pytest.raises(ValueError):
+        finder.find_optimal_locations(*center, 150, sectors=-2)
+
+    api = QueryApi(finder=finder)
+    assert api.run("optimal", {"lat": center[0], "lon": center[1], "radius_km": 150, "sectors": 4, "top_n": 8})
+    with pytest.raises(ApiError):
+        api.run("optimal", {"lat": center[0], "lon": center[1], "sectors": 40})
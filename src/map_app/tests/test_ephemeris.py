@@ -0,0 +1,160 @@
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+from models import ephemeris
+from models.ephemeris import (
+    annotate_locations,
+    compute_hourly_sky,
+    compute_night_ephemeris,
+    evening_date,
+    get_moon_summary,
+    moon_illumination,
+    moon_phase_name,
+)
+
+# Reference events for the night of 2026-01-05, from a full-precision ephemeris
+NEW_YORK = (40.7128, -74.0060)
+SYDNEY = (-33.87, 151.21)
+REFERENCE = {
+    NEW_YORK: {
+        "moon_rise": "2026-01-06T00:30:12",
+        "moon_set": "2026-01-06T14:41:07",
+        "dusk": "2026-01-05T23:21:00",
+        "dawn": "2026-01-06T10:42:16",
+    },
+    SYDNEY: {
+        "moon_rise": "2026-01-05T10:53:03",
+        "moon_set": "2026-01-05T21:33:14",
+        "dusk": "2026-01-05T10:52:35",
+        "dawn": "2026-01-05T17:08:45",
+    },
+}
+
+
+def _minutes_apart(actual: np.datetime64, expected: str) -> float:
+    return abs((actual - np.datetime64(expected, "s")).astype("timedelta64[s]").astype(int)) / 60.0
+
+
+@pytest.mark.parametrize("site", [NEW_YORK, SYDNEY])
+def test_rise_set_and_twilight_within_a_few_minutes(site):
+    """Test events against reference times for a northern and a southern site."""
+    night = compute_night_ephemeris([site[0]], [site[1]], "2026-01-05")
+
+    for event, expected in REFERENCE[site].items():
+        assert _minutes_apart(getattr(night, event)[0, 0], expected) < 3, event
+
+
+def test_illumination_at_full_and_new_moon():
+    """Test illumination at the January 2026 full (Jan 3 10:03) and new (Jan 18 19:52) moons."""
+    full_moon_jd, new_moon_jd = 2461043.918, 2461059.328
+
+    full, new = moon_illumination(np.array([full_moon_jd, new_moon_jd]))
+
+    assert full > 0.99
+    assert new < 0.01
+
+
+def test_phase_names_distinguish_waxing_and_waning():
+    """Test that gibbous phases on either side of full moon get different names."""
+    names = moon_phase_name(np.array([2461040.0, 2461047.0, 2461066.0]))
+
+    assert list(names) == ["Waxing Gibbous", "Waning Gibbous", "First Quarter"]
+
+
+def test_no_astronomical_darkness_during_polar_summer():
+    """Test that a high-latitude midsummer night has no -18° twilight events."""
+    night = compute_night_ephemeris([69.65], [18.96], "2026-06-21")
+
+    assert np.isnat(night.dusk[0, 0])
+    assert np.isnat(night.dawn[0, 0])
+    assert night.dark_hours[0, 0] == 0
+    assert night.moon_free_dark_hours[0, 0] == 0
+
+
+def test_batched_sites_match_individual_computation(monkeypatch):
+    """Test that results do not depend on how sites are split into blocks."""
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(-55, 55, 9)
+    lons = rng.uniform(-180, 180, 9)
+    monkeypatch.setattr(ephemeris, "SITE_BLOCK_SIZE", 4)
+
+    batch = compute_night_ephemeris(lats, lons, "2026-03-01", nights=4)
+
+    assert batch.moon_rise.shape == (9, 4)
+    for i in (0, 5, 8):
+        single = compute_night_ephemeris([lats[i]], [lons[i]], "2026-03-01", nights=4)
+        np.testing.assert_array_equal(batch.dusk[i], single.dusk[0])
+        np.testing.assert_array_equal(batch.moon_rise[i], single.moon_rise[0])
+        np.testing.assert_allclose(batch.dark_hours[i], single.dark_hours[0])
+
+
+def test_dark_hours_match_twilight_interval():
+    """Test that counted dark hours agree with the dusk-to-dawn interval."""
+    night = compute_night_ephemeris([NEW_YORK[0]], [NEW_YORK[1]], "2026-01-05")
+
+    interval = (night.dawn[0, 0] - night.dusk[0, 0]).astype("timedelta64[s]").astype(int) / 3600.0
+
+    assert abs(night.dark_hours[0, 0] - interval) < 0.25
+    assert 0 <= night.moon_free_dark_hours[0, 0] <= night.dark_hours[0, 0]
+
+
+def test_hourly_sky_agrees_with_nightly_events():
+    """Test that hourly darkness and moon fractions add up to the night's figures."""
+    sites = [NEW_YORK, SYDNEY]
+    night = compute_night_ephemeris([s[0] for s in sites], [s[1] for s in sites], "2026-01-05")
+    # Local solar noon to noon of the night of 2026-01-05, per site
+    for i, (lat, lon) in enumerate(sites):
+        start = np.datetime64("2026-01-05T12", "h") - np.timedelta64(int(round(lon / 15)), "h")
+        sky = compute_hourly_sky([lat], [lon], start, 24)
+        assert abs(sky.darkness[0].sum() - night.dark_hours[i, 0]) < 0.25
+        moon_free = (sky.darkness[0] * (1 - sky.moon_up[0])).sum()
+        assert abs(moon_free - night.moon_free_dark_hours[i, 0]) < 0.5
+    assert abs(sky.moon_illumination.mean() - night.moon_illumination[1, 0]) < 3
+
+
+def test_moon_summary_shape():
+    """Test the single-site summary used by the sidebar and weather fallback."""
+    summary = get_moon_summary(NEW_YORK[0], NEW_YORK[1], "2026-01-05")
+
+    assert summary["moon_phase"] == "Waning Gibbous"
+    assert 80 <= summary["illumination_percent"] <= 100
+    assert summary["moon_rise_time"] == "00:30:11"
+    assert summary["darkness_start_time"].startswith("23:2")
+    assert summary["time_zone"] == "UTC"
+
+
+def test_annotate_locations_fills_candidate_fields():
+    """Test that candidate dictionaries gain tonight's moon and darkness figures."""
+    locations = [
+        {"latitude": NEW_YORK[0], "longitude": NEW_YORK[1]},
+        {"latitude": SYDNEY[0], "longitude": SYDNEY[1]},
+    ]
+
+    annotate_locations(locations, "2026-01-05")
+
+    for loc in locations:
+        assert loc["moon_brightness"] > 80
+        assert loc["moon_phase"] == "Waning Gibbous"
+        assert loc["dark_hours"] > 0
+    # Short southern-summer night versus a long northern-winter one
+    assert locations[1]["dark_hours"] < locations[0]["dark_hours"]
+    assert annotate_locations([]) == []
+
+
+def test_evening_date_follows_local_solar_time():
+    """Test that a western evening, already the next day in UTC, keeps its own night."""
+    # 21:30 EDT on 2026-10-18 in New York, 10:30 the next morning in Sydney
+    now = datetime(2026, 10, 19, 1, 30, tzinfo=timezone.utc)
+
+    assert evening_date(NEW_YORK[1], now) == date(2026, 10, 18)
+    assert evening_date(SYDNEY[1], now) == date(2026, 10, 18)
+    assert evening_date(NEW_YORK[1], datetime(2026, 10, 19, 18, 0)) == date(2026, 10, 19)
+
+    summary = get_moon_summary(NEW_YORK[0], NEW_YORK[1], now)
+    assert summary == get_moon_summary(NEW_YORK[0], NEW_YORK[1], "2026-10-18")
+    assert summary != get_moon_summary(NEW_YORK[0], NEW_YORK[1], "2026-10-19")
+
+    locations = [{"latitude": NEW_YORK[0], "longitude": NEW_YORK[1]}]
+    annotate_locations(locations, now)
+    assert locations[0]["moon_brightness"] == summary["illumination_percent"]
@@ -0,0 +1,66 @@
+from services.forecast_cache import ForecastCache
+
+
+def test_quantize_snaps_nearby_points_to_same_cell(tmp_path):
+    """Test that points a few meters apart share one grid point."""
+    cache = ForecastCache(path=str(tmp_path / "cache.sqlite3"), grid_degrees=0.05)
+
+    assert cache.quantize(40.7128, -74.0060) == cache.quantize(40.7130, -74.0062)
+    assert cache.quantize(40.7128, -74.0060) == (40.7, -74.0)
+
+
+def test_entries_are_shared_between_cache_instances(tmp_path):
+    """Test that a second instance (e.g. another worker process) sees stored values."""
+    path = str(tmp_path / "cache.sqlite3")
+    calls = []
+
+    def fetch(lat, lon):
+        calls.append((lat, lon))
+        return {"cloudiness_percent": 12, "source": "scraped"}
+
+    first = ForecastCache(path=path)
+    second = ForecastCache(path=path)
+
+    assert first.get_or_fetch("cloudiness", 40.7128, -74.0060, fetch)["cloudiness_percent"] == 12
+    assert second.get_or_fetch("cloudiness", 40.7129, -74.0061, fetch)["cloudiness_percent"] == 12
+    assert calls == [(40.7, -74.0)]
+
+
+def test_fields_use_their_own_ttl(tmp_path, clock):
+    """Test that cloudiness expires after 1 h while moon data is kept for 24 h."""
+    cache = ForecastCache(path=str(tmp_path / "cache.sqlite3"), stale_seconds=0, clock=clock)
+    cache.set("cloudiness", 10.0, 10.0, {"cloudiness_percent": 5, "source": "scraped"})
+    cache.set("moon", 10.0, 10.0, {"illumination_percent": 40.0, "source": "scraped"})
+
+    clock.now += 2 * 3600
+
+    assert cache.get("cloudiness", 10.0, 10.0) is None
+    assert cache.get("moon", 10.0, 10.0).value["illumination_percent"] == 40.0
+
+
+def test_stale_entry_is_served_while_revalidating(tmp_path, clock):
+    """Test stale-while-revalidate returns the old value and refreshes it."""
+    cache = ForecastCache(path=str(tmp_path / "cache.sqlite3"), stale_seconds=600, clock=clock)
+    cache.set("cloudiness", 10.0, 10.0, {"cloudiness_percent": 5, "source": "scraped"})
+    clock.now += 3600 + 60
+
+    result = cache.get_or_fetch(
+        "cloudiness", 10.0, 10.0, lambda lat, lon: {"cloudiness_percent": 80, "source": "scraped"}
+    )
+    assert result["cloudiness_percent"] == 5
+
+    cache._last_refresh_thread.join(timeout=5)
+    entry = cache.get("cloudiness", 10.0, 10.0)
+    assert entry.value["cloudiness_percent"] == 80
+    assert not entry.is_stale
+
+
+def test_fallback_results_are_not_persisted(tmp_path):
+    """Test that fallback data is returned but not cached."""
+    cache = ForecastCache(path=str(tmp_path / "cache.sqlite3"))
+    result = cache.get_or_fetch(
+        "bortle", 10.0, 10.0, lambda lat, lon: {"bortle_scale": 5, "source": "fallback"}
+    )
+
+    assert result["source"] == "fallback"
+    assert cache.get("bortle", 10.0, 10.0) is None
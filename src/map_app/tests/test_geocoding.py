@@ -0,0 +1,155 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from utils.geocoding import (
+    Gazetteer,
+    GeocodeCache,
+    Geocoder,
+    GeocodingError,
+    normalize_query,
+    parse_coordinates,
+)
+
+GAZETTEER = Path(__file__).resolve().parent / "fixtures" / "gazetteer_sample.csv"
+
+
+class CountingLookup:
+    """Stand-in for the online geocoder that records its queries."""
+
+    def __init__(self, answers=None, error=None):
+        self.answers = answers or {}
+        self.error = error
+        self.queries = []
+
+    def __call__(self, query):
+        self.queries.append(query)
+        if self.error is not None:
+            raise self.error
+        return self.answers.get(query)
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer.from_file(str(GAZETTEER))
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("40.7128,-74.0060", (40.7128, -74.006)),
+        ("-33.8688 151.2093", (-33.8688, 151.2093)),
+        ("40.7128° N, 74.0060° W", (40.7128, -74.006)),
+        ("N40.7128 W74.0060", (40.7128, -74.006)),
+        ("74.0060 W 40.7128 N", (40.7128, -74.006)),
+        ("40°42'46\"N 74°0'22\"W", (40.712778, -74.006111)),
+        ("12 34", None),
+        ("95, 10", None),
+        ("40.7 N 10 N", None),
+        ("10 Downing Street", None),
+    ],
+)
+def test_parse_coordinates(text, expected):
+    """Test decimal, hemisphere and DMS notation, and rejection of non-coordinates."""
+    result = parse_coordinates(text)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected, abs=1e-6)
+
+
+def test_coordinates_resolve_without_any_lookup(tmp_path):
+    """Test that literal coordinates never reach the cache or the network."""
+    online = CountingLookup()
+    geocoder = Geocoder(cache=GeocodeCache(str(tmp_path / "geo.sqlite3")), online=online)
+
+    result = geocoder.geocode("40.7128,-74.0060")
+
+    assert (result.latitude, result.longitude, result.source) == (40.7128, -74.006, "coordinates")
+    assert online.queries == []
+
+
+def test_online_results_persist_across_processes(tmp_path):
+    """Test that a second geocoder on the same cache file answers without the network."""
+    path = str(tmp_path / "geo.sqlite3")
+    online = CountingLookup({"Mauna Kea": (19.8207, -155.4681, "Mauna Kea")})
+    first = Geocoder(cache=GeocodeCache(path), online=online)
+
+    assert first.geocode("Mauna Kea").source == "online"
+    assert first.geocode("  mauna   KEA ").source == "memory"
+
+    second = Geocoder(cache=GeocodeCache(path), online=online)
+    assert second.geocode("Mauna Kea").source == "cache"
+    assert second.geocode("Atlantis") is None
+    assert Geocoder(cache=GeocodeCache(path), online=online).geocode("Atlantis") is None
+    assert online.queries == ["Mauna Kea", "Atlantis"]
+
+
+def test_online_errors_are_not_cached(tmp_path):
+    """Test that a network failure is reported, not cached, and retried on the next search."""
+    cache = GeocodeCache(str(tmp_path / "geo.sqlite3"))
+    failing = CountingLookup(error=ConnectionError("offline"))
+
+    with pytest.raises(GeocodingError, match="offline"):
+        Geocoder(cache=cache, online=failing).geocode("Mauna Kea")
+    assert cache.get(normalize_query("Mauna Kea")) == (False, None)
+    retry = Geocoder(cache=cache, online=failing)
+    with pytest.raises(GeocodingError):
+        retry.geocode("Mauna Kea")
+    assert len(failing.queries) == 2
+    assert retry.stats()["online_errors"] == 1
+
+
+def test_geocode_location_reports_service_errors(monkeypatch):
+    """Test that a geocoder outage is shown as an error, not as "not found"."""
+    from utils import geocoding, map_utils
+
+    messages = []
+    monkeypatch.setattr(map_utils.st, "error", lambda text: messages.append(("error", text)))
+    monkeypatch.setattr(map_utils.st, "warning", lambda text: messages.append(("warning", text)))
+    failing = Geocoder(online=CountingLookup(error=ConnectionError("offline")))
+    monkeypatch.setattr(geocoding, "get_geocoder", lambda: failing)
+
+    map_utils.geocode_location("Mauna Kea")
+    monkeypatch.setattr(geocoding, "get_geocoder", lambda: Geocoder(online=CountingLookup()))
+    map_utils.geocode_location("Atlantis")
+
+    assert [kind for kind, _ in messages] == ["error", "warning"]
+    assert "offline" in messages[0][1] and "not found" in messages[1][1]
+
+def test_gazetteer_lookup_prefers_population_and_country(gazetteer, tmp_path):
+    """Test exact place lookups, country qualifiers and accent folding."""
+    online = CountingLookup()
+    geocoder = Geocoder(cache=GeocodeCache(str(tmp_path / "geo.sqlite3")), gazetteer=gazetteer, online=online)
+
+    assert geocoder.geocode("paris").name == "Paris, FR"
+    assert geocoder.geocode("Paris, US").latitude == pytest.approx(33.6609)
+    assert geocoder.geocode("Sao Paulo").source == "gazetteer"
+    assert online.queries == []
+
+    # An unknown qualifier is left to the online geocoder
+    geocoder.geocode("Paris, Texas")
+    assert online.queries == ["Paris, Texas"]
+
+
+def test_gazetteer_suggestions_use_prefix_then_trigrams(gazetteer):
+    """Test autocomplete ranking and fuzzy matching of typos."""
+    assert [place.name for place in gazetteer.suggest("new", limit=3)] == ["New York City", "Newark", "New Haven"]
+    assert [place.label for place in gazetteer.suggest("lo", limit=3)] == ["London, GB", "Los Angeles, US", "London, CA"]
+    assert gazetteer.suggest("Flagstaf")[0].name == "Flagstaff"
+    assert gazetteer.suggest("Tuscon")[0].name == "Tucson"
+    assert gazetteer.suggest("") == []
+
+
+def test_local_resolution_takes_microseconds(gazetteer, tmp_path):
+    """Test that repeated and gazetteer searches stay far below a network round trip."""
+    geocoder = Geocoder(cache=GeocodeCache(str(tmp_path / "geo.sqlite3")), gazetteer=gazetteer, online=None)
+    queries = ["40.7128,-74.0060", "London", "Sydney", "Reykjavik"] * 250
+
+    started = time.perf_counter()
+    for query in queries:
+        assert geocoder.geocode(query) is not None
+    per_query = (time.perf_counter() - started) / len(queries)
+
+    assert per_query < 200e-6
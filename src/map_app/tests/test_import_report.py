@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+from benchmarks.import_report import APP_DIR, parse_importtime, summarize
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 | encodings
+import time:        50 |         50 |     PIL._version
+import time:       400 |        450 |   PIL
+import time:       200 |        200 |   config
+import time:       100 |        750 | main
+"""
+
+
+def test_parse_importtime_and_summarize():
+    """Test that importtime output is parsed and attributed to the target."""
+    records = parse_importtime(SAMPLE)
+
+    assert [(r.module, r.depth) for r in records] == [
+        ("_io", 1), ("encodings", 0), ("PIL._version", 2), ("PIL", 1), ("config", 1), ("main", 0),
+    ]
+    summary = summarize("main", records, top=2)
+    assert summary["total_ms"] == 0.75
+    assert summary["modules"] == 4
+    assert summary["heavy"] == ["PIL"]
+    assert summary["top"] == [("PIL", 0.45, 0.4), ("config", 0.2, 0.2)]
+
+
+def test_entry_points_do_not_import_heavy_dependencies():
+    """Test that main and the API server defer the map and ML stacks to first use."""
+    deferred = {
+        "main": ["folium", "pandas", "PIL", "sklearn", "bs4", "geopy"],
+        "api_server": ["PIL", "sklearn", "bs4", "geopy"],
+    }
+    for target, modules in deferred.items():
+        check = f"import sys, {target}; print(','.join(m for m in {modules!r} if m in sys.modules))"
+        result = subprocess.run(
+            [sys.executable, "-c", check], cwd=APP_DIR, capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == "", f"{target} imported {result.stdout.strip()}"
@@ -0,0 +1,92 @@
+import os
+import time
+
+import httpx
+import pytest
+
+from api_server import ApiServer, QueryApi
+from models.optimal_locations import OptimalLocationFinder
+from utils import instrumentation
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Record into a fresh registry with instrumentation turned on."""
+    fresh = instrumentation.MetricsRegistry()
+    monkeypatch.setattr(instrumentation, "_registry", fresh)
+    monkeypatch.setattr(instrumentation, "_enabled", True)
+    return fresh
+
+
+def test_disabled_instrumentation_records_nothing(monkeypatch):
+    """Test that spans and counters are no-ops while instrumentation is off."""
+    fresh = instrumentation.MetricsRegistry()
+    monkeypatch.setattr(instrumentation, "_registry", fresh)
+    monkeypatch.setattr(instrumentation, "_enabled", False)
+
+    with instrumentation.span("stage"):
+        pass
+    instrumentation.count("bytes_loaded_total", 10, source="x")
+
+    assert instrumentation.span("stage") is instrumentation.span("other")
+    assert fresh.snapshot() == {"spans": {}, "counters": {}}
+    assert fresh.render_prometheus() == ""
+
+
+def test_search_stages_and_cache_counters_export_as_prometheus(registry):
+    """Test that a finder search records its stages, map cache and bytes loaded."""
+    finder = OptimalLocationFinder()
+    finder.find_optimal_locations(40.7128, -74.006, 25, top_n=3)
+    finder.find_optimal_locations(40.7128, -74.006, 25, top_n=3)
+
+    snapshot = registry.snapshot()
+    assert snapshot["spans"]["finder.find_optimal_locations"]["count"] == 2
+    assert {"finder.decode_png", "finder.distances", "finder.classify"} <= set(snapshot["spans"])
+    assert snapshot["spans"]["finder.decode_png"]["count"] == 1
+    assert snapshot["counters"]['cache_requests_total{cache="region_map",result="miss"}'] == 1
+    assert snapshot["counters"]['cache_requests_total{cache="region_map",result="hit"}'] >= 1
+    png = os.path.join(finder.maps_dir, "NorthAmerica2024.png")
+    assert snapshot["counters"]['bytes_loaded_total{source="region_png"}'] == os.path.getsize(png)
+
+    text = registry.render_prometheus()
+    assert "# TYPE skyline_span_duration_seconds histogram" in text
+    assert 'skyline_span_duration_seconds_bucket{span="finder.find_optimal_locations",le="+Inf"} 2' in text
+    assert 'skyline_span_duration_seconds_count{span="finder.find_optimal_locations"} 2' in text
+    assert "# TYPE skyline_cache_requests_total counter" in text
+    assert 'skyline_cache_requests_total{cache="region_map",result="miss"} 1' in text
+
+
+def test_api_serves_metrics(registry):
+    """Test that the API server exports the metrics of the requests it answered."""
+    with ApiServer(QueryApi(), port=0, workers=0) as server:
+        httpx.get(f"{server.url}/v1/nearby", params={"lat": 40.7128, "lon": -74.006, "radius_km": 50})
+        response = httpx.get(f"{server.url}/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'span="nearby.find_nearby_observation_locations"' in response.text
+
+
+def test_slow_request_profiler_keeps_only_slow_profiles(tmp_path):
+    """Test that a slow request's sampled stacks are written and fast ones dropped."""
+
+    def spin_for(seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    profiler = instrumentation.SlowRequestProfiler(threshold_ms=50, interval_ms=1, output_dir=str(tmp_path))
+    with profiler.profile("GET /fast"):
+        pass
+    assert profiler.last_profile is None
+
+    with profiler.profile("GET /v1/slow"):
+        spin_for(0.2)
+
+    assert os.path.dirname(profiler.last_profile) == str(tmp_path)
+    assert os.path.basename(profiler.last_profile).startswith("GET__v1_slow-")
+    with open(profiler.last_profile) as handle:
+        lines = handle.read().splitlines()
+    stacks = dict(line.rsplit(" ", 1) for line in lines)
+    assert any("spin_for (test_instrumentation.py" in stack for stack in stacks)
+    assert sum(int(samples) for samples in stacks.values()) >= 10
@@ -0,0 +1,148 @@
+import time
+from pathlib import Path
+
+import pytest
+import streamlit as st
+from services import nearby_locations_service
+from streamlit.testing.v1 import AppTest
+
+from components.map_cache import get_map_cache_stats
+from components.map_display import get_new_click
+from components.timing_overlay import TIMINGS_KEY, record_timing
+from config import CLOUDINESS_TTL_SECONDS, DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+
+MAIN = Path(__file__).resolve().parents[1] / "main.py"
+
+LOCATIONS = [
+    {
+        "name": "Low-light spot #1",
+        "latitude": 40.9,
+        "longitude": -74.2,
+        "distance_km": 12.5,
+        "light_pollution_index": 1.5,
+        "cloudiness_percent": 20,
+        "moon_brightness": 40,
+        "conditions": "Clear Skies",
+    }
+]
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Count calls to the nearby-locations search made by the page."""
+    calls = []
+
+    def fake_search(latitude, longitude, radius_km, top_n=5, rank_by="distance"):
+        assert rank_by == "score"
+        calls.append((latitude, longitude, radius_km, top_n))
+        return [dict(loc) for loc in LOCATIONS]
+
+    monkeypatch.setattr(nearby_locations_service, "find_nearby_observation_locations", fake_search)
+    st.cache_data.clear()
+    yield calls
+    st.cache_data.clear()
+
+
+def test_search_runs_once_per_input_state(searches):
+    """Test that map and panel share one query and unchanged reruns reuse it."""
+    app = AppTest.from_file(str(MAIN), default_timeout=30)
+    app.session_state["first_search_done"] = True
+    app.run()
+    assert not app.exception
+    assert len(searches) == 1
+
+    app.run()
+    assert len(searches) == 1
+
+    app.session_state["selected_radius"] = 20
+    app.run()
+    assert [call[2] for call in searches] == [5, 20]
+
+
+def test_timing_overlay_records_sections(searches):
+    """Test that every page section is timed and shown with ?timing=1."""
+    app = AppTest.from_file(str(MAIN), default_timeout=30)
+    app.session_state["first_search_done"] = True
+    app.query_params["timing"] = "1"
+    app.run()
+
+    timings = app.session_state[TIMINGS_KEY]
+    assert {"full page", "time to map", "map", "results panel", "sidebar"} <= set(timings)
+    assert any("Render timings" in expander.label for expander in app.sidebar.expander)
+
+
+def test_record_timing_accumulates_runs():
+    """Test last, total and run count bookkeeping."""
+    store = {}
+    record_timing("map", 10.0, store)
+    entry = record_timing("map", 30.0, store)
+
+    assert entry == {"last_ms": 30.0, "runs": 2, "total_ms": 40.0}
+
+
+def test_get_new_click_ignores_repeated_clicks():
+    """Test that the click st_folium keeps returning is only handled once."""
+    map_data = {"last_clicked": {"lat": 41.1234567, "lng": -73.5}}
+
+    click = get_new_click(map_data, None)
+
+    assert click == (41.123457, -73.5)
+    assert get_new_click(map_data, click) is None
+    assert get_new_click({"last_clicked": None}, click) is None
+    assert get_new_click(None, None) is None
+
+
+def test_observation_layer_loads_points_for_viewport(searches):
+    """Test that the GaN layer is only loaded when switched on, for the area in view."""
+    app = AppTest.from_file(str(MAIN), default_timeout=30)
+    app.session_state["first_search_done"] = True
+    app.run()
+    assert "observation_points" not in app.session_state
+
+    app.toggle(key="show_observations").set_value(True).run()
+
+    assert not app.exception
+    region, points = app.session_state["observation_points"]
+    assert len(points) > 0
+    assert region[0] <= points.latitude.min() and points.latitude.max() <= region[2]
+
+
+def test_unchanged_rerun_is_served_from_map_cache(searches):
+    """Test that rerunning with the same inputs reuses the built map."""
+    app = AppTest.from_file(str(MAIN), default_timeout=30)
+    app.session_state["first_search_done"] = True
+    app.run()
+    hits = get_map_cache_stats()["hits"]
+
+    app.run()
+
+    assert not app.exception
+    assert get_map_cache_stats()["hits"] > hits
+
+
+def test_sidebar_reports_source_of_every_metric(searches):
+    """Test that the sidebar shows each metric with the source that produced it."""
+    app = AppTest.from_file(str(MAIN), default_timeout=30)
+    app.session_state["first_search_done"] = True
+    app.run()
+
+    assert not app.exception
+    assert [metric.label for metric in app.sidebar.metric][:3] == ["💡 Light Pollution", "☁️ Cloudiness", "🌕 Moon Brightness"]
+    captions = " ".join(caption.value for caption in app.sidebar.caption)
+    for source in ("light_pollution", "bortle", "sky_visibility", "cloudiness", "moon"):
+        assert f"{source}: " in captions
+    assert "loading…" not in captions
+
+
+@pytest.mark.parametrize("age, shown", [(0.0, True), (CLOUDINESS_TTL_SECONDS + 1.0, False)])
+def test_sidebar_metrics_expire_with_the_forecast(searches, age, shown):
+    """Test that kept sidebar metrics are reused until the cloudiness TTL passes."""
+    kept = {"latitude": DEFAULT_LATITUDE, "longitude": DEFAULT_LONGITUDE, "forecast_description": "Kept forecast"}
+    app = AppTest.from_file(str(MAIN), default_timeout=30)
+    app.session_state["first_search_done"] = True
+    app.session_state["location_metrics"] = ((DEFAULT_LATITUDE, DEFAULT_LONGITUDE), kept, time.monotonic() - age)
+    app.run()
+
+    assert not app.exception
+    captions = " ".join(caption.value for caption in app.sidebar.caption)
+    assert ("Kept forecast" in captions) is shown
@@ -0,0 +1,60 @@
+import copy
+
+import folium
+
+from components.map_cache import MapBuildCache, canonical_map_key
+from utils.map_utils import add_center_marker, create_base_map
+
+
+def test_canonical_key_ignores_order_and_float_noise():
+    """Test that equal map inputs hash to the same key and different ones do not."""
+    key = canonical_map_key(center=(40.7128, -74.006), radius_km=5, layers=["gan"])
+
+    assert key == canonical_map_key(layers=["gan"], radius_km=5, center=[40.71280000001, -74.006])
+    assert key != canonical_map_key(center=(40.7128, -74.006), radius_km=10, layers=["gan"])
+    assert key != canonical_map_key(center=(40.7128, -74.006), radius_km=5, layers=[])
+
+
+def test_map_cache_reuses_built_maps():
+    """Test that a key is built once and later served from the cache."""
+    cache = MapBuildCache(max_entries=4, max_bytes=1 << 20)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return add_center_marker(create_base_map(40.7128, -74.006, 12), 40.7128, -74.006, "Center")
+
+    first, hit = cache.get_or_build("a", build)
+    html = copy.deepcopy(first).get_root().render()
+    second, second_hit = cache.get_or_build("a", build)
+
+    assert not hit and second_hit
+    assert second is first
+    assert len(builds) == 1
+    # Rendering a copy leaves the shared map as it was built
+    assert copy.deepcopy(second).get_root().render().count("L.marker") == html.count("L.marker") == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_map_cache_evicts_by_bytes():
+    """Test that the least recently used map is dropped over the byte budget."""
+
+    def layer():
+        group = folium.FeatureGroup(name="layer")
+        folium.Marker([40.0, -74.0], popup="x" * 1000).add_to(group)
+        return group
+
+    sizer = MapBuildCache(max_entries=1, max_bytes=1 << 20)
+    sizer.get_or_build("a", layer)
+    entry_bytes = sizer.stats()["bytes"]
+    assert entry_bytes > 1000  # The popup text is counted
+    # Room for two layers, not three
+    cache = MapBuildCache(max_entries=10, max_bytes=entry_bytes * 5 // 2)
+
+    cache.get_or_build("a", layer)
+    cache.get_or_build("b", layer)
+    cache.get_or_build("a", layer)  # "b" is now least recently used
+    cache.get_or_build("c", layer)
+
+    assert cache.get_or_build("a", layer)[1]
+    assert not cache.get_or_build("b", layer)[1]
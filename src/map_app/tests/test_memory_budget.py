@@ -0,0 +1,64 @@
+from benchmarks import synthetic
+from models.optimal_locations import OptimalLocationFinder
+from services import memory_budget
+from services.bounded_cache import BoundedLRUCache, memoize
+from services.memory_budget import MemoryGovernor
+
+
+def test_governor_evicts_the_oldest_entry_across_caches():
+    """Test that the budget is shared and the least recently used entry of any cache goes first."""
+    governor = MemoryGovernor(budget_bytes=100)
+    pages = governor.register("pages", BoundedLRUCache(max_entries=10, max_bytes=1000, sizeof=len))
+    results = governor.register("results", BoundedLRUCache(max_entries=10, max_bytes=1000, sizeof=len))
+    governor.register_usage("model", lambda: 20)
+
+    pages.put("a", "x" * 30)
+    results.put("b", "x" * 30)
+    assert pages.get("a")  # b is now the least recently used entry
+    pages.put("c", "x" * 30)
+
+    assert "b" not in results and "a" in pages and "c" in pages
+    stats = governor.stats()
+    assert stats["used_bytes"] == 80
+    assert stats["caches"] == {
+        "pages": {"bytes": 60, "entries": 2, "evictions": 0, "evicted_bytes": 0},
+        "results": {"bytes": 0, "entries": 0, "evictions": 1, "evicted_bytes": 30},
+        "model": {"bytes": 20, "entries": None, "evictions": 0, "evicted_bytes": 0},
+    }
+
+
+def test_without_budget_caches_keep_their_own_limits():
+    """Test that an unbudgeted governor only reports usage."""
+    governor = MemoryGovernor(budget_bytes=None)
+    cache = governor.register("pages", BoundedLRUCache(max_entries=10, max_bytes=1000, sizeof=len))
+    for key in "abcde":
+        cache.put(key, "x" * 100)
+
+    assert len(cache) == 5
+    assert governor.stats()["caches"]["pages"]["bytes"] == 500
+
+
+def test_least_recently_searched_region_map_is_evicted(monkeypatch):
+    """Test that region maps and memoized results share the budget, oldest region first."""
+    raster = synthetic.synthetic_raster(200, 100, seed=1)
+    governor = MemoryGovernor(budget_bytes=int(2.5 * raster.nbytes))
+    monkeypatch.setattr(memory_budget, "_governor", governor)
+    finder = OptimalLocationFinder()
+
+    synthetic.install_raster(finder, raster, "Europe")
+    synthetic.install_raster(finder, raster, "Australia")
+    finder.get_light_pollution_at(50.0, 10.0)  # Europe
+    synthetic.install_raster(finder, raster, "Asia")
+
+    assert "Europe" in finder._map_cache and "Asia" in finder._map_cache
+    assert "Australia" not in finder._map_cache
+
+    calls = []
+    table = memoize(memory_budget.register_cache("tables", BoundedLRUCache(4, raster.nbytes)))(
+        lambda name: calls.append(name) or bytearray(raster.nbytes // 2)
+    )
+    table("a")
+    table("a")
+    assert calls == ["a"]
+    assert "Europe" not in finder._map_cache  # Searched before Asia was installed
+    assert governor.stats()["caches"]["region_maps"]["evictions"] == 2
@@ -0,0 +1,69 @@
+import time
+
+from services.metrics_aggregator import ERROR, OK, TIMEOUT, MetricSource, MetricsAggregator, merge_result
+
+
+def slow_source(name: str, seconds: float, value: int) -> MetricSource:
+    def fetch(latitude, longitude):
+        time.sleep(seconds)
+        return {name: value, "source": "upstream"}
+
+    return MetricSource(name, fetch, lambda latitude, longitude: {name: None, "source": "fallback"})
+
+
+def test_sources_run_concurrently_and_arrive_in_completion_order():
+    """Test that total time is the slowest source, not the sum, and fast results come first."""
+    aggregator = MetricsAggregator(
+        [slow_source("slow", 0.3, 1), slow_source("medium", 0.2, 2), slow_source("fast", 0.0, 3)],
+        deadline_seconds=2.0,
+    )
+
+    started = time.perf_counter()
+    results = list(aggregator.iter_results(40.0, -74.0))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.45
+    assert [result.name for result in results] == ["fast", "medium", "slow"]
+    assert all(result.status == OK and result.source == "upstream" for result in results)
+    assert results[-1].elapsed_ms >= 300
+
+
+def test_late_and_failing_sources_fall_back():
+    """Test that a source past the deadline or raising reports its fallback value."""
+
+    def broken(latitude, longitude):
+        raise RuntimeError("upstream down")
+
+    aggregator = MetricsAggregator(
+        [
+            slow_source("late", 1.0, 1),
+            slow_source("fast", 0.0, 2),
+            MetricSource("broken", broken, lambda latitude, longitude: {"broken": 0}),
+        ],
+        deadline_seconds=0.2,
+    )
+
+    started = time.perf_counter()
+    results = aggregator.collect(40.0, -74.0)
+
+    assert time.perf_counter() - started < 0.5
+    assert results["fast"].status == OK and results["fast"].values["fast"] == 2
+    assert results["late"].status == TIMEOUT
+    assert results["late"].values == {"late": None, "source": "fallback"}
+    assert results["broken"].status == ERROR and results["broken"].source == "fallback"
+    stats = aggregator.stats()
+    assert stats["late"][TIMEOUT] == 1 and stats["fast"][OK] == 1
+
+
+def test_merge_result_records_provenance():
+    """Test that merged metrics keep each source's provenance and timing."""
+    aggregator = MetricsAggregator([slow_source("cloudiness_percent", 0.0, 40)], deadline_seconds=1.0)
+    metrics = {"latitude": 40.0, "sources": {}}
+
+    for result in aggregator.iter_results(40.0, -74.0):
+        metrics = merge_result(metrics, result)
+
+    assert metrics["cloudiness_percent"] == 40
+    assert "source" not in metrics
+    assert metrics["sources"]["cloudiness_percent"]["source"] == "upstream"
+    assert metrics["sources"]["cloudiness_percent"]["status"] == OK
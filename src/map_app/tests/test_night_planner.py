@@ -0,0 +1,109 @@
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from api_server import QueryApi
+from models.night_planner import SkyMatrix, align_forecast_clouds, plan_windows
+from models.observing_windows import HourlyForecast
+from services.clearoutside_parser import extract_forecast_fields
+from services.planner_service import plan_observing_nights
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "clearoutside_forecast.html"
+# The recorded page is for New York, starting on Sunday 18/10
+NEW_YORK = (40.70, -74.00)
+START = "2026-10-18T16:00"
+
+
+def _matrix(clouds, darkness, moon_up=0.0, illumination=0.0):
+    sites, hours = np.shape(clouds)
+    start = np.datetime64("2026-10-18T12", "h")
+    return SkyMatrix(
+        hours=start + np.arange(hours),
+        clouds=np.asarray(clouds, dtype=float),
+        darkness=np.asarray(darkness, dtype=np.float32),
+        moon_up=np.full((sites, hours), moon_up, dtype=np.float32),
+        moon_illumination=np.full(hours, illumination, dtype=np.float32),
+        nights=np.tile(np.datetime64("2026-10-18") + np.arange(hours) // 24, (sites, 1)),
+    )
+
+
+def test_forecast_clouds_are_aligned_by_the_local_utc_offset():
+    """Test that the page's local hours land on UTC hours four hours later (EDT)."""
+    forecast = HourlyForecast.from_table(extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))["hourly"])
+    hours = np.datetime64(START, "h") + np.arange(48)
+
+    clouds = align_forecast_clouds([forecast], [NEW_YORK[0]], [NEW_YORK[1]], hours)[0]
+
+    # 16:00 UTC is 12:00 local, the page's 13th hour
+    np.testing.assert_array_equal(clouds, forecast.total_clouds[12:60])
+
+    # Without the page's timezone, the offset is found from the darkness hours
+    guessed = align_forecast_clouds([replace(forecast, start_utc=None)], [NEW_YORK[0]], [NEW_YORK[1]], hours)[0]
+    np.testing.assert_array_equal(guessed, clouds)
+
+
+def test_forecast_timezone_takes_precedence_over_darkness_matching():
+    """Test that a page's own UTC offset is used even far from the solar offset."""
+    forecast = HourlyForecast.from_table(extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))["hourly"])
+    # Local midnight two hours later than EDT (as for a site far west of its time zone)
+    start_utc = datetime(2026, 10, 18, 6, tzinfo=timezone.utc).timestamp()
+    hours = np.datetime64(START, "h") + np.arange(48)
+
+    clouds = align_forecast_clouds([replace(forecast, start_utc=start_utc)], [NEW_YORK[0]], [NEW_YORK[1]], hours)[0]
+
+    # 16:00 UTC is now 10:00 local, the page's 11th hour
+    np.testing.assert_array_equal(clouds, forecast.total_clouds[10:58])
+
+
+def test_plan_windows_keeps_the_best_window_of_each_site_and_night():
+    """Test the cell scoring, window validity and per-(site, night) ranking."""
+    hours = 48
+    darkness = np.zeros((2, hours))
+    darkness[:, 8:18] = 1  # 20:00-06:00 on both nights
+    darkness[:, 32:42] = 1
+    clouds = np.full((2, hours), 100.0)
+    clouds[1, 35:38] = 0  # site 1 clears up for three hours on the second night
+    clouds[0, 8:18] = np.nan  # no forecast for site 0's first night
+
+    plans = plan_windows(
+        _matrix(clouds, darkness),
+        site_criteria={"darkness": np.array([1.0, 0.5])},
+        window_hours=3,
+        top_k=10,
+        weights={"darkness": 1, "clear_sky": 1},
+    )
+
+    assert [(plan["site"], plan["night"]) for plan in plans] == [
+        (0, "2026-10-18"), (1, "2026-10-19"), (0, "2026-10-19"), (1, "2026-10-18"),
+    ]
+    assert plans[0]["score"] == 100.0 and plans[0]["mean_cloudiness_percent"] is None
+    assert plans[1]["start_time"] == "2026-10-19T23:00:00" and plans[1]["mean_cloudiness_percent"] == 0.0
+    assert plans[1]["score"] == 75.0 and plans[3]["score"] == 25.0
+    assert not plan_windows(_matrix(clouds, np.zeros((2, hours))), window_hours=3)
+
+
+def test_planner_handles_hundreds_of_sites_from_shared_forecasts(clearoutside):
+    """Test a week-long plan for 300 sites: a few forecast fetches, known clouds, best first."""
+    rng = np.random.default_rng(5)
+    locations = [
+        {"name": f"site {i}", "latitude": NEW_YORK[0] + lat, "longitude": NEW_YORK[1] + lon,
+         "distance_km": float(np.hypot(lat, lon) * 111), "light_pollution_index": float(level)}
+        for i, (lat, lon, level) in enumerate(zip(
+            rng.uniform(-0.4, 0.4, 300), rng.uniform(-0.4, 0.4, 300), rng.choice([1, 2, 3, 4], 300)
+        ))
+    ]
+
+    plans = plan_observing_nights(locations, nights=7, top_k=20, start=START)
+
+    assert len(plans) == 20 and clearoutside.stats()["requests"] <= 25
+    scores = [plan["score"] for plan in plans]
+    assert scores == sorted(scores, reverse=True)
+    assert all(plan["mean_cloudiness_percent"] is not None for plan in plans)
+    assert len({(plan["site"], plan["night"]) for plan in plans}) == 20
+    assert {plan["name"] for plan in plans} <= {loc["name"] for loc in locations}
+
+    api_plans = QueryApi().run("plan", {"lat": 40.7128, "lon": -74.006, "radius_km": 50, "source": "nearby",
+                                        "sites": 40, "nights": 3, "top_n": 5})
+    assert 0 < len(api_plans) <= 5 and all("limiting_mag" in plan for plan in api_plans)
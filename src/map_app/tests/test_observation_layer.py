@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+from services.memory_budget import get_memory_usage
+from services.observation_points import ObservationPoints, load_observation_points, points_in_bounds
+
+from utils.map_utils import create_base_map
+from utils.observation_layer import (
+    COORDINATE_SCALE,
+    bounds_to_box,
+    box_contains,
+    build_observation_feature_group,
+    encode_points,
+    pad_box,
+)
+
+
+def random_points(n: int, seed: int = 0) -> ObservationPoints:
+    rng = np.random.default_rng(seed)
+    return ObservationPoints.from_arrays(
+        rng.uniform(-60, 70, n),
+        rng.uniform(-180, 180, n),
+        rng.integers(0, 8, n).astype(float),
+        rng.choice([0.0, 0.25, 0.5], n),
+    )
+
+
+def test_dataset_loads_sorted_by_latitude():
+    """Test that the GaN dataset is loaded as sorted, read-only columns held under the memory budget."""
+    points = load_observation_points()
+
+    assert len(points) > 10_000
+    assert np.all(np.diff(points.latitude) >= 0)
+    assert not points.longitude.flags.writeable
+    assert load_observation_points() is points
+    assert get_memory_usage()["caches"]["observation_points"]["bytes"] >= points.nbytes
+
+
+def test_points_in_bounds_matches_brute_force_and_wraps_antimeridian():
+    """Test viewport selection, including boxes crossing 180° and the point cap."""
+    points = random_points(5000)
+
+    box = points_in_bounds(points, 10, -20, 40, 30)
+    expected = (
+        (points.latitude >= 10) & (points.latitude <= 40) & (points.longitude >= -20) & (points.longitude <= 30)
+    )
+    assert len(box) == expected.sum()
+
+    # Leaflet reports the wrapped view 170°E..170°W as 170..190
+    wrapped = points_in_bounds(points, -60, 170, 70, 190)
+    assert len(wrapped) == (np.abs(points.longitude) >= 170).sum()
+
+    capped = points_in_bounds(points, -90, -180, 90, 180, max_points=100)
+    assert len(capped) == 100
+    assert np.all(np.diff(capped.latitude) >= 0)
+
+
+def test_encoded_columns_round_trip():
+    """Test that delta-encoded integer columns decode to the original points."""
+    points = ObservationPoints.from_arrays([45.5, -33.87, 10.0], [15.53, 151.21, -70.0], [2, np.nan, 5], [0.25, 0, np.nan])
+
+    columns = encode_points(points)
+
+    latitude = np.cumsum(columns["dlat"]) / COORDINATE_SCALE
+    assert np.allclose(latitude, points.latitude, atol=1e-4)
+    assert np.allclose(np.array(columns["lon"]) / COORDINATE_SCALE, points.longitude, atol=1e-4)
+    assert columns["mag"] == [-1, 5, 2]
+    assert columns["cloud"] == [0, -1, 25]
+
+
+def test_hundred_thousand_points_render_compactly():
+    """Test that 100k points add well under 20 bytes each to the map HTML."""
+    map_obj = create_base_map(0, 0, 3)
+    empty = len(map_obj.get_root().render())
+
+    map_obj = create_base_map(0, 0, 3)
+    build_observation_feature_group(random_points(100_000)).add_to(map_obj)
+    html = map_obj.get_root().render()
+
+    assert (len(html) - empty) / 100_000 < 20
+    # Popups are built in the browser on demand, not shipped per point
+    assert html.count("bindPopup") == 1
+    data = html[html.index("var data = ") + len("var data = "):]
+    assert len(json.JSONDecoder().raw_decode(data)[0]["lon"]) == 100_000
+
+
+def test_viewport_box_helpers():
+    """Test conversion, padding and containment of st_folium bounds."""
+    bounds = {"_southWest": {"lat": 40.0, "lng": -75.0}, "_northEast": {"lat": 41.0, "lng": -73.0}}
+
+    box = bounds_to_box(bounds)
+    padded = pad_box(box, 0.5)
+
+    assert box == (40.0, -75.0, 41.0, -73.0)
+    assert padded == (39.5, -76.0, 41.5, -72.0)
+    assert box_contains(padded, box) and not box_contains(box, padded)
+    assert bounds_to_box({"_southWest": {"lat": None, "lng": None}, "_northEast": {}}) is None
+    assert bounds_to_box(None) is None
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import numpy as np
+from models.observing_windows import HourlyForecast, empty_hourly_forecast, find_best_windows
+from services.clearoutside_parser import extract_forecast_fields
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "clearoutside_forecast.html"
+
+
+def _day(date, clouds, darkness=(20 * 60, 5 * 60), moon=(None, None), illumination=0.0):
+    return {
+        "date": date,
+        "hours": list(range(24)),
+        "darkness": list(darkness) if darkness else None,
+        "moon_illumination": illumination,
+        "moon_rise": moon[0],
+        "moon_set": moon[1],
+        "total_clouds": clouds,
+    }
+
+
+def test_fixture_page_builds_hourly_arrays():
+    """Test that the recorded page yields 7 days of compact hourly arrays."""
+    table = extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))["hourly"]
+    forecast = HourlyForecast.from_table(table)
+
+    assert len(forecast) == 7 * 24
+    assert forecast.total_clouds.dtype == np.uint8
+    assert forecast.darkness.min() >= 0 and forecast.darkness.max() <= 1
+    # Darkness starts at 19:41, so 19:00-20:00 is partly dark and 21:00 fully dark
+    assert 0 < forecast.darkness[19] < 1
+    assert forecast.darkness[21] == 1
+
+
+def test_darkness_and_moon_cross_midnight():
+    """Test that intervals ending after midnight cover the next morning."""
+    forecast = HourlyForecast.from_table(
+        {"days": [_day("01/01", [0] * 24, moon=(22 * 60, 2 * 60), illumination=80.0),
+                  _day("02/01", [0] * 24)]}
+    )
+
+    assert forecast.darkness[23] == 1 and forecast.darkness[24 + 3] == 1
+    assert forecast.darkness[12] == 0
+    assert forecast.moon_up[22] == 1 and forecast.moon_up[24 + 1] == 1
+    assert forecast.moon_up[24 + 3] == 0
+
+
+def test_best_window_prefers_clear_moonless_hours():
+    """Test that the clearest dark stretch ranks first."""
+    clouds = [100] * 24
+    clouds[1:4] = [0, 0, 0]  # clear 01:00-04:00 after the first night's dusk
+    forecast = HourlyForecast.from_table(
+        {"days": [_day("01/01", [100] * 24), _day("02/01", clouds), _day("03/01", [100] * 24)]}
+    )
+
+    windows = find_best_windows(forecast, nights=3, window_hours=3, top_k=2)
+
+    assert windows[0]["night"] == "01/01"
+    assert (windows[0]["start_time"], windows[0]["end_time"]) == ("01:00", "04:00")
+    assert windows[0]["score"] == 100.0
+    assert windows[0]["mean_cloudiness_percent"] == 0.0
+    assert windows[1]["score"] < windows[0]["score"]
+    # Returned windows never overlap
+    first = set(range(windows[0]["start_offset_hours"], windows[0]["start_offset_hours"] + 3))
+    second = set(range(windows[1]["start_offset_hours"], windows[1]["start_offset_hours"] + 3))
+    assert not first & second
+
+
+def test_windows_are_limited_to_requested_nights():
+    """Test that nights are counted from the first upcoming evening."""
+    days = [_day(f"0{day}/01", [100] * 12 + [0] * 12) for day in range(1, 5)]
+    days[0]["total_clouds"] = [0] * 24  # a clear morning ending a night the page does not list
+    forecast = HourlyForecast.from_table({"days": days, "utc_offset_hours": 2.0, "start_date": "2026-01-01"})
+
+    def nights(count, hour):
+        now = forecast.start_utc + hour * 3600
+        windows = find_best_windows(forecast, nights=count, window_hours=2, top_k=20, now=now)
+        assert all(w["start_offset_hours"] >= hour for w in windows)
+        return {w["night"] for w in windows}
+
+    assert nights(1, 0) == {"01/01"}
+    assert nights(2, 0) == {"01/01", "02/01"}
+    # During the first night the rest of it still counts; the next day it is over
+    assert nights(2, 23) == {"01/01", "02/01"}
+    assert nights(2, 36) == {"02/01", "03/01"}
+    assert find_best_windows(forecast, now=forecast.start_utc + 5 * 24 * 3600) == []
+
+
+def test_dict_round_trip_preserves_windows():
+    """Test that cached arrays give the same windows without re-parsing."""
+    table = extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))["hourly"]
+    forecast = HourlyForecast.from_table(table)
+    restored = HourlyForecast.from_dict(forecast.to_dict())
+
+    now = forecast.start_utc + 20 * 3600
+    assert restored.start_utc == forecast.start_utc
+    assert find_best_windows(restored, now=now) == find_best_windows(forecast, now=now) != []
+
+
+def test_empty_forecast_has_no_windows():
+    """Test that a missing forecast yields no windows."""
+    assert find_best_windows(empty_hourly_forecast()) == []
@@ -0,0 +1,244 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+from services import weather_service
+from services.forecast_cache import ForecastCache
+from services.resilience import (
+    CircuitBreaker,
+    LatencyBudgetExceeded,
+    ResilientCaller,
+)
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "clearoutside_forecast.html"
+
+
+@pytest.fixture
+def flaky_clearoutside(clearoutside, monkeypatch):
+    """Stand-in with injectable faults behind a tight breaker and budget."""
+    monkeypatch.setattr(
+        weather_service,
+        "_upstream",
+        ResilientCaller(
+            CircuitBreaker(failure_threshold=2, reset_timeout_seconds=0.5),
+            budget_seconds=0.6,
+            hedge_after_seconds=0.2,
+            max_attempts=2,
+        ),
+    )
+    clearoutside.config.vary_by_coordinate = False
+    return clearoutside.config
+
+
+def test_breaker_trips_and_recovers_through_half_open_probe(clock):
+    """Test closed -> open -> half-open -> closed transitions."""
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout_seconds=10, clock=clock)
+
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    clock.now += 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    # Only one probe at a time
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["trips"] == 1
+
+
+def test_failed_probe_reopens_breaker(clock):
+    """Test that a failing half-open probe opens the circuit again."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=5, clock=clock)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["trips"] == 2
+
+
+def test_cancelled_half_open_probe_lets_the_next_probe_through(clock):
+    """Test that cancelling the probe's caller does not leave the breaker rejecting forever."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=5, clock=clock)
+    caller = ResilientCaller(breaker, budget_seconds=2.0, hedge_after_seconds=2.0, max_attempts=1)
+    breaker.record_failure()
+    clock.now += 5
+
+    async def probe_then_cancel():
+        task = asyncio.ensure_future(caller.call_async(lambda timeout: asyncio.sleep(1.0)))
+        await asyncio.sleep(0.05)
+        assert not breaker.allow_request()  # the probe is in flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(probe_then_cancel())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_hedged_attempt_wins_when_first_is_slow():
+    """Test that a hedge answers while the first attempt is still hanging."""
+    caller = ResilientCaller(CircuitBreaker(), budget_seconds=2.0, hedge_after_seconds=0.05, max_attempts=2)
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            time.sleep(1.0)
+            return "slow"
+        return "fast"
+
+    started = time.monotonic()
+    assert caller.call(attempt) == "fast"
+    assert time.monotonic() - started < 0.5
+    assert caller.stats()["hedges"] == 1
+    # Each attempt's timeout is capped by what is left of the budget
+    assert calls[1] < calls[0] <= 2.0
+
+
+def test_failed_attempt_is_retried_within_budget():
+    """Test an immediate retry after a fast failure."""
+    caller = ResilientCaller(CircuitBreaker(), budget_seconds=1.0, hedge_after_seconds=0.5, max_attempts=2)
+    outcomes = iter([RuntimeError("boom"), "ok"])
+
+    def attempt(timeout):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert caller.call(attempt) == "ok"
+    assert caller.stats()["retries"] == 1
+
+
+def test_budget_bounds_latency_when_every_attempt_hangs():
+    """Test that the caller gives up at the budget even if attempts never return."""
+    caller = ResilientCaller(CircuitBreaker(), budget_seconds=0.3, hedge_after_seconds=0.1, max_attempts=2)
+
+    started = time.monotonic()
+    with pytest.raises(LatencyBudgetExceeded):
+        caller.call(lambda timeout: time.sleep(2.0))
+    assert time.monotonic() - started < 0.45
+    assert caller.stats()["budget_exceeded"] == 1
+
+
+def test_async_call_cancels_losing_attempts():
+    """Test async hedging returns the fast attempt and cancels the slow one."""
+    caller = ResilientCaller(CircuitBreaker(), budget_seconds=2.0, hedge_after_seconds=0.05, max_attempts=2)
+    cancelled = []
+    count = 0
+
+    async def attempt(timeout):
+        nonlocal count
+        count += 1
+        if count == 1:
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return count
+
+    assert asyncio.run(caller.call_async(attempt)) == 2
+    assert cancelled == [True]
+
+
+def test_upstream_errors_open_circuit_and_fallback_is_immediate(flaky_clearoutside, clearoutside):
+    """Test that repeated 503s trip the breaker, after which no requests are sent."""
+    flaky_clearoutside.error_rate = 1.0
+
+    assert weather_service.fetch_forecast_fields(40.71, -74.00) is None
+    assert weather_service.fetch_forecast_fields(34.05, -118.24) is None
+    sent = clearoutside.stats()["requests"]
+    assert weather_service.get_upstream_stats()["breaker"]["state"] == "open"
+
+    started = time.monotonic()
+    fetcher = weather_service.ClearOutsideWeatherFetcher(51.5, -0.12)
+    assert time.monotonic() - started < 0.1
+    assert clearoutside.stats()["requests"] == sent
+    assert fetcher.get_cloudiness()["source"] == "fallback"
+    assert weather_service.get_upstream_stats()["short_circuited"] == 1
+
+
+def test_client_errors_do_not_open_circuit(flaky_clearoutside, clearoutside):
+    """Test that 4xx answers are neither retried nor counted as upstream failures."""
+    flaky_clearoutside.error_rate = 1.0
+    flaky_clearoutside.error_status = 404
+
+    for _ in range(4):
+        assert weather_service.fetch_forecast_fields(40.71, -74.00) is None
+    stats = weather_service.get_upstream_stats()
+    assert stats["breaker"]["state"] == "closed" and stats["breaker"]["trips"] == 0
+    assert stats["client_errors"] == 4 and stats["retries"] == 0
+    assert clearoutside.stats()["requests"] == 4
+
+
+def test_slow_upstream_is_bounded_by_latency_budget(flaky_clearoutside):
+    """Test that a hanging upstream costs at most the budget, not the request timeout."""
+    flaky_clearoutside.latency_seconds = 3.0
+
+    started = time.monotonic()
+    assert weather_service.fetch_forecast_fields(40.71, -74.00) is None
+    assert time.monotonic() - started < 0.9
+    # The first attempt was hedged once
+    assert weather_service.get_upstream_stats()["hedges"] == 1
+
+
+def test_circuit_closes_again_when_upstream_recovers(flaky_clearoutside):
+    """Test the half-open probe restores normal fetching."""
+    flaky_clearoutside.error_rate = 1.0
+    flaky_clearoutside.error_status = 500
+    weather_service.fetch_forecast_fields(40.71, -74.00)
+    weather_service.fetch_forecast_fields(40.71, -74.00)
+    assert weather_service.get_upstream_stats()["breaker"]["state"] == "open"
+
+    flaky_clearoutside.error_rate = 0.0
+    time.sleep(0.55)
+
+    fields = weather_service.fetch_forecast_fields(40.71, -74.00)
+    assert fields["bortle"]["bortle_scale"] == 7
+    assert weather_service.get_upstream_stats()["breaker"]["state"] == "closed"
+
+
+def test_forecast_cache_serves_expired_entry_when_fetch_falls_back(tmp_path, clock):
+    """Test that stale data is preferred over a fallback guess."""
+    cache = ForecastCache(path=str(tmp_path / "cache.sqlite3"), stale_seconds=60, clock=clock)
+    cache.set("cloudiness", 40.71, -74.00, {"cloudiness_percent": 12, "source": "scraped"})
+    clock.now += 10 * 3600
+
+    value = cache.get_or_fetch(
+        "cloudiness", 40.71, -74.00, lambda lat, lon: {"cloudiness_percent": 30, "source": "fallback"}
+    )
+
+    assert value == {"cloudiness_percent": 12, "source": "scraped", "stale": True}
+    # Nothing cached yet for this cell: the fallback is returned as-is
+    fallback = cache.get_or_fetch(
+        "cloudiness", 10.0, 10.0, lambda lat, lon: {"cloudiness_percent": 30, "source": "fallback"}
+    )
+    assert fallback["source"] == "fallback"
+
+
+def test_fetcher_cache_keeps_serving_previous_record_when_refetch_fails(monkeypatch):
+    """Test that an expired fetcher is kept when the upstream is down."""
+    from services.clearoutside_parser import extract_forecast_fields
+
+    fields = extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))
+    responses = iter([fields, None])
+    monkeypatch.setattr(weather_service, "fetch_forecast_fields", lambda lat, lon: next(responses))
+    monkeypatch.setattr(
+        weather_service, "_fetcher_cache", weather_service.BoundedLRUCache(max_entries=4, max_bytes=10**7)
+    )
+
+    first = weather_service.get_weather_fetcher(40.71, -74.00)
+    object.__setattr__(first.record, "fetched_at", first.record.fetched_at - 10 * 3600)
+
+    assert weather_service.get_weather_fetcher(40.71, -74.00) is first
+    assert first.get_cloudiness()["source"] == "scraped"
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from models import optimal_locations, scoring
+from models.optimal_locations import OptimalLocationFinder
+from services.nearby_locations_service import find_nearby_observation_locations
+
+
+def test_score_skips_unknown_criteria_and_top_k_matches_a_full_sort():
+    """Test the NaN-aware weighted mean, weight checks and partial selection."""
+    criteria = scoring.normalize_criteria(
+        light_pollution=np.array([0.0, 7.5, 3.75]),
+        distance_km=np.array([0.0, 10.0, 5.0]),
+        radius_km=10,
+        cloud_percent=50,
+        limiting_mag=np.array([np.nan, 7.0, 3.5]),
+    )
+    weights = {"darkness": 2, "proximity": 1, "clear_sky": 1, "limiting_mag": 1}
+    assert np.allclose(scoring.score(criteria, weights), [(2 + 1 + 0.5) / 4, (0.5 + 1) / 5, (1 + 0.5 + 0.5 + 0.5) / 5])
+    assert np.isnan(scoring.score({"limiting_mag": np.array([np.nan])}, {"limiting_mag": 1}))[0]
+    with pytest.raises(ValueError):
+        scoring.score(criteria, {"sunshine": 1})
+
+    scores = np.round(np.random.default_rng(0).random(10_000), 3)
+    scores[::7] = np.nan
+    expected = np.lexsort((np.arange(len(scores)), -np.nan_to_num(scores, nan=-np.inf)))
+    for k in (1, 25, 10_000, 20_000):
+        assert np.array_equal(scoring.top_k(scores, k), expected[:k])
+
+
+def test_neighborhood_mean_and_moon_criterion():
+    """Test the integral-image box mean and the moon-up weighting."""
+    grid = np.random.default_rng(1).random((9, 13))
+    means = scoring.neighborhood_mean(grid, 2)
+    for y, x in ((0, 0), (4, 6), (8, 12), (1, 11)):
+        assert means[y, x] == pytest.approx(grid[max(y - 2, 0):y + 3, max(x - 2, 0):x + 3].mean())
+
+    up = scoring.moon_up_fraction([8.0, 8.0, 0.0], [8.0, 2.0, 0.0])
+    assert np.allclose(up[:2], [0.0, 0.75]) and np.isnan(up[2])
+    moon = scoring.normalize_criteria(moon_illumination_percent=[100.0, 100.0, 100.0], moon_up=up)["moon"]
+    assert np.allclose(moon[:2], [1.0, 0.25]) and np.isnan(moon[2])
+
+
+def test_finder_and_nearby_rank_by_score(tmp_path, monkeypatch):
+    """Test that both services return scored results, best first, and honour the weights."""
+    raster = synthetic.synthetic_raster(512, 270, seed=1)
+    finder = OptimalLocationFinder()
+    synthetic.install_raster(finder, raster)
+    center = synthetic.lit_points(raster, 1, seed=1, min_level=6)[0]
+
+    results = finder.find_optimal_locations(*center, 200, top_n=8, cloud_percent=40)
+    scores = [loc["score"] for loc in results]
+    assert len(results) == 8 and scores == sorted(scores, reverse=True)
+    assert all(loc["cloudiness_percent"] == 40 for loc in results)
+    closest = finder.find_optimal_locations(*center, 200, top_n=8, weights={"proximity": 1})
+    # Without a forecast the cloud cover is unknown, not clear
+    assert all(loc["cloudiness_percent"] is None for loc in closest)
+    distances = [loc["distance_km"] for loc in closest]
+    assert distances == sorted(distances) and distances[-1] <= results[0]["distance_km"]
+    with pytest.raises(ValueError):
+        finder.find_optimal_locations(*center, 200, weights={"darkness": -1})
+    # Observers' limiting magnitude is a criterion too (synthetic sites are far from most observers)
+    monkeypatch.setattr(optimal_locations, "SCORING_OBSERVATION_RADIUS_KM", 500.0)
+    by_magnitude = finder.find_optimal_locations(*center, 200, top_n=8, weights={"limiting_mag": 1, "proximity": 1e-9})
+    magnitudes = [loc["limiting_mag"] for loc in by_magnitude]
+    assert None not in magnitudes and magnitudes == sorted(magnitudes, reverse=True)
+
+    path = synthetic.write_observations_csv(str(tmp_path / "obs.csv"), 5_000, seed=1)
+    town = synthetic.observation_centers(5_000, seed=1)[0]
+    by_distance = find_nearby_observation_locations(*town, 50, csv_path=path, top_n=5)
+    by_score = find_nearby_observation_locations(*town, 50, csv_path=path, top_n=5, rank_by="score")
+    assert [loc["distance_km"] for loc in by_distance] == sorted(loc["distance_km"] for loc in by_distance)
+    assert [loc["score"] for loc in by_score] == sorted((loc["score"] for loc in by_score), reverse=True)
+    assert by_score[0]["score"] >= max(loc["score"] for loc in by_distance)
+    with pytest.raises(ValueError):
+        find_nearby_observation_locations(*town, 50, csv_path=path, rank_by="brightness")
+
+
+def test_nearby_search_raises_on_malformed_observations(tmp_path):
+    """Test that a dataset that cannot be parsed is an error, not an empty answer."""
+    path = tmp_path / "obs.csv"
+    path.write_text("Latitude,Longitude,LimitingMag,CloudCover\n40.7,-74.0,not a number,0\n")
+
+    with pytest.raises(ValueError):
+        find_nearby_observation_locations(40.7, -74.0, 10, csv_path=str(path))
+    with pytest.raises(OSError):
+        find_nearby_observation_locations(40.7, -74.0, 10, csv_path=str(tmp_path / "missing.csv"))
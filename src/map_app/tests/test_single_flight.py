@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from services import weather_service
+from services.single_flight import SingleFlight
+
+
+@pytest.fixture
+def fake_clearoutside(clearoutside):
+    """Stand-in answering slowly enough for concurrent callers to overlap."""
+    clearoutside.config.latency_seconds = 0.3
+    clearoutside.config.vary_by_coordinate = False
+    return clearoutside
+
+
+def test_single_flight_runs_once_for_concurrent_callers():
+    """Test that concurrent callers with one key share a single execution."""
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert calls == [1]
+    assert results == ["value"] * 10
+    stats = flight.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced_hits"] == 9
+    assert stats["in_flight"] == 0
+    assert stats["max_wait_seconds"] > 0
+
+
+def test_single_flight_shares_exceptions_and_recovers():
+    """Test that a failed call is reported to waiters and the key can run again."""
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: 42) == 42
+    assert flight.stats()["misses"] == 2
+
+
+def test_concurrent_threads_for_same_cell_make_one_request(fake_clearoutside):
+    """Stress test: many threads asking for nearby points trigger one HTTP fetch."""
+    results = []
+
+    def worker(offset):
+        # Points a few meters apart fall in the same forecast grid cell
+        results.append(weather_service.fetch_forecast_fields(40.7128 + offset, -74.0060 - offset))
+
+    threads = [threading.Thread(target=worker, args=(i * 1e-5,)) for i in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert fake_clearoutside.stats()["requests"] == 1
+    assert len(results) == 25
+    assert all(fields["bortle"]["bortle_scale"] == 7 for fields in results)
+    stats = weather_service.get_fetch_coalescing_stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced_hits"] == 24
+
+
+def test_cell_is_fetched_at_its_grid_point(monkeypatch):
+    """Test that the page fetched for a cell does not depend on which caller came first."""
+    requested = []
+
+    def download(latitude, longitude):
+        requested.append((latitude, longitude))
+        return {"cell": (latitude, longitude)}
+
+    monkeypatch.setattr(weather_service, "_download_forecast_fields", download)
+
+    first = weather_service.fetch_forecast_fields(40.7128, -74.0060)
+    second = weather_service.fetch_forecast_fields(40.6912, -73.9901)
+
+    assert requested == [(40.7, -74.0), (40.7, -74.0)]
+    assert first == second
+
+
+def test_concurrent_async_callers_make_one_request(fake_clearoutside):
+    """Stress test: asyncio callers coalesce onto one fetch per cell."""
+
+    async def run():
+        same_cell = [weather_service.fetch_forecast_fields_async(40.7128, -74.0060) for _ in range(20)]
+        other_cell = [weather_service.fetch_forecast_fields_async(34.05, -118.24) for _ in range(5)]
+        return await asyncio.gather(*same_cell, *other_cell)
+
+    results = asyncio.run(run())
+
+    assert fake_clearoutside.stats()["requests"] == 2
+    assert all(fields is not None for fields in results)
+    assert weather_service.get_fetch_coalescing_stats()["coalesced_hits"] == 23
+
+
+def test_async_and_sync_callers_share_a_fetch(fake_clearoutside):
+    """Test that a threaded caller joins a fetch started on the async path."""
+
+    async def run():
+        fetch = asyncio.ensure_future(weather_service.fetch_forecast_fields_async(51.5, -0.12))
+        await asyncio.sleep(0.05)
+        sync_result = await asyncio.to_thread(weather_service.fetch_forecast_fields, 51.5, -0.12)
+        return await fetch, sync_result
+
+    async_result, sync_result = asyncio.run(run())
+
+    assert fake_clearoutside.stats()["requests"] == 1
+    assert async_result == sync_result
+
+
+def test_fetcher_async_constructor_uses_coalesced_fetch(fake_clearoutside):
+    """Test the async fetcher constructor returns scraped data."""
+    fetcher = asyncio.run(weather_service.ClearOutsideWeatherFetcher.create_async(40.7128, -74.0060))
+
+    assert fetcher.get_cloudiness()["source"] == "scraped"
+    assert fetcher.get_moon_brightness()["illumination_percent"] == 52.0
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from models.optimal_locations import LIGHT_POLLUTION_SCALE
+from utils.png_strips import PngStripReader, pack_rgb, unpack_rgb
+from utils.validate_light_pollution_colors import main, scan_map_colors, validate_maps
+
+SCALE = np.array(list(LIGHT_POLLUTION_SCALE), dtype=np.uint8)
+STRAY = (255, 0, 255)
+
+
+def _map_pixels(width=203, height=77, seed=0):
+    """Scale colors in smooth bands (so PNG picks varied row filters) with a few stray pixels."""
+    rng = np.random.default_rng(seed)
+    bands = (np.add.outer(np.arange(height) // 9, np.arange(width) // 13) + rng.integers(0, 2, (height, width)))
+    rgb = SCALE[bands % len(SCALE)]
+    for x, y in ((5, 3), (150, 3), (7, 60)):
+        rgb[y, x] = STRAY
+    return rgb
+
+
+def test_strip_reader_matches_pil_for_each_png_layout(tmp_path):
+    """Test palette, truecolor, alpha and low-bit-depth images against PIL's full decode."""
+    rgb = _map_pixels()
+    images = {
+        "rgb": Image.fromarray(rgb),
+        "rgba": Image.fromarray(np.dstack([rgb, np.full(rgb.shape[:2], 200, dtype=np.uint8)])),
+        "palette4": Image.fromarray(rgb).quantize(colors=16, method=Image.Quantize.MAXCOVERAGE),
+        "gray": Image.fromarray(rgb[..., 1]),
+        "bilevel": Image.fromarray(rgb[..., 0] > 40),
+    }
+    for name, image in images.items():
+        path = tmp_path / f"{name}.png"
+        image.save(path, optimize=True)
+        expected = pack_rgb(np.array(Image.open(path).convert("RGB")))
+
+        reader = PngStripReader(path, strip_rows=10)
+        strips = list(reader)
+        assert [top for top, _ in strips] == list(range(0, 77, 10))
+        codes = np.concatenate([codes for _, codes in strips])
+        decoded = codes if reader.header.palette is None else reader.header.palette[codes]
+        assert np.array_equal(decoded, expected), name
+
+    assert np.array_equal(unpack_rgb(pack_rgb(rgb)), rgb)
+    Image.fromarray(rgb).save(tmp_path / "map.jpg")
+    with pytest.raises(ValueError):
+        PngStripReader(tmp_path / "map.jpg")
+
+
+def test_scan_reports_unexpected_colors_with_locations(tmp_path):
+    """Test counts against np.unique and the stray pixels' locations, in and out of process."""
+    rgb = _map_pixels()
+    paths = [tmp_path / "truecolor.png", tmp_path / "palette.png"]
+    Image.fromarray(rgb).save(paths[0])
+    Image.fromarray(rgb).quantize(colors=16, method=Image.Quantize.MAXCOVERAGE).save(paths[1])
+    colors, counts = np.unique(rgb.reshape(-1, 3), axis=0, return_counts=True)
+    expected = {tuple(color.tolist()): int(count) for color, count in zip(colors, counts)}
+
+    for report in validate_maps(paths, workers=1, strip_rows=16, max_locations=2) + validate_maps(paths, workers=2):
+        assert report.counts == expected and not report.ok
+        assert set(report.unexpected) == {STRAY}
+        stray = report.unexpected[STRAY]
+        assert stray.count == 3 and stray.bounds == (5, 3, 150, 60)
+        assert stray.locations[:2] == [(5, 3), (150, 3)]
+
+    clean = rgb.copy()
+    clean[np.all(clean == STRAY, axis=2)] = 0
+    Image.fromarray(clean).save(tmp_path / "clean.png")
+    assert scan_map_colors(tmp_path / "clean.png").ok
+    assert main(["--path", str(tmp_path / "clean.png"), "--workers", "1"]) == 0
+    assert main(["--path", str(paths[0]), "--path", str(tmp_path / "clean.png"), "--workers", "1"]) == 1
@@ -1,9 +1,14 @@
+from pathlib import Path
+
 import pytest
-from services import weather_service
+from services import forecast_cache, weather_service
+from services.clearoutside_parser import extract_forecast_fields
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "clearoutside_forecast.html"
 
 
 def test_get_cloudiness_returns_valid_data():
-    """Test get_cloudiness with real network call to ClearOutside.com."""
+    """Test get_cloudiness over HTTP (local stand-in unless --live-clearoutside)."""
     result = weather_service.get_cloudiness(40.730610, -73.935242)
     
     # Check required fields
@@ -37,7 +42,7 @@ def test_cloudiness_description_matches_value():
 
 
 def test_get_moon_brightness_returns_valid_data():
-    """Test get_moon_brightness with real network call to ClearOutside.com."""
+    """Test get_moon_brightness over HTTP (local stand-in unless --live-clearoutside)."""
     result = weather_service.get_moon_brightness(40.730610, -73.935242)
     
     # Check required fields
@@ -52,7 +57,7 @@ def test_get_moon_brightness_returns_valid_data():
 
 
 def test_get_bortle_scale_returns_valid_data():
-    """Test get_bortle_scale with real network call to ClearOutside.com."""
+    """Test get_bortle_scale over HTTP (local stand-in unless --live-clearoutside)."""
     result = weather_service.get_bortle_scale(40.730610, -73.935242)
     
     # Check required fields
@@ -67,3 +72,55 @@ def test_get_bortle_scale_returns_valid_data():
     assert 1 <= result["bortle_scale"] <= 9
     assert result["source"] in ["scraped", "fallback"]
     assert result["source"] in ["scraped", "fallback"]
+
+
+def test_moon_times_carry_the_time_zone_of_their_source():
+    """Test that scraped times are labelled with the page's offset and offline ones as UTC."""
+    fields = extract_forecast_fields(FIXTURE.read_text(encoding="utf-8"))
+    scraped = weather_service.ClearOutsideWeatherFetcher(40.7128, -74.0060, fields=fields)
+    offline = weather_service.ClearOutsideWeatherFetcher(40.7128, -74.0060, fields=None).get_moon_brightness()
+
+    assert scraped.get_moon_brightness()["time_zone"] == "UTC-4"
+    assert (offline["time_zone"], offline["source"]) == ("UTC", "fallback")
+    assert [weather_service._time_zone_label(hours) for hours in (None, 0, 5.5, -3.5)] == [
+        "local", "UTC+0", "UTC+5:30", "UTC-3:30"
+    ]
+
+
+def test_stale_forecast_is_not_kept_after_upstream_recovers(clearoutside, monkeypatch, tmp_path, clock):
+    """Test that an expired value served during an outage is replaced once upstream is back."""
+    if clearoutside is None:
+        pytest.skip("needs the local stand-in")
+    cache = forecast_cache.ForecastCache(str(tmp_path / "stale.sqlite3"), stale_seconds=0, clock=clock)
+    monkeypatch.setattr(forecast_cache, "_forecast_cache", cache)
+    cache.set("cloudiness", 40.7128, -74.0060, {"cloudiness_percent": 99, "source": "scraped"})
+    clock.now += 2 * 3600
+
+    clearoutside.config.error_rate = 1.0
+    outage = weather_service.get_cloudiness(40.7128, -74.0060)
+    assert outage["stale"] and outage["cloudiness_percent"] == 99
+    assert not forecast_cache.is_cacheable(outage)
+
+    clearoutside.config.error_rate = 0.0
+    requests = clearoutside.stats()["requests"]
+    recovered = weather_service.get_cloudiness(40.7128, -74.0060)
+    assert clearoutside.stats()["requests"] > requests
+    assert recovered["source"] == "scraped" and "stale" not in recovered
+
+
+def test_observing_windows_are_not_kept_from_a_fallback_forecast(clearoutside):
+    """Test that the empty windows of an outage are recomputed once upstream is back."""
+    if clearoutside is None:
+        pytest.skip("needs the local stand-in")
+    clearoutside.config.error_rate = 1.0
+    assert weather_service.get_best_observing_windows(40.7128, -74.0060) == []
+
+    clearoutside.config.error_rate = 0.0
+    weather_service.invalidate_weather_fetchers()
+    requests = clearoutside.stats()["requests"]
+    weather_service.get_best_observing_windows(40.7128, -74.0060)
+    assert clearoutside.stats()["requests"] > requests
+    # A real forecast is memoized: no further upstream call
+    requests = clearoutside.stats()["requests"]
+    weather_service.get_best_observing_windows(40.7128, -74.0060)
+    assert clearoutside.stats()["requests"] == requests
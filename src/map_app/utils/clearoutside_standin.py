@@ -0,0 +1,254 @@
+"""Local stand-in for clearoutside.com.
+
+Serves recorded forecast pages at ``/forecast/<lat>/<lon>`` so the weather
+service, its tests and throughput benchmarks can run without network access.
+Latency, jitter and error rate are configurable, and each coordinate gets a
+deterministic variation of the recorded page (cloud cover, Bortle class and
+the coordinates in the heading), so different locations do not all look
+identical.
+
+Run standalone from ``src/map_app`` and point the app at it:
+
+    python -m utils.clearoutside_standin --port 8765 --latency 0.3 --error-rate 0.05
+    SKYLINE_CLEAROUTSIDE_URL=http://127.0.0.1:8765 streamlit run main.py
+"""
+import argparse
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGES = [
+    Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "clearoutside_forecast.html",
+]
+
+_FORECAST_PATH_RE = re.compile(r"^/forecast/(-?\d+(?:\.\d+)?)/(-?\d+(?:\.\d+)?)(?:/.*)?$")
+_HOUR_CELL_RE = re.compile(r'<li class="fc_\d+">(\d+)</li>')
+_SUMMARY_RE = re.compile(r"(Current cloud cover: <b>)(\d+)(%</b>)")
+_BORTLE_RE = re.compile(r"(btn-bortle-|Bortle scale class |Class )(\d)")
+_COORDINATES_RE = re.compile(r"\d+\.\d+[NS] \d+\.\d+[EW]")
+
+
+@dataclass
+class StandInConfig:
+    """Behaviour of the stand-in server; may be changed while it runs."""
+
+    latency_seconds: float = 0.0  # Added to every response
+    jitter_seconds: float = 0.0  # Uniform extra latency in [0, jitter)
+    error_rate: float = 0.0  # Fraction of requests answered with error_status
+    error_status: int = 503
+    vary_by_coordinate: bool = True
+    seed: int = 0
+
+
+def _format_coordinates(latitude: float, longitude: float) -> str:
+    return (
+        f"{abs(latitude):.2f}{'N' if latitude >= 0 else 'S'} "
+        f"{abs(longitude):.2f}{'E' if longitude >= 0 else 'W'}"
+    )
+
+
+def _coordinate_rng(latitude: float, longitude: float, seed: int) -> random.Random:
+    """Deterministic RNG for a coordinate rounded to 0.01°."""
+    key = f"{seed}:{latitude:.2f}:{longitude:.2f}".encode()
+    return random.Random(int.from_bytes(hashlib.sha256(key).digest()[:8], "big"))
+
+
+def vary_page(html: str, latitude: float, longitude: float, seed: int = 0) -> str:
+    """
+    Derive a coordinate-specific page from a recorded one.
+
+    Cloud values are shifted by a per-coordinate offset and the Bortle class
+    is redrawn; the moon data is left untouched since it is the same everywhere.
+
+    Args:
+        html: Recorded forecast page
+        latitude: Requested latitude
+        longitude: Requested longitude
+        seed: Variation seed
+
+    Returns:
+        Modified page
+    """
+    rng = _coordinate_rng(latitude, longitude, seed)
+    cloud_shift = rng.randint(-40, 40)
+    bortle = rng.randint(1, 9)
+
+    def shift_cell(match: re.Match) -> str:
+        value = min(100, max(0, int(match.group(1)) + cloud_shift))
+        return f'<li class="fc_{round(value / 10)}">{value}</li>'
+
+    html = _HOUR_CELL_RE.sub(shift_cell, html)
+    html = _SUMMARY_RE.sub(
+        lambda m: f"{m.group(1)}{min(100, max(0, int(m.group(2)) + cloud_shift))}{m.group(3)}", html
+    )
+    html = _BORTLE_RE.sub(lambda m: f"{m.group(1)}{bortle}", html)
+    return _COORDINATES_RE.sub(_format_coordinates(latitude, longitude), html)
+
+
+class ClearOutsideStandIn:
+    """Threaded HTTP server imitating clearoutside.com forecast pages."""
+
+    def __init__(
+        self,
+        pages: Optional[Sequence[Path]] = None,
+        config: Optional[StandInConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Args:
+            pages: Recorded forecast pages; coordinates are spread across them
+            config: Latency, error and variation settings
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.pages: List[str] = [Path(p).read_text(encoding="utf-8") for p in (pages or DEFAULT_PAGES)]
+        self.config = config or StandInConfig()
+        self._host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self._counts = {"requests": 0, "errors": 0, "not_found": 0}
+        self._render = lru_cache(maxsize=4096)(self._render_uncached)
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as CLEAROUTSIDE_BASE_URL."""
+        if self._server is None:
+            raise RuntimeError("Stand-in server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _render_uncached(self, latitude: float, longitude: float, vary: bool, seed: int) -> bytes:
+        page = self.pages[_coordinate_rng(latitude, longitude, seed).randrange(len(self.pages))]
+        if vary:
+            page = vary_page(page, latitude, longitude, seed)
+        return page.encode("utf-8")
+
+    def render(self, latitude: float, longitude: float) -> bytes:
+        """Return the page served for a coordinate."""
+        return self._render(round(latitude, 2), round(longitude, 2), self.config.vary_by_coordinate, self.config.seed)
+
+    def _next_response(self) -> Dict[str, float]:
+        """Draw latency and failure for one request."""
+        config = self.config
+        with self._lock:
+            self._counts["requests"] += 1
+            delay = config.latency_seconds + self._random.uniform(0, config.jitter_seconds)
+            failed = self._random.random() < config.error_rate
+            if failed:
+                self._counts["errors"] += 1
+        return {"delay": delay, "failed": failed}
+
+    def _make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                response = standin._next_response()
+                match = _FORECAST_PATH_RE.match(self.path)
+                if response["delay"] > 0:
+                    time.sleep(response["delay"])
+
+                if match is None:
+                    with standin._lock:
+                        standin._counts["not_found"] += 1
+                    status, body = 404, b"Not found"
+                elif response["failed"]:
+                    status, body = standin.config.error_status, b"Service unavailable"
+                else:
+                    status, body = 200, standin.render(float(match.group(1)), float(match.group(2)))
+
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass  # Client gave up (e.g. its latency budget ran out)
+
+            def log_message(self, format, *args):
+                logger.debug("stand-in: " + format, *args)
+
+        return Handler
+
+    def start(self) -> "ClearOutsideStandIn":
+        """Start serving in a daemon thread."""
+        self._server = ThreadingHTTPServer((self._host, self._port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="clearoutside-standin", daemon=True)
+        self._thread.start()
+        logger.info(f"ClearOutside stand-in listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and release its port."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "ClearOutsideStandIn":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        """Return request, error and not-found counts."""
+        with self._lock:
+            return dict(self._counts)
+
+    def reset_stats(self) -> None:
+        """Zero the counters."""
+        with self._lock:
+            for name in self._counts:
+                self._counts[name] = 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve recorded ClearOutside pages locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--page", action="append", help="Recorded page to serve (repeatable)")
+    parser.add_argument("--no-variation", action="store_true", help="Serve pages unchanged")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    config = StandInConfig(
+        latency_seconds=args.latency,
+        jitter_seconds=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        vary_by_coordinate=not args.no_variation,
+        seed=args.seed,
+    )
+    standin = ClearOutsideStandIn(pages=args.page, config=config, host=args.host, port=args.port).start()
+    print(f"Serving ClearOutside stand-in at {standin.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,542 @@
+"""Location search that resolves most queries locally.
+
+Queries are resolved in order of cost:
+
+1. Coordinate input ("40.7128,-74.0060", "40.7128° N 74.0060° W",
+   "40°42'46\"N 74°0'22\"W") is parsed directly.
+2. Previous answers come from an in-memory LRU backed by a persistent SQLite
+   cache shared by all worker processes (not-found answers are cached for a
+   shorter time).
+3. An optional gazetteer of populated places (GeoNames ``cities*.txt`` or a
+   ``name,latitude,longitude,country,population`` CSV, set with
+   ``SKYLINE_GAZETTEER_PATH``) answers exact place names and powers
+   autocomplete through a prefix index and a trigram index.
+4. Only then is the online geocoder (Nominatim) called, through one shared
+   client with a timeout.
+"""
+import bisect
+import csv
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import (
+    GAZETTEER_PATH,
+    GEOCODE_CACHE_PATH,
+    GEOCODE_CACHE_TTL_SECONDS,
+    GEOCODE_NEGATIVE_TTL_SECONDS,
+    GEOCODER_TIMEOUT_SECONDS,
+    GEOCODER_USER_AGENT,
+)
+from services.bounded_cache import BoundedLRUCache
+from services.memory_budget import register_cache
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodingError(RuntimeError):
+    """Raised when the online geocoder fails, as opposed to finding nothing."""
+
+
+_COORDINATE = r"""
+    (?P<{p}hem1>[NSEW])?\s*
+    (?P<{p}deg>[+-]?\d+(?:\.\d+)?)\s*°?\s*
+    (?:(?P<{p}min>\d+(?:\.\d+)?)\s*['′]\s*)?
+    (?:(?P<{p}sec>\d+(?:\.\d+)?)\s*(?:["″]|'')\s*)?
+    (?({p}hem1)|(?P<{p}hem2>[NSEW])?)
+"""
+_COORDINATE_PAIR_RE = re.compile(
+    r"^\s*" + _COORDINATE.format(p="a_") + r"\s*[,;/]?\s*" + _COORDINATE.format(p="b_") + r"\s*$",
+    re.VERBOSE | re.IGNORECASE,
+)
+_NON_WORD_RE = re.compile(r"[^\w,]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    query TEXT PRIMARY KEY,
+    found INTEGER NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    name TEXT,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    """A resolved location and where the answer came from."""
+
+    latitude: float
+    longitude: float
+    name: str
+    source: str  # coordinates, memory, cache, gazetteer or online
+
+
+@dataclass(frozen=True)
+class Place:
+    """A populated place from the gazetteer."""
+
+    name: str
+    latitude: float
+    longitude: float
+    country: str = ""
+    population: int = 0
+
+    @property
+    def label(self) -> str:
+        """Display name, e.g. "Paris, FR"."""
+        return f"{self.name}, {self.country}" if self.country else self.name
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query for cache keys and name matching.
+
+    Accents are stripped, case is folded and punctuation other than commas
+    collapses to single spaces, so "  São Paulo " and "sao paulo" match.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD_RE.sub(" ", text.casefold())
+    return re.sub(r"\s*,\s*", ", ", text).strip(" ,")
+
+
+def _coordinate_value(match: re.Match, prefix: str) -> Tuple[Optional[float], Optional[str]]:
+    degrees = match.group(prefix + "deg")
+    minutes = match.group(prefix + "min")
+    seconds = match.group(prefix + "sec")
+    hemisphere = (match.group(prefix + "hem1") or match.group(prefix + "hem2") or "").upper() or None
+
+    value = abs(float(degrees))
+    for part, divisor in ((minutes, 60.0), (seconds, 3600.0)):
+        if part is not None:
+            if float(part) >= 60:
+                return None, None
+            value += float(part) / divisor
+    if degrees.startswith("-"):
+        if hemisphere is not None:
+            return None, None
+        value = -value
+    if hemisphere in ("S", "W"):
+        value = -value
+    return value, hemisphere
+
+
+def parse_coordinates(text: str) -> Optional[Tuple[float, float]]:
+    """
+    Parse coordinate input in decimal or degree-minute-second notation.
+
+    Two bare integers ("12 34") are not treated as coordinates, since they are
+    more likely part of an address.
+
+    Args:
+        text: User input, e.g. "40.7128,-74.0060" or "40°42'46\"N 74°0'22\"W"
+
+    Returns:
+        (latitude, longitude), or None if the text is not a valid coordinate pair
+    """
+    match = _COORDINATE_PAIR_RE.match(text)
+    if match is None:
+        return None
+    if not re.search(r"[,;/.°'′\"″]|[NSEW]", text, re.IGNORECASE):
+        return None
+
+    first, first_hemisphere = _coordinate_value(match, "a_")
+    second, second_hemisphere = _coordinate_value(match, "b_")
+    if first is None or second is None:
+        return None
+    if first_hemisphere in ("E", "W") and second_hemisphere in (None, "N", "S"):
+        first, second = second, first
+    elif second_hemisphere in ("N", "S") or first_hemisphere in ("E", "W"):
+        return None
+
+    latitude, longitude = first, second
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+        return None
+    return latitude, longitude
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """In-memory place index with exact, prefix and trigram lookup."""
+
+    PREFIX_TABLE_LENGTH = 2  # Prefixes this short get a precomputed top list
+    SUGGESTION_POOL = 2000  # Prefix matches scanned before ranking by population
+
+    def __init__(self, places: List[Place]):
+        """
+        Args:
+            places: Places to index
+        """
+        # Most populous first, so every posting list is already ranked
+        self.places = sorted(places, key=lambda place: -place.population)
+        keys = [(normalize_query(place.name), index) for index, place in enumerate(self.places)]
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._key_ids = [index for _, index in keys]
+
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+        self._trigram_counts: List[int] = []
+        self._short_prefixes: Dict[str, List[int]] = defaultdict(list)
+        for index, place in enumerate(self.places):
+            key = normalize_query(place.name)
+            self._exact[key].append(index)
+            grams = _trigrams(key)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigrams[gram].append(index)
+            for length in range(1, min(len(key), self.PREFIX_TABLE_LENGTH) + 1):
+                top = self._short_prefixes[key[:length]]
+                if len(top) < 20:
+                    top.append(index)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    @classmethod
+    def from_file(cls, path: str, min_population: int = 0) -> "Gazetteer":
+        """
+        Load a GeoNames ``cities*.txt`` dump or a CSV with name, latitude,
+        longitude and optional country and population columns.
+
+        Args:
+            path: Gazetteer file
+            min_population: Skip smaller places
+
+        Returns:
+            Gazetteer
+        """
+        places = []
+        with open(path, encoding="utf-8", newline="") as handle:
+            if path.endswith(".txt"):
+                # GeoNames: name=1, latitude=4, longitude=5, country=8, population=14
+                for row in csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+                    population = int(row[14] or 0)
+                    if population >= min_population:
+                        places.append(Place(row[1], float(row[4]), float(row[5]), row[8], population))
+            else:
+                for row in csv.DictReader(handle):
+                    population = int(row.get("population") or 0)
+                    if population >= min_population:
+                        places.append(
+                            Place(
+                                row["name"],
+                                float(row["latitude"]),
+                                float(row["longitude"]),
+                                row.get("country") or "",
+                                population,
+                            )
+                        )
+        logger.info(f"Loaded {len(places)} gazetteer places from {path}")
+        return cls(places)
+
+    def lookup(self, query: str) -> Optional[Place]:
+        """
+        Return the most populous place named exactly like the query.
+
+        A qualifier after a comma ("Paris, FR", "Paris, Texas") is matched
+        against the country code when possible.
+        """
+        name, _, qualifier = normalize_query(query).partition(", ")
+        candidates = self._exact.get(name)
+        if not candidates:
+            return None
+        if qualifier:
+            for index in candidates:
+                if normalize_query(self.places[index].country) == qualifier:
+                    return self.places[index]
+            # An unrecognized qualifier (state, region) could mean a smaller
+            # namesake; leave those to the online geocoder
+            return None
+        return self.places[candidates[0]]
+
+    def suggest(self, text: str, limit: int = 8) -> List[Place]:
+        """
+        Autocomplete a partial place name.
+
+        Prefix matches come first, ranked by population; fuzzy trigram matches
+        fill the remaining slots, so typos still produce suggestions.
+
+        Args:
+            text: Partial query
+            limit: Maximum suggestions
+
+        Returns:
+            List[Place]: Suggestions, best first
+        """
+        prefix = normalize_query(text).partition(",")[0].strip()
+        if not prefix:
+            return []
+
+        if len(prefix) <= self.PREFIX_TABLE_LENGTH:
+            ids = self._short_prefixes.get(prefix, [])[:limit]
+        else:
+            start = bisect.bisect_left(self._keys, prefix)
+            stop = bisect.bisect_left(self._keys, prefix + "\uffff", lo=start)
+            ids = sorted(self._key_ids[start:min(stop, start + self.SUGGESTION_POOL)])[:limit]
+
+        if len(ids) < limit and len(prefix) >= 3:
+            seen = set(ids)
+            for index in self._fuzzy(prefix):
+                if index not in seen:
+                    ids.append(index)
+                    seen.add(index)
+                if len(ids) >= limit:
+                    break
+        return [self.places[index] for index in ids]
+
+    def _fuzzy(self, text: str, min_similarity: float = 0.25) -> List[int]:
+        """Return place ids by trigram similarity to text (best first)."""
+        grams = _trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        scored = []
+        for index, count in shared.items():
+            similarity = count / (len(grams) + self._trigram_counts[index] - count)
+            if similarity >= min_similarity:
+                scored.append((-similarity, index))
+        scored.sort()
+        return [index for _, index in scored]
+
+
+class GeocodeCache:
+    """Persistent geocode results in SQLite, shared across processes."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = GEOCODE_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: float = GEOCODE_NEGATIVE_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            path: SQLite file path (defaults to GEOCODE_CACHE_PATH)
+            ttl_seconds: How long found locations are kept
+            negative_ttl_seconds: How long "not found" answers are kept
+            clock: Time source, injectable for tests
+        """
+        self.path = path or GEOCODE_CACHE_PATH
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._clock = clock
+        self._local = threading.local()
+        self._connect().execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, query: str) -> Tuple[bool, Optional[GeocodeResult]]:
+        """
+        Look up a normalized query.
+
+        Returns:
+            (hit, result): hit is False when nothing fresh is cached; result is
+            None for a cached "not found"
+        """
+        row = self._connect().execute(
+            "SELECT found, latitude, longitude, name, fetched_at FROM geocode WHERE query = ?",
+            (query,),
+        ).fetchone()
+        if row is None:
+            return False, None
+        found, latitude, longitude, name, fetched_at = row
+        ttl = self.ttl_seconds if found else self.negative_ttl_seconds
+        if self._clock() - fetched_at > ttl:
+            return False, None
+        if not found:
+            return True, None
+        return True, GeocodeResult(latitude, longitude, name, "cache")
+
+    def set(self, query: str, result: Optional[GeocodeResult]) -> None:
+        """Store a result, or a "not found" answer when result is None."""
+        if result is None:
+            values = (query, 0, None, None, None, self._clock())
+        else:
+            values = (query, 1, result.latitude, result.longitude, result.name, self._clock())
+        self._connect().execute(
+            "INSERT OR REPLACE INTO geocode (query, found, latitude, longitude, name, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            values,
+        )
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        self._connect().execute("DELETE FROM geocode")
+
+
+_nominatim = None
+_nominatim_lock = threading.Lock()
+
+
+def nominatim_lookup(query: str) -> Optional[Tuple[float, float, str]]:
+    """
+    Geocode a query online through one shared Nominatim client.
+
+    Returns:
+        (latitude, longitude, name), or None if nothing was found
+
+    Raises:
+        geopy.exc.GeopyError: The service could not be reached or failed
+    """
+    global _nominatim
+    if _nominatim is None:
+        with _nominatim_lock:
+            if _nominatim is None:
+                from geopy.geocoders import Nominatim
+
+                _nominatim = Nominatim(user_agent=GEOCODER_USER_AGENT, timeout=GEOCODER_TIMEOUT_SECONDS)
+    location = _nominatim.geocode(query)
+    if location is None:
+        return None
+    return location.latitude, location.longitude, query
+
+
+class Geocoder:
+    """Resolve location queries locally first and online only on a miss."""
+
+    def __init__(
+        self,
+        cache: Optional[GeocodeCache] = None,
+        gazetteer: Optional[Gazetteer] = None,
+        online: Optional[Callable[[str], Optional[Tuple[float, float, str]]]] = nominatim_lookup,
+        memory_entries: int = 1024,
+    ):
+        """
+        Args:
+            cache: Persistent result cache (None disables it)
+            gazetteer: Local place index (None disables it)
+            online: Online lookup returning (latitude, longitude, name) or None;
+                exceptions are treated as temporary failures, not cached and
+                raised as GeocodingError
+            memory_entries: Size of the in-process LRU in front of the cache
+        """
+        self.cache = cache
+        self.gazetteer = gazetteer
+        self.online = online
+        self._memory = register_cache(
+            "geocoder", BoundedLRUCache(max_entries=memory_entries, max_bytes=memory_entries * 1024)
+        )
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def geocode(self, text: str) -> Optional[GeocodeResult]:
+        """
+        Resolve a location query.
+
+        Args:
+            text: Address, place name or coordinates
+
+        Returns:
+            GeocodeResult, or None if the location was not found
+
+        Raises:
+            GeocodingError: If the online geocoder failed
+        """
+        coordinates = parse_coordinates(text)
+        if coordinates is not None:
+            self._count("coordinates")
+            latitude, longitude = coordinates
+            return GeocodeResult(latitude, longitude, f"{latitude:.4f}, {longitude:.4f}", "coordinates")
+
+        query = normalize_query(text)
+        if not query:
+            return None
+        remembered = self._memory.get(query)
+        if remembered is not None:
+            self._count("memory")
+            found, result = remembered
+            return GeocodeResult(result.latitude, result.longitude, result.name, "memory") if found else None
+
+        if self.cache is not None:
+            hit, result = self.cache.get(query)
+            if hit:
+                self._count("cache")
+                self._memory.put(query, (result is not None, result))
+                return result
+
+        result = None
+        place = self.gazetteer.lookup(text) if self.gazetteer is not None else None
+        if place is not None:
+            self._count("gazetteer")
+            result = GeocodeResult(place.latitude, place.longitude, place.label, "gazetteer")
+        elif self.online is not None:
+            self._count("online")
+            try:
+                found = self.online(text.strip())
+            except Exception as exc:  # noqa: BLE001 - network errors are not answers
+                logger.warning(f"Online geocoding failed for '{text}': {exc}")
+                self._count("online_errors")
+                raise GeocodingError(str(exc)) from exc
+            if found is not None:
+                result = GeocodeResult(found[0], found[1], found[2], "online")
+        else:
+            return None
+
+        self._memory.put(query, (result is not None, result))
+        # Gazetteer answers are as cheap to recompute as to read back
+        if self.cache is not None and (result is None or result.source == "online"):
+            self.cache.set(query, result)
+        return result
+
+    def suggest(self, text: str, limit: int = 8) -> List[Place]:
+        """Autocomplete suggestions from the gazetteer (empty without one)."""
+        if self.gazetteer is None:
+            return []
+        return self.gazetteer.suggest(text, limit=limit)
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many queries each source answered."""
+        with self._lock:
+            return dict(self._counts)
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer(path: Optional[str] = GAZETTEER_PATH) -> Optional[Gazetteer]:
+    """Load the configured gazetteer once, or return None if none is configured."""
+    if not path:
+        return None
+    if not Path(path).exists():
+        logger.warning(f"Gazetteer file not found: {path}")
+        return None
+    return Gazetteer.from_file(path)
+
+
+_geocoder: Optional[Geocoder] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> Geocoder:
+    """Return the process-wide geocoder, creating it on first use."""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = Geocoder(cache=GeocodeCache(), gazetteer=load_gazetteer())
+    return _geocoder
@@ -0,0 +1,361 @@
+"""Hot-path timing spans, counters and a slow-request profiler.
+
+Stages of the search pipeline are wrapped in ``span(name)`` (or decorated
+with ``@traced(name)``) and caches report hits, misses and bytes loaded
+through ``count(name, **labels)``. Everything lands in one process-wide
+registry, exported in the Prometheus text format by ``render_prometheus()``:
+the API server serves it at /metrics, and the Streamlit app starts a small
+exporter with ``serve_metrics()`` when SKYLINE_METRICS_PORT is set.
+
+Instrumentation is off unless SKYLINE_INSTRUMENTATION=1 (or ``enable()``).
+While off, ``span`` returns a shared no-op context manager and ``count``
+returns at once, so the hooks cost one global lookup each.
+
+Separately, ``profile_request(name)`` samples the current thread's stack
+every few milliseconds while a request runs, and writes the samples as
+collapsed stacks (flamegraph.pl / speedscope format) if the request took
+longer than SKYLINE_PROFILE_SLOW_MS. Without that setting it is a no-op.
+
+Forked API workers each keep their own registry, so a scrape sees the
+worker that answered it.
+"""
+
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import (
+    INSTRUMENTATION_ENABLED,
+    PROFILE_DIR,
+    PROFILE_INTERVAL_MS,
+    PROFILE_SLOW_MS,
+)
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "skyline_"
+# Upper bounds (seconds) of the span duration histogram buckets
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNTER_HELP = {
+    "cache_requests_total": "Cache lookups by cache and result (hit or miss).",
+    "bytes_loaded_total": "Bytes read from disk or the network by source.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_enabled = INSTRUMENTATION_ENABLED
+_NO_SPAN = nullcontext()
+
+
+class MetricsRegistry:
+    """Span duration histograms and labelled counters of one process."""
+
+    def __init__(self, buckets: Tuple[float, ...] = SPAN_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._spans: Dict[str, List[float]] = {}  # bucket counts, then count and sum
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one run of a span."""
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                entry = self._spans[name] = [0] * len(self.buckets) + [0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry[index] += 1
+                    break
+            entry[-2] += 1
+            entry[-1] += seconds
+
+    def inc(self, name: str, value: float = 1, labels: Labels = ()) -> None:
+        """Add to a counter."""
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return span counts/totals (seconds) and counter values."""
+        with self._lock:
+            return {
+                "spans": {name: {"count": entry[-2], "sum": entry[-1]} for name, entry in self._spans.items()},
+                "counters": {
+                    name + _format_labels(labels): value for (name, labels), value in self._counters.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Forget every recorded value."""
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def render_prometheus(self) -> str:
+        """Return every metric in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            spans = {name: list(entry) for name, entry in self._spans.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        if spans:
+            metric = f"{METRIC_PREFIX}span_duration_seconds"
+            lines += [f"# HELP {metric} Duration of instrumented stages.", f"# TYPE {metric} histogram"]
+            for name in sorted(spans):
+                entry = spans[name]
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {entry[-2]}')
+                lines.append(f'{metric}_count{{span="{name}"}} {entry[-2]}')
+                lines.append(f'{metric}_sum{{span="{name}"}} {entry[-1]:.6f}')
+
+        for name in sorted({name for name, _ in counters}):
+            metric = METRIC_PREFIX + name
+            lines += [f"# HELP {metric} {COUNTER_HELP.get(name, name)}", f"# TYPE {metric} counter"]
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _registry
+
+
+def enabled() -> bool:
+    """Return True if spans and counters are being recorded."""
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    """Turn recording on or off at runtime (e.g. in tests or a debug session)."""
+    global _enabled
+    _enabled = on
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        _registry.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def span(name: str):
+    """Time the enclosed block as the named stage (no-op while disabled)."""
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator timing every call of a function as the named stage."""
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: float = 1, **labels: Any) -> None:
+    """Add to a counter, e.g. count("cache_requests_total", cache="region_map", result="hit")."""
+    if not _enabled:
+        return
+    _registry.inc(name, value, tuple(sorted((key, str(label)) for key, label in labels.items())))
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    """Count one lookup of a named cache."""
+    if not _enabled:
+        return
+    count("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def render_prometheus() -> str:
+    """Return the process-wide metrics in the Prometheus text format."""
+    return _registry.render_prometheus()
+
+
+# Metrics exporter for processes without an HTTP server of their own
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_exporter: Optional["ThreadingHTTPServer"] = None
+_exporter_lock = threading.Lock()
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> "ThreadingHTTPServer":
+    """
+    Serve /metrics from a daemon thread; later calls return the running server.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        host: Interface to bind
+
+    Returns:
+        The exporter's server (its server_address holds the bound port)
+    """
+    # http.server is imported here: it is most of this module's import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics: " + format, *args)
+
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = ThreadingHTTPServer((host, port), MetricsHandler)
+            _exporter.daemon_threads = True
+            threading.Thread(target=_exporter.serve_forever, name="metrics-exporter", daemon=True).start()
+            logger.info(f"Serving Prometheus metrics on {host}:{_exporter.server_address[1]}/metrics")
+        return _exporter
+
+
+# Slow-request profiling
+
+
+def _collapse(frame) -> str:
+    """One stack as 'outer;...;inner' frames of function (file:line)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Sample the stacks of threads serving requests; keep the profiles of slow ones."""
+
+    def __init__(self, threshold_ms: float, interval_ms: float = PROFILE_INTERVAL_MS, output_dir: str = PROFILE_DIR):
+        """
+        Args:
+            threshold_ms: Requests at least this slow have their profile written
+            interval_ms: Time between stack samples
+            output_dir: Directory receiving the .folded profile files
+        """
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000.0
+        self.output_dir = output_dir
+        self.last_profile: Optional[str] = None
+        self._lock = threading.Lock()
+        self._targets: Dict[int, Dict[str, int]] = {}
+        self._sampler: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        """Sampler thread: runs while any request is being profiled."""
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._sampler = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, samples in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = _collapse(frame)
+                        samples[stack] = samples.get(stack, 0) + 1
+            time.sleep(self.interval)
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profile the enclosed block on the current thread."""
+        thread_id = threading.get_ident()
+        samples: Dict[str, int] = {}
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._sampler.start()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with self._lock:
+                self._targets.pop(thread_id, None)
+            if elapsed_ms >= self.threshold_ms:
+                self._write(name, elapsed_ms, samples)
+
+    def _write(self, name: str, elapsed_ms: float, samples: Dict[str, int]) -> None:
+        safe_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name).strip("_") or "request"
+        path = os.path.join(self.output_dir, f"{safe_name}-{time.strftime('%Y%m%dT%H%M%S')}-{elapsed_ms:.0f}ms.folded")
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as handle:
+                for stack, hits in sorted(samples.items(), key=lambda item: -item[1]):
+                    handle.write(f"{stack} {hits}\n")
+        except OSError as exc:
+            logger.warning(f"Could not write profile of slow request {name}: {exc}")
+            return
+        self.last_profile = path
+        logger.warning(f"Slow request {name} took {elapsed_ms:.0f} ms; {sum(samples.values())} samples in {path}")
+
+
+_profiler: Optional[SlowRequestProfiler] = (
+    SlowRequestProfiler(PROFILE_SLOW_MS) if PROFILE_SLOW_MS is not None else None
+)
+
+
+def set_profiler(profiler: Optional[SlowRequestProfiler]) -> Optional[SlowRequestProfiler]:
+    """Install (or remove, with None) the slow-request profiler; returns the previous one."""
+    global _profiler
+    previous, _profiler = _profiler, profiler
+    return previous
+
+
+def profile_request(name: str):
+    """Profile the enclosed request if profiling is configured (no-op otherwise)."""
+    if _profiler is None:
+        return _NO_SPAN
+    return _profiler.profile(name)
@@ -0,0 +1,33 @@
+"""Lazily resolved package exports (PEP 562).
+
+Packages such as ``models`` and ``services`` re-export names from their
+modules, but importing one module must not load its siblings' dependencies.
+``lazy_exports`` builds the package's module ``__getattr__``, which imports
+the defining module on first access and caches the value on the package.
+"""
+import importlib
+import sys
+from typing import Any, Callable, Dict
+
+
+def lazy_exports(name_map: Dict[str, str], package: str) -> Callable[[str], Any]:
+    """
+    Build a module ``__getattr__`` resolving exports on first access.
+
+    Args:
+        name_map: Exported name -> submodule (relative to package) defining it
+        package: The package's ``__name__``
+
+    Returns:
+        Function to assign to the package's ``__getattr__``
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name not in name_map:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(f"{package}.{name_map[name]}"), name)
+        # Later lookups find the value directly and skip __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
@@ -107,11 +107,12 @@ def add_optimal_location_markers(
         else:
             icon_color = "orange"
 
+        cloudiness = loc.get("cloudiness_percent")
         popup_text = f"""
         <b>{idx}. {loc.get('name', 'Unknown')}</b><br>
         Light Pollution: {pollution_value}<br>
         Distance: {loc.get('distance_km', 0):.1f} km<br>
-        Cloudiness: {loc.get('cloudiness_percent', 0)}%<br>
+        Cloudiness: {'n/a' if cloudiness is None else f'{cloudiness}%'}<br>
         Conditions: {loc.get('conditions', 'Unknown')}
         """
 
@@ -127,29 +128,34 @@ def add_optimal_location_markers(
 
 def geocode_location(location_str: str) -> Tuple[float, float, str]:
     """
-    Convert location string to coordinates using geopy.
+    Convert location string to coordinates.
+
+    Coordinates are parsed directly and known places come from the local
+    geocode cache or gazetteer; the online geocoder is only used on a miss.
 
     Args:
-        location_str: Address or location name string
+        location_str: Address, location name or coordinates string
 
     Returns:
         Tuple[float, float, str]: (latitude, longitude, location_name)
     """
-    try:
-        from geopy.geocoders import Nominatim
+    from config import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_LOCATION_NAME
+    from utils.geocoding import GeocodingError, get_geocoder
 
-        geolocator = Nominatim(user_agent="star_observation_map")
-        location = geolocator.geocode(location_str)
+    try:
+        geocoder = get_geocoder()
+        result = geocoder.geocode(location_str)
 
-        if location:
-            return (location.latitude, location.longitude, location_str)
+        if result:
+            return (result.latitude, result.longitude, result.name)
         else:
-            st.warning(f"Location '{location_str}' not found. Using default.")
-            from config import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_LOCATION_NAME
-
+            suggestions = [place.label for place in geocoder.suggest(location_str, limit=3)]
+            hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+            st.warning(f"Location '{location_str}' not found.{hint} Using default.")
             return (DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_LOCATION_NAME)
+    except GeocodingError as e:
+        st.error(f"Geocoding service unavailable: {str(e)}. Using default.")
+        return (DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_LOCATION_NAME)
     except Exception as e:
         st.error(f"Error geocoding location: {str(e)}")
-        from config import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_LOCATION_NAME
-
         return (DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_LOCATION_NAME)
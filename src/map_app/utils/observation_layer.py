@@ -0,0 +1,173 @@
+"""
+High-volume observation layer for the folium map.
+
+``ObservationClusterLayer`` renders tens of thousands of points with
+Leaflet.markercluster without the per-marker cost of ``folium.Marker``:
+
+- Points are shipped as compact integer columns (coordinates in 1e-4 degrees,
+  latitudes delta-encoded since they are sorted) instead of one JSON object
+  and HTML popup per marker.
+- Markers are lightweight circle markers added in bulk with chunked loading,
+  so the browser stays responsive while clustering 100k points.
+- A single popup function builds the popup HTML only when a marker is opened.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import folium
+import numpy as np
+from folium.plugins import MarkerCluster
+from folium.template import Template
+
+from services.observation_points import ObservationPoints
+
+COORDINATE_SCALE = 10_000  # 1e-4 degrees (~11 m) is plenty for clustering
+MISSING = -1
+
+Box = Tuple[float, float, float, float]  # (south, west, north, east) in degrees
+
+
+def bounds_to_box(bounds: Optional[Dict[str, Any]]) -> Optional[Box]:
+    """
+    Convert Leaflet bounds returned by st_folium to a (south, west, north, east) box.
+
+    Args:
+        bounds: {"_southWest": {"lat", "lng"}, "_northEast": {"lat", "lng"}}
+
+    Returns:
+        Box, or None if the bounds are missing or incomplete
+    """
+    try:
+        south_west, north_east = bounds["_southWest"], bounds["_northEast"]
+        box = (south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"])
+    except (KeyError, TypeError):
+        return None
+    return None if any(value is None for value in box) else tuple(float(value) for value in box)
+
+
+def pad_box(box: Box, fraction: float) -> Box:
+    """Grow a box by a fraction of its size on every side (latitudes clamped)."""
+    south, west, north, east = box
+    lat_pad = (north - south) * fraction
+    lon_pad = (east - west) * fraction
+    return (max(-90.0, south - lat_pad), west - lon_pad, min(90.0, north + lat_pad), east + lon_pad)
+
+
+def box_contains(outer: Box, inner: Box) -> bool:
+    """Return True if inner lies entirely within outer."""
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+def encode_points(points: ObservationPoints) -> Dict[str, List[int]]:
+    """
+    Encode observations as compact integer columns for the browser.
+
+    Args:
+        points: Observations sorted by latitude
+
+    Returns:
+        Dict: "dlat" (latitude deltas), "lon", "mag" and "cloud" (percent)
+        columns, with -1 for missing readings
+    """
+    latitude = np.rint(points.latitude * COORDINATE_SCALE).astype(np.int64)
+    longitude = np.rint(points.longitude * COORDINATE_SCALE).astype(np.int64)
+    delta_latitude = np.diff(latitude, prepend=0)
+    mag = np.where(np.isnan(points.limiting_mag), MISSING, np.rint(points.limiting_mag)).astype(np.int64)
+    cloud = np.where(np.isnan(points.cloud_cover), MISSING, np.rint(points.cloud_cover * 100)).astype(np.int64)
+    return {
+        "dlat": delta_latitude.tolist(),
+        "lon": longitude.tolist(),
+        "mag": mag.tolist(),
+        "cloud": cloud.tolist(),
+    }
+
+
+class ObservationClusterLayer(MarkerCluster):
+    """Client-side clustered layer of observation points with lazy popups."""
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var data = {{ this.columns_json }};
+                var scale = {{ this.scale }};
+                var colors = ["#d73027", "#fc8d59", "#fee08b", "#d9ef8b", "#91cf60", "#1a9850", "#1a9850", "#006837"];
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+
+                var popup = function (marker) {
+                    var i = marker.options.row;
+                    var mag = data.mag[i] < 0 ? "n/a" : data.mag[i];
+                    var cloud = data.cloud[i] < 0 ? "n/a" : data.cloud[i] + "%";
+                    var latlng = marker.getLatLng();
+                    return "<b>Observation</b><br>Limiting magnitude: " + mag +
+                        "<br>Cloud cover: " + cloud +
+                        "<br>" + latlng.lat.toFixed(4) + ", " + latlng.lng.toFixed(4);
+                };
+
+                var markers = new Array(data.lon.length);
+                var lat = 0;
+                for (var i = 0; i < data.lon.length; i++) {
+                    lat += data.dlat[i];
+                    var mag = data.mag[i];
+                    var marker = L.circleMarker([lat / scale, data.lon[i] / scale], {
+                        row: i,
+                        radius: 5,
+                        weight: 1,
+                        color: "#333",
+                        fillOpacity: 0.8,
+                        fillColor: mag < 0 ? "#888" : colors[Math.min(mag, colors.length - 1)],
+                    });
+                    marker.bindPopup(popup);
+                    markers[i] = marker;
+                }
+                cluster.addLayers(markers);
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(
+        self,
+        points: ObservationPoints,
+        name: Optional[str] = "GaN observations",
+        overlay: bool = True,
+        control: bool = True,
+        show: bool = True,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            points: Observations to show, sorted by latitude
+            name: Layer name in layer controls
+            overlay: Add as an optional overlay rather than a base layer
+            control: Include the layer in layer controls
+            show: Show the layer on load
+            **kwargs: Extra Leaflet.markercluster options
+        """
+        kwargs.setdefault("chunkedLoading", True)
+        kwargs.setdefault("removeOutsideVisibleBounds", True)
+        super().__init__(name=name, overlay=overlay, control=control, show=show, **kwargs)
+        self._name = "ObservationClusterLayer"
+        self.scale = COORDINATE_SCALE
+        self.columns_json = json.dumps(encode_points(points), separators=(",", ":"))
+        self.point_count = len(points)
+
+
+def build_observation_feature_group(points: ObservationPoints) -> folium.FeatureGroup:
+    """
+    Wrap an observation layer in a feature group for st_folium.
+
+    Passed as feature_group_to_add, the group is swapped in the browser
+    without remounting the map, which is how viewport updates are streamed.
+
+    Args:
+        points: Observations to show
+
+    Returns:
+        folium.FeatureGroup: Group containing one ObservationClusterLayer
+    """
+    group = folium.FeatureGroup(name="GaN observations")
+    ObservationClusterLayer(points, name=None, control=False).add_to(group)
+    return group
@@ -0,0 +1,230 @@
+"""Stream a PNG's pixels in strips of rows, with bounded memory.
+
+PIL decodes a whole image at once, and the North America light pollution map
+has 126 million pixels. This reader inflates the IDAT stream incrementally
+and un-filters it one strip at a time, so memory stays at a few strips
+whatever the image size.
+
+Pixels come as integer codes: palette indices for palette and grayscale
+images (``header.palette`` gives their colors), and packed 24-bit RGB
+(``0xRRGGBB``, see pack_rgb) for truecolor images. Alpha is dropped and
+16-bit samples are reduced to their high byte. Interlaced images are not
+supported.
+"""
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+DEFAULT_STRIP_ROWS = 256
+
+# Samples per pixel by PNG color type
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def pack_rgb(rgb: np.ndarray) -> np.ndarray:
+    """Pack (..., 3) RGB values into 24-bit integers (0xRRGGBB)."""
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def unpack_rgb(codes: np.ndarray) -> np.ndarray:
+    """Inverse of pack_rgb: (...) integers to (..., 3) uint8 RGB."""
+    codes = np.asarray(codes, dtype=np.uint32)
+    return np.stack([(codes >> 16) & 0xFF, (codes >> 8) & 0xFF, codes & 0xFF], axis=-1).astype(np.uint8)
+
+
+@dataclass(frozen=True)
+class PngHeader:
+    """Image properties from the IHDR and PLTE chunks."""
+
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+    interlace: int
+    palette: Optional[np.ndarray]  # packed color of each code; None for truecolor images
+
+    @property
+    def channels(self) -> int:
+        return _CHANNELS[self.color_type]
+
+    @property
+    def row_bytes(self) -> int:
+        """Bytes of one un-filtered row (without the filter type byte)."""
+        return (self.width * self.channels * self.bit_depth + 7) // 8
+
+    @property
+    def filter_stride(self) -> int:
+        """Bytes per complete pixel, as used by the Sub, Average and Paeth filters."""
+        return max(1, self.channels * self.bit_depth // 8)
+
+
+def _iter_chunks(handle: BinaryIO) -> Iterator[Tuple[bytes, bytes]]:
+    """Yield (type, data) of each chunk after the signature."""
+    while True:
+        head = handle.read(8)
+        if len(head) < 8:
+            raise ValueError("PNG ends before its IEND chunk")
+        length, kind = struct.unpack(">I4s", head)
+        data = handle.read(length)
+        handle.read(4)  # CRC
+        if len(data) < length:
+            raise ValueError(f"PNG chunk {kind!r} is truncated")
+        yield kind, data
+        if kind == b"IEND":
+            return
+
+
+def _open(path: Path) -> BinaryIO:
+    handle = open(path, "rb")
+    if handle.read(8) != PNG_SIGNATURE:
+        handle.close()
+        raise ValueError(f"Not a PNG file: {path}")
+    return handle
+
+
+def read_png_header(path: Union[str, Path]) -> PngHeader:
+    """
+    Read a PNG's header chunks without decoding any pixels.
+
+    Args:
+        path: PNG file
+
+    Returns:
+        PngHeader
+
+    Raises:
+        ValueError: If the file is not a PNG or uses an unsupported layout
+    """
+    with _open(Path(path)) as handle:
+        ihdr = None
+        palette = None
+        for kind, data in _iter_chunks(handle):
+            if kind == b"IHDR":
+                ihdr = struct.unpack(">IIBBBBB", data)
+            elif kind == b"PLTE":
+                palette = pack_rgb(np.frombuffer(data, dtype=np.uint8).reshape(-1, 3))
+            elif kind in (b"IDAT", b"IEND"):
+                break
+    if ihdr is None:
+        raise ValueError(f"PNG has no IHDR chunk: {path}")
+    width, height, bit_depth, color_type, _, _, interlace = ihdr
+    if color_type not in _CHANNELS:
+        raise ValueError(f"Unsupported PNG color type {color_type}: {path}")
+    if interlace:
+        raise ValueError(f"Interlaced PNGs are not supported: {path}")
+    if color_type in (0, 4):
+        # Grayscale: codes are gray levels, shown through a gray palette
+        levels = np.arange(2 ** min(bit_depth, 8), dtype=np.uint32)
+        gray = levels * 255 // max(len(levels) - 1, 1)
+        palette = gray * 0x010101
+    elif color_type != 3:
+        palette = None
+    elif palette is None:
+        raise ValueError(f"Palette PNG has no PLTE chunk: {path}")
+    return PngHeader(width, height, bit_depth, color_type, interlace, palette)
+
+
+def _unfilter_row(filter_type: int, row: np.ndarray, previous: np.ndarray, stride: int) -> np.ndarray:
+    """Reverse one row's PNG filter (uint8 arithmetic wraps modulo 256, as the format requires)."""
+    if filter_type == 0:
+        return row
+    if filter_type == 1:  # Sub
+        return np.cumsum(row.reshape(-1, stride), axis=0, dtype=np.uint8).ravel()
+    if filter_type == 2:  # Up
+        return row + previous
+    if filter_type not in (3, 4):
+        raise ValueError(f"Unknown PNG filter type {filter_type}")
+    # Average and Paeth depend on the pixel just decoded; libpng rarely
+    # writes them for palette images, so a plain loop is enough
+    out = bytearray(row.tobytes())
+    above = previous.tobytes()
+    for i in range(len(out)):
+        left = out[i - stride] if i >= stride else 0
+        if filter_type == 3:
+            out[i] = (out[i] + ((left + above[i]) >> 1)) & 0xFF
+            continue
+        upper_left = above[i - stride] if i >= stride else 0
+        estimate = left + above[i] - upper_left
+        distances = (abs(estimate - left), abs(estimate - above[i]), abs(estimate - upper_left))
+        predictor = (left, above[i], upper_left)[distances.index(min(distances))]
+        out[i] = (out[i] + predictor) & 0xFF
+    return np.frombuffer(bytes(out), dtype=np.uint8)
+
+
+def _to_codes(data: np.ndarray, header: PngHeader) -> np.ndarray:
+    """Un-filtered rows (rows, row_bytes) to pixel codes (rows, width)."""
+    rows = data.shape[0]
+    if header.bit_depth < 8:
+        per_byte = 8 // header.bit_depth
+        shifts = (np.arange(per_byte - 1, -1, -1) * header.bit_depth).astype(np.uint8)
+        values = (data[:, :, None] >> shifts) & np.uint8(2 ** header.bit_depth - 1)
+        return values.reshape(rows, -1)[:, : header.width]
+    samples = data.reshape(rows, header.width, header.channels, header.bit_depth // 8)[..., 0]
+    if header.palette is not None:
+        return samples[..., 0]
+    return pack_rgb(samples[..., :3])
+
+
+class PngStripReader:
+    """Iterate over a PNG in strips of rows."""
+
+    def __init__(self, path: Union[str, Path], strip_rows: int = DEFAULT_STRIP_ROWS):
+        """
+        Args:
+            path: PNG file
+            strip_rows: Rows per strip (the last strip may be shorter)
+
+        Raises:
+            ValueError: If the file is not a PNG or uses an unsupported layout
+        """
+        self.path = Path(path)
+        self.strip_rows = max(1, int(strip_rows))
+        self.header = read_png_header(self.path)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield (first_row, codes) for each strip.
+
+        codes has shape (rows, width): uint8 palette indices for palette and
+        grayscale images, uint32 packed RGB otherwise.
+        """
+        header = self.header
+        stride = header.row_bytes + 1
+        strip_bytes = stride * self.strip_rows
+        inflater = zlib.decompressobj()
+        pending = bytearray()
+        previous = np.zeros(header.row_bytes, dtype=np.uint8)
+        row = 0
+
+        def decode(raw: bytes) -> np.ndarray:
+            nonlocal previous
+            lines = np.frombuffer(raw, dtype=np.uint8).reshape(-1, stride)
+            filters = lines[:, 0]
+            data = lines[:, 1:]
+            if filters.any():
+                data = data.copy()
+                for i, filter_type in enumerate(filters.tolist()):
+                    data[i] = _unfilter_row(filter_type, data[i], data[i - 1] if i else previous, header.filter_stride)
+            previous = data[-1].copy()
+            return _to_codes(data, header)
+
+        with _open(self.path) as handle:
+            for kind, chunk in _iter_chunks(handle):
+                if kind == b"IDAT":
+                    pending += inflater.decompress(chunk)
+                elif kind == b"IEND":
+                    pending += inflater.flush()
+                while len(pending) >= strip_bytes or (kind == b"IEND" and len(pending) >= stride):
+                    size = min(len(pending) // stride * stride, strip_bytes)
+                    codes = decode(bytes(pending[:size]))
+                    del pending[:size]
+                    yield row, codes
+                    row += codes.shape[0]
+        if row != header.height:
+            raise ValueError(f"PNG has {row} of {header.height} rows: {self.path}")
@@ -0,0 +1,41 @@
+"""Streamlit adapter for the service result cache.
+
+The services cache through services/cache_backends.py and never import
+Streamlit. The app installs ``StreamlitCacheBackend`` at startup, which keeps
+their results in a store held by ``st.cache_resource``: shared by every
+session, and emptied by Streamlit's own "Clear cache" and
+``st.cache_resource.clear()``.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+import streamlit as st
+
+from services.cache_backends import CacheBackend, MemoryCacheBackend, get_cache_backend, set_cache_backend
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_store() -> MemoryCacheBackend:
+    """The store behind the adapter, one per Streamlit server."""
+    return MemoryCacheBackend()
+
+
+class StreamlitCacheBackend(CacheBackend):
+    """Cache backend living in Streamlit's resource cache."""
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        return _shared_store().get(key)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        _shared_store().set(key, value, ttl_seconds)
+
+    def clear(self) -> int:
+        return _shared_store().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**_shared_store().stats(), "backend": "streamlit"}
+
+
+def use_streamlit_cache() -> None:
+    """Route service caching through Streamlit; safe to call on every rerun."""
+    if not isinstance(get_cache_backend(), StreamlitCacheBackend):
+        set_cache_backend(StreamlitCacheBackend())
@@ -2,26 +2,38 @@
 Utility script to verify that light pollution map PNGs use only the
 colors defined in ``LIGHT_POLLUTION_SCALE``.
 
-Run from the repository root (with the virtualenv activated):
+Run from ``src/map_app`` (with the virtualenv activated):
 
-    python -m map_app.utils.validate_light_pollution_colors --map NorthAmerica2024.png
+    python -m utils.validate_light_pollution_colors
+    python -m utils.validate_light_pollution_colors --map NorthAmerica2024.png
 
-If ``--map`` is omitted, the script checks the default North America map
-at ``src/map_app/models/assets/light_pollution_maps/NorthAmerica2024.png``.
+Without ``--map`` or ``--path`` all six continent maps in
+``src/map_app/models/assets/light_pollution_maps`` are checked, in parallel.
+
+Maps are streamed in strips of rows (utils/png_strips.py) instead of being
+decoded whole, so memory stays at a few megabytes per map. Colors are
+counted as packed 24-bit integers: palette maps count their palette
+indices with ``np.bincount``, truecolor maps accumulate per-strip
+``np.unique`` counts in a dictionary. Unexpected colors are reported with
+their pixel count, bounding box and first pixel locations. The exit status
+is 1 when any map has unexpected colors.
 """
 from __future__ import annotations
 
-from pathlib import Path
 import argparse
-from typing import Dict, Tuple, Iterable
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
-from PIL import Image
-from map_app.models.optimal_locations import LIGHT_POLLUTION_SCALE
 
-Image.MAX_IMAGE_PIXELS = 150000000  # Prevent DecompressionBombError for large images
+from models.optimal_locations import CONTINENTS, LIGHT_POLLUTION_SCALE
+from utils.png_strips import DEFAULT_STRIP_ROWS, PngStripReader, pack_rgb
 
-DEFAULT_MAP_NAME = "NorthAmerica2024.png"
+DEFAULT_MAX_LOCATIONS = 10
 MAP_ROOT = (
     Path(__file__)
     .resolve()
@@ -31,73 +43,227 @@ MAP_ROOT = (
     / "light_pollution_maps"
 )
 
-def _collect_colors(image_path: Path) -> Dict[Tuple[int, int, int], int]:
-    """Return a mapping of RGB tuples to pixel counts for the PNG."""
+Color = Tuple[int, int, int]
+
+
+@dataclass
+class UnexpectedColor:
+    """Where a color outside the scale occurs in a map."""
+
+    count: int = 0
+    locations: List[Tuple[int, int]] = field(default_factory=list)  # first (x, y) pixels, in row order
+    bounds: Optional[Tuple[int, int, int, int]] = None  # (x_min, y_min, x_max, y_max)
+
+
+@dataclass
+class MapColorReport:
+    """Color census of one map."""
+
+    path: Path
+    width: int
+    height: int
+    counts: Dict[Color, int]
+    unexpected: Dict[Color, UnexpectedColor]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return not self.unexpected
+
+    @property
+    def missing(self) -> List[Color]:
+        return sorted(set(LIGHT_POLLUTION_SCALE) - set(self.counts))
+
+
+def _unpack(code: int) -> Color:
+    return (code >> 16) & 0xFF, (code >> 8) & 0xFF, code & 0xFF
+
+
+def _locate(
+    entry: UnexpectedColor, codes: np.ndarray, code: int, top: int, count: int, max_locations: int
+) -> None:
+    """Add one strip's pixels of an unexpected color to its entry."""
+    ys, xs = np.nonzero(codes == code)
+    entry.count += count
+    room = max_locations - len(entry.locations)
+    if room > 0:
+        entry.locations.extend((int(x), int(y) + top) for x, y in zip(xs[:room], ys[:room]))
+    box = (int(xs.min()), int(ys[0]) + top, int(xs.max()), int(ys[-1]) + top)
+    if entry.bounds is not None:
+        box = (
+            min(box[0], entry.bounds[0]), min(box[1], entry.bounds[1]),
+            max(box[2], entry.bounds[2]), max(box[3], entry.bounds[3]),
+        )
+    entry.bounds = box
+
+
+def scan_map_colors(
+    image_path: Path,
+    strip_rows: int = DEFAULT_STRIP_ROWS,
+    max_locations: int = DEFAULT_MAX_LOCATIONS,
+) -> MapColorReport:
+    """
+    Count a map's colors strip by strip and locate those outside the scale.
+
+    Args:
+        image_path: PNG file
+        strip_rows: Rows decoded at a time
+        max_locations: Pixel locations kept per unexpected color
+
+    Returns:
+        MapColorReport
+
+    Raises:
+        FileNotFoundError: If the map does not exist
+        ValueError: If the PNG cannot be streamed (e.g. interlaced)
+    """
+    image_path = Path(image_path)
     if not image_path.exists():
         raise FileNotFoundError(f"Map file not found: {image_path}")
 
-    image = Image.open(image_path).convert("RGB")
-    data = np.array(image).reshape(-1, 3)
-    unique_colors, counts = np.unique(data, axis=0, return_counts=True)
-    return {tuple(color.tolist()): int(counts[idx]) for idx, color in enumerate(unique_colors)}
+    started = time.perf_counter()
+    reader = PngStripReader(image_path, strip_rows)
+    palette = reader.header.palette
+    allowed = set(pack_rgb(np.array(list(LIGHT_POLLUTION_SCALE), dtype=np.uint8)).tolist())
+    counts: Dict[int, int] = {}
+    unexpected: Dict[int, UnexpectedColor] = {}
 
+    for top, codes in reader:
+        if palette is not None:
+            strip_counts = np.bincount(codes.ravel())
+            present = np.flatnonzero(strip_counts)
+            if present[-1] >= len(palette):
+                raise ValueError(f"Palette index {present[-1]} out of range in {image_path}")
+            colors = palette[present]
+            strip_counts = strip_counts[present]
+        else:
+            present, strip_counts = np.unique(codes, return_counts=True)
+            colors = present
+        for code, color, count in zip(present.tolist(), colors.tolist(), strip_counts.tolist()):
+            counts[color] = counts.get(color, 0) + count
+            if color not in allowed:
+                entry = unexpected.setdefault(color, UnexpectedColor())
+                _locate(entry, codes, code, top, count, max_locations)
 
-def _format_color(color: Tuple[int, int, int]) -> str:
-    return f"({color[0]:3d}, {color[1]:3d}, {color[2]:3d})"
+    return MapColorReport(
+        path=image_path,
+        width=reader.header.width,
+        height=reader.header.height,
+        counts={_unpack(code): count for code, count in counts.items()},
+        unexpected={_unpack(code): entry for code, entry in unexpected.items()},
+        seconds=time.perf_counter() - started,
+    )
 
 
-def validate_map_colors(image_path: Path) -> None:
-    """Print a report comparing map colors against the allowed scale."""
-    present_colors = _collect_colors(image_path)
-    allowed = set(LIGHT_POLLUTION_SCALE.keys())
-    present = set(present_colors.keys())
+def validate_maps(
+    paths: Sequence[Path],
+    workers: Optional[int] = None,
+    strip_rows: int = DEFAULT_STRIP_ROWS,
+    max_locations: int = DEFAULT_MAX_LOCATIONS,
+) -> List[MapColorReport]:
+    """
+    Scan several maps, one per worker process.
+
+    Args:
+        paths: PNG files
+        workers: Worker processes (defaults to one per CPU, at most one per map);
+            1 scans in this process
+        strip_rows: Rows decoded at a time
+        max_locations: Pixel locations kept per unexpected color
+
+    Returns:
+        Reports in the order of paths
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [scan_map_colors(path, strip_rows, max_locations) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(scan_map_colors, path, strip_rows, max_locations) for path in paths]
+        return [future.result() for future in futures]
+
+
+def _format_color(color: Color) -> str:
+    return f"({color[0]:3d}, {color[1]:3d}, {color[2]:3d})"
 
-    unexpected = present - allowed
-    missing = allowed - present
 
-    print(f"Analyzing: {image_path}")
-    print(f"Total unique colors found: {len(present_colors)}")
+def print_report(report: MapColorReport) -> None:
+    """Print a report comparing a map's colors against the allowed scale."""
+    print(f"Analyzing: {report.path}")
+    print(f"Size: {report.width} x {report.height}, scanned in {report.seconds:.2f}s")
+    for name, (*_, width, height, filename) in CONTINENTS.items():
+        if filename == report.path.name and (width, height) != (report.width, report.height):
+            print(f"  Note: CONTINENTS lists {name} as {width} x {height}")
+    print(f"Total unique colors found: {len(report.counts)}")
 
-    if unexpected:
-        print("\nUnexpected colors (count):")
-        for color in sorted(unexpected):
-            print(f"  {_format_color(color)} -> {present_colors[color]} pixels")
+    if report.unexpected:
+        print("\nUnexpected colors (count, bounding box x0,y0-x1,y1, first pixels x,y):")
+        for color in sorted(report.unexpected):
+            entry = report.unexpected[color]
+            x0, y0, x1, y1 = entry.bounds
+            pixels = " ".join(f"{x},{y}" for x, y in entry.locations)
+            print(f"  {_format_color(color)} -> {entry.count} pixels in {x0},{y0}-{x1},{y1}: {pixels}")
     else:
         print("\nNo unexpected colors found.")
 
-    if missing:
+    if report.missing:
         print("\nAllowed colors missing from map:")
-        for color in sorted(missing):
+        for color in report.missing:
             print(f"  {_format_color(color)} (expected level {LIGHT_POLLUTION_SCALE[color]})")
     else:
         print("\nAll allowed colors are present in the map.")
 
     print("\nTop 10 most frequent colors:")
-    top_colors = sorted(present_colors.items(), key=lambda item: item[1], reverse=True)[:10]
+    top_colors = sorted(report.counts.items(), key=lambda item: item[1], reverse=True)[:10]
     for color, count in top_colors:
         level = LIGHT_POLLUTION_SCALE.get(color, "<not in scale>")
         print(f"  {_format_color(color)} -> {count} pixels (level {level})")
 
 
-def main(argv: Iterable[str] | None = None) -> None:
+def validate_map_colors(image_path: Path) -> None:
+    """Print a report comparing map colors against the allowed scale."""
+    print_report(scan_map_colors(image_path))
+
+
+def main(argv: Iterable[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Validate light pollution map colors.")
     parser.add_argument(
         "--map",
-        dest="map_name",
-        default=DEFAULT_MAP_NAME,
-        help=f"PNG filename in {MAP_ROOT} (default: {DEFAULT_MAP_NAME})",
+        dest="map_names",
+        action="append",
+        default=None,
+        help=f"PNG filename in {MAP_ROOT}; repeat for several (default: all continent maps)",
     )
     parser.add_argument(
         "--path",
-        dest="map_path",
+        dest="map_paths",
+        action="append",
         default=None,
-        help="Optional full path to PNG; overrides --map when provided.",
+        help="Full path to a PNG; repeatable, overrides --map when provided.",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--strip-rows", type=int, default=DEFAULT_STRIP_ROWS, help="Rows decoded at a time")
+    parser.add_argument(
+        "--max-locations", type=int, default=DEFAULT_MAX_LOCATIONS, help="Pixel locations listed per unexpected color"
     )
     args = parser.parse_args(list(argv) if argv is not None else None)
 
-    image_path = Path(args.map_path) if args.map_path else MAP_ROOT / args.map_name
-    validate_map_colors(image_path)
+    if args.map_paths:
+        paths = [Path(path) for path in args.map_paths]
+    else:
+        names = args.map_names or [continent[-1] for continent in CONTINENTS.values()]
+        paths = [MAP_ROOT / name for name in names]
+
+    started = time.perf_counter()
+    reports = validate_maps(paths, args.workers, args.strip_rows, args.max_locations)
+    for index, report in enumerate(reports):
+        if index:
+            print("\n" + "-" * 60)
+        print_report(report)
+    failed = [report.path.name for report in reports if not report.ok]
+    print(f"\n{len(reports)} map(s) checked in {time.perf_counter() - started:.2f}s", end="")
+    print(f"; unexpected colors in: {', '.join(failed)}" if failed else "; all colors valid")
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())